@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+
+# Titus counterpart of functions.scala: times each function in a PFA test file
+# (baseline-functions.json or the conformance tests) and writes lines in the
+# timingResults.tsv format that formatResultsForWeb.py reads.
+#
+#     python titusFunctions.py run baseline-functions.json pfa-tests.json --output timingResults.tsv
+#     python titusFunctions.py compare before.tsv after.tsv --threshold 0.1
+
+import argparse
+import gc
+import json
+import re
+import sys
+import timeit
+
+import titus.datatype
+from titus.errors import PFARuntimeException
+from titus.genpy import PFAEngine
+
+def timeSample(engine, datum, failure, warmupSeconds, measureSeconds, minRepetitions):
+    """Call engine.action(datum) repeatedly, first for warmupSeconds (not
+    counted), then for at least measureSeconds and minRepetitions.  Returns
+    (mean seconds per call, number of calls measured)."""
+
+    timer = timeit.default_timer
+    gc.collect()
+    gcWasEnabled = gc.isenabled()
+    gc.disable()
+    try:
+        startTime = timer()
+        now = startTime
+        repetitions = 0
+        warming = warmupSeconds > 0.0
+        while warming or now - startTime < measureSeconds or repetitions < minRepetitions:
+            if warming and now - startTime >= warmupSeconds:
+                startTime = now
+                repetitions = 0
+                warming = False
+            if failure:
+                try:
+                    engine.action(datum)
+                except PFARuntimeException:
+                    pass
+            else:
+                engine.action(datum)
+            repetitions += 1
+            now = timer()
+    finally:
+        if gcWasEnabled:
+            gc.enable()
+
+    return (now - startTime) / repetitions, repetitions
+
+def doTests(fileName, output, functionPattern, warmupSamples, warmupSeconds, measureSeconds, minRepetitions):
+    """Time every function in a PFA test file.  As in functions.scala, the
+    first sample of each function is repeated warmupSamples times before the
+    real samples and not reported.  An unexpected exception in one function
+    is reported on standard error and skips the rest of that function only;
+    returns a list of (function, error message) pairs."""
+
+    tests = json.load(open(fileName))
+    version = tests.get("pfa-version")
+    errors = []
+
+    for test in tests["pfa-tests"]:
+        function = test["function"]
+        if functionPattern is not None and functionPattern.search(function) is None:
+            continue
+
+        try:
+            engine, = PFAEngine.fromJson(test["engine"], version=version)
+            inputType = json.dumps(engine.inputType.jsonNode(set()), separators=(",", ":"))
+
+            trials = test["trials"]
+            if len(trials) > 0:
+                trials = [trials[0]] * warmupSamples + trials
+
+            for sampleIndex, trial in enumerate(trials):
+                datum = titus.datatype.jsonDecoder(engine.inputType, trial["sample"])
+                jsonInput = json.dumps(trial["sample"], separators=(",", ":"))
+
+                if "error" in trial:
+                    result = "failure"
+                    value = str(trial["error"])
+                elif "nondeterministic" in trial:
+                    result = "success"
+                    value = "?"
+                else:
+                    result = "success"
+                    value = json.dumps(trial["result"], separators=(",", ":"))
+
+                timeInPFA, repetitions = timeSample(engine, datum, result == "failure", warmupSeconds, measureSeconds, minRepetitions)
+
+                if sampleIndex >= warmupSamples:
+                    output.write("\t".join([function, inputType, jsonInput, result, value, repr(timeInPFA), str(repetitions)]) + "\n")
+                    output.flush()
+
+        except Exception as err:
+            message = "{0}: {1}".format(err.__class__.__name__, str(err).replace("\n", " "))
+            errors.append((function, message))
+            sys.stderr.write("{0}\terror\t{1}\n".format(function, message))
+
+    return errors
+
+def readResults(fileName):
+    """Weighted mean seconds per call of the successful samples of each function, as in formatResultsForWeb.py."""
+
+    totals = {}
+    for line in open(fileName):
+        if line.startswith("Java HotSpot(TM)") or line.strip() == "":
+            continue
+        function, signature, input, result, output, timeSeconds, repetitions = line.rstrip("\n").split("\t")
+        if result == "success":
+            timeSeconds = float(timeSeconds)
+            repetitions = int(repetitions)
+            weightedTime, totalRepetitions = totals.get(function, (0.0, 0))
+            totals[function] = (weightedTime + timeSeconds * repetitions, totalRepetitions + repetitions)
+
+    return dict((function, weightedTime / totalRepetitions) for function, (weightedTime, totalRepetitions) in totals.items() if totalRepetitions > 0)
+
+def compareResults(beforeFileName, afterFileName, threshold, output):
+    """Print the per-function change in mean time and return the names of functions that slowed down by more than threshold (a fraction)."""
+
+    before = readResults(beforeFileName)
+    after = readResults(afterFileName)
+
+    regressions = []
+    output.write("{0:>12s} {1:>12s} {2:>9s}  {3}\n".format("before (us)", "after (us)", "change", "function"))
+    for function in sorted(set(before).intersection(after)):
+        change = after[function] / before[function] - 1.0 if before[function] > 0.0 else 0.0
+        flag = ""
+        if change > threshold:
+            regressions.append(function)
+            flag = "  REGRESSION"
+        output.write("{0:12.3f} {1:12.3f} {2:+8.1f}%  {3}{4}\n".format(before[function] * 1e6, after[function] * 1e6, change * 100.0, function, flag))
+
+    for function in sorted(set(before).symmetric_difference(after)):
+        output.write("{0:>12s} {1:>12s} {2:>9s}  {3}\n".format("-" if function not in before else "{0:.3f}".format(before[function] * 1e6), "-" if function not in after else "{0:.3f}".format(after[function] * 1e6), "", function))
+
+    return regressions
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description="Time each PFA function in Titus, or compare two timing results files.")
+    subparsers = argparser.add_subparsers(dest="command")
+
+    runparser = subparsers.add_parser("run", help="time the functions in PFA test files")
+    runparser.add_argument("tests", nargs="*", default=["baseline-functions.json"], help="PFA test files (default is baseline-functions.json)")
+    runparser.add_argument("--output", default="timingResults.tsv", help="timing results file, \"-\" for standard out (default is timingResults.tsv)")
+    runparser.add_argument("--function", default=None, help="only time functions whose names match this regular expression")
+    runparser.add_argument("--warmup-samples", type=int, default=30, help="number of times to run the first sample of each function without reporting, as in functions.scala (default is 30)")
+    runparser.add_argument("--warmup-seconds", type=float, default=0.009, help="time to spend on each sample before measuring (default is 0.009)")
+    runparser.add_argument("--seconds", type=float, default=0.001, help="minimum time to spend measuring each sample (default is 0.001)")
+    runparser.add_argument("--repetitions", type=int, default=1, help="minimum number of measured calls per sample (default is 1)")
+
+    compareparser = subparsers.add_parser("compare", help="compare two timing results files")
+    compareparser.add_argument("before", help="timing results file for the reference version")
+    compareparser.add_argument("after", help="timing results file for the new version")
+    compareparser.add_argument("--threshold", type=float, default=0.1, help="fractional slow-down to flag as a regression (default is 0.1)")
+
+    arguments = argparser.parse_args()
+
+    if arguments.command == "run":
+        if arguments.repetitions < 1:
+            argparser.error("--repetitions must be at least 1.")
+        if arguments.warmup_samples < 0:
+            argparser.error("--warmup-samples must not be negative.")
+        if arguments.function is not None:
+            functionPattern = re.compile(arguments.function)
+        else:
+            functionPattern = None
+
+        if arguments.output == "-":
+            output = sys.stdout
+        else:
+            output = open(arguments.output, "w")
+        errors = []
+        try:
+            for fileName in arguments.tests:
+                errors.extend(doTests(fileName, output, functionPattern, arguments.warmup_samples, arguments.warmup_seconds, arguments.seconds, arguments.repetitions))
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+        if len(errors) > 0:
+            sys.stderr.write("\n{0} function(s) could not be timed: {1}\n".format(len(errors), ", ".join(function for function, message in errors)))
+            sys.exit(1)
+
+    elif arguments.command == "compare":
+        regressions = compareResults(arguments.before, arguments.after, arguments.threshold, sys.stdout)
+        if len(regressions) > 0:
+            sys.stdout.write("\n{0} function(s) slower by more than {1:g}%: {2}\n".format(len(regressions), arguments.threshold * 100.0, ", ".join(regressions)))
+            sys.exit(1)
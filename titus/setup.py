@@ -42,7 +42,7 @@ setup(name="titus",
                 "titus.lib.stat",
                 "titus.pmml",
                 "titus.inspector"],
-      scripts = ["scripts/pfainspector", "scripts/pfachain", "scripts/pfaexternalize", "scripts/pfarandom", "scripts/pfasize"],
+      scripts = ["scripts/pfainspector", "scripts/pfachain", "scripts/pfaexternalize", "scripts/pfarandom", "scripts/pfasize", "scripts/pfabenchmark"],
       description="Python implementation of Portable Format for Analytics (PFA): producer, converter, and consumer.",
       test_suite="test",
       install_requires=["avro >= 1.7.6", "ply >= 3.4"],
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2014  Open Data ("Open Data" refers to
+# one or more of the following companies: Open Data Partners LLC,
+# Open Data Research LLC, or Open Data Capital LLC.)
+# 
+# This file is part of Hadrian.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import tempfile
+import unittest
+
+from titus.inspector.jsonindex import JsonIndex, IndexNode
+
+class TestJsonIndex(unittest.TestCase):
+    def index(self, text):
+        fd, fileName = tempfile.mkstemp(suffix=".json")
+        os.write(fd, text)
+        os.close(fd)
+        self.addCleanup(os.remove, fileName)
+        index = JsonIndex(fileName)
+        self.addCleanup(index.close)
+        return index
+
+    def testIndexStructure(self):
+        text = '{"a": [1, 2.5, "x,y]", {"b": null, "c": [[], {}, [3]]}], "d": "s\\"{", "e": {}, "f": [ ], "g": -1e5, "h\\u00e9": true}'
+        index = self.index(text)
+
+        self.assertTrue(isinstance(index.root, IndexNode))
+        self.assertEqual(index.root.count, 6)
+        self.assertEqual(index.size(index.root), len(text))
+        self.assertEqual(index.load(index.root), json.loads(text))
+
+        a = index.lookup(index.root, "a")
+        self.assertEqual((a.isDict, a.count), (False, 4))
+        self.assertEqual(sorted(a.children), [3])
+        self.assertEqual(index.lookup(a, 2), "x,y]")
+        self.assertEqual(index.lookup(a, -4), 1)
+        self.assertEqual(index.load(index.lookup(index.lookup(a, 3), "c")), [[], {}, [3]])
+        self.assertEqual(index.lookup(index.lookup(a, 3), "c").count, 3)
+        self.assertEqual(index.lookup(index.root, "e").count, 0)
+        self.assertEqual(index.lookup(index.root, "f").count, 0)
+
+        self.assertEqual(index.lookup(index.root, "d"), "s\"{")
+        self.assertEqual(index.lookup(index.root, "g"), -1e5)
+        self.assertEqual(index.lookup(index.root, u"h\u00e9"), True)
+        self.assertTrue(index.isContainer(index.root, "a"))
+        self.assertFalse(index.isContainer(index.root, "g"))
+
+        self.assertRaises(KeyError, lambda: index.lookup(index.root, "z"))
+        self.assertRaises(TypeError, lambda: index.lookup(index.root, 0))
+        self.assertRaises(IndexError, lambda: index.lookup(a, 4))
+        self.assertRaises(TypeError, lambda: index.lookup(a, "b"))
+
+        text = u'{"caf\u00e9": {"\u65e5\u672c": [1, 2]}, "na\u00efve": "x"}'.encode("utf-8")
+        index = self.index(text)
+        self.assertEqual(index.load(index.root), json.loads(text))
+        self.assertEqual(index.load(index.lookup(index.root, u"caf\u00e9")), {u"\u65e5\u672c": [1, 2]})
+        self.assertEqual(index.lookup(index.lookup(index.root, u"caf\u00e9"), u"\u65e5\u672c").count, 2)
+        self.assertEqual(index.lookup(index.root, u"na\u00efve"), "x")
+
+    def testLongArraysAreNotIndexedByElement(self):
+        values = [i * 0.5 for i in xrange(10000)]
+        index = self.index(json.dumps({"init": values, "trees": [{"left": i} for i in xrange(100)]}))
+
+        init = index.lookup(index.root, "init")
+        self.assertEqual(init.count, 10000)
+        self.assertEqual(init.children, {})
+        self.assertEqual(index.lookup(init, 9999), 4999.5)
+
+        trees = index.lookup(index.root, "trees")
+        self.assertEqual(trees.count, 100)
+        self.assertEqual(len(trees.children), 100)
+        self.assertEqual(index.lookup(index.lookup(trees, 42), "left"), 42)
+
+    def testMalformed(self):
+        self.assertRaises(ValueError, lambda: self.index('{"a": [1, 2}'))
+        self.assertRaises(ValueError, lambda: self.index('{"a": [1, 2]'))
+        self.assertRaises(ValueError, lambda: self.index('{"a": "b}'))
+        self.assertRaises(ValueError, lambda: self.index('{} []'))
+        self.assertEqual(self.index(' 3.5 ').root, 3.5)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1471,3 +1471,34 @@ action:
 ''')
         self.assertRaises(PFAException, lambda: engine.action(-.4))
         self.assertRaises(PFAException, lambda: engine.action(1.4))
+
+    def testCacheDistributionsPerEngine(self):
+        engine, = PFAEngine.fromYaml('''
+input: double
+output: double
+action:
+  - prob.dist.poissonQF: [input, 40.0]
+''')
+        expected = [engine.action(p) for p in [0.5, 0.9, 0.1, 0.99]]
+        self.assertEqual(engine.distributions.statistics()["misses"], 1)
+        self.assertEqual(engine.distributions.statistics()["hits"], 3)
+        self.assertEqual(expected, [40, 48, 32, 55])
+
+        distribution = engine.distributions.entries.values()[0]
+        self.assertTrue(len(distribution.table.values) > 55)
+        self.assertEqual([engine.action(p) for p in [0.5, 0.9, 0.1, 0.99]], expected)
+        self.assertAlmostEqual(distribution.table.values[40], distribution.CDF(40), places=12)
+
+        other, = PFAEngine.fromYaml('''
+input: double
+output: double
+action:
+  - prob.dist.tQF: [input, 4]
+''')
+        self.assertEqual(len(other.distributions.entries), 0)
+        first = other.action(0.975)
+        self.assertAlmostEqual(first, 2.776, places=3)
+        self.assertEqual(other.action(0.975), first)
+        distribution = other.distributions.entries.values()[0]
+        self.assertEqual(distribution.quantiles, {0.975: first})
+        self.assertTrue(len(distribution.brackets[1.0]) > 0)
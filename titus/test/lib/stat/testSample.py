@@ -17,10 +17,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import json
+import math
 import unittest
 
 from titus.genpy import PFAEngine
 from titus.errors import *
+from titus.util import SlidingWindow, VersionedMap
     
 class TestLib1StatSample(unittest.TestCase):
     def testAccumulateACounter(self):
@@ -456,6 +459,116 @@ action:
         self.assertAlmostEqual(engine.action(5.5), 6.86, places=2)
         self.assertAlmostEqual(engine.action(2.1), 1.96, places=2)
 
+    def testUpdateWindowDoesNotDisturbOldCopies(self):
+        engine, = PFAEngine.fromYaml('''
+input: double
+output: {type: array, items: double}
+cells:
+  state:
+    type: {type: array, items: {type: record, name: State, fields: [{name: x, type: double}, {name: w, type: double}, {name: count, type: double}, {name: mean, type: double}]}}
+    init: []
+action:
+  - let:
+      old: {cell: state}
+  - cell: state
+    to:
+      params: [{state: {type: array, items: State}}]
+      ret: {type: array, items: State}
+      do: {stat.sample.updateWindow: [input, 1.0, state, 3]}
+  - let:
+      fork: {stat.sample.updateWindow: [{u-: input}, 1.0, old, 3]}
+  - new:
+      - {a.len: {cell: state}}
+      - {attr: {a.last: {cell: state}}, path: [[mean]]}
+      - {a.len: fork}
+      - {attr: {a.last: fork}, path: [[x]]}
+    type: {type: array, items: double}
+''')
+        self.assertEqual(engine.action(1.0), [1.0, 1.0, 1.0, -1.0])
+        self.assertEqual(engine.action(2.0), [2.0, 1.5, 2.0, -2.0])
+        self.assertEqual(engine.action(3.0), [3.0, 2.0, 3.0, -3.0])
+        self.assertEqual(engine.action(4.0), [3.0, 3.0, 3.0, -4.0])
+        self.assertEqual(engine.action(5.0), [3.0, 4.0, 3.0, -5.0])
+        for i in xrange(100):
+            engine.action(6.0 + i)
+        self.assertEqual([x["x"] for x in engine.cells["state"].value], [103.0, 104.0, 105.0])
+
+        snapshot = engine.snapshot()
+        self.assertEqual([x["x"] for x in json.loads(snapshot.cells["state"].init)], [103.0, 104.0, 105.0])
+
+    def testUpdateWindowOutputsAreAvroSerializable(self):
+        import os
+        import shutil
+        import tempfile
+        from avro.datafile import DataFileReader
+        from avro.io import DatumReader
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        def writeAndRead(engine, outputs):
+            fileName = os.path.join(directory, "output.avro")
+            writer = engine.avroOutputDataFileWriter(fileName)
+            for x in outputs:
+                writer.append(x)
+            writer.close()
+            return list(DataFileReader(open(fileName, "rb"), DatumReader()))
+
+        engine, = PFAEngine.fromYaml('''
+input: double
+output: {type: array, items: {type: record, name: State, fields: [{name: x, type: double}, {name: w, type: double}, {name: count, type: double}]}}
+cells:
+  state:
+    type: {type: array, items: State}
+    init: []
+action:
+  - cell: state
+    to:
+      params: [{state: {type: array, items: State}}]
+      ret: {type: array, items: State}
+      do: {stat.sample.updateWindow: [input, 1.0, state, 2]}
+''')
+        outputs = [engine.action(x) for x in 1.0, 2.0, 3.0]
+        self.assertEqual([[y["x"] for y in x] for x in writeAndRead(engine, outputs)], [[1.0], [1.0, 2.0], [2.0, 3.0]])
+
+        engine, = PFAEngine.fromYaml('''
+input: double
+output: {type: array, items: {type: record, name: State, fields: [{name: x, type: double}, {name: w, type: double}, {name: count, type: double}]}}
+method: fold
+zero: []
+action: {stat.sample.updateWindow: [input, 1.0, tally, 2]}
+merge: {a.concat: [tallyOne, tallyTwo]}
+''')
+        outputs = [engine.action(x) for x in 1.0, 2.0, 3.0]
+        self.assertEqual([[y["x"] for y in x] for x in writeAndRead(engine, outputs)], [[1.0], [1.0, 2.0], [2.0, 3.0]])
+        # only the outputs are materialized; the tally stays a window so that the next update does not rebuild it
+        self.assertTrue(isinstance(engine.tally, SlidingWindow))
+
+    def testUpdateWindowInAUnionCanBeCast(self):
+        engine, = PFAEngine.fromYaml('''
+input: double
+output: int
+cells:
+  state:
+    type: {type: array, items: {type: record, name: State, fields: [{name: x, type: double}, {name: w, type: double}, {name: count, type: double}]}}
+    init: []
+action:
+  - cell: state
+    to:
+      params: [{state: {type: array, items: State}}]
+      ret: {type: array, items: State}
+      do: {stat.sample.updateWindow: [input, 1.0, state, 3]}
+  - let:
+      u:
+        upcast: {cell: state}
+        as: ["null", {type: array, items: State}]
+  - cast: u
+    cases:
+      - {as: {type: array, items: State}, named: arr, do: {a.len: arr}}
+      - {as: "null", named: n, do: -1}
+''')
+        self.assertEqual([engine.action(x) for x in 1.0, 2.0, 3.0, 4.0], [1, 2, 3, 3])
+
     def testAccumulateAnEWMA(self):
         engine, = PFAEngine.fromYaml('''
 input: double
@@ -1228,6 +1341,42 @@ action:
         self.assertEqual(engine.action(float("-inf")), [2.0, 2.0, 4.0])
         self.assertEqual(engine.action(float("nan")), [2.0, 2.0, 4.0])
 
+    def testFillADisjointVariableBinWidthHistogram(self):
+        engine, = PFAEngine.fromYaml('''
+input: double
+output: {type: array, items: double}
+cells:
+  histogram:
+    type:
+      type: record
+      name: Histogram
+      fields:
+        - {name: ranges, type: {type: array, items: {type: array, items: double}}}
+        - {name: values, type: {type: array, items: double}}
+        - {name: underflow, type: double}
+    init:
+      ranges: [[5.0, 10.0], [-3.0, 0.0], [0.0, 2.0], [12.0, 20.0]]
+      values: [0.0, 0.0, 0.0, 0.0]
+      underflow: 0.0
+action:
+  attr:
+    cell: histogram
+    to:
+      params: [{old: Histogram}]
+      ret: Histogram
+      do: {stat.sample.fillHistogram: [input, 1.0, old]}
+  path: [{string: values}]
+''')
+        self.assertEqual(engine.action(5.0), [1.0, 0.0, 0.0, 0.0])
+        self.assertEqual(engine.action(0.0), [1.0, 0.0, 1.0, 0.0])
+        self.assertEqual(engine.action(-0.5), [1.0, 1.0, 1.0, 0.0])
+        self.assertEqual(engine.action(2.0), [1.0, 1.0, 1.0, 0.0])
+        self.assertEqual(engine.action(11.0), [1.0, 1.0, 1.0, 0.0])
+        self.assertEqual(engine.action(19.0), [1.0, 1.0, 1.0, 1.0])
+        self.assertEqual(engine.action(-10.0), [1.0, 1.0, 1.0, 1.0])
+        self.assertEqual(engine.action(20.0), [1.0, 1.0, 1.0, 1.0])
+        self.assertEqual(engine.cells["histogram"].value["underflow"], 4.0)
+
     def testFillATwoDimensionalHistogram(self):
         engine, = PFAEngine.fromYaml('''
 input: {type: array, items: double}
@@ -1408,6 +1557,94 @@ action:
         self.assertEqual(engine.action("ragtime"), {"hello": 3.0, "my": 3.0, "darling": 1.0, "baby": 1.0, "ragtime": 1.0})
         self.assertEqual(engine.action("gal"),     {"hello": 3.0, "my": 3.0, "darling": 1.0, "baby": 1.0, "ragtime": 1.0, "gal": 1.0})
 
+    def testFillCounterDoesNotDisturbOldCopies(self):
+        engine, = PFAEngine.fromYaml("""
+input: string
+output: {type: array, items: double}
+cells:
+  state:
+    type: {type: record, name: Counter, fields: [{name: values, type: {type: map, values: double}}]}
+    init: {values: {one: 10.0}}
+action:
+  - let:
+      old: {cell: state}
+  - cell: state
+    to:
+      params: [{c: Counter}]
+      ret: Counter
+      do: {stat.sample.fillCounter: [input, 1.0, c]}
+  - let:
+      fork: {stat.sample.fillCounter: [{s.concat: [input, {string: "-fork"}]}, 1.0, old]}
+  - new:
+      - {map.len: {cell: state, path: [[values]]}}
+      - {map.len: old.values}
+      - {map.len: fork.values}
+      - {"if": {map.containsKey: [old.values, input]}, then: 1.0, else: 0.0}
+      - {a.sum: {map.values: {cell: state, path: [[values]]}}}
+      - {a.sum: {map.values: old.values}}
+    type: {type: array, items: double}
+""")
+        self.assertEqual(engine.action("one"), [1.0, 1.0, 2.0, 1.0, 11.0, 10.0])
+        self.assertEqual(engine.action("two"), [2.0, 1.0, 2.0, 0.0, 12.0, 11.0])
+        self.assertEqual(engine.action("two"), [2.0, 2.0, 3.0, 1.0, 13.0, 12.0])
+        for i in xrange(100):
+            engine.action(str(i))
+        self.assertEqual(engine.cells["state"].value["values"], dict([("one", 11.0), ("two", 2.0)] + [(str(i), 1.0) for i in xrange(100)]))
+
+        # the cell keeps a versioned map (updated in place) and snapshots serialize it as a plain map
+        self.assertTrue(isinstance(engine.cells["state"].value["values"], VersionedMap))
+        self.assertEqual(json.loads(engine.snapshot().cells["state"].init)["values"]["one"], 11.0)
+
+        engine, = PFAEngine.fromYaml("""
+input: string
+output: {type: map, values: double}
+cells:
+  state:
+    type: {type: record, name: Counter, fields: [{name: values, type: {type: map, values: double}}]}
+    init: {values: {}}
+    rollback: true
+action:
+  - cell: state
+    to:
+      params: [{c: Counter}]
+      ret: Counter
+      do: {stat.sample.fillCounter: [input, 1.0, c]}
+  - if: {"==": [input, {string: bad}]}
+    then: {error: "roll back"}
+  - {cell: state, path: [[values]]}
+""")
+        self.assertEqual(engine.action("good"), {"good": 1.0})
+        self.assertRaises(PFAUserException, lambda: engine.action("bad"))
+        self.assertEqual(engine.action("good"), {"good": 2.0})
+
+    def testFillCounterOutputsAreAvroSerializable(self):
+        import os
+        import shutil
+        import tempfile
+        from avro.datafile import DataFileReader
+        from avro.io import DatumReader
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        engine, = PFAEngine.fromYaml("""
+input: string
+output: {type: record, name: Counter, fields: [{name: values, type: {type: map, values: double}}]}
+method: fold
+zero: {values: {}}
+action: {stat.sample.fillCounter: [input, 1.0, tally]}
+merge: tallyOne
+""")
+        outputs = [engine.action(x) for x in "a", "b", "a"]
+        self.assertTrue(isinstance(engine.tally["values"], VersionedMap))
+
+        fileName = os.path.join(directory, "output.avro")
+        writer = engine.avroOutputDataFileWriter(fileName)
+        for x in outputs:
+            writer.append(x)
+        writer.close()
+        self.assertEqual([x["values"] for x in DataFileReader(open(fileName, "rb"), DatumReader())], [{"a": 1.0}, {"a": 1.0, "b": 1.0}, {"a": 2.0, "b": 1.0}])
+
     def testMaintainATop5List(self):
         engine, = PFAEngine.fromYaml("""
 input: double
@@ -1436,6 +1673,62 @@ fcns:
         self.assertEqual(engine.action(1.0), [3.0, 2.0, 1.5, 1.0, 1.0])
         self.assertEqual(engine.action(4.0), [4.0, 3.0, 2.0, 1.5, 1.0])
 
+    def testMaintainATop5ListLikeALinearScan(self):
+        engine, = PFAEngine.fromYaml("""
+input: double
+output: {type: array, items: double}
+cells:
+  state:
+    type: {type: array, items: double}
+    init: []
+action:
+  - cell: state
+    to:
+      params: [{old: {type: array, items: double}}]
+      ret: {type: array, items: double}
+      do: {stat.sample.topN: [input, old, 5, {fcn: u.lt}]}
+fcns:
+  lt:
+    params: [{x: double}, {y: double}]
+    ret: boolean
+    do: {"<": [{m.floor: x}, {m.floor: y}]}
+""")
+        expected = []
+        for x in [3.5, 1.2, 3.1, 7.0, 1.9, 3.9, 0.5, 7.5, 2.2, 1.1, 7.2, 3.0, 9.9, 0.1]:
+            index = 0
+            while index < len(expected) and not math.floor(expected[index]) < math.floor(x):
+                index += 1
+            expected = (expected[:index] + [x] + expected[index:])[:5]
+            self.assertEqual(engine.action(x), expected)
+
+    def testMaintainATop5ListFromAnUnsortedStart(self):
+        engine, = PFAEngine.fromYaml("""
+input: double
+output: {type: array, items: double}
+cells:
+  state:
+    type: {type: array, items: double}
+    init: [1.0, 5.0, 3.0]
+action:
+  - cell: state
+    to:
+      params: [{old: {type: array, items: double}}]
+      ret: {type: array, items: double}
+      do: {stat.sample.topN: [input, old, 5, {fcn: u.lt}]}
+fcns:
+  lt:
+    params: [{x: double}, {y: double}]
+    ret: boolean
+    do: {"<": [x, y]}
+""")
+        expected = [1.0, 5.0, 3.0]
+        for x in [4.0, 2.0, 0.5, 6.0, 7.0, 0.1, 9.0, 8.0]:
+            index = 0
+            while index < len(expected) and not expected[index] < x:
+                index += 1
+            expected = (expected[:index] + [x] + expected[index:])[:5]
+            self.assertEqual(engine.action(x), expected)
+
     def testMaintainATop5ListOfStrings(self):
         engine, = PFAEngine.fromYaml("""
 input: string
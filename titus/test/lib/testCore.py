@@ -145,6 +145,26 @@ action:
         self.assertEqual(engine.action(9223372036854775807), -9223372036854775807)
         self.assertRaises(PFARuntimeException, lambda: engine.action(-9223372036854775808))
 
+    def testOverflowErrorCodesAndPositions(self):
+        for op, code in [("+", 18000), ("-", 18010), ("*", 18020)]:
+            engine, = PFAEngine.fromJson({"input": "int", "output": "int", "action": [{op: ["input", 2147483647], "@": "here"}]})
+            try:
+                engine.action(-5 if op == "-" else 5)
+            except PFARuntimeException as err:
+                self.assertEqual(err.code, code)
+                self.assertEqual(err.fcnName, op)
+                self.assertTrue("here" in err.pos)
+            else:
+                self.fail()
+
+            engine, = PFAEngine.fromJson({"input": "long", "output": "long", "action": [{op: ["input", {"long": 9223372036854775807}]}]})
+            try:
+                engine.action(-5 if op == "-" else 5)
+            except PFARuntimeException as err:
+                self.assertEqual(err.code, code + 1)
+            else:
+                self.fail()
+
     def testDoMultiplication(self):
         engine, = PFAEngine.fromYaml('''
 input: double
@@ -474,6 +494,14 @@ action:
         self.assertFalse(GT.action(5.3))
         self.assertTrue(GT.action(5.4))
 
+    def testNaNComparisons(self):
+        nan = float("nan")
+        for op, expected in [("==", [False, True, False]), ("!=", [True, False, True]), ("<", [True, False, False]), ("<=", [True, True, False]), (">", [False, False, True]), (">=", [False, True, True]), ("cmp", [-1, 0, 1])]:
+            engine, = PFAEngine.fromJson({"input": {"type": "array", "items": "double"}, "output": ("int" if op == "cmp" else "boolean"), "action": [{op: [{"attr": "input", "path": [0]}, {"attr": "input", "path": [1]}]}]})
+            self.assertEqual(engine.action([1.0, nan]), expected[0])
+            self.assertEqual(engine.action([nan, nan]), expected[1])
+            self.assertEqual(engine.action([nan, 1.0]), expected[2])
+
     def testSpecificNonNumericOperators(self):
         LE, = PFAEngine.fromYaml("""
 input: string
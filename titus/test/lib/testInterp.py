@@ -17,6 +17,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import random
 import unittest
 
 from titus.genpy import PFAEngine
@@ -342,5 +343,83 @@ action:
         self.assertEqual(engine.action(1.1), None)
         self.assertEqual(engine.action(1.2), None)
 
+    def testLinearIndexAgreesWithScan(self):
+        from titus.lib.interp import Linear
+        from titus.util import IdentityCache
+        rng = random.Random(12345)
+        cache = IdentityCache()
+        for trial in xrange(20):
+            table = [{"x": float(rng.randint(-20, 20)), "to": rng.random()} for i in xrange(rng.randint(1, 30))]
+            for repeat in xrange(2):
+                for datum in [rng.uniform(-25.0, 25.0) for i in xrange(20)] + [-20.0, 0.0, 20.0, float("inf"), float("-inf")]:
+                    try:
+                        expected = Linear.closestScan(datum, table, 0, "interp.linear", None)
+                    except PFARuntimeException as err:
+                        self.assertRaises(PFARuntimeException, lambda: Linear.closest(datum, table, 0, "interp.linear", None, cache))
+                    else:
+                        one, two, between = Linear.closest(datum, table, 0, "interp.linear", None, cache)
+                        self.assertTrue(one is expected[0])
+                        self.assertTrue(two is expected[1])
+                        self.assertEqual(between, expected[2])
+
+    def testLinearTableUpdate(self):
+        engine, = PFAEngine.fromYaml('''
+input: double
+output: double
+cells:
+  table:
+    type:
+      type: array
+      items:
+        type: record
+        name: Table
+        fields:
+          - {name: x, type: double}
+          - {name: to, type: double}
+    init:
+      - {x: 0.0, to: 0.0}
+      - {x: 1.0, to: 1.0}
+action:
+  - if: {"<": [input, 0.0]}
+    then:
+      - cell: table
+        to:
+          type: {type: array, items: Table}
+          value: [{x: 0.0, to: 0.0}, {x: 1.0, to: 10.0}]
+  - interp.linear: [{m.abs: input}, {cell: table}]
+''')
+        self.assertAlmostEqual(engine.action(0.5), 0.5, places=3)
+        self.assertAlmostEqual(engine.action(0.5), 0.5, places=3)
+        self.assertAlmostEqual(engine.action(0.5), 0.5, places=3)
+        self.assertAlmostEqual(engine.action(-0.5), 5.0, places=3)
+        self.assertAlmostEqual(engine.action(0.5), 5.0, places=3)
+        self.assertAlmostEqual(engine.action(0.5), 5.0, places=3)
+
+    def testLinearIndexesMoreTablesThanACacheHolds(self):
+        from titus.lib.interp import Linear
+        from titus.util import IdentityCache
+
+        cache = IdentityCache(maxSize=4)
+        tables = [[{"x": 0.0, "to": 0.0}, {"x": 1.0, "to": float(i)}] for i in xrange(10)]
+        for table in tables:
+            cache.put(table, "index")
+            self.assertEqual(cache.get(tables[0]), "index")
+        self.assertEqual(len(cache.entries), 4)
+        self.assertEqual([cache.get(x) for x in tables], ["index"] + [None] * 6 + ["index"] * 3)
+
+        numTables = IdentityCache().maxSize + 6
+        tableType = {"type": "array", "items": {"type": "record", "name": "Table", "fields": [{"name": "x", "type": "double"}, {"name": "to", "type": "double"}]}}
+        engine, = PFAEngine.fromJson({
+            "input": "double",
+            "output": "double",
+            "action": [{"a.sum": {"type": {"type": "array", "items": "double"}, "new": [{"interp.linear": ["input", {"cell": "t{0}".format(i)}]} for i in xrange(numTables)]}}],
+            "cells": dict(("t{0}".format(i), {"type": tableType if i == 0 else {"type": "array", "items": "Table"}, "init": [{"x": 0.0, "to": 0.0}, {"x": 1.0, "to": float(i)}]}) for i in xrange(numTables))})
+        for i in xrange(3):
+            self.assertAlmostEqual(engine.action(0.5), sum(0.5 * i for i in xrange(numTables)), places=6)
+        self.assertEqual(len(engine.identityCaches), numTables)
+        for cache in engine.identityCaches.values():
+            (table, index), = cache.entries.values()
+            self.assertEqual(index[0], [0.0, 1.0])
+
 if __name__ == "__main__":
     unittest.main()
@@ -289,5 +289,60 @@ action: {rand.gaussian: [10, 2]}
         self.assertAlmostEqual(engine.action(None), 10.143049927, places=5)
         self.assertAlmostEqual(engine.action(None), 10.7667383886, places=5)
 
+    def testBulkBackend(self):
+        document = '''
+input: "null"
+output: {type: array, items: double}
+randseed: 12345
+action:
+  - let:
+      choices: {rand.choices: [1000, {value: [0, 1, 2, 3], type: {type: array, items: int}}]}
+      sample: {rand.sample: [3, {value: [0, 1, 2, 3, 4], type: {type: array, items: int}}]}
+      histogram: {rand.histogram: {value: [3.3, 0.0, 5.5], type: {type: array, items: double}}}
+      string: {rand.string: [20, {string: "abc"}]}
+      bytes: {rand.bytes: [20, 65, 70]}
+      int: {rand.int: [5, 10]}
+      long: {rand.long: []}
+      gaussian: {rand.gaussian: [10, 2]}
+  - new:
+      - {a.sum: choices}
+      - {a.sum: sample}
+      - histogram
+      - {s.len: string}
+      - {bytes.len: bytes}
+      - int
+      - long
+      - gaussian
+    type: {type: array, items: double}
+'''
+        engine1, engine2 = PFAEngine.fromYaml(document, options={"rng": "numpy"}, multiplicity=2)
+        again, = PFAEngine.fromYaml(document, options={"rng": "numpy"})
+        results1 = [engine1.action(None) for i in xrange(100)]
+        results2 = [engine2.action(None) for i in xrange(100)]
+        self.assertEqual(results1, [again.action(None) for i in xrange(100)])
+        self.assertNotEqual(results1, results2)
+
+        for choices, sample, histogram, string, bytes, int, long, gaussian in results1:
+            self.assertTrue(0 <= choices <= 3000)
+            self.assertTrue(3 <= sample <= 9)
+            self.assertTrue(histogram in (0.0, 2.0))
+            self.assertEqual((string, bytes), (20, 20))
+            self.assertTrue(5 <= int < 10)
+            self.assertTrue(-2**63 <= long < 2**63)
+        self.assertAlmostEqual(sum(x[0] for x in results1) / 100000.0, 1.5, places=1)
+        self.assertAlmostEqual(sum(x[7] for x in results1) / 100.0, 10.0, places=0)
+
+        engine, = PFAEngine.fromYaml('''
+input: {type: array, items: double}
+output: int
+action: {rand.histogram: input}
+''', options={"rng": "numpy"})
+        self.assertRaises(PFARuntimeException, lambda: engine.action([1.0, -1.0]))
+        self.assertRaises(PFARuntimeException, lambda: engine.action([1.0, float("nan")]))
+        self.assertRaises(PFARuntimeException, lambda: engine.action([0.0, 0.0]))
+        self.assertEqual(engine.action([0.0, 1.0, 0.0]), 1)
+
+        self.assertRaises(PFAInitializationException, lambda: PFAEngine.fromYaml(document, options={"rng": "mersenne"}))
+
 if __name__ == "__main__":
     unittest.main()
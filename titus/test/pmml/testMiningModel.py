@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2014  Open Data ("Open Data" refers to
+# one or more of the following companies: Open Data Partners LLC,
+# Open Data Research LLC, or Open Data Capital LLC.)
+# 
+# This file is part of Hadrian.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import unittest
+
+from titus.genpy import PFAEngine
+from titus.pmml.reader import loadPMML
+from titus.pmml.reader import pmmlToNode
+
+def tree(functionName, scores, threshold):
+    return '''
+            <TreeModel functionName="{0}" splitCharacteristic="binarySplit">
+                <Node>
+                    <True/>
+                    <Node>
+                        <SimplePredicate field="x" operator="lessThan" value="{3}"/>
+                        <Node score="{1[0]}">
+                            <SimplePredicate field="z" operator="equal" value="hello"/>
+                        </Node>
+                        <Node score="{1[1]}">
+                            <SimplePredicate field="z" operator="notEqual" value="hello"/>
+                        </Node>
+                    </Node>
+                    <Node score="{2}">
+                        <SimplePredicate field="x" operator="greaterOrEqual" value="{3}"/>
+                    </Node>
+                </Node>
+            </TreeModel>'''.format(functionName, scores, scores[2], threshold)
+
+def ensemble(functionName, multipleModelMethod, segments, xType="double"):
+    return '''
+<PMML version="4.2">
+    <Header copyright=""/>
+    <DataDictionary>
+        <DataField name="x" optype="continuous" dataType="{3}" />
+        <DataField name="z" optype="categorical" dataType="string" />
+    </DataDictionary>
+    <MiningModel functionName="{0}">
+        <Segmentation multipleModelMethod="{1}">{2}
+        </Segmentation>
+    </MiningModel>
+</PMML>
+'''.format(functionName, multipleModelMethod, "".join('''
+            <Segment weight="{0}">
+                <True/>{1}
+            </Segment>'''.format(weight, tree(functionName, scores, threshold)) for weight, scores, threshold in segments), xType)
+
+class TestMiningModel(unittest.TestCase):
+    regressionSegments = [(1, (1.0, 2.0, 3.0), 1), (3, (10.0, 20.0, 30.0), 2)]
+    classificationSegments = [(1, ("a", "b", "c"), 1), (1, ("a", "c", "b"), 2), (3, ("b", "b", "c"), 3)]
+
+    def testRegressionEnsembles(self):
+        for method, expected in [("sum", [11.0, 22.0, 13.0, 33.0]),
+                                 ("average", [5.5, 11.0, 6.5, 16.5]),
+                                 ("weightedAverage", [7.75, 15.5, 8.25, 23.25])]:
+            engine, = PFAEngine.fromPmml(ensemble("regression", method, self.regressionSegments))
+            self.assertAlmostEqual(engine.action({"x": 0.5, "z": "hello"}), expected[0])
+            self.assertAlmostEqual(engine.action({"x": 0.5, "z": "goodbye"}), expected[1])
+            self.assertAlmostEqual(engine.action({"x": 1.5, "z": "hello"}), expected[2])
+            self.assertAlmostEqual(engine.action({"x": 2.5, "z": "hello"}), expected[3])
+
+    def testClassificationEnsembles(self):
+        engine, = PFAEngine.fromPmml(ensemble("classification", "majorityVote", self.classificationSegments))
+        self.assertEqual(engine.action({"x": 0.5, "z": "hello"}), "a")
+        self.assertEqual(engine.action({"x": 0.5, "z": "goodbye"}), "b")
+        self.assertEqual(engine.action({"x": 1.5, "z": "goodbye"}), "c")
+        self.assertEqual(engine.action({"x": 3.5, "z": "hello"}), "c")
+
+        engine, = PFAEngine.fromPmml(ensemble("classification", "weightedMajorityVote", self.classificationSegments))
+        self.assertEqual(engine.action({"x": 0.5, "z": "hello"}), "b")
+        self.assertEqual(engine.action({"x": 1.5, "z": "goodbye"}), "b")
+        self.assertEqual(engine.action({"x": 3.5, "z": "hello"}), "c")
+
+    def testNonDoubleNumericFields(self):
+        engine, = PFAEngine.fromPmml(ensemble("regression", "sum", self.regressionSegments, "integer"))
+        self.assertAlmostEqual(engine.action({"x": 0, "z": "hello"}), 11.0)
+        self.assertAlmostEqual(engine.action({"x": 1, "z": "hello"}), 13.0)
+        self.assertAlmostEqual(engine.action({"x": 2, "z": "hello"}), 33.0)
+
+        engine, = PFAEngine.fromPmml(ensemble("classification", "majorityVote", self.classificationSegments, "float"))
+        self.assertEqual(engine.action({"x": 0.5, "z": "hello"}), "a")
+        self.assertEqual(engine.action({"x": 3.5, "z": "hello"}), "c")
+
+    def testPackedCell(self):
+        pfa = pmmlToNode(ensemble("regression", "sum", self.regressionSegments))
+        self.assertEqual(pfa["cells"]["modelData"]["type"]["type"], "array")
+        trees = pfa["cells"]["modelData"]["init"]
+        self.assertEqual(len(trees), 2)
+        self.assertEqual([(node["pass"], node["fail"]) for node in trees[0]["nodes"]], [(1, 4), (2, 3), (-1, -1), (-1, -1), (-1, -1)])
+        self.assertEqual([node["score"] for node in trees[1]["nodes"] if node["pass"] < 0], [10.0, 20.0, 30.0])
+
+    def testStreamingCompaction(self):
+        pmml = ensemble("regression", "sum", self.regressionSegments)
+
+        compacted = loadPMML(pmml, compactSegments=True)
+        for segment in compacted.MiningModel[0].Segmentation[0].Segment:
+            self.assertEqual(segment.TreeModel, [])
+            self.assertEqual(len(segment.packed["nodes"]), 5)
+
+        notCompacted = loadPMML(pmml)
+        for segment in notCompacted.MiningModel[0].Segmentation[0].Segment:
+            self.assertEqual(len(segment.TreeModel), 1)
+
+        options = {"engine.name": "Ensemble"}
+        self.assertEqual(pmmlToNode(pmml, dict(options, **{"reader.compactSegments": True})), pmmlToNode(pmml, dict(options, **{"reader.compactSegments": False})))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2014  Open Data ("Open Data" refers to
+# one or more of the following companies: Open Data Partners LLC,
+# Open Data Research LLC, or Open Data Capital LLC.)
+# 
+# This file is part of Hadrian.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import math
+import unittest
+
+from titus.genpy import PFAEngine
+from titus.pmml.reader import pmmlToNode
+
+class TestRegression(unittest.TestCase):
+    dataDictionary = '''
+    <DataDictionary>
+        <DataField name="x" optype="continuous" dataType="double" />
+        <DataField name="y" optype="continuous" dataType="integer" />
+        <DataField name="z" optype="categorical" dataType="string" />
+        <DataField name="w" optype="categorical" dataType="integer" />
+    </DataDictionary>'''
+
+    def testLinearRegression(self):
+        pmml = '''
+<PMML version="4.2">
+    <Header copyright=""/>{0}
+    <RegressionModel functionName="regression">
+        <RegressionTable intercept="1.5">
+            <NumericPredictor name="x" coefficient="2"/>
+            <NumericPredictor name="y" exponent="2" coefficient="0.5"/>
+            <CategoricalPredictor name="z" value="hello" coefficient="10"/>
+            <CategoricalPredictor name="z" value="there" coefficient="20"/>
+            <CategoricalPredictor name="w" value="3" coefficient="100"/>
+            <PredictorTerm coefficient="-1">
+                <FieldRef field="x"/>
+                <FieldRef field="y"/>
+            </PredictorTerm>
+        </RegressionTable>
+    </RegressionModel>
+</PMML>
+'''.format(self.dataDictionary)
+
+        pfa = pmmlToNode(pmml)
+        self.assertEqual(pfa["cells"]["modelData"]["init"]["coeff"], [2.0, 0.5, -1.0, 10.0, 20.0, 100.0])
+        self.assertEqual(pfa["cells"]["modelData"]["init"]["oneHot"], {"z": {"hello": 3, "there": 4}, "w": {"3": 5}})
+
+        engine, = PFAEngine.fromPmml(pmml)
+        self.assertAlmostEqual(engine.action({"x": 1.0, "y": 2, "z": "hello", "w": 3}), 1.5 + 2.0 + 2.0 + 10.0 + 100.0 - 2.0)
+        self.assertAlmostEqual(engine.action({"x": 1.0, "y": 2, "z": "there", "w": 4}), 1.5 + 2.0 + 2.0 + 20.0 - 2.0)
+        self.assertAlmostEqual(engine.action({"x": 0.0, "y": 0, "z": "other", "w": 0}), 1.5)
+
+    def testLogitRegression(self):
+        engine, = PFAEngine.fromPmml('''
+<PMML version="4.2">
+    <Header copyright=""/>{0}
+    <RegressionModel functionName="regression" normalizationMethod="logit">
+        <RegressionTable intercept="-1">
+            <NumericPredictor name="x" coefficient="2"/>
+        </RegressionTable>
+    </RegressionModel>
+</PMML>
+'''.format(self.dataDictionary))
+        self.assertAlmostEqual(engine.action({"x": 1.5, "y": 0, "z": "", "w": 0}), 1.0 / (1.0 + math.exp(-2.0)))
+
+    def testMultinomialClassification(self):
+        pmml = '''
+<PMML version="4.2">
+    <Header copyright=""/>{0}
+    <RegressionModel functionName="classification" normalizationMethod="softmax">
+        <RegressionTable intercept="0" targetCategory="one">
+            <NumericPredictor name="x" coefficient="1"/>
+        </RegressionTable>
+        <RegressionTable intercept="0" targetCategory="two">
+            <NumericPredictor name="x" coefficient="-1"/>
+            <CategoricalPredictor name="z" value="hello" coefficient="5"/>
+        </RegressionTable>
+        <RegressionTable intercept="1" targetCategory="three"/>
+    </RegressionModel>
+</PMML>
+'''.format(self.dataDictionary)
+
+        pfa = pmmlToNode(pmml)
+        self.assertEqual(pfa["cells"]["modelData"]["init"]["coeff"], [[1.0, 0.0], [-1.0, 5.0], [0.0, 0.0]])
+        self.assertEqual(pfa["cells"]["modelData"]["init"]["const"], [0.0, 0.0, 1.0])
+
+        engine, = PFAEngine.fromPmml(pmml)
+        self.assertEqual(engine.action({"x": 2.0, "y": 0, "z": "", "w": 0}), "one")
+        self.assertEqual(engine.action({"x": -2.0, "y": 0, "z": "", "w": 0}), "two")
+        self.assertEqual(engine.action({"x": 0.0, "y": 0, "z": "", "w": 0}), "three")
+        self.assertEqual(engine.action({"x": 2.0, "y": 0, "z": "hello", "w": 0}), "two")
+
+    def testBinaryLogitClassification(self):
+        engine, = PFAEngine.fromPmml('''
+<PMML version="4.2">
+    <Header copyright=""/>{0}
+    <RegressionModel functionName="classification" normalizationMethod="logit">
+        <RegressionTable intercept="-1" targetCategory="yes">
+            <NumericPredictor name="x" coefficient="1"/>
+        </RegressionTable>
+        <RegressionTable intercept="0" targetCategory="no"/>
+    </RegressionModel>
+</PMML>
+'''.format(self.dataDictionary))
+        self.assertEqual(engine.action({"x": 0.5, "y": 0, "z": "", "w": 0}), "no")
+        self.assertEqual(engine.action({"x": 1.5, "y": 0, "z": "", "w": 0}), "yes")
+
+    def testBinaryUnnormalizedClassification(self):
+        engine, = PFAEngine.fromPmml('''
+<PMML version="4.2">
+    <Header copyright=""/>{0}
+    <RegressionModel functionName="classification" normalizationMethod="none">
+        <RegressionTable intercept="0" targetCategory="yes">
+            <NumericPredictor name="x" coefficient="1"/>
+        </RegressionTable>
+        <RegressionTable intercept="0" targetCategory="no"/>
+    </RegressionModel>
+</PMML>
+'''.format(self.dataDictionary))
+        # p(yes) = x and p(no) = 1 - x, so "yes" needs x >= 0.5, not just x > 0 (the score of the second table)
+        self.assertEqual(engine.action({"x": 0.3, "y": 0, "z": "", "w": 0}), "no")
+        self.assertEqual(engine.action({"x": 0.7, "y": 0, "z": "", "w": 0}), "yes")
+        self.assertEqual(engine.action({"x": -0.5, "y": 0, "z": "", "w": 0}), "no")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -935,5 +935,37 @@ types:
   some = int;
 ''', lineNumbers=False), {"name": "test", "input": {"fields": [{"type": "int", "name": "one"}, {"type": "double", "name": "two"}, {"type": "string", "name": "three"}], "type": "record", "name": "MyRecord"}, "output": "int", "method": "map", "action": [{"attr": "input", "path": [{"string": "one"}]}]})
 
+    def testTemplateCache(self):
+        template = r'''
+input: <<T>>
+output: <<T>>
+action: table.value + <<expr>>
+cells:
+  table(record(key: string, value: <<T>>)) = <<data>>
+'''
+        def cacheSizes():
+            return len([key for key in titus.prettypfa.parser.cache if key[0] == template]), len(titus.prettypfa.checkedCache)
+
+        parsed, checked = cacheSizes()
+
+        one = titus.prettypfa.jsonNode(template, lineNumbers=False, T="double", expr="input", data={"key": "one", "value": 1.5})
+        two = titus.prettypfa.jsonNode(template, lineNumbers=False, T="double", expr="input", data={"key": "two", "value": 2.5})
+        self.assertEqual(one["cells"]["table"]["init"], {"key": "one", "value": 1.5})
+        self.assertEqual(two["cells"]["table"]["init"], {"key": "two", "value": 2.5})
+        self.assertEqual(one["action"], [{"+": [{"cell": "table", "path": [{"string": "value"}]}, "input"]}])
+        self.assertEqual(cacheSizes(), (parsed + 1, checked + 1))
+
+        three = titus.prettypfa.jsonNode(template, lineNumbers=False, T="int", expr="input * 2", data={"key": "three", "value": 3})
+        self.assertEqual(three["input"], "int")
+        self.assertEqual(three["action"], [{"+": [{"cell": "table", "path": [{"string": "value"}]}, {"*": ["input", 2]}]}])
+        self.assertEqual(cacheSizes(), (parsed + 1, checked + 2))
+
+        self.assertRaises(Exception, lambda: titus.prettypfa.jsonNode(template, T="double", expr="input", data={"key": "bad", "value": "not a number"}))
+        self.assertRaises(Exception, lambda: titus.prettypfa.jsonNode(template, T="string", expr="input", data={"key": "bad", "value": "string"}))
+
+        engine, = titus.prettypfa.engine(template, T="double", expr="-input", data={"key": "four", "value": 4.0})
+        self.assertEqual(engine.action(5.0), -1.0)
+        self.assertEqual(cacheSizes()[0], parsed + 1)
+
 if __name__ == "__main__":
     unittest.main()
@@ -17,7 +17,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import itertools
+import multiprocessing
+import os
 import random
+import shutil
+import tempfile
 import unittest
 
 import numpy
@@ -193,5 +198,129 @@ class TestProducerCart(unittest.TestCase):
         # look(doc, maxDepth=8)
         engine, = PFAEngine.fromJson(doc)
 
+    def testSortedCategorySplitIsExact(self):
+        random.seed(12345)
+        numpy.seterr(divide="ignore", invalid="ignore")
+        rows = []
+        for i in xrange(2000):
+            a = random.randint(0, 8)
+            z = random.gauss(a % 4, 1.0)
+            c = "yes" if random.random() < (a * 7 % 9) / 9.0 else "no"
+            rows.append(("A" + str(a), z, c))
+        dataset = Dataset.fromIterable(rows, names=("a", "z", "c"))
+
+        def nTimesVariance(values):
+            return len(values) * numpy.var(values) if len(values) > 0 else 0.0
+
+        def entropy(values):
+            out = 0.0
+            for category in set(values):
+                frac = 1.0 * numpy.sum(values == category) / len(values)
+                out -= frac * numpy.log2(frac)
+            return out
+
+        def regressionGain(tree, selection):
+            return -nTimesVariance(tree.predictand.data[selection]) - nTimesVariance(tree.predictand.data[~selection])
+
+        def classificationGain(tree, selection):
+            return -(1.0 * numpy.sum(selection) / len(selection)) * entropy(tree.predictand.data[selection]) - (1.0 * numpy.sum(~selection) / len(selection)) * entropy(tree.predictand.data[~selection])
+
+        for predictandIndex, gainOf in ((1, regressionGain), (2, classificationGain)):
+            tree = TreeNode(Dataset([dataset.fields[0]], ["a"]), dataset.fields[predictandIndex])
+            field = tree.dataset.fields[0]
+            gainTerm, split = tree.fieldGainTerm(field)
+
+            bestGain = max(gainOf(tree, numpy.in1d(field.data, subset)) for howMany in xrange(1, 9) for subset in itertools.combinations(range(9), howMany))
+            self.assertAlmostEqual(gainTerm, bestGain, places=6)
+            self.assertAlmostEqual(gainOf(tree, numpy.in1d(field.data, split)), bestGain, places=6)
+            self.assertTrue(len(split) <= 5)
+
+    def testParallelFieldSearch(self):
+        random.seed(12345)
+        numpy.seterr(divide="ignore", invalid="ignore")
+        dataset = Dataset.fromIterable(((x, y, a, b, z) for (x, y, z, a, b, c) in TestProducerCart.data()), 5000, ("x", "y", "a", "b", "z"))
+        inputType = {"type": "record", "name": "Datum", "fields": [{"name": "x", "type": "double"}, {"name": "y", "type": "double"}, {"name": "a", "type": "string"}, {"name": "b", "type": "string"}]}
+
+        serial = TreeNode.fromWholeDataset(dataset, "z")
+        serial.splitMaxDepth(3)
+
+        pool = multiprocessing.Pool(2)
+        try:
+            parallel = TreeNode.fromWholeDataset(dataset, "z", pool=pool)
+            parallel.splitMaxDepth(3)
+        finally:
+            pool.close()
+            pool.join()
+
+        self.assertEqual(parallel.pfaDocument(inputType, "TreeNode")["cells"], serial.pfaDocument(inputType, "TreeNode")["cells"])
+
+    def testIndexedTrainingMatchesCopying(self):
+        random.seed(12345)
+        numpy.seterr(divide="ignore", invalid="ignore")
+        dataset = Dataset.fromIterable(((x, y, a, b, z, c) for (x, y, z, a, b, c) in TestProducerCart.data()), 5000, ("x", "y", "a", "b", "z", "c"))
+        inputType = {"type": "record", "name": "Datum", "fields": [{"name": "x", "type": "double"}, {"name": "y", "type": "double"}, {"name": "a", "type": "string"}, {"name": "b", "type": "string"}, {"name": "c", "type": "string"}]}
+
+        copying = TreeNode.fromWholeDataset(dataset, "z")
+        copying.splitMaxDepth(4)
+        indexed = TreeNode.fromWholeDataset(dataset, "z", indexed=True)
+        indexed.splitMaxDepth(4)
+        self.assertEqual(indexed.pfaDocument(inputType, "TreeNode")["cells"], copying.pfaDocument(inputType, "TreeNode")["cells"])
+
+        inputType["fields"][4] = {"name": "z", "type": "double"}
+        copying = TreeNode.fromWholeDataset(dataset, "c")
+        copying.splitMaxDepth(4)
+        indexed = TreeNode.fromWholeDataset(dataset, "c", indexed=True)
+        indexed.splitMaxDepth(4)
+        self.assertEqual(indexed.pfaDocument(inputType, "TreeNode")["cells"], copying.pfaDocument(inputType, "TreeNode")["cells"])
+
+    def testBinnedTraining(self):
+        random.seed(12345)
+        numpy.seterr(divide="ignore", invalid="ignore")
+        dataset = Dataset.fromIterable(((x, y, z) for (x, y, z, a, b, c) in TestProducerCart.data()), 20000, ("x", "y", "z"))
+
+        tree = TreeNode.fromWholeDataset(dataset, "z", bins=100)
+        tree.splitMaxDepth(2)
+        doc = tree.pfaDocument({"type": "record", "name": "Datum", "fields": [{"name": "x", "type": "double"}, {"name": "y", "type": "double"}]}, "TreeNode")
+        self.assertEqual(doc["cells"]["tree"]["init"]["field"], "x")
+        self.assertAlmostEqual(doc["cells"]["tree"]["init"]["value"], 4.0, delta=0.15)
+        self.assertEqual(doc["cells"]["tree"]["init"]["pass"]["TreeNode"]["field"], "y")
+        self.assertAlmostEqual(doc["cells"]["tree"]["init"]["pass"]["TreeNode"]["value"], 6.0, delta=0.15)
+        self.assertEqual(doc["cells"]["tree"]["init"]["fail"]["TreeNode"]["field"], "y")
+        self.assertAlmostEqual(doc["cells"]["tree"]["init"]["fail"]["TreeNode"]["value"], 2.0, delta=0.15)
+
+        dataset = Dataset.fromIterable(((x, y, z, c) for (x, y, z, a, b, c) in TestProducerCart.data()), 20000, ("x", "y", "z", "c"))
+        tree = TreeNode.fromWholeDataset(dataset, "c", bins=100)
+        tree.splitMaxDepth(1)
+        doc = tree.pfaDocument({"type": "record", "name": "Datum", "fields": [{"name": "x", "type": "double"}, {"name": "y", "type": "double"}, {"name": "z", "type": "double"}]}, "TreeNode")
+        self.assertEqual(doc["cells"]["tree"]["init"]["field"], "z")
+        self.assertAlmostEqual(doc["cells"]["tree"]["init"]["value"], 3.0, delta=0.15)
+
+    def testDatasetFromNumpyFiles(self):
+        random.seed(12345)
+        numpy.seterr(divide="ignore", invalid="ignore")
+        rows = list(itertools.islice(TestProducerCart.data(), 2000))
+        tmpdir = tempfile.mkdtemp()
+        try:
+            fileNames = []
+            for name, index in ("x", 0), ("y", 1), ("z", 2):
+                fileNames.append(os.path.join(tmpdir, name + ".npy"))
+                numpy.save(fileNames[-1], numpy.array([row[index] for row in rows]))
+
+            dataset = Dataset.fromNumpy(fileNames + [numpy.array([row[5] for row in rows])], ["x", "y", "z", "c"])
+            self.assertTrue(isinstance(dataset.fields[0].data, numpy.memmap))
+            self.assertEqual(dataset.fields[3].tpe, basestring)
+            self.assertEqual(sorted(dataset.fields[3].strToInt), sorted(set(row[5] for row in rows)))
+
+            reference = Dataset.fromIterable(((x, y, z, c) for (x, y, z, a, b, c) in rows), len(rows), ("x", "y", "z", "c"))
+            fromNumpy = TreeNode.fromWholeDataset(dataset, "z", indexed=True)
+            fromNumpy.splitMaxDepth(3)
+            fromIterable = TreeNode.fromWholeDataset(reference, "z")
+            fromIterable.splitMaxDepth(3)
+            inputType = {"type": "record", "name": "Datum", "fields": [{"name": "x", "type": "double"}, {"name": "y", "type": "double"}, {"name": "c", "type": "string"}]}
+            self.assertEqual(fromNumpy.pfaDocument(inputType, "TreeNode")["cells"], fromIterable.pfaDocument(inputType, "TreeNode")["cells"])
+            del dataset, fromNumpy
+        finally:
+            shutil.rmtree(tmpdir)
+
 if __name__ == "__main__":
     unittest.main()
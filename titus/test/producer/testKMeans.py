@@ -17,7 +17,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import multiprocessing
+import os
 import random
+import shutil
+import tempfile
 import unittest
 
 import numpy
@@ -126,5 +130,64 @@ class TestProducerKMeans(unittest.TestCase):
         self.assertEqual(engine.action([4.99 * 10, 8.00 * 20, 4.99 * 30]), "four")
         self.assertEqual(engine.action([8.02 * 10, 2.00 * 20, 7.01 * 30]), "five")
 
+    def testChunkedClosestCluster(self):
+        random.seed(12345)
+        dataset = numpy.array([x for x, i in zip(TestProducerKMeans.data([1, 1, 1], [3, 2, 5], [8, 2, 7]), xrange(1000))])
+
+        whole = KMeans(3, dataset, chunkSize=dataset.shape[0])
+        chunked = KMeans(3, dataset, chunkSize=7)
+        chunked.clusters = [x.copy() for x in whole.clusters]
+        self.assertTrue((whole.closestCluster() == chunked.closestCluster()).all())
+        self.assertTrue((whole.closestCluster(dataset, numpy.arange(dataset.shape[0])) == whole.closestCluster(dataset)).all())
+
+        whole.optimize(whileall(moving(), maxIterations(5)))
+        chunked.optimize(whileall(moving(), maxIterations(5)))
+        for x, y in zip(whole.clusters, chunked.clusters):
+            self.assertArrayAlmostEqual(x, y, places=10)
+
+    def testPlusPlusAndMiniBatch(self):
+        random.seed(12345)
+        numpy.seterr(divide="ignore", invalid="ignore")
+
+        dataset = numpy.empty((20000, 3), dtype=numpy.dtype(float))
+        for i, x in enumerate(TestProducerKMeans.data([1, 1, 1], [3, 2, 5], [8, 2, 7], [5, 8, 5], [1, 1, 9])):
+            if i >= dataset.shape[0]:
+                break
+            dataset[i,:] = x
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            fileName = os.path.join(tmpdir, "dataset.npy")
+            numpy.save(fileName, dataset)
+
+            random.seed(3)
+            kmeans = KMeans(5, fileName, seeding="kmeans++", chunkSize=1000)
+            self.assertTrue(isinstance(kmeans.dataset, numpy.memmap))
+            kmeans.optimizeMiniBatch(maxIterations(200), batchSize=500)
+
+            centers = kmeans.centers()
+            self.assertArrayAlmostEqual(centers[0], [1.00, 1.00, 1.00], delta=0.15)
+            self.assertArrayAlmostEqual(centers[1], [1.00, 1.00, 9.00], delta=0.15)
+            self.assertArrayAlmostEqual(centers[2], [3.00, 2.00, 5.00], delta=0.15)
+            self.assertArrayAlmostEqual(centers[3], [5.00, 8.00, 5.00], delta=0.15)
+            self.assertArrayAlmostEqual(centers[4], [8.00, 2.00, 7.00], delta=0.15)
+
+            pool = multiprocessing.Pool(2)
+            try:
+                parallel = KMeans(5, fileName, chunkSize=1000, pool=pool)
+                parallel.clusters = [x.copy() for x in kmeans.clusters]
+                self.assertTrue((parallel.closestCluster() == kmeans.closestCluster()).all())
+                parallel.optimize(whileall(moving(), maxIterations(3)))
+                kmeans.optimize(whileall(moving(), maxIterations(3)))
+                for x, y in zip(parallel.clusters, kmeans.clusters):
+                    self.assertArrayAlmostEqual(x, y, places=10)
+            finally:
+                pool.close()
+                pool.join()
+
+            del kmeans, parallel
+        finally:
+            shutil.rmtree(tmpdir)
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2014  Open Data ("Open Data" refers to
+# one or more of the following companies: Open Data Partners LLC,
+# Open Data Research LLC, or Open Data Capital LLC.)
+# 
+# This file is part of Hadrian.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import unittest
+
+import titus.benchmark
+
+class TestBenchmark(unittest.TestCase):
+    def testPercentile(self):
+        values = range(1, 101)
+        self.assertEqual(titus.benchmark.percentile(values, 0.5), 50)
+        self.assertEqual(titus.benchmark.percentile(values, 0.99), 99)
+        self.assertEqual(titus.benchmark.percentile(values, 1.0), 100)
+        self.assertEqual(titus.benchmark.percentile([7], 0.99), 7)
+
+    def testEveryWorkloadRuns(self):
+        results = titus.benchmark.runSuite([x.name for x in titus.benchmark.workloads if x.name != "deep-tree"], records=10, warmup=2, isolate=False)
+        json.dumps(results)
+        self.assertEqual([x["name"] for x in results["benchmarks"]], ["forest", "kmeans", "regression", "strings", "pools", "emit", "fold"])
+        for result in results["benchmarks"]:
+            self.assertEqual(result["records"], 10)
+            self.assertTrue(result["latencySeconds"]["p50"] <= result["latencySeconds"]["p99"] <= result["latencySeconds"]["max"])
+            self.assertTrue(result["loadSeconds"] > 0.0)
+        self.assertTrue([x for x in results["benchmarks"] if x["name"] == "emit"][0]["emitted"] > 0)
+
+    def testUnknownWorkload(self):
+        self.assertRaises(ValueError, lambda: titus.benchmark.runSuite(["no-such-workload"]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -259,5 +259,64 @@ class TestDataType(unittest.TestCase):
         # forwardDeclarationParser.getAvroType('''{"type": "array", "items": "Outer"}''') should be (Some(AvroArray(type1)))
         # forwardDeclarationParser.getAvroType('''{"type": "array", "items": "int"}''') should be (Some(AvroArray(AvroInt())))
 
+    def testInternStructurallyEqualTypes(self):
+        x = jsonToAvroType('{"type": "array", "items": {"type": "record", "name": "Point", "fields": [{"name": "x", "type": "double"}, {"name": "y", "type": "double"}]}}')
+        y = jsonToAvroType('{"items": {"fields": [{"type": "double", "name": "x"}, {"type": "double", "name": "y"}], "name": "Point", "type": "record"}, "type": "array"}')
+        z = AvroArray(AvroRecord([AvroField("x", AvroDouble()), AvroField("y", AvroDouble())], name="Point"))
+
+        self.assertTrue(x is y)
+        self.assertTrue(x.items is y.items)
+        self.assertTrue(x.items is x.items)
+        self.assertEqual(x, z)
+        self.assertFalse(x != z)
+        self.assertEqual(hash(x), hash(z))
+        self.assertEqual(len(set([x, y, z])), 1)
+        self.assertTrue(x.structuralKey is z.structuralKey)
+
+        self.assertNotEqual(x, jsonToAvroType('{"type": "array", "items": {"type": "record", "name": "Point", "fields": [{"name": "x", "type": "double"}]}}'))
+        self.assertNotEqual(ExceptionType(), AvroNull())
+        self.assertFalse(AvroNull().accepts(ExceptionType()))
+
+    def testCacheAcceptsResults(self):
+        acceptsCache.clear()
+        record = jsonToAvroType('{"type": "record", "name": "Recursive", "fields": [{"name": "child", "type": ["null", "Recursive"]}, {"name": "value", "type": "int"}]}')
+        widened = jsonToAvroType('{"type": "record", "name": "Recursive", "fields": [{"name": "child", "type": ["null", "Recursive"]}, {"name": "value", "type": "long"}]}')
+
+        self.assertTrue(widened.accepts(record))
+        self.assertFalse(record.accepts(widened))
+        self.assertEqual(acceptsCache[widened.structuralKey, record.structuralKey], True)
+        self.assertEqual(acceptsCache[record.structuralKey, widened.structuralKey], False)
+
+        self.assertTrue(widened.accepts(record))
+        self.assertFalse(record.accepts(widened))
+        self.assertTrue(AvroUnion([AvroNull(), widened]).accepts(record))
+
+    def testSortKeyAgreesWithCompare(self):
+        import random
+        rng = random.Random(12345)
+        recordType = jsonNodeToAvroType({"type": "record", "name": "Rec", "fields": [
+            {"name": "label", "type": {"type": "enum", "name": "Label", "symbols": ["z", "a", "m"]}},
+            {"name": "score", "type": "double", "order": "descending"},
+            {"name": "note", "type": "string", "order": "ignore"},
+            {"name": "tags", "type": {"type": "array", "items": "int"}},
+            {"name": "extra", "type": ["null", "string", "double"]}]})
+
+        def randomRecord():
+            return {"label": rng.choice(["z", "a", "m"]),
+                    "score": rng.choice([0.0, -1.5, 2.5, float("nan")]),
+                    "note": rng.choice(["x", "y"]),
+                    "tags": [rng.randint(0, 2) for i in xrange(rng.randint(0, 3))],
+                    "extra": rng.choice([None, "a", "b", 1.0, 3.5])}
+
+        key = sortKey(recordType)
+        for trial in xrange(2000):
+            x, y = randomRecord(), randomRecord()
+            self.assertEqual(cmp(key(x), key(y)), compare(recordType, x, y))
+
+        doubleArray = [rng.choice([float("nan"), rng.gauss(0, 1)]) for i in xrange(100)]
+        key = sortKeyFromJson({"type": "array", "items": "double"}, "items")
+        self.assertEqual(sorted(doubleArray, key=key), sorted(doubleArray, lambda x, y: compare(AvroDouble(), x, y)))
+        self.assertTrue(key is sortKeyFromJson({"items": "double", "type": "array"}, "items"))
+
 if __name__ == "__main__":
     unittest.main()
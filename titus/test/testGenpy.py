@@ -18,10 +18,17 @@
 # limitations under the License.
 
 import json
+import math
+import os
+import shutil
+import struct
+import tempfile
 import unittest
 
 from titus.reader import yamlToAst
 from titus.genpy import PFAEngine
+import titus.pfaast
+import titus.signature
 from titus.errors import *
     
 def unsigned(x):
@@ -2464,6 +2471,29 @@ action:
         self.assertRaises(PFAUserException, lambda: engineLittleEndian.action("".join(map(unsigned, [0, 0, 0, 4, 5, 104, 101, 108, 108, 111, 0, 0, 0]))))
         self.assertRaises(PFAUserException, lambda: engineLittleEndian.action("".join(map(unsigned, []))))
 
+    def testUnpackAndPackWithPrecompiledPlans(self):
+        engine, = PFAEngine.fromYaml('''
+input: bytes
+output: bytes
+action:
+  unpack: input
+  format: [{a: little int}, {b: pad}, {c: little double}, {d: "unsigned byte"}, {e: "null terminated"}, {f: int}, {g: short}, {h: "raw 2"}]
+  then:
+    pack: [{"little int": a}, {pad: null}, {"little double": c}, {"unsigned byte": d}, {"null terminated": e}, {int: f}, {short: g}, {"raw 2": h}]
+  else: {base64: "AA=="}
+''')
+        data = struct.pack("<ixdB", -3, 2.5, 200) + "hi\x00" + struct.pack(">ih", 7, -2) + "ok"
+        self.assertEqual(engine.action(data), data)
+        self.assertEqual(engine.action(data[:-1]), "\x00")
+        self.assertEqual(engine.action(data + "!"), "\x00")
+        self.assertEqual(engine.action(data[:13]), "\x00")
+
+        unpackPlan, packPlan = engine.binaryPlans
+        self.assertEqual([step[0] for step in unpackPlan.steps], ["struct", "tonull", "struct", "raw"])
+        self.assertEqual(unpackPlan.steps[0][1].format, "<ixdB")
+        self.assertEqual(unpackPlan.steps[2][1].format, ">ih")
+        self.assertEqual([step[0] for step in packPlan.steps], ["struct", "tonull", "struct", "raw"])
+
     def testUnpackNotBreakOtherVariables(self):
         engine, = PFAEngine.fromYaml('''
 input: bytes
@@ -3303,6 +3333,211 @@ cells:
 ''')
         self.assertEqual(engine.action("two"), 2)
 
+    def testExtractExternalCellsAndPools(self):
+        import numpy
+        from avro.datafile import DataFileWriter
+        from avro.io import DatumWriter
+        from titus.datatype import jsonNodeToAvroType
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        def writeAvro(fileName, avroType, datum):
+            writer = DataFileWriter(open(fileName, "wb"), DatumWriter(), jsonNodeToAvroType(avroType).schema)
+            writer.append(datum)
+            writer.close()
+
+        matrixFile = os.path.join(directory, "matrix.npy")
+        numpy.save(matrixFile, numpy.array([[1.0, 2.0], [3.0, 4.5]], dtype=numpy.float32))
+        recordType = {"type": "record", "name": "R", "fields": [{"name": "x", "type": ["null", "double"]}, {"name": "y", "type": "string"}]}
+        recordFile = os.path.join(directory, "record.avro")
+        writeAvro(recordFile, recordType, {"x": 2.5, "y": "hello"})
+        poolFile = os.path.join(directory, "pool.avro")
+        writeAvro(poolFile, {"type": "map", "values": "int"}, {"a": 1, "b": 2})
+
+        def document(matrixType):
+            return json.dumps({
+                "input": "string",
+                "output": "double",
+                "action": [{"+": [{"cell": "m", "path": [1, 1]}, {"pool": "p", "path": ["input"]}]}],
+                "cells": {"m": {"type": matrixType, "init": matrixFile, "source": "npy"},
+                          "r": {"type": recordType, "init": recordFile, "source": "avro"}},
+                "pools": {"p": {"type": "int", "init": poolFile, "source": "avro"}}})
+
+        engine, = PFAEngine.fromJson(document({"type": "array", "items": {"type": "array", "items": "double"}}))
+        self.assertEqual(engine.action("b"), 6.5)
+        self.assertEqual(engine.config.cells["m"].initValue, [[1.0, 2.0], [3.0, 4.5]])
+        self.assertEqual(engine.config.cells["r"].initValue, {"x": 2.5, "y": "hello"})
+        self.assertEqual(engine.config.cells["r"].initJsonNode, {"x": {"double": 2.5}, "y": "hello"})
+        self.assertEqual(engine.config.pools["p"].initJsonNode, {"a": 1, "b": 2})
+
+        self.assertRaises(PFAInitializationException, lambda: PFAEngine.fromJson(document({"type": "array", "items": {"type": "array", "items": "int"}})))
+
+    def testWriteUnionTypedSideFiles(self):
+        from avro.datafile import DataFileWriter
+        from avro.io import DatumWriter
+        from titus.datatype import jsonNodeToAvroType
+        from titus.reader import avroExternalDatum
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+
+        def writeAvro(fileName, avroType, value):
+            avroType = jsonNodeToAvroType(avroType)
+            writer = DataFileWriter(open(fileName, "wb"), DatumWriter(), avroType.schema)
+            writer.append(avroExternalDatum(avroType, value))
+            writer.close()
+
+        cellType = {"type": "array", "items": ["null", "double"]}
+        cellFile = os.path.join(directory, "cell.avro")
+        writeAvro(cellFile, cellType, [None, {"double": 2.5}, {"double": -1.0}])
+        poolType = ["null", "string"]
+        poolFile = os.path.join(directory, "pool.avro")
+        writeAvro(poolFile, {"type": "map", "values": poolType}, {"a": {"string": "one"}, "b": None})
+
+        engine, = PFAEngine.fromJson(json.dumps({
+            "input": "string",
+            "output": poolType,
+            "action": [{"pool": "p", "path": ["input"]}],
+            "cells": {"c": {"type": cellType, "init": cellFile, "source": "avro"}},
+            "pools": {"p": {"type": poolType, "init": poolFile, "source": "avro"}}}))
+        self.assertEqual(engine.action("a"), "one")
+        self.assertEqual(engine.action("b"), None)
+        self.assertEqual(engine.config.cells["c"].initValue, [None, 2.5, -1.0])
+        self.assertEqual(engine.config.cells["c"].initJsonNode, [None, {"double": 2.5}, {"double": -1.0}])
+        self.assertEqual(engine.config.pools["p"].initJsonNode, {"a": {"string": "one"}, "b": None})
+
+    def testMemoryMapCells(self):
+        import numpy
+        from titus.util import ArrayView
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        matrixFile = os.path.join(directory, "matrix.npy")
+        numpy.save(matrixFile, numpy.array([[1.0, 2.0], [3.0, 4.5], [0.0, -1.0]], dtype=numpy.float32))
+        vectorFile = os.path.join(directory, "vector.npy")
+        numpy.save(vectorFile, numpy.array([0.5, 1.5], dtype=numpy.float64))
+
+        engine, = PFAEngine.fromJson(json.dumps({
+            "input": "int",
+            "output": {"type": "array", "items": "double"},
+            "action": [
+                {"let": {"nearest": {"model.neighbor.nearestK": [1, {"cell": "v"}, {"cell": "m"}]}}},
+                {"a.concat": [{"a.concat": [{"la.dot": [{"cell": "m"}, {"cell": "v"}]}, {"attr": "nearest", "path": [0]}]},
+                              {"new": [{"cell": "m", "path": ["input", 1]}], "type": {"type": "array", "items": "double"}}]}],
+            "cells": {"m": {"type": {"type": "array", "items": {"type": "array", "items": "double"}}, "init": matrixFile, "source": "mmap"},
+                      "v": {"type": {"type": "array", "items": "double"}, "init": vectorFile, "source": "mmap"}}}))
+
+        self.assertTrue(isinstance(engine.config.cells["m"].initValue, ArrayView))
+        self.assertEqual(engine.action(1), [3.5, 8.25, -1.5, 1.0, 2.0, 4.5])
+        self.assertEqual(engine.config.cells["m"].initJsonNode, [[1.0, 2.0], [3.0, 4.5], [0.0, -1.0]])
+        self.assertEqual(json.loads(engine.snapshot().toJson(False))["cells"]["v"]["init"], [0.5, 1.5])
+
+        self.assertRaises(PFASyntaxException, lambda: PFAEngine.fromJson(json.dumps({
+            "input": "int",
+            "output": "int",
+            "action": ["input"],
+            "pools": {"p": {"type": "double", "init": vectorFile, "source": "mmap"}}})))
+
+    def testMemoryMappedOutputsAreAvroSerializable(self):
+        import numpy
+        from avro.datafile import DataFileReader
+        from avro.io import DatumReader
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        matrixFile = os.path.join(directory, "matrix.npy")
+        numpy.save(matrixFile, numpy.array([[1.0, 2.0], [3.0, 4.5], [0.0, -1.0]]))
+
+        matrix = {"type": "array", "items": {"type": "array", "items": "double"}}
+        cluster = {"type": "record", "name": "Cluster", "fields": [{"name": "center", "type": {"type": "array", "items": "double"}}, {"name": "id", "type": "int"}]}
+        output = {"type": "record", "name": "Output", "fields": [
+            {"name": "whole", "type": matrix},
+            {"name": "row", "type": {"type": "array", "items": "double"}},
+            {"name": "first", "type": {"type": "array", "items": "double"}},
+            {"name": "distinct", "type": matrix},
+            {"name": "nearest", "type": matrix},
+            {"name": "closest", "type": cluster}]}
+
+        def writeAndRead(engine, outputs):
+            fileName = os.path.join(directory, "output.avro")
+            writer = engine.avroOutputDataFileWriter(fileName)
+            for x in outputs:
+                writer.append(x)
+            writer.close()
+            return list(DataFileReader(open(fileName, "rb"), DatumReader()))
+
+        engine, = PFAEngine.fromJson(json.dumps({
+            "input": "int",
+            "output": output,
+            "action": [{"new": {
+                "whole": {"cell": "m"},
+                "row": {"cell": "m", "path": ["input"]},
+                "first": {"a.head": [{"cell": "m"}]},
+                "distinct": {"a.distinct": [{"cell": "m"}]},
+                "nearest": {"model.neighbor.nearestK": [2, {"cell": "m", "path": ["input"]}, {"cell": "m"}]},
+                "closest": {"model.cluster.closest": [
+                    {"cell": "m", "path": ["input"]},
+                    {"new": [{"new": {"center": {"cell": "m", "path": [0]}, "id": 0}, "type": "Cluster"},
+                             {"new": {"center": {"cell": "m", "path": [2]}, "id": 2}, "type": "Cluster"}],
+                     "type": {"type": "array", "items": "Cluster"}}]}},
+                "type": "Output"}],
+            "cells": {"m": {"type": matrix, "init": matrixFile, "source": "mmap"}}}))
+        self.assertEqual(writeAndRead(engine, [engine.action(2)]), [{
+            "whole": [[1.0, 2.0], [3.0, 4.5], [0.0, -1.0]],
+            "row": [0.0, -1.0],
+            "first": [1.0, 2.0],
+            "distinct": [[1.0, 2.0], [3.0, 4.5], [0.0, -1.0]],
+            "nearest": [[0.0, -1.0], [1.0, 2.0]],
+            "closest": {"center": [0.0, -1.0], "id": 2}}])
+
+        engine, = PFAEngine.fromJson(json.dumps({
+            "input": "int",
+            "output": {"type": "array", "items": "double"},
+            "method": "emit",
+            "action": [{"emit": [{"cell": "m", "path": ["input"]}]}],
+            "cells": {"m": {"type": matrix, "init": matrixFile, "source": "mmap"}}}))
+        emitted = []
+        engine.emit = emitted.append
+        engine.action(1)
+        self.assertEqual(writeAndRead(engine, emitted), [[3.0, 4.5]])
+
+    def testCastAUnionHoldingAMemoryMappedRow(self):
+        import numpy
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        matrixFile = os.path.join(directory, "matrix.npy")
+        numpy.save(matrixFile, numpy.array([[1.0, 2.0], [3.0, 4.5], [0.0, -1.0]]))
+        vector = {"type": "array", "items": "double"}
+
+        engine, = PFAEngine.fromJson(json.dumps({
+            "input": "int",
+            "output": "double",
+            "action": [
+                {"let": {"u": {"upcast": {"cell": "m", "path": ["input"]}, "as": ["null", vector]}}},
+                {"cast": "u", "cases": [
+                    {"as": vector, "named": "row", "do": {"a.sum": "row"}},
+                    {"as": "null", "named": "n", "do": -999.0}]}],
+            "cells": {"m": {"type": {"type": "array", "items": vector}, "init": matrixFile, "source": "mmap"}}}))
+        self.assertEqual([engine.action(i) for i in 0, 1, 2], [3.0, 7.5, -1.0])
+
+        engine, = PFAEngine.fromJson(json.dumps({
+            "input": "int",
+            "output": "boolean",
+            "action": [{"a.startswith": [{"cell": "m", "path": ["input"]}, {"cell": "m", "path": [1]}]}],
+            "cells": {"m": {"type": {"type": "array", "items": vector}, "init": matrixFile, "source": "mmap"}}}))
+        self.assertEqual([engine.action(i) for i in 0, 1, 2], [False, True, False])
+
+        engine, = PFAEngine.fromJson(json.dumps({
+            "input": "int",
+            "output": vector,
+            "action": [{"a.concat": [{"stat.test.residual": [{"cell": "m", "path": ["input"]}, {"cell": "m", "path": [0]}]},
+                                     {"m.link.logit": [{"cell": "m", "path": ["input"]}]}]}],
+            "cells": {"m": {"type": {"type": "array", "items": vector}, "init": matrixFile, "source": "mmap"}}}))
+        self.assertEqual(engine.action(1)[:2], [2.0, 2.5])
+        self.assertAlmostEqual(engine.action(1)[2], 1.0 / (1.0 + math.exp(-3.0)))
+
     def testNotFindNonExistentCells(self):
         self.assertRaises(PFASemanticException, lambda: PFAEngine.fromYaml('''
 input: string
@@ -4720,6 +4955,40 @@ fcns:
         self.assertEqual(engine.callDepth("u.d"), float("inf"))
         self.assertEqual(engine.callDepth("u.c"), float("inf"))
 
+    def testCallGraphClosureMatchesTraversal(self):
+        import random
+        from titus.genpy import CallGraphClosure
+        rng = random.Random(12345)
+        for trial in xrange(50):
+            names = ["u.f{0}".format(i) for i in xrange(rng.randint(1, 12))]
+            callGraph = dict((n, set(rng.sample(names + ["+", "m.sqrt"], rng.randint(0, 3)))) for n in names)
+            engine, = PFAEngine.fromYaml("""
+input: int
+output: int
+action: input
+""")
+            engine.callGraph = callGraph
+            closure = CallGraphClosure(callGraph)
+            for n in names + ["+"]:
+                self.assertEqual(set(closure.reach.get(n, ())), engine.calledBy(n, set()))
+                self.assertEqual(closure.depth.get(n, 0), engine.callDepth(n, set()))
+
+    def testCallGraphClosureOnDenseGraphs(self):
+        numFcns = 300
+        fcns = {}
+        for i in xrange(numFcns):
+            if i < numFcns - 2:
+                fcns["f{0}".format(i)] = {"params": [{"x": "int"}], "ret": "int", "do": {"+": [{"u.f{0}".format(i + 1): ["x"]}, {"u.f{0}".format(i + 2): ["x"]}]}}
+            else:
+                fcns["f{0}".format(i)] = {"params": [{"x": "int"}], "ret": "int", "do": "x"}
+        engines = PFAEngine.fromJson({"input": "int", "output": "int", "cells": {"c": {"type": "int", "init": 0}}, "action": [{"cell": "c", "to": {"fcn": "u.f0"}}], "fcns": fcns}, multiplicity=2)
+
+        self.assertEqual(engines[0].callDepth("u.f0"), numFcns - 2)
+        self.assertEqual(engines[0].calledBy("u.f0"), set(["+"] + ["u.f{0}".format(i) for i in xrange(1, numFcns)]))
+        self.assertFalse(engines[0].hasSideEffects("u.f0"))
+        self.assertTrue(engines[0].hasSideEffects("(action)"))
+        self.assertTrue(engines[0].callGraphClosure() is engines[1].callGraphClosure())
+
     def testRefuseSituationsThatCouldLeadToDeadlock(self):
         engine, = PFAEngine.fromYaml("""
 input: string
@@ -5257,5 +5526,282 @@ action:
         self.assertRaises(PFAUserException, lambda: engine.action(4))
         self.assertEqual(engine.action(5), 5)
 
+    def testProfileStyleCountsCallSites(self):
+        pfa = '''
+input: int
+output: int
+cells:
+  total: {type: int, init: 0}
+action:
+  - for: {i: 0}
+    while: {"<": [i, input]}
+    step: {i: {+: [i, 1]}}
+    do:
+      - cell: total
+        to: {u.inc: [i]}
+  - {cell: total}
+fcns:
+  inc:
+    params: [{x: int}]
+    ret: int
+    do: {+: [x, {m.abs: x}]}
+'''
+        engine, = PFAEngine.fromYaml(pfa, style="profile")
+        self.assertEqual(engine.action(5), 8)
+        self.assertEqual(engine.action(3), 4)
+
+        counts = {}
+        for x in engine.profiler.report():
+            name = x["site"].split(" ")[0]
+            counts[name] = counts.get(name, 0) + x["count"]
+        self.assertEqual(counts["for"], 2)
+        self.assertEqual(counts["cell-to"], 8)
+        self.assertEqual(counts["u.inc"], 8)
+        self.assertEqual(counts["m.abs"], 8)
+        self.assertEqual(counts["cell"], 2)
+        self.assertEqual(counts["+"], 16)
+        self.assertEqual(counts["<"], 10)
+
+        for x in engine.profiler.report():
+            self.assertTrue("YAML line" in x["site"])
+            self.assertTrue(x["selfTime"] <= x["totalTime"] + 1e-9)
+
+        self.assertEqual(engine.profiler.report("count", 1)[0]["count"], 10)
+
+        stacks = dict(line.rsplit(" ", 1) for line in engine.profiler.collapsedStacks("count"))
+        absStacks = [k for k in stacks if k.split(";")[-1].startswith("m.abs")]
+        self.assertEqual(len(absStacks), 1)
+        self.assertEqual([x.split(" ")[0] for x in absStacks[0].split(";")], ["for", "cell-to", "u.inc", "+", "m.abs"])
+        self.assertEqual(stacks[absStacks[0]], "8")
+
+        engine.profiler.reset()
+        self.assertEqual(engine.profiler.report(), [])
+        self.assertEqual(PFAEngine.fromYaml(pfa)[0].profiler, None)
+
+    def testProfileStyleRecursion(self):
+        engine, = PFAEngine.fromYaml('''
+input: int
+output: int
+action: {u.fact: [input]}
+fcns:
+  fact:
+    params: [{n: int}]
+    ret: int
+    do:
+      if: {"<=": [n, 1]}
+      then: 1
+      else: {"*": [n, {u.fact: [{-: [n, 1]}]}]}
+''', style="profile")
+        self.assertEqual(engine.action(5), 120)
+        self.assertRaises(PFARuntimeException, lambda: engine.action(20))
+        self.assertEqual(engine.profiler.frames, [])
+
+        sites = dict((x["site"].split(" ")[0] + " " + x["site"].split(" ")[-1], x) for x in engine.profiler.report())
+        ifSite = [x for k, x in sites.items() if k.startswith("if ")][0]
+        self.assertTrue(ifSite["count"] >= 5)
+        self.assertTrue(ifSite["totalTime"] <= sum(x["selfTime"] for x in engine.profiler.report()) + 1e-6)
+
+    def testMemoizePureActionAndFunctions(self):
+        engine, = PFAEngine.fromYaml('''
+input: {type: record, name: Input, fields: [{name: x, type: int}, {name: y, type: string}]}
+output: int
+action: {u.fib: [input.x]}
+fcns:
+  fib:
+    params: [{n: int}]
+    ret: int
+    do:
+      if: {"<": [n, 2]}
+      then: n
+      else: {"+": [{u.fib: [{-: [n, 1]}]}, {u.fib: [{-: [n, 2]}]}]}
+''')
+        self.assertTrue(engine.isPure("(action)"))
+        self.assertEqual(engine.memoize(maxSize=3), ["(action)", "u.fib"])
+
+        self.assertEqual(engine.action({"x": 20, "y": "one"}), 6765)
+        self.assertEqual(engine.memos["u.fib"].misses, 21)
+        self.assertEqual(engine.memos["u.fib"].statistics()["size"], 3)
+        self.assertTrue(engine.memos["u.fib"].evictions > 0)
+
+        self.assertEqual(engine.action({"y": "one", "x": 20}), 6765)
+        self.assertEqual(engine.memos["(action)"].statistics(), {"size": 1, "maxSize": 3, "hits": 1, "misses": 1, "evictions": 0})
+        self.assertEqual(engine.actionsStarted, 2)
+        self.assertEqual(engine.actionsFinished, 2)
+
+        engine.action({"x": 3, "y": "one"})
+        engine.action({"x": 4, "y": "one"})
+        engine.action({"x": 5, "y": "one"})
+        self.assertEqual(engine.memos["(action)"].evictions, 1)
+        self.assertRaises(TypeError, lambda: engine.action({"x": 3, "y": 1}))
+
+    def testMemoizeDistinguishesBooleansFromNumbers(self):
+        engine, = PFAEngine.fromYaml('''
+input: int
+output: string
+action: {s.concat: [{u.f: [{"==": [input, 1]}]}, {u.f: [input]}]}
+fcns:
+  f:
+    params: [{x: [boolean, int]}]
+    ret: string
+    do:
+      cast: x
+      cases:
+        - {as: boolean, named: b, do: {string: b}}
+        - {as: int, named: i, do: {string: i}}
+''')
+        self.assertEqual(engine.memoize(), ["(action)", "u.f"])
+        self.assertEqual(engine.action(1), "bi")
+        self.assertEqual(engine.action(1), "bi")
+        self.assertEqual(engine.memos["u.f"].misses, 2)
+
+    def testMemoizeSkipsImpureComputations(self):
+        engine, = PFAEngine.fromYaml('''
+input: double
+output: double
+cells:
+  total: {type: double, init: 0}
+action:
+  - cell: total
+    to: {params: [{old: double}], ret: double, do: {"+": [old, input]}}
+  - {"+": [{u.noise: []}, {u.square: [input]}]}
+fcns:
+  noise:
+    params: []
+    ret: double
+    do: {rand.double: [0, 1]}
+  square:
+    params: [{x: double}]
+    ret: double
+    do: {"*": [x, x]}
+''')
+        self.assertFalse(engine.isPure("(action)"))
+        self.assertFalse(engine.isPure("u.noise"))
+        self.assertEqual(engine.memoize(), ["u.square"])
+        engine.action(2.0)
+        engine.action(2.0)
+        self.assertEqual(engine.memos["u.square"].hits, 1)
+        self.assertEqual(engine.cells["total"].value, 4.0)
+
+        engine2, = PFAEngine.fromYaml('''
+input: long
+output: long
+action: {+: [input, actionsStarted]}
+''')
+        self.assertEqual(engine2.memoize(), [])
+
+    def testOptimizeFoldsPrunesAndInlines(self):
+        pfa = '''
+input: double
+output: double
+action:
+  - {doc: "scaled input"}
+  - let: {k: {+: [1, 2]}}
+  - if: {">": [{m.pi: []}, 3]}
+    then: {u.scale: [input, k]}
+    else: {error: never}
+fcns:
+  scale:
+    params: [{x: double}, {n: int}]
+    ret: double
+    do: {"*": [x, {/: [n, 4]}]}
+'''
+        optimized = titus.pfaast.optimize(yamlToAst(pfa), titus.signature.PFAVersion.fromString("0.8.1")).jsonNode(False, set())
+        self.assertEqual(optimized["action"][0], {"let": {"k": 3}})
+        self.assertEqual(len(optimized["action"]), 2)
+        self.assertEqual(optimized["action"][1]["upcast"]["do"][0]["do"][-1], {"upcast": {"*": ["inline1_scale_x", {"/": ["inline1_scale_n", 4]}]}, "as": "double"})
+
+        engine, = PFAEngine.fromYaml(pfa, optimize=True)
+        self.assertAlmostEqual(engine.action(2.0), 1.5, places=12)
+        self.assertTrue("*" in engine.callGraph["(action)"])
+        self.assertEqual(set(["u.scale", "m.pi", "+", "if", "doc"]).intersection(engine.callGraph["(action)"]), set())
+
+    def testOptimizeLeavesRuntimeBehavior(self):
+        engine, = PFAEngine.fromYaml('''
+input: int
+output: int
+action:
+  - if: {"==": [input, 0]}
+    then: {"//": [1, 0]}
+    else: {+: [{u.fact: [input]}, {rand.int: [0, 1]}]}
+randseed: 12345
+fcns:
+  fact:
+    params: [{n: int}]
+    ret: int
+    do:
+      if: {"<=": [n, 1]}
+      then: 1
+      else: {"*": [n, {u.fact: [{-: [n, 1]}]}]}
+''', optimize=True)
+        self.assertEqual(engine.action(5), 120)
+        self.assertRaises(PFARuntimeException, lambda: engine.action(0))
+        self.assertTrue("u.fact" in engine.callGraph["(action)"])
+        self.assertTrue("rand.int" in engine.callGraph["(action)"])
+
+    def testOptimizeKeepsTheTypeOfPrunedBranches(self):
+        engine, = PFAEngine.fromYaml('''
+input: double
+output: double
+action:
+  - let: {x: {if: true, then: 1, else: 2.5}}
+  - set: {x: input}
+  - x
+''', optimize=True)
+        self.assertEqual(engine.action(3.5), 3.5)
+
+        pfa = '''
+input: int
+output: double
+action:
+  - let:
+      x: {+: [{if: true, then: input, else: 0.5}, 2147483647]}
+      y: {+: [{cond: [{if: false, then: 0.5}, {if: true, then: input}], else: 0.5}, 2147483647]}
+  - {+: [x, y]}
+'''
+        optimized = titus.pfaast.optimize(yamlToAst(pfa), titus.signature.PFAVersion.fromString("0.8.1")).jsonNode(False, set())
+        self.assertEqual(optimized["action"][0]["let"]["x"], {"+": [{"upcast": {"do": ["input"]}, "as": "double"}, 2147483647]})
+        self.assertEqual(optimized["action"][0]["let"]["y"], {"+": [{"upcast": {"do": ["input"]}, "as": "double"}, 2147483647]})
+
+        for optimize in False, True:
+            engine, = PFAEngine.fromYaml(pfa, optimize=optimize)
+            self.assertEqual(engine.action(1), 4294967296.0)
+
+    def testOptimizeDoesNotChangeResults(self):
+        def results(pfa, inputs, optimize):
+            engine, = PFAEngine.fromYaml(pfa, optimize=optimize)
+            out = []
+            for x in inputs:
+                try:
+                    out.append(engine.action(x))
+                except PFARuntimeException as err:
+                    out.append((PFARuntimeException, str(err)))
+                except PFAUserException as err:
+                    out.append((PFAUserException, str(err)))
+            return out
+
+        for pfa, inputs in [
+                ('{input: int, output: [string, int], action: {if: false, then: input, else: {string: "string"}}}', [3]),
+                ('{input: int, output: [string, int], action: {if: true, then: input, else: {string: "string"}}}', [3]),
+                ('{input: int, output: [string, int], action: {cond: [{if: false, then: input}], else: {string: "string"}}}', [3]),
+                ('{input: "null", output: [string, "null"], action: {if: true, then: {string: hello}, else: {do: {error: "This is bad"}}}}', [None]),
+                ('{input: "null", output: string, action: {if: false, then: {string: hello}, else: {error: "This is bad"}}}', [None]),
+                ('{input: "null", output: double, action: {a.ntile: [{value: [1, 2, 3, 4], type: {type: array, items: double}}, 0.5]}}', [None]),
+                ('{input: int, output: int, action: {a.ntile: [{value: [1, 2, 3, 4], type: {type: array, items: int}}, 0.5]}}', [0]),
+                ('{input: double, output: double, action: {+: [{if: true, then: input, else: 1}, {a.mean: [{value: [1, 2], type: {type: array, items: double}}]}]}}', [0.5])]:
+            self.assertEqual(results(pfa, inputs, True), results(pfa, inputs, False))
+
+        # optimizing a long call chain works bottom-up instead of recursing through it
+        numFcns = 300
+        fcns = {}
+        for i in xrange(numFcns):
+            if i < numFcns - 2:
+                fcns["f{0}".format(i)] = {"params": [{"x": "int"}], "ret": "int", "do": {"+": [{"u.f{0}".format(i + 1): ["x"]}, {"u.f{0}".format(i + 2): ["x"]}]}}
+            else:
+                fcns["f{0}".format(i)] = {"params": [{"x": "int"}], "ret": "int", "do": "x"}
+        pfa = json.dumps({"input": "int", "output": "int", "action": [{"u.f{0}".format(numFcns - 6): ["input"]}], "fcns": fcns})
+        optimized = titus.pfaast.optimize(yamlToAst(pfa), titus.signature.PFAVersion.fromString("0.8.1"))
+        self.assertEqual(sorted(optimized.fcns), sorted(fcns))
+        self.assertEqual(results(pfa, [1, 2], True), [8, 16])
+
 if __name__ == "__main__":
     unittest.main()
@@ -219,5 +219,27 @@ class TestSignature(unittest.TestCase):
         self.assertTrue(self.matches(Sig([{"x": P.WildRecord("A", {"one": P.Double()})}], P.Wildcard("A")).accepts([AvroRecord([AvroField("one", AvroInt()), AvroField("two", AvroString())], "MyRecord")], self.version), None))
         self.assertTrue(self.matches(Sig([{"x": P.WildRecord("A", {"one": P.Int()})}], P.Wildcard("A")).accepts([AvroRecord([AvroField("uno", AvroInt()), AvroField("two", AvroString())], "MyRecord")], self.version), None))
 
+    def testCacheResolutions(self):
+        sigs = Sigs([Sig([{"x": P.Array(P.Wildcard("A"))}], P.Wildcard("A"), Lifespan(None, PFAVersion(0, 7, 2), PFAVersion(0, 9, 0), None)),
+                     Sig([{"x": P.Array(P.Wildcard("A"))}], P.Array(P.Wildcard("A")), Lifespan(PFAVersion(0, 9, 0), None, None, None))])
+
+        first = sigs.accepts([jsonToAvroType('{"type": "array", "items": "double"}')], self.version)
+        self.assertTrue(self.matches(first, ([AvroArray(AvroDouble())], AvroDouble())))
+        self.assertTrue(first[0] is sigs.cases[0])
+
+        second = sigs.accepts([AvroArray(AvroDouble())], self.version)
+        self.assertEqual(len(sigs.resolutionCache), 1)
+        self.assertTrue(second[0] is first[0] and second[2] is first[2])
+        second[1].append(AvroNull())
+        self.assertEqual(len(sigs.accepts([AvroArray(AvroDouble())], self.version)[1]), 1)
+
+        later = sigs.accepts([AvroArray(AvroDouble())], PFAVersion(0, 9, 0))
+        self.assertTrue(self.matches(later, ([AvroArray(AvroDouble())], AvroArray(AvroDouble()))))
+        self.assertTrue(later[0] is sigs.cases[1])
+
+        self.assertTrue(sigs.accepts([AvroDouble()], self.version) is None)
+        self.assertTrue(sigs.accepts([AvroDouble()], self.version) is None)
+        self.assertEqual(len(sigs.resolutionCache), 3)
+
 if __name__ == "__main__":
     unittest.main()
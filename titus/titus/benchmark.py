@@ -0,0 +1,312 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2014  Open Data ("Open Data" refers to
+# one or more of the following companies: Open Data Partners LLC,
+# Open Data Research LLC, or Open Data Capital LLC.)
+#
+# This file is part of Hadrian.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""End-to-end benchmarks of representative scoring engines.
+
+Each ``titus.benchmark.Workload`` generates a PFA document and a stream of input data from a fixed random seed, so that results are comparable across Titus versions. ``titus.benchmark.runSuite`` measures, for each workload, the time to load and compile the engine, steady-state records per second, per-record latency percentiles, and peak resident memory. The ``pfabenchmark`` script runs the suite from the command line and writes the results as JSON.
+"""
+
+import datetime
+import gc
+import json
+import math
+import multiprocessing
+import platform
+import random
+import sys
+import timeit
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from titus.genpy import PFAEngine
+import titus.version
+
+class Workload(object):
+    """A named scoring engine and input data generator for benchmarking."""
+
+    def __init__(self, name, description, engine, datum):
+        """:type name: string
+        :param name: name of the workload, used to select it from the command line and in the results
+        :type description: string
+        :param description: one-line description of the engine's shape
+        :type engine: callable of ``random.Random`` that returns Pythonized JSON
+        :param engine: function that builds the PFA document
+        :type datum: callable of ``random.Random`` that returns a datum
+        :param datum: function that generates one input record
+        """
+        self.name = name
+        self.description = description
+        self.engine = engine
+        self.datum = datum
+
+    def __repr__(self):
+        return "Workload({0})".format(repr(self.name))
+
+numericFields = ["x{0}".format(i) for i in xrange(10)]
+
+numericInput = {"type": "record", "name": "Datum", "fields": [{"name": x, "type": "double"} for x in numericFields]}
+
+def numericDatum(rand):
+    return dict((x, rand.gauss(0.0, 1.0)) for x in numericFields)
+
+treeNodeType = {"type": "record",
+                "name": "TreeNode",
+                "fields": [{"name": "field", "type": {"type": "enum", "name": "Fields", "symbols": numericFields}},
+                           {"name": "operator", "type": "string"},
+                           {"name": "value", "type": "double"},
+                           {"name": "pass", "type": ["string", "TreeNode"]},
+                           {"name": "fail", "type": ["string", "TreeNode"]}]}
+
+def randomTree(rand, depth):
+    if depth == 0:
+        return {"string": rand.choice(["a", "b", "c", "d"])}
+    else:
+        return {"TreeNode": {"field": rand.choice(numericFields),
+                             "operator": "<",
+                             "value": rand.gauss(0.0, 0.5),
+                             "pass": randomTree(rand, depth - 1),
+                             "fail": randomTree(rand, depth - 1)}}
+
+def walkTree(tree):
+    return {"model.tree.simpleWalk": ["input", tree, {"params": [{"d": "Datum"}, {"t": "TreeNode"}], "ret": "boolean", "do": {"model.tree.simpleTest": ["d", "t"]}}]}
+
+def deepTreeEngine(rand):
+    return {"input": numericInput,
+            "output": "string",
+            "cells": {"tree": {"type": treeNodeType, "init": randomTree(rand, 14)["TreeNode"]}},
+            "action": walkTree({"cell": "tree"})}
+
+def forestEngine(rand):
+    return {"input": numericInput,
+            "output": "string",
+            "cells": {"forest": {"type": {"type": "array", "items": treeNodeType}, "init": [randomTree(rand, 8)["TreeNode"] for i in xrange(30)]}},
+            "action": {"a.mode": {"a.map": [{"cell": "forest"}, {"params": [{"tree": "TreeNode"}], "ret": "string", "do": walkTree("tree")}]}}}
+
+def kmeansEngine(rand):
+    return {"input": {"type": "array", "items": "double"},
+            "output": "string",
+            "cells": {"clusters": {"type": {"type": "array", "items": {"type": "record", "name": "Cluster", "fields": [{"name": "center", "type": {"type": "array", "items": "double"}}, {"name": "id", "type": "string"}]}},
+                                   "init": [{"center": [rand.gauss(0.0, 1.0) for j in xrange(20)], "id": "cluster{0}".format(i)} for i in xrange(50)]}},
+            "action": {"attr": {"model.cluster.closest": ["input", {"cell": "clusters"}]}, "path": [{"string": "id"}]}}
+
+def kmeansDatum(rand):
+    return [rand.gauss(0.0, 1.0) for j in xrange(20)]
+
+def regressionEngine(rand):
+    return {"input": {"type": "array", "items": "double"},
+            "output": {"type": "array", "items": "double"},
+            "cells": {"model": {"type": {"type": "record", "name": "Model", "fields": [{"name": "coeff", "type": {"type": "array", "items": {"type": "array", "items": "double"}}}, {"name": "const", "type": {"type": "array", "items": "double"}}]},
+                                "init": {"coeff": [[rand.gauss(0.0, 1.0) for j in xrange(20)] for i in xrange(10)], "const": [rand.gauss(0.0, 1.0) for i in xrange(10)]}}},
+            "action": {"m.link.softmax": {"model.reg.linear": ["input", {"cell": "model"}]}}}
+
+words = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta", "theta", "iota", "kappa", "lambda", "mu"]
+
+def stringDatum(rand):
+    return " ".join(rand.choice(words) + ("!" if rand.random() < 0.1 else "") + (str(rand.randint(0, 99)) if rand.random() < 0.2 else "") for i in xrange(rand.randint(5, 30)))
+
+def stringsEngine(rand):
+    return {"input": "string",
+            "output": {"type": "map", "values": "int"},
+            "action": [
+                {"let": {"cleaned": {"re.replaceall": [{"s.lower": "input"}, {"string": "[^a-z ]+"}, {"string": ""}]}}},
+                {"let": {"tokens": {"a.filter": [{"s.split": ["cleaned", {"string": " "}]}, {"params": [{"t": "string"}], "ret": "boolean", "do": {">": [{"s.len": "t"}, 3]}}]}}},
+                {"new": {"tokens": {"a.len": "tokens"},
+                         "vowelStart": {"a.count": ["tokens", {"params": [{"t": "string"}], "ret": "boolean", "do": {"re.contains": ["t", {"string": "^[aeiou]"}]}}]},
+                         "digits": {"a.len": {"re.findall": ["input", {"string": "[0-9]+"}]}},
+                         "exclamations": {"s.count": ["input", {"string": "!"}]},
+                         "longest": {"a.fold": ["tokens", 0, {"params": [{"n": "int"}, {"t": "string"}], "ret": "int", "do": {"max": ["n", {"s.len": "t"}]}}]}},
+                 "type": {"type": "map", "values": "int"}}]}
+
+def poolsEngine(rand):
+    return {"input": "string",
+            "output": "int",
+            "pools": {"counts": {"type": "int", "init": {}}},
+            "action": [
+                {"let": {"words": {"s.split": ["input", {"string": " "}]}}},
+                {"foreach": "word", "in": "words", "do": [
+                    {"pool": "counts", "path": ["word"], "to": {"params": [{"old": "int"}], "ret": "int", "do": {"+": ["old", 1]}}, "init": 0}]},
+                {"pool": "counts", "path": [{"attr": "words", "path": [0]}]}]}
+
+def emitEngine(rand):
+    return {"input": "string",
+            "output": "string",
+            "method": "emit",
+            "action": [
+                {"foreach": "word", "in": {"s.split": ["input", {"string": " "}]}, "do": [
+                    {"if": {"re.contains": ["word", {"string": "[0-9]"}]}, "then": [{"emit": ["word"]}]}]}]}
+
+def foldEngine(rand):
+    return {"input": numericInput,
+            "output": {"type": "record", "name": "Tally", "fields": [{"name": "count", "type": "double"}, {"name": "mean", "type": "double"}, {"name": "variance", "type": "double"}]},
+            "method": "fold",
+            "zero": {"count": 0.0, "mean": 0.0, "variance": 0.0},
+            "action": {"stat.sample.update": [{"a.sum": {"new": [{"attr": "input", "path": [{"string": x}]} for x in numericFields], "type": {"type": "array", "items": "double"}}}, 1.0, "tally"]},
+            "merge": "tallyOne"}
+
+workloads = [
+    Workload("deep-tree", "depth-14 decision tree walked with model.tree.simpleWalk", deepTreeEngine, numericDatum),
+    Workload("forest", "30 depth-8 trees combined with a.map and a.mode", forestEngine, numericDatum),
+    Workload("kmeans", "50 20-dimensional clusters with model.cluster.closest", kmeansEngine, kmeansDatum),
+    Workload("regression", "10x20 linear regression with m.link.softmax", regressionEngine, kmeansDatum),
+    Workload("strings", "regex and string feature engineering", stringsEngine, stringDatum),
+    Workload("pools", "per-word counters in a pool updated with pool-to", poolsEngine, stringDatum),
+    Workload("emit", "emit engine producing a variable number of outputs per record", emitEngine, stringDatum),
+    Workload("fold", "fold engine accumulating a running mean and variance", foldEngine, numericDatum),
+    ]
+"""Workloads in the standard suite."""
+
+def percentile(sortedValues, fraction):
+    """Nearest-rank percentile of a non-empty sorted list.
+
+    :type sortedValues: list of numbers
+    :param sortedValues: values in increasing order
+    :type fraction: number between 0 and 1
+    :param fraction: 0.5 for the median, 0.99 for the 99th percentile, etc.
+    :rtype: number
+    :return: the smallest value that is at least as large as ``fraction`` of the values
+    """
+    index = int(math.ceil(fraction * len(sortedValues))) - 1
+    return sortedValues[max(0, min(len(sortedValues) - 1, index))]
+
+def peakRSS():
+    """Peak resident set size of this process in bytes, or ``None`` if the platform does not report it."""
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return maxrss
+    else:
+        return maxrss * 1024
+
+def runWorkload(workload, records, warmup, seed=12345):
+    """Measure one workload in the current process.
+
+    :type workload: titus.benchmark.Workload
+    :param workload: the engine and data to run
+    :type records: positive integer
+    :param records: number of records to measure
+    :type warmup: non-negative integer
+    :param warmup: number of records to run before measuring
+    :type seed: integer
+    :param seed: random seed for generating the engine and the data
+    :rtype: dict
+    :return: measurements, suitable for serializing as JSON
+    """
+
+    rand = random.Random(seed)
+    document = json.dumps(workload.engine(rand))
+    data = [workload.datum(rand) for i in xrange(warmup + records)]
+
+    timer = timeit.default_timer
+
+    startTime = timer()
+    engine, = PFAEngine.fromJson(document)
+    loadSeconds = timer() - startTime
+
+    emitted = [0]
+    def emit(x):
+        emitted[0] += 1
+    engine.emit = emit
+
+    engine.begin()
+    for datum in data[:warmup]:
+        engine.action(datum)
+
+    gc.collect()
+    latencies = []
+    action = engine.action
+    startTime = timer()
+    for datum in data[warmup:]:
+        before = timer()
+        action(datum)
+        latencies.append(timer() - before)
+    totalSeconds = timer() - startTime
+    engine.end()
+
+    latencies.sort()
+    return {"name": workload.name,
+            "description": workload.description,
+            "loadSeconds": loadSeconds,
+            "records": records,
+            "warmup": warmup,
+            "totalSeconds": totalSeconds,
+            "recordsPerSecond": records / totalSeconds if totalSeconds > 0.0 else None,
+            "latencySeconds": {"mean": sum(latencies) / len(latencies),
+                               "p50": percentile(latencies, 0.50),
+                               "p99": percentile(latencies, 0.99),
+                               "max": latencies[-1]},
+            "emitted": emitted[0],
+            "peakRSSBytes": peakRSS()}
+
+def _runWorkloadByName(name, records, warmup, seed):
+    return runWorkload(dict((x.name, x) for x in workloads)[name], records, warmup, seed)
+
+def runSuite(names=None, records=5000, warmup=500, seed=12345, isolate=True, progress=None):
+    """Measure a set of standard workloads.
+
+    :type names: list of strings or ``None``
+    :param names: names of workloads to run, or ``None`` for all of them
+    :type records: positive integer
+    :param records: number of records to measure per workload
+    :type warmup: non-negative integer
+    :param warmup: number of records to run before measuring
+    :type seed: integer
+    :param seed: random seed for generating engines and data
+    :type isolate: bool
+    :param isolate: if ``True``, run each workload in a fresh process so that its peak resident memory is not contaminated by the others
+    :type progress: callable of dict or ``None``
+    :param progress: called with each workload's measurements as soon as they are available
+    :rtype: dict
+    :return: environment description and a list of measurements, suitable for serializing as JSON
+    """
+
+    known = [x.name for x in workloads]
+    if names is None:
+        names = known
+    for name in names:
+        if name not in known:
+            raise ValueError("unknown workload \"{0}\" (known workloads are {1})".format(name, ", ".join(known)))
+
+    results = []
+    for name in names:
+        if isolate:
+            pool = multiprocessing.Pool(1)
+            try:
+                result = pool.apply(_runWorkloadByName, (name, records, warmup, seed))
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            result = _runWorkloadByName(name, records, warmup, seed)
+        if progress is not None:
+            progress(result)
+        results.append(result)
+
+    return {"titusVersion": titus.version.titusVersion,
+            "pfaVersion": titus.version.defaultPFAVersion,
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "date": datetime.datetime.utcnow().isoformat() + "Z",
+            "seed": seed,
+            "isolated": isolate,
+            "benchmarks": results}
@@ -19,6 +19,7 @@
 
 import json
 import math
+import weakref
 
 import avro.io
 import avro.schema
@@ -49,6 +50,11 @@ class FcnType(Type):
     def ret(self):
         return self._ret
 
+    @property
+    def structuralKey(self):
+        """Canonical string for the function type, built from the structural keys of its parameter and return types."""
+        return "function(" + ",".join(x.structuralKey for x in self.params) + ")->" + self.ret.structuralKey
+
     def accepts(self, other):
         if isinstance(self, FcnType):
             return len(self.params) == len(other.params) and \
@@ -98,52 +104,81 @@ def jsonNodeToAvroType(x):
 def schemaToAvroType(schema):
     """Convert an Avro schema into a titus.datatype.AvroType.
 
+    The wrapper is remembered on the schema object and interned by structural identity, so repeated conversions (e.g. every access to ``AvroArray.items``) return the same AvroType instance.
+
     :type schema: avro.schema.Schema
     :param schema: schema object from the Avro library
     :rtype: titus.datatype.AvroType
     :return: AvroType object
     """
 
+    out = schema.__dict__.get("_titusAvroType")
+    if out is not None:
+        return out
+
     if schema.type == "null":
-        return AvroNull()
+        out = AvroNull()
     elif schema.type == "boolean":
-        return AvroBoolean()
+        out = AvroBoolean()
     elif schema.type == "int":
-        return AvroInt()
+        out = AvroInt()
     elif schema.type == "long":
-        return AvroLong()
+        out = AvroLong()
     elif schema.type == "float":
-        return AvroFloat()
+        out = AvroFloat()
     elif schema.type == "double":
-        return AvroDouble()
+        out = AvroDouble()
     elif schema.type == "bytes":
-        return AvroBytes()
+        out = AvroBytes()
     elif schema.type == "fixed":
         out = AvroFixed.__new__(AvroFixed)
         out._schema = schema
-        return out
     elif schema.type == "string":
-        return AvroString()
+        out = AvroString()
     elif schema.type == "enum":
         out = AvroEnum.__new__(AvroEnum)
         out._schema = schema
-        return out
     elif schema.type == "array":
         out = AvroArray.__new__(AvroArray)
         out._schema = schema
-        return out
     elif schema.type == "map":
         out = AvroMap.__new__(AvroMap)
         out._schema = schema
-        return out
     elif schema.type == "record":
         out = AvroRecord.__new__(AvroRecord)
         out._schema = schema
-        return out
     elif schema.type == "union":
         out = AvroUnion.__new__(AvroUnion)
         out._schema = schema
-        return out
+    else:
+        return None
+
+    out = internAvroType(out)
+    schema._titusAvroType = out
+    return out
+
+internedAvroTypes = weakref.WeakValueDictionary()
+
+acceptsCacheSize = 100000
+acceptsCache = {}
+
+def internAvroType(avroType):
+    """Return the canonical instance of a type that is structurally equal to ``avroType``.
+
+    Interned types share one structural key string, so equality and hashing of interned types do not need to serialize or walk their schemas.
+
+    :type avroType: titus.datatype.AvroType
+    :param avroType: type to intern
+    :rtype: titus.datatype.AvroType
+    :return: ``avroType`` itself if it is the first of its kind, or the previously interned equivalent
+    """
+
+    key = avroType.structuralKey
+    out = internedAvroTypes.get(key)
+    if out is None:
+        internedAvroTypes[key] = avroType
+        out = avroType
+    return out
 
 def avroTypeToSchema(avroType):
     """Convert a titus.datatype.AvroType into an Avro schema.
@@ -172,18 +207,36 @@ class AvroType(Type):
         """Return "name" of this type, which is used as a key in tagged unions."""
         return None
 
+    @property
+    def structuralKey(self):
+        """Canonical JSON string of the type, computed once per instance and shared among structurally equal types."""
+        try:
+            return self._structuralKey
+        except AttributeError:
+            key = json.dumps(self.schema.to_json(), sort_keys=True)
+            canonical = internedAvroTypes.get(key)
+            if canonical is not None and canonical is not self:
+                key = canonical.structuralKey
+            self._structuralKey = key
+            return key
+
     def __eq__(self, other):
         """Return ``True`` if the two types are equal."""
-        if isinstance(other, AvroType):
-            return self.schema == other.schema
+        if self is other:
+            return True
+        elif isinstance(other, AvroType):
+            return self.structuralKey == other.structuralKey
         elif isinstance(other, AvroPlaceholder):
-            return self.schema == other.avroType.schema
+            return self.structuralKey == other.avroType.structuralKey
         else:
             return False
 
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
     def __hash__(self):
         """Return a unique hash of the type."""
-        return hash(self.schema)
+        return hash(self.structuralKey)
 
     def _recordFieldsOkay(self, other, memo, checkRecord):
         for xf in self.fields:
@@ -208,7 +261,7 @@ class AvroType(Type):
 
         If ``x.accepts(y) and y.accepts(x)``, then ``x`` and ``y`` are equal. In general, acceptability is not symmetric.
 
-        The ``memo`` and ``checkRecord`` parameters are only used to avoid infinite recursion.
+        The ``memo`` and ``checkRecord`` parameters are only used to avoid infinite recursion. Results of calls without them are cached by the structural keys of the two types.
 
         :type self: titus.datatype.AvroType
         :param self: the expected signature to be matched
@@ -218,6 +271,19 @@ class AvroType(Type):
         :return: ``True`` if ``other`` is an acceptable substitute for ``self`` (or is exactly the same); ``False`` if incompatible
         """
 
+        if memo is None and checkRecord and isinstance(other, AvroType):
+            key = (self.structuralKey, other.structuralKey)
+            out = acceptsCache.get(key)
+            if out is None:
+                out = self._accepts(other, memo, checkRecord)
+                if len(acceptsCache) >= acceptsCacheSize:
+                    acceptsCache.clear()
+                acceptsCache[key] = out
+            return out
+        else:
+            return self._accepts(other, memo, checkRecord)
+
+    def _accepts(self, other, memo, checkRecord):
         if isinstance(other, ExceptionType):
             return False
 
@@ -335,6 +401,9 @@ class ExceptionType(AvroType):
     """Pseudo-type for exceptions (the "bottom" type in type theory)."""
     def accepts(self, other):
         return isinstance(other, ExceptionType)
+    @property
+    def structuralKey(self):
+        return '{"type":"exception"}'
     def __repr__(self):
         return '{"type":"exception"}'
     def jsonNode(self, memo):
@@ -921,10 +990,10 @@ def jsonDecoder(avroType, value):
         if isinstance(value, basestring) and value in avroType.symbols:
             return value
     elif isinstance(avroType, AvroArray):
-        if isinstance(value, (list, tuple)):
+        if isinstance(value, titus.util.arrayTypes):
             return [jsonDecoder(avroType.items, x) for x in value]
     elif isinstance(avroType, AvroMap):
-        if isinstance(value, dict):
+        if isinstance(value, titus.util.mapTypes):
             return dict((k, jsonDecoder(avroType.values, v)) for k, v in value.items())
     elif isinstance(avroType, AvroRecord):
         if isinstance(value, dict):
@@ -987,9 +1056,9 @@ def jsonEncoder(avroType, value, tagged=True):
         return value
     elif isinstance(avroType, AvroEnum) and isinstance(value, basestring) and value in avroType.symbols:
         return value
-    elif isinstance(avroType, AvroArray) and isinstance(value, (list, tuple)):
+    elif isinstance(avroType, AvroArray) and isinstance(value, titus.util.arrayTypes):
         return [jsonEncoder(avroType.items, x, tagged) for x in value]
-    elif isinstance(avroType, AvroMap) and isinstance(value, dict):
+    elif isinstance(avroType, AvroMap) and isinstance(value, titus.util.mapTypes):
         return dict((k, jsonEncoder(avroType.values, v, tagged)) for k, v in value.items())
     elif isinstance(avroType, AvroRecord) and isinstance(value, dict):
         out = {}
@@ -1088,7 +1157,7 @@ def compare(avroType, x, y):
             return 1
         else:
             return 0
-    elif isinstance(avroType, AvroArray) and isinstance(x, (list, tuple)) and isinstance(y, (list, tuple)):
+    elif isinstance(avroType, AvroArray) and isinstance(x, titus.util.arrayTypes) and isinstance(y, titus.util.arrayTypes):
         for xi, yi in zip(x, y):
             comparison = compare(avroType.items, xi, yi)
             if comparison != 0:
@@ -1099,7 +1168,7 @@ def compare(avroType, x, y):
             return -1
         else:
             return 0
-    elif isinstance(avroType, AvroMap) and isinstance(x, dict) and isinstance(y, dict):
+    elif isinstance(avroType, AvroMap) and isinstance(x, titus.util.mapTypes) and isinstance(y, titus.util.mapTypes):
         raise NotImplementedError("Avro has no order defined for maps???")
     elif isinstance(avroType, AvroRecord) and isinstance(x, dict) and isinstance(y, dict):
         for field in avroType.fields:
@@ -1156,6 +1225,137 @@ def compare(avroType, x, y):
     else:
         raise titus.errors.AvroException("{0} or {1} does not match schema {2}".format(json.dumps(x), json.dumps(y), ts(avroType)))
 
+########################### sort keys
+
+def identity(x):
+    return x
+
+class Descending(object):
+    """Wraps a sort key to reverse its order, for record fields with ``"order": "descending"``."""
+
+    __slots__ = ("key",)
+
+    def __init__(self, key):
+        self.key = key
+    def __eq__(self, other):
+        return self.key == other.key
+    def __ne__(self, other):
+        return self.key != other.key
+    def __lt__(self, other):
+        return other.key < self.key
+    def __gt__(self, other):
+        return other.key > self.key
+    def __le__(self, other):
+        return other.key <= self.key
+    def __ge__(self, other):
+        return other.key >= self.key
+    def __hash__(self):
+        return hash(self.key)
+
+def sortKey(avroType, memo=None):
+    """Compile a type into a Python sort key that orders values the same way as ``compare``.
+
+    For valid examples ``x`` and ``y`` of the type, ``cmp(key(x), key(y)) == compare(avroType, x, y)``, but the type is only examined once, when the key is built, so ``sorted(a, key=sortKey(t))`` avoids dispatching on the type in every comparison.
+
+    :type avroType: titus.datatype.AvroType
+    :param avroType: type of the objects to order
+    :type memo: dict or ``None``
+    :param memo: keys of records already being compiled (for recursive types); provide ``None`` if unsure
+    :rtype: callable of one argument
+    :return: function from a value to something that Python can compare
+    """
+
+    if memo is None:
+        memo = {}
+
+    if isinstance(avroType, AvroNull):
+        return lambda x: None
+
+    elif isinstance(avroType, (AvroBoolean, AvroInt, AvroLong, AvroBytes, AvroFixed, AvroString)):
+        return identity
+
+    elif isinstance(avroType, (AvroFloat, AvroDouble)):
+        # NaN is greater than everything else and equal to itself
+        return lambda x: (1, 0.0) if x != x else (0, x)
+
+    elif isinstance(avroType, AvroEnum):
+        index = dict((x, i) for i, x in enumerate(avroType.symbols))
+        return lambda x: index[x]
+
+    elif isinstance(avroType, AvroArray):
+        itemKey = sortKey(avroType.items, memo)
+        if itemKey is identity:
+            return tuple
+        else:
+            return lambda x: tuple(itemKey(xi) for xi in x)
+
+    elif isinstance(avroType, AvroMap):
+        def key(x):
+            raise NotImplementedError("Avro has no order defined for maps???")
+        return key
+
+    elif isinstance(avroType, AvroRecord):
+        if avroType.fullName in memo:
+            return lambda x: memo[avroType.fullName](x)
+        memo[avroType.fullName] = None
+        fields = []
+        for field in avroType.fields:
+            if field.order != "ignore":
+                fields.append((field.name, sortKey(field.avroType, memo), field.order == "descending"))
+        def key(x):
+            return tuple(Descending(fieldKey(x[name])) if descending else fieldKey(x[name]) for name, fieldKey, descending in fields)
+        memo[avroType.fullName] = key
+        return key
+
+    elif isinstance(avroType, AvroUnion):
+        types = avroType.types
+        keys = [sortKey(t, memo) for t in types]
+        tags = dict((t.name, i) for i, t in enumerate(types))
+        nullIndex = tags.get("null")
+        def key(x):
+            if x is None and nullIndex is not None:
+                return (nullIndex, None)
+            if isinstance(x, dict) and len(x) == 1:
+                (tag, value), = x.items()
+                if tag in tags:
+                    return (tags[tag], keys[tags[tag]](value))
+            index = None
+            for ti, t in enumerate(types):
+                try:
+                    jsonEncoder(t, x)
+                except titus.errors.AvroException:
+                    pass
+                else:
+                    index = ti
+            if index is None:
+                raise titus.errors.AvroException()
+            return (index, keys[index](x))
+        return key
+
+    else:
+        raise titus.errors.AvroException("no order defined for {0}".format(ts(avroType)))
+
+sortKeyCache = {}
+
+def sortKeyFromJson(x, member=None):
+    """Sort key (see ``sortKey``) for a type given as Pythonized JSON, such as a library function's ``paramTypes``, cached by the type's JSON form.
+
+    :type x: Pythonized JSON
+    :param x: type to order by
+    :type member: string or ``None``
+    :param member: if "items" or "values", order by the array's items or the map's values instead
+    :rtype: callable of one argument
+    :return: function from a value to something that Python can compare
+    """
+    cacheKey = (json.dumps(x, sort_keys=True), member)
+    out = sortKeyCache.get(cacheKey)
+    if out is None:
+        avroType = jsonNodeToAvroType(x)
+        if member is not None:
+            avroType = getattr(avroType, member)
+        out = sortKeyCache[cacheKey] = sortKey(avroType)
+    return out
+
 ########################### check data value against type
 
 try:
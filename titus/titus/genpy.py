@@ -22,8 +22,10 @@ import json
 import math
 import threading
 import time
+import timeit
 import random
 import struct
+from collections import OrderedDict
 
 from avro.datafile import DataFileReader, DataFileWriter
 from avro.io import DatumReader, DatumWriter
@@ -32,6 +34,8 @@ from titus.errors import *
 import titus.pfaast
 import titus.datatype
 import titus.fcn
+import titus.lib.core
+import titus.lib.rand
 import titus.options
 import titus.P as P
 import titus.reader
@@ -42,6 +46,7 @@ import titus.version
 
 from titus.pfaast import EngineConfig
 from titus.pfaast import Cell as AstCell
+from titus.pfaast import CellPoolSource
 from titus.pfaast import Pool as AstPool
 from titus.pfaast import FcnDef
 from titus.pfaast import FcnRef
@@ -103,19 +108,37 @@ class GeneratePython(titus.pfaast.Task):
     def makeTask(style):
         """Make a ``titus.genpy.GeneratePython`` Task with a particular style.
 
-        Currently, the only style is "pure" (``titus.genpy.GeneratePythonPure``).
+        Styles are "pure" (``titus.genpy.GeneratePythonPure``) and "profile" (``titus.genpy.GeneratePythonProfile``).
         """
 
         if style == "pure":
             return GeneratePythonPure()
+        elif style == "profile":
+            return GeneratePythonProfile()
         else:
             raise NotImplementedError("unrecognized style " + style)
 
-    def commandsMap(self, codes, indent):
+    def makeProfiler(self):
+        """Make the ``titus.genpy.Profiler`` attached to each engine instance, or ``None`` if this style is not instrumented."""
+        return None
+
+    def binaryPlan(self, formats):
+        """Register a ``titus.genpy.BinaryPlan`` for a ``pack`` or ``unpack`` site, to be built once as a class attribute of the engine.
+
+        :type formats: list of (string or ``None``, string, int or ``None``)
+        :param formats: (symbol, format, length) triples
+        :rtype: string
+        :return: Python expression for the plan in generated code
+        """
+        plans = self.__dict__.setdefault("binaryPlans", [])
+        plans.append(formats)
+        return "self.binaryPlans[" + str(len(plans) - 1) + "]"
+
+    def commandsMap(self, codes, indent, materialize=False):
         """Concatenate commands for a map-type engine."""
 
         suffix = indent + "self.actionsFinished += 1\n" + \
-                 indent + "return last\n"
+                 indent + ("return materialize(last)\n" if materialize else "return last\n")
         return "".join(indent + x + "\n" for x in codes[:-1]) + indent + "last = " + codes[-1] + "\n" + suffix
 
     def commandsEmit(self, codes, indent):
@@ -124,20 +147,20 @@ class GeneratePython(titus.pfaast.Task):
         suffix = indent + "self.actionsFinished += 1\n"
         return "".join(indent + x + "\n" for x in codes) + suffix
 
-    def commandsFold(self, codes, indent):
+    def commandsFold(self, codes, indent, materialize=False):
         """Concatenate commands for a fold-type engine."""
 
         prefix = indent + "scope.let({'tally': self.tally})\n"
         suffix = indent + "self.tally = last\n" + \
                  indent + "self.actionsFinished += 1\n" + \
-                 indent + "return self.tally\n"
+                 indent + ("return materialize(self.tally)\n" if materialize else "return self.tally\n")
         return prefix + "".join(indent + x + "\n" for x in codes[:-1]) + indent + "last = " + codes[-1] + "\n" + suffix
 
-    def commandsFoldMerge(self, codes, indent):
+    def commandsFoldMerge(self, codes, indent, materialize=False):
         """Concatenate commands for the merge section of a fold-type engine."""
 
         suffix = indent + "self.tally = last\n" + \
-                 indent + "return self.tally\n"
+                 indent + ("return materialize(self.tally)\n" if materialize else "return self.tally\n")
         return "".join(indent + x + "\n" for x in codes[:-1]) + indent + "last = " + codes[-1] + "\n" + suffix
 
     def commandsBeginEnd(self, codes, indent):
@@ -173,14 +196,17 @@ class GeneratePython(titus.pfaast.Task):
             action, actionSymbols, actionCalls = context.action
             end, endSymbols, endCalls = context.end
 
-            callGraph = {"(begin)": beginCalls, "(action)": actionCalls, "(end)": endCalls}
-            if context.merge is not None:
-                mergeTasks, mergeSymbols, mergeCalls = context.merge
-                callGraph["(merge)"] = mergeCalls
-            for fname, fctx in context.fcns:
-                callGraph[fname] = fctx.calls
+            callGraph = context.callGraph
+
+            # array views only come from memory-mapped cells and stat.sample.updateWindow, and versioned maps from stat.sample.fillCounter;
+            # outputs must not contain them because serializers such as Avro's DatumWriter only accept lists and dicts
+            materialize = any(x.source == CellPoolSource.MMAP for x in context.cells.values()) or \
+                          any("stat.sample.updateWindow" in calls or "stat.sample.fillCounter" in calls for calls in callGraph.values())
 
             out = ["class PFA_" + name + """(PFAEngine):
+    binaryPlans = [""" + ", ".join("BinaryPlan(" + repr(x) + ")" for x in self.__dict__.get("binaryPlans", [])) + """]
+    materializeOutput = """ + repr(materialize) + """
+
     def __init__(self, cells, pools, config, options, log, emit, zero, instance, rand):
         self.actionsStarted = 0
         self.actionsFinished = 0
@@ -194,6 +220,8 @@ class GeneratePython(titus.pfaast.Task):
         self.emit = emit
         self.instance = instance
         self.rand = rand
+        self.distributions = Memo(self.distributionCacheSize)
+        self.identityCaches = {}
         self.callGraph = """ + repr(callGraph) + "\n"]
 
             if context.method == Method.FOLD:
@@ -209,7 +237,7 @@ class GeneratePython(titus.pfaast.Task):
             if len(begin) > 0:
                 out.append("""
     def begin(self):
-        state = ExecutionState(self.options, self.rand, 'action', self.parser)
+        state = ExecutionState(self.options, self.rand, 'action', self.parser, self.distributions, self.identityCaches)
         scope = DynamicScope(None)
         scope.let({'name': self.config.name, 'instance': self.instance, 'metadata': self.config.metadata})
         if self.config.version is not None:
@@ -222,17 +250,17 @@ class GeneratePython(titus.pfaast.Task):
 """)
 
             if context.method == Method.MAP:
-                commands = self.commandsMap(action, "            ")
+                commands = self.commandsMap(action, "            ", materialize)
             elif context.method == Method.EMIT:
                 commands = self.commandsEmit(action, "            ")
             elif context.method == Method.FOLD:
-                commands = self.commandsFold(action, "            ")
+                commands = self.commandsFold(action, "            ", materialize)
 
             out.append("""
     def action(self, input, check=True):
         if check:
             input = checkData(input, self.inputType)
-        state = ExecutionState(self.options, self.rand, 'action', self.parser)
+        state = ExecutionState(self.options, self.rand, 'action', self.parser, self.distributions, self.identityCaches)
         scope = DynamicScope(None)
         for cell in self.cells.values():
             cell.maybeSaveBackup()
@@ -254,9 +282,10 @@ class GeneratePython(titus.pfaast.Task):
 """)
 
             if context.merge is not None:
+                mergeTasks, mergeSymbols, mergeCalls = context.merge
                 out.append("""
     def merge(self, tallyOne, tallyTwo):
-        state = ExecutionState(self.options, self.rand, 'merge', self.parser)
+        state = ExecutionState(self.options, self.rand, 'merge', self.parser, self.distributions, self.identityCaches)
         scope = DynamicScope(None)
         for cell in self.cells.values():
             cell.maybeSaveBackup()
@@ -266,7 +295,7 @@ class GeneratePython(titus.pfaast.Task):
             scope.let({'tallyOne': tallyOne, 'tallyTwo': tallyTwo, 'name': self.config.name, 'instance': self.instance, 'metadata': self.config.metadata})
             if self.config.version is not None:
                 scope.let({'version': self.config.version})
-""" + self.commandsFoldMerge(mergeTasks, "            "))
+""" + self.commandsFoldMerge(mergeTasks, "            ", materialize))
 
                 out.append("""        except Exception:
             for cell in self.cells.values():
@@ -283,7 +312,7 @@ class GeneratePython(titus.pfaast.Task):
                 
                 out.append("""
     def end(self):
-        state = ExecutionState(self.options, self.rand, 'action', self.parser)
+        state = ExecutionState(self.options, self.rand, 'action', self.parser, self.distributions, self.identityCaches)
         scope = DynamicScope(None)
         scope.let({'name': self.config.name, 'instance': self.instance, 'metadata': self.config.metadata, 'actionsStarted': self.actionsStarted, 'actionsFinished': self.actionsFinished})
         if self.config.version is not None:
@@ -348,10 +377,10 @@ class GeneratePython(titus.pfaast.Task):
             return str(context.value)
 
         elif isinstance(context, LiteralFloat.Context):
-            return str(float(context.value))
+            return repr(float(context.value))
 
         elif isinstance(context, LiteralDouble.Context):
-            return str(float(context.value))
+            return repr(float(context.value))
 
         elif isinstance(context, LiteralString.Context):
             return repr(context.value)
@@ -447,13 +476,15 @@ class GeneratePython(titus.pfaast.Task):
                 return "ifNotNullElse(state, scope, {" + ", ".join(repr(n) + ": " + e for n, t, e in context.symbolTypeResult) + "}, {" + ", ".join(repr(n) + ": '" + repr(t) + "'" for n, t, e in context.symbolTypeResult) + "}, lambda state, scope: do(" + ", ".join(context.thenClause) + "), lambda state, scope: do(" + ", ".join(context.elseClause) + "))"
 
         elif isinstance(context, Pack.Context):
-            return "pack(state, scope, [" + ", ".join("(" + str(d.value) + ", " + str(d) + ")" for d in context.exprsDeclareRes) + "], " + repr(context.pos) + ")"
+            plan = self.binaryPlan([(None,) + d.formatLength for d in context.exprsDeclareRes])
+            return plan + ".pack([" + ", ".join(str(d.value) for d in context.exprsDeclareRes) + "], " + repr(context.pos) + ")"
 
         elif isinstance(context, Unpack.Context):
+            plan = self.binaryPlan([(d.value,) + d.formatLength for d in context.formatter])
             if context.elseClause is None:
-                return "unpack(state, scope, " + context.bytes + ", [" + ", ".join(str(x) for x in context.formatter) + "], lambda state, scope: do(" + ", ".join(context.thenClause) + "))"
+                return plan + ".unpack(state, scope, " + context.bytes + ", lambda state, scope: do(" + ", ".join(context.thenClause) + "))"
             else:
-                return "unpackElse(state, scope, " + context.bytes + ", [" + ", ".join(str(x) for x in context.formatter) + "], lambda state, scope: do(" + ", ".join(context.thenClause) + "), lambda state, scope: do(" + ", ".join(context.elseClause) + "))"
+                return plan + ".unpackElse(state, scope, " + context.bytes + ", lambda state, scope: do(" + ", ".join(context.thenClause) + "), lambda state, scope: do(" + ", ".join(context.elseClause) + "))"
 
         elif isinstance(context, Doc.Context):
             return "None"
@@ -477,6 +508,62 @@ class GeneratePythonPure(GeneratePython):
     """
     pass
 
+class GeneratePythonProfile(GeneratePython):
+    """A ``titus.pfaast.Task`` for generating a pure Python executable that profiles itself.
+
+    Every library function call, user function call, cell or pool access, and control-flow block is wrapped in a call to the engine's ``titus.genpy.Profiler``, keyed by the name of the construct and its position in the PFA document.
+    """
+
+    siteNames = [(CallUserFcn.Context, "call"),
+                 (CellGet.Context, "cell"),
+                 (CellTo.Context, "cell-to"),
+                 (PoolGet.Context, "pool"),
+                 (PoolTo.Context, "pool-to"),
+                 (PoolDel.Context, "pool-del"),
+                 (If.Context, "if"),
+                 (Cond.Context, "cond"),
+                 (While.Context, "while"),
+                 (DoUntil.Context, "do-until"),
+                 (For.Context, "for"),
+                 (Foreach.Context, "foreach"),
+                 (Forkeyval.Context, "forkey-forval")]
+
+    def __init__(self):
+        self.unknownPositions = 0
+
+    def makeProfiler(self):
+        return Profiler()
+
+    def siteKey(self, context):
+        """Name a call site as "construct (position)", or ``None`` if the context is not instrumented."""
+
+        if isinstance(context, Call.Context):
+            name = getattr(context.fcn, "name", None)
+            if name is None:
+                name = "emit"
+        else:
+            for cls, name in self.siteNames:
+                if isinstance(context, cls):
+                    break
+            else:
+                return None
+
+        pos = context.pos
+        if pos is None:
+            self.unknownPositions += 1
+            pos = "unknown position {0}".format(self.unknownPositions)
+        return "{0} ({1})".format(name, pos)
+
+    def __call__(self, context, engineOptions):
+        """Turn a PFA Context into Python, wrapping instrumented expressions in ``self.profiler.measure``."""
+
+        out = GeneratePython.__call__(self, context, engineOptions)
+        key = self.siteKey(context)
+        if key is None:
+            return out
+        else:
+            return "self.profiler.measure({0}, lambda: {1})".format(repr(key), out)
+
 ###########################################################################
 
 class ExecutionState(object):
@@ -484,12 +571,14 @@ class ExecutionState(object):
 
     Every PFA function implementation gets this state as an argument.
 
-    It includes execution options, random number generators, whether we are in begin, action, or end, etc.
+    It includes execution options, random number generators, the engine's cache of ``prob.dist.*`` distribution objects and its per-call-site caches of structures derived from PFA values, whether we are in begin, action, or end, etc.
     """
 
-    def __init__(self, options, rand, routine, parser):
+    def __init__(self, options, rand, routine, parser, distributions=None, identityCaches=None):
         self.rand = rand
         self.parser = parser
+        self.distributions = distributions
+        self.identityCaches = {} if identityCaches is None else identityCaches
 
         if routine == "begin":
             self.timeout = options.timeout_begin
@@ -500,10 +589,316 @@ class ExecutionState(object):
 
         self.startTime = time.time()
 
+    def identityCache(self, site):
+        """Get the engine's titus.util.IdentityCache for one call site, creating it if necessary.
+
+        :type site: hashable object
+        :param site: call site, usually the function name and ``pos``
+        :rtype: titus.util.IdentityCache
+        :return: cache that lasts as long as the engine
+        """
+        out = self.identityCaches.get(site)
+        if out is None:
+            out = self.identityCaches[site] = titus.util.IdentityCache()
+        return out
+
     def checkTime(self):
         if self.timeout > 0 and (time.time() - self.startTime) * 1000 > self.timeout:
             raise PFATimeoutException("exceeded timeout of {0} milliseconds".format(self.timeout))
 
+class Profiler(object):
+    """Counts calls and accumulates time per call site in an engine generated with style "profile".
+
+    Times are measured inclusively (``totalTime``: everything under the call site) and exclusively (``selfTime``: minus the time spent in instrumented call sites nested within it). Recursive call sites only contribute the outermost call to ``totalTime``.
+    """
+
+    def __init__(self, timer=None):
+        """:type timer: callable returning a number of seconds
+        :param timer: clock to use; default is ``timeit.default_timer``
+        """
+        if timer is None:
+            timer = timeit.default_timer
+        self.timer = timer
+        self.reset()
+
+    def reset(self):
+        """Forget all measurements."""
+        self.sites = {}
+        self.stacks = {}
+        self.active = {}
+        self.frames = []
+
+    def measure(self, key, thunk):
+        """Evaluate ``thunk()`` as call site ``key``, recording its count and time.
+
+        :type key: string
+        :param key: name and position of the call site
+        :type thunk: callable of no arguments
+        :param thunk: the expression to evaluate
+        :rtype: anything
+        :return: the result of ``thunk()``
+        """
+
+        frames = self.frames
+        if len(frames) > 0:
+            path = frames[-1][1] + (key,)
+        else:
+            path = (key,)
+        frame = [0.0, path]
+        frames.append(frame)
+        active = self.active
+        active[key] = active.get(key, 0) + 1
+
+        start = self.timer()
+        try:
+            return thunk()
+        finally:
+            elapsed = self.timer() - start
+            frames.pop()
+            active[key] -= 1
+            if len(frames) > 0:
+                frames[-1][0] += elapsed
+            selfTime = elapsed - frame[0]
+
+            site = self.sites.get(key)
+            if site is None:
+                site = self.sites[key] = [0, 0.0, 0.0]
+            site[0] += 1
+            if active[key] == 0:
+                site[1] += elapsed
+            site[2] += selfTime
+
+            stack = self.stacks.get(path)
+            if stack is None:
+                stack = self.stacks[path] = [0, 0.0]
+            stack[0] += 1
+            stack[1] += selfTime
+
+    def report(self, sortBy="selfTime", limit=None):
+        """Summarize measurements per call site, largest first.
+
+        :type sortBy: string
+        :param sortBy: "count", "totalTime", or "selfTime"
+        :type limit: positive integer or ``None``
+        :param limit: maximum number of call sites to return
+        :rtype: list of dict
+        :return: one ``{"site": string, "count": int, "totalTime": seconds, "selfTime": seconds}`` per call site
+        """
+        if sortBy not in ("count", "totalTime", "selfTime"):
+            raise ValueError("sortBy must be \"count\", \"totalTime\", or \"selfTime\"")
+        out = [{"site": key, "count": count, "totalTime": totalTime, "selfTime": selfTime} for key, (count, totalTime, selfTime) in self.sites.items()]
+        out.sort(key=lambda x: (-x[sortBy], x["site"]))
+        if limit is not None:
+            out = out[:limit]
+        return out
+
+    def formatReport(self, sortBy="selfTime", limit=None):
+        """Format ``report`` as a fixed-width table (times in milliseconds).
+
+        :type sortBy: string
+        :param sortBy: "count", "totalTime", or "selfTime"
+        :type limit: positive integer or ``None``
+        :param limit: maximum number of call sites to show
+        :rtype: string
+        :return: table with one line per call site
+        """
+        lines = ["{0:>12s} {1:>14s} {2:>14s}  {3}".format("count", "total (ms)", "self (ms)", "site")]
+        for x in self.report(sortBy, limit):
+            lines.append("{0:12d} {1:14.3f} {2:14.3f}  {3}".format(x["count"], x["totalTime"] * 1000.0, x["selfTime"] * 1000.0, x["site"]))
+        return "\n".join(lines) + "\n"
+
+    def collapsedStacks(self, metric="selfTime"):
+        """Express measurements in the collapsed-stack format read by flamegraph.pl and similar tools.
+
+        :type metric: string
+        :param metric: "selfTime" (in integer microseconds) or "count"
+        :rtype: list of string
+        :return: sorted lines of the form "outer;inner;innermost value"
+        """
+        if metric not in ("count", "selfTime"):
+            raise ValueError("metric must be \"count\" or \"selfTime\"")
+        out = []
+        for path, (count, selfTime) in self.stacks.items():
+            if metric == "count":
+                value = count
+            else:
+                value = int(round(selfTime * 1e6))
+            out.append("{0} {1}".format(";".join(x.replace(";", ",") for x in path), value))
+        out.sort()
+        return out
+
+    def writeCollapsedStacks(self, fileName, metric="selfTime"):
+        """Write ``collapsedStacks`` to a file, one stack per line.
+
+        :type fileName: string or file-like object
+        :param fileName: where to write the stacks
+        :type metric: string
+        :param metric: "selfTime" (in integer microseconds) or "count"
+        """
+        text = "".join(x + "\n" for x in self.collapsedStacks(metric))
+        if isinstance(fileName, basestring):
+            outputFile = open(fileName, "w")
+            try:
+                outputFile.write(text)
+            finally:
+                outputFile.close()
+        else:
+            fileName.write(text)
+
+def memoKey(value):
+    """Convert a PFA value into a hashable key for ``Memo``, preserving the distinction between arrays and maps/records.
+
+    :type value: any PFA value
+    :param value: data to convert
+    :rtype: hashable object
+    :return: nested tuples that compare equal if and only if the values are equal
+    """
+    if isinstance(value, titus.util.mapTypes):
+        return (dict, tuple(sorted((k, memoKey(v)) for k, v in value.items())))
+    elif isinstance(value, titus.util.arrayTypes):
+        return (list, tuple(memoKey(x) for x in value))
+    else:
+        # True == 1 == 1.0 in Python, but they are different PFA values (e.g. the branches of a [boolean, int] union)
+        return (type(value), value)
+
+class CallGraphClosure(object):
+    """Transitive closure and call depths of a ``callGraph``, computed once in linear time (Tarjan's strongly connected components).
+
+    Every member of a strongly connected component reaches the same functions, so they share one ``frozenset``.
+    """
+
+    def __init__(self, callGraph):
+        """:type callGraph: dict from string to set of string
+        :param callGraph: functions called directly by each function; callees that are not keys (library functions and special forms) are leaves
+        """
+        self.reach = {}
+        self.depth = {}
+
+        index = {}
+        lowlink = {}
+        stack = []
+        onStack = set()
+        counter = 0
+
+        for root in callGraph:
+            if root in index:
+                continue
+            index[root] = lowlink[root] = counter
+            counter += 1
+            stack.append(root)
+            onStack.add(root)
+            work = [(root, iter(callGraph[root]))]
+
+            while len(work) > 0:
+                node, callees = work[-1]
+                for callee in callees:
+                    if callee not in callGraph:
+                        continue
+                    if callee not in index:
+                        index[callee] = lowlink[callee] = counter
+                        counter += 1
+                        stack.append(callee)
+                        onStack.add(callee)
+                        work.append((callee, iter(callGraph[callee])))
+                        break
+                    elif callee in onStack and index[callee] < lowlink[node]:
+                        lowlink[node] = index[callee]
+                else:
+                    work.pop()
+                    if len(work) > 0 and lowlink[node] < lowlink[work[-1][0]]:
+                        lowlink[work[-1][0]] = lowlink[node]
+                    if lowlink[node] == index[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            onStack.discard(member)
+                            component.append(member)
+                            if member == node:
+                                break
+                        self.addComponent(component, callGraph)
+
+    def addComponent(self, component, callGraph):
+        # components arrive in reverse topological order, so every callee outside this one is already known
+        direct = set()
+        for member in component:
+            direct.update(callGraph[member])
+        members = set(component)
+
+        reach = set(direct)
+        cyclic = len(component) > 1 or component[0] in direct
+        depth = 0 if len(direct) == 0 else 1
+        for callee in direct:
+            if callee in members:
+                continue
+            if callee in self.reach:
+                reach.update(self.reach[callee])
+                depth = max(depth, self.depth[callee] + 1)
+
+        reach = frozenset(reach)
+        if cyclic:
+            depth = float("inf")
+        for member in component:
+            self.reach[member] = reach
+            self.depth[member] = depth
+
+class Memo(object):
+    """Least-recently-used cache of the results of a pure function, used by ``PFAEngine.memoize``.
+
+    Exceptions are never cached: a call that raises is counted as a miss and will be evaluated again next time.
+    """
+
+    def __init__(self, maxSize):
+        """:type maxSize: positive integer
+        :param maxSize: number of results to keep before evicting the least recently used
+        """
+        if maxSize < 1:
+            raise ValueError("maxSize must be a positive integer")
+        self.maxSize = maxSize
+        self.clear()
+
+    def clear(self):
+        """Forget all results and reset the counters."""
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __call__(self, key, thunk):
+        """Return the cached result for ``key`` or evaluate ``thunk()`` and cache it.
+
+        :type key: hashable object
+        :param key: normalized arguments, usually from ``memoKey``
+        :type thunk: callable of no arguments
+        :param thunk: the computation to cache
+        :rtype: anything
+        :return: the result of ``thunk()``
+        """
+        entries = self.entries
+        try:
+            value = entries.pop(key)
+        except KeyError:
+            self.misses += 1
+            value = thunk()
+            entries[key] = value
+            if len(entries) > self.maxSize:
+                entries.popitem(last=False)
+                self.evictions += 1
+        except TypeError:
+            self.misses += 1
+            return thunk()
+        else:
+            self.hits += 1
+            entries[key] = value
+        return value
+
+    def statistics(self):
+        """Summarize the cache's state.
+
+        :rtype: dict
+        :return: ``{"size": int, "maxSize": int, "hits": int, "misses": int, "evictions": int}``
+        """
+        return {"size": len(self.entries), "maxSize": self.maxSize, "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
 class SharedState(object):
     """Represents the state of all shared cells and pools at runtime."""
 
@@ -623,6 +1018,22 @@ def labeledFcn(fcn, paramNames):
     fcn.paramNames = paramNames
     return fcn
 
+def memoizedFcn(fcn, memo):
+    """Wraps a labeled user function so that its results are cached by its arguments.
+
+    :type fcn: callable Python object with ``paramNames``
+    :param fcn: pure function to wrap
+    :type memo: titus.genpy.Memo
+    :param memo: cache to use
+    :rtype: callable Python object
+    :return: a new labeled function with the same ``paramNames``
+    """
+
+    paramNames = fcn.paramNames
+    def memoized(state, scope):
+        return memo(memoKey([scope.get(x) for x in paramNames]), lambda: fcn(state, scope))
+    return labeledFcn(memoized, paramNames)
+
 def get(obj, path, arrayErrCode, mapErrCode, fcnName, pos):
     """Apply an "attr", "cell", or "pool" extraction path to an object.
 
@@ -647,7 +1058,7 @@ def get(obj, path, arrayErrCode, mapErrCode, fcnName, pos):
         try:
             obj = obj[head]
         except (KeyError, IndexError):
-            if isinstance(obj, (list, tuple)):
+            if isinstance(obj, titus.util.arrayTypes):
                 raise PFARuntimeException("array index not found", arrayErrCode, fcnName, pos)
             else:
                 raise PFARuntimeException("map key not found", mapErrCode, fcnName, pos)
@@ -683,7 +1094,7 @@ def update(state, scope, obj, path, to, arrayErrCode, mapErrCode, fcnName, pos):
     if len(path) > 0:
         head, tail = path[0], path[1:]
 
-        if isinstance(obj, dict):
+        if isinstance(obj, titus.util.mapTypes):
             if len(tail) > 0 and head not in obj:
                 raise PFARuntimeException("map key not found", mapErrCode, fcnName, pos)
             out = {}
@@ -694,7 +1105,7 @@ def update(state, scope, obj, path, to, arrayErrCode, mapErrCode, fcnName, pos):
                     out[k] = v
             return out
 
-        elif isinstance(obj, (list, tuple)):
+        elif isinstance(obj, titus.util.arrayTypes):
             if (len(tail) > 0 and head >= len(obj)) or head < 0:
                 raise PFARuntimeException("array index not found", arrayErrCode, fcnName, pos)
             out = []
@@ -1101,8 +1512,172 @@ def ifNotNullElse(state, scope, nameExpr, nameType, thenClause, elseClause):
     else:
         return elseClause(state, scope)
 
+class MisalignedPacking(Exception):
+    """Exception to raise if the packed length doesn't fit the format."""
+    pass
+
+class BinaryPlan(object):
+    """Precompiled plan for a ``pack`` or ``unpack`` site, built once per engine class by code generation.
+
+    Consecutive fixed-width fields with compatible byte order are merged into a single ``struct.Struct`` (pads become "x" codes, which take and yield no value). Variable-length fields ("raw", "tonull", "prefixed") are separate steps, and unpacking walks the byte string by offsets rather than slicing off the remainder after every field.
+    """
+
+    variableFormats = ("raw", "tonull", "prefixed")
+
+    def __init__(self, formats):
+        """:type formats: list of (string or ``None``, string, int or ``None``)
+        :param formats: (symbol, format, length) triples, in which format is a ``struct`` code (possibly with a "<" or ">" byte order) or "raw", "tonull", or "prefixed"; symbols are only used for unpacking
+        """
+        self.formats = formats
+        self.steps = []
+        run = []
+        order = None
+        for i, (s, f, l) in enumerate(formats):
+            if f in self.variableFormats:
+                self._addRun(run, order)
+                run = []
+                order = None
+                self.steps.append((f, l, i, s))
+            else:
+                if f[0] in "<>":
+                    if order is not None and order != f[0]:
+                        self._addRun(run, order)
+                        run = []
+                    order = f[0]
+                    f = f[1:]
+                run.append((i, s, f))
+        self._addRun(run, order)
+
+    def _addRun(self, run, order):
+        if len(run) > 0:
+            fields = [(i, s) for i, s, f in run if f != "x"]
+            self.steps.append(("struct", struct.Struct((order or "<") + "".join(f for i, s, f in run)), [i for i, s in fields], [s for i, s in fields], [s for i, s, f in run if f == "x"]))
+
+    def pack(self, values, pos):
+        """Pack a list of values, one per format (including pads).
+
+        :type values: list
+        :param values: values to pack
+        :type pos: string or ``None``
+        :param pos: position from locator marks for error reporting
+        :rtype: string
+        :return: packed byte array
+        """
+        out = []
+        for step in self.steps:
+            f = step[0]
+            if f == "struct":
+                out.append(step[1].pack(*[values[i] for i in step[2]]))
+            else:
+                value = values[step[2]]
+                if f == "raw":
+                    if step[1] is not None and len(value) != step[1]:
+                        raise PFARuntimeException("raw bytes does not have specified size", 3000, "pack", pos)
+                    out.append(value)
+                elif f == "tonull":
+                    out.append(value)
+                    out.append(chr(0))
+                else:
+                    if len(value) > 255:
+                        raise PFARuntimeException("length prefixed bytes is larger than 255 bytes", 3001, "pack", pos)
+                    out.append(chr(len(value)))
+                    out.append(value)
+        return "".join(out)
+
+    def unpackSymbols(self, bytes):
+        """Unpack a byte array into a dict of symbol values.
+
+        :type bytes: string
+        :param bytes: byte array to unpack
+        :rtype: dict from string to values
+        :return: values of the symbols
+        :raises titus.genpy.MisalignedPacking: if the byte array does not exactly fit the format
+        """
+        out = {}
+        offset = 0
+        end = len(bytes)
+        for step in self.steps:
+            f = step[0]
+            if f == "struct":
+                if offset + step[1].size > end:
+                    raise MisalignedPacking()
+                out.update(zip(step[3], step[1].unpack_from(bytes, offset)))
+                for s in step[4]:
+                    out[s] = None
+                offset += step[1].size
+            elif f == "raw":
+                if offset + step[1] > end:
+                    raise MisalignedPacking()
+                out[step[3]] = bytes[offset:(offset + step[1])]
+                offset += step[1]
+            elif f == "tonull":
+                nullbyte = bytes.find(chr(0), offset)
+                if nullbyte == -1:
+                    raise MisalignedPacking()
+                out[step[3]] = bytes[offset:nullbyte]
+                offset = nullbyte + 1
+            else:
+                if offset >= end:
+                    raise MisalignedPacking()
+                length = ord(bytes[offset])
+                if offset + 1 + length > end:
+                    raise MisalignedPacking()
+                out[step[3]] = bytes[(offset + 1):(offset + 1 + length)]
+                offset += 1 + length
+        if offset != end:
+            raise MisalignedPacking()
+        return out
+
+    def unpack(self, state, scope, bytes, thenClause):
+        """Unpack as an expression: call ``thenClause`` with the symbols in scope if the byte array fits the format.
+
+        :type state: titus.genpy.ExecutionState
+        :param state: exeuction state
+        :type scope: titus.util.DynamicScope
+        :param scope: dynamic scope object
+        :type bytes: string
+        :param bytes: byte array to unpack
+        :type thenClause: callable
+        :param thenClause: function that is called if the byte array fits
+        :rtype: ``None``
+        :return: nothing
+        """
+        try:
+            symbols = self.unpackSymbols(bytes)
+        except MisalignedPacking:
+            pass
+        else:
+            thenScope = DynamicScope(scope)
+            thenScope.let(symbols)
+            thenClause(state, thenScope)
+
+    def unpackElse(self, state, scope, bytes, thenClause, elseClause):
+        """Unpack with an else clause as an expression.
+
+        :type state: titus.genpy.ExecutionState
+        :param state: exeuction state
+        :type scope: titus.util.DynamicScope
+        :param scope: dynamic scope object
+        :type bytes: string
+        :param bytes: byte array to unpack
+        :type thenClause: callable
+        :param thenClause: function that is called if the byte array fits
+        :type elseClause: callable
+        :param elseClause: function that is called if it does not
+        :rtype: result of ``thenClause`` or ``elseClause``
+        :return: result of ``thenClause`` with the symbols in scope if the byte array fits, otherwise the result of ``elseClause``
+        """
+        try:
+            symbols = self.unpackSymbols(bytes)
+        except MisalignedPacking:
+            return elseClause(state, scope)
+        else:
+            thenScope = DynamicScope(scope)
+            thenScope.let(symbols)
+            return thenClause(state, thenScope)
+
 def pack(state, scope, exprsDeclareRes, pos):
-    """Helper function for pack as an expression.
+    """Helper function for pack as an expression (generated code uses a precompiled ``titus.genpy.BinaryPlan`` instead).
 
     :type state: titus.genpy.ExecutionState
     :param state: exeuction state
@@ -1115,83 +1690,10 @@ def pack(state, scope, exprsDeclareRes, pos):
     :rtype: string
     :return: packed byte array
     """
-
-    out = []
-    for value, (v, f, l) in exprsDeclareRes:
-        if f == "raw":
-            if l is not None and len(value) != l:
-                raise PFARuntimeException("raw bytes does not have specified size", 3000, "pack", pos)
-            out.append(value)
-
-        elif f == "tonull":
-            out.append(value)
-            out.append(chr(0))
-
-        elif f == "prefixed":
-            if len(value) > 255:
-                raise PFARuntimeException("length prefixed bytes is larger than 255 bytes", 3001, "pack", pos)
-            out.append(chr(len(value)))
-            out.append(value)
-
-        elif f == "x":
-            out.append(chr(0))
-
-        else:
-            out.append(struct.pack(f, value))
-
-    return "".join(out)
-
-class MisalignedPacking(Exception):
-    """Exception to raise if the packed length doesn't fit the format."""
-    pass
-
-def unpackOne(bytes, scope, s, f, l):
-    """Helper function for unpack."""
-
-    if f == "raw":
-        this, that = bytes[:l], bytes[l:]
-        if len(this) != l:
-            raise MisalignedPacking()
-        scope.let({s: this})
-
-    elif f == "tonull":
-        try:
-            nullbyte = bytes.index(chr(0))
-        except ValueError:
-            raise MisalignedPacking()
-        else:
-            this = bytes[:nullbyte]
-            that = bytes[(nullbyte + 1):]
-            scope.let({s: this})
-
-    elif f == "prefixed":
-        if len(bytes) < 1:
-            raise MisalignedPacking()
-        length = ord(bytes[0])
-        this = bytes[1:(length + 1)]
-        that = bytes[(length + 1):]
-        if len(this) != length:
-            raise MisalignedPacking()
-        scope.let({s: this})
-
-    elif f == "x":
-        this, that = bytes[:l], bytes[l:]
-        if len(this) != l:
-            raise MisalignedPacking()
-        struct.unpack(f, this)
-        scope.let({s: None})
-        
-    else:
-        this, that = bytes[:l], bytes[l:]
-        if len(this) != l:
-            raise MisalignedPacking()
-        value, = struct.unpack(f, this)
-        scope.let({s: value})
-
-    return that
+    return BinaryPlan([d for value, d in exprsDeclareRes]).pack([value for value, d in exprsDeclareRes], pos)
 
 def unpack(state, scope, bytes, format, thenClause):
-    """Helper function for unpack as an expression.
+    """Helper function for unpack as an expression (generated code uses a precompiled ``titus.genpy.BinaryPlan`` instead).
 
     :type state: titus.genpy.ExecutionState
     :param state: exeuction state
@@ -1205,19 +1707,10 @@ def unpack(state, scope, bytes, format, thenClause):
     :rtype: ``None``
     :return: nothing
     """
-
-    thenScope = DynamicScope(scope)
-    try:
-        for s, f, l in format:
-            bytes = unpackOne(bytes, thenScope, s, f, l)
-    except MisalignedPacking:
-        pass
-    else:
-        if len(bytes) == 0:
-            thenClause(state, thenScope)
+    BinaryPlan(format).unpack(state, scope, bytes, thenClause)
 
 def unpackElse(state, scope, bytes, format, thenClause, elseClause):
-    """Helper function for unpack with an else clause as an expression.
+    """Helper function for unpack with an else clause as an expression (generated code uses a precompiled ``titus.genpy.BinaryPlan`` instead).
 
     :type state: titus.genpy.ExecutionState
     :param state: exeuction state
@@ -1233,18 +1726,7 @@ def unpackElse(state, scope, bytes, format, thenClause, elseClause):
     :rtype: result of ``thenClause`` or ``elseClause``
     :return: if there was no titus.genpy.MisalignedPacking exception, returns result of ``thenClause``, otherwise, returns result of ``elseClause``
     """
-
-    thenScope = DynamicScope(scope)
-    try:
-        for s, f, l in format:
-            bytes = unpackOne(bytes, thenScope, s, f, l)
-    except MisalignedPacking:
-        return elseClause(state, scope)
-    else:
-        if len(bytes) != 0:
-            return elseClause(state, scope)
-        else:
-            return thenClause(state, thenScope)
+    return BinaryPlan(format).unpackElse(state, scope, bytes, thenClause, elseClause)
 
 def error(message, code, pos):
     """Helper function for raising an exception as an expression.
@@ -1289,15 +1771,21 @@ def genericLog(message, namespace):
     """
 
     if namespace is None:
-        print " ".join(map(json.dumps, message))
+        print " ".join(json.dumps(x, default=titus.util.arrayJsonDefault) for x in message)
     else:
-        print namespace + ": " + " ".join(map(json.dumps, message))
+        print namespace + ": " + " ".join(json.dumps(x, default=titus.util.arrayJsonDefault) for x in message)
     
 class FakeEmitForExecution(titus.fcn.Fcn):
     """Placeholder so that the ``emit`` function looks like any other function to PFA."""
     def __init__(self, engine):
         self.engine = engine
 
+    def emit(self, x):
+        """Pass an output to the engine's ``emit`` callback, replacing array views by lists if the engine can produce them."""
+        if self.engine.materializeOutput:
+            x = titus.util.materialize(x)
+        return self.engine.emit(x)
+
 def genericEmit(x):
     """Generic emit function for use in PFAEngine.emit.
 
@@ -1311,14 +1799,6 @@ def checkForDeadlock(engineConfig, engine):
     If any function used as an updator eventually calls some other function that would update state, this function raises titus.errors.PFAInitializationException.
     """
 
-    class WithFcnRef(object):
-        def isDefinedAt(self, ast):
-            return isinstance(ast, (CellTo, PoolTo)) and isinstance(ast.to, (FcnRef, FcnRefFill))
-        def __call__(self, slotTo):
-            if engine.hasSideEffects(slotTo.to.name):
-                raise PFAInitializationException("{0} references function \"{1}\", which has side-effects".format(slotTo.desc, slotTo.to.name))
-    engineConfig.collect(WithFcnRef())
-
     class CellToOrPoolTo(object):
         def isDefinedAt(self, ast):
             return isinstance(ast, (CellTo, PoolTo))
@@ -1331,14 +1811,19 @@ def checkForDeadlock(engineConfig, engine):
         def __call__(self, call):
             raise PFAInitializationException("inline function in cell-to or pool-to invokes function \"{0}\", which has side-effects".format(call.name))
 
-    class WithFcnDef(object):
+    class WithFcnRefOrFcnDef(object):
         def isDefinedAt(self, ast):
-            return isinstance(ast, (CellTo, PoolTo)) and isinstance(ast.to, FcnDef)
+            return isinstance(ast, (CellTo, PoolTo)) and isinstance(ast.to, (FcnRef, FcnRefFill, FcnDef))
         def __call__(self, slotTo):
-            for x in slotTo.to.body:
-                x.collect(CellToOrPoolTo())
-                x.collect(SideEffectFunction())
-    engineConfig.collect(WithFcnDef())
+            if isinstance(slotTo.to, FcnDef):
+                for x in slotTo.to.body:
+                    x.collect(CellToOrPoolTo())
+                    x.collect(SideEffectFunction())
+            elif engine.hasSideEffects(slotTo.to.name):
+                raise PFAInitializationException("{0} references function \"{1}\", which has side-effects".format(slotTo.desc, slotTo.to.name))
+
+    # one pass over the document; each hasSideEffects is a lookup in the engine class's cached call-graph closure
+    engineConfig.collect(WithFcnRefOrFcnDef())
 
 class PFAEngine(object):
     """Base class for a Titus scoring engine.
@@ -1416,13 +1901,13 @@ class PFAEngine(object):
     """
 
     @staticmethod
-    def fromAst(engineConfig, options=None, version=None, sharedState=None, multiplicity=1, style="pure", debug=False):
+    def fromAst(engineConfig, options=None, version=None, sharedState=None, multiplicity=1, style="pure", debug=False, optimize=False):
         """Create a collection of instances of this scoring engine from a PFA abstract syntax tree (``titus.pfaast.EngineConfig``).
         
         :type engineConfig: titus.pfaast.EngineConfig
         :param engineConfig: a parsed, interpreted PFA document, i.e. produced by ``titus.reader.jsonToAst``
         :type options: dict of Pythonized JSON
-        :param options: options that override those found in the PFA document
+        :param options: options that override those found in the PFA document; ``{"rng": "numpy"}`` draws ``rand.*`` values in bulk with ``titus.lib.rand.BulkRandom``
         :type version: string
         :param version: PFA version number as a "major.minor.release" string
         :type sharedState: titus.genpy.SharedState
@@ -1430,9 +1915,11 @@ class PFAEngine(object):
         :type multiplicity: positive integer
         :param multiplicity: number of instances to return (default is 1; a single-item collection)
         :type style: string
-        :param style: style of scoring engine; only one currently supported: "pure" for pure-Python
+        :param style: style of scoring engine: "pure" for pure-Python or "profile" for pure-Python with a ``titus.genpy.Profiler`` attached to each engine as ``engine.profiler``
         :type debug: bool
         :param debug: if ``True``, print the Python code generated by this PFA document before evaluating
+        :type optimize: bool
+        :param optimize: if ``True``, simplify the document with ``titus.pfaast.optimize`` (constant folding, branch pruning, inlining) before generating code
         :rtype: PFAEngine
         :return: a list of scoring engine instances
         """
@@ -1444,13 +1931,26 @@ class PFAEngine(object):
             version = titus.version.defaultPFAVersion
         pfaVersion = titus.signature.PFAVersion.fromString(version)
 
-        context, code = engineConfig.walk(GeneratePython.makeTask(style), titus.pfaast.SymbolTable.blank(), functionTable, engineOptions, pfaVersion)
+        if optimize:
+            try:
+                optimized = titus.pfaast.optimize(engineConfig, pfaVersion, engineOptions=engineOptions)
+                task = GeneratePython.makeTask(style)
+                context, code = optimized.walk(task, titus.pfaast.SymbolTable.blank(), functionTable, engineOptions, pfaVersion)
+            except Exception:
+                # optimizing is best-effort: pruning may have narrowed a type that the rest of the document depends on,
+                # or the original is invalid, in which case the walk below reports the error
+                optimize = False
+                functionTable = titus.pfaast.FunctionTable.blank()
+        if not optimize:
+            task = GeneratePython.makeTask(style)
+            context, code = engineConfig.walk(task, titus.pfaast.SymbolTable.blank(), functionTable, engineOptions, pfaVersion)
         if debug:
             print code
 
         sandbox = {# Scoring engine architecture
                    "PFAEngine": PFAEngine,
                    "ExecutionState": ExecutionState,
+                   "Memo": Memo,
                    "DynamicScope": DynamicScope,
                    # Python statement --> expression wrappers
                    "labeledFcn": labeledFcn,
@@ -1474,10 +1974,17 @@ class PFAEngine(object):
                    "pack": pack,
                    "unpack": unpack,
                    "unpackElse": unpackElse,
+                   "BinaryPlan": BinaryPlan,
                    "error": error,
                    "tryCatch": tryCatch,
                    # Titus dependencies
                    "checkData": titus.datatype.checkData,
+                   "materialize": titus.util.materialize,
+                   # inlined library functions
+                   "div": titus.util.div,
+                   "checkInt": titus.lib.core.checkInt,
+                   "checkLong": titus.lib.core.checkLong,
+                   "compareDouble": titus.lib.core.compareDouble,
                    # Python libraries
                    "math": math,
                    }
@@ -1491,12 +1998,12 @@ class PFAEngine(object):
 
         for cellName, cellConfig in engineConfig.cells.items():
             if cellConfig.shared and cellName not in sharedState.cells:
-                value = titus.datatype.jsonDecoder(cellConfig.avroType, cellConfig.initJsonNode)
+                value = cellConfig.initValue
                 sharedState.cells[cellName] = Cell(value, cellConfig.shared, cellConfig.rollback, cellConfig.source)
 
         for poolName, poolConfig in engineConfig.pools.items():
             if poolConfig.shared and poolName not in sharedState.pools:
-                value = titus.datatype.jsonDecoder(titus.datatype.AvroMap(poolConfig.avroType), poolConfig.initJsonNode)
+                value = poolConfig.initValue
                 sharedState.pools[poolName] = Pool(value, poolConfig.shared, poolConfig.rollback, poolConfig.source)
 
         out = []
@@ -1506,12 +2013,12 @@ class PFAEngine(object):
 
             for cellName, cellConfig in engineConfig.cells.items():
                 if not cellConfig.shared:
-                    value = titus.datatype.jsonDecoder(cellConfig.avroType, cellConfig.initJsonNode)
+                    value = cellConfig.initValue
                     cells[cellName] = Cell(value, cellConfig.shared, cellConfig.rollback, cellConfig.source)
 
             for poolName, poolConfig in engineConfig.pools.items():
                 if not poolConfig.shared:
-                    value = titus.datatype.jsonDecoder(titus.datatype.AvroMap(poolConfig.avroType), poolConfig.initJsonNode)
+                    value = poolConfig.initValue
                     pools[poolName] = Pool(value, poolConfig.shared, poolConfig.rollback, poolConfig.source)
 
             if engineConfig.method == Method.FOLD:
@@ -1519,7 +2026,9 @@ class PFAEngine(object):
             else:
                 zero = None
 
-            if engineConfig.randseed is None:
+            if engineOptions.rng == "numpy":
+                rand = titus.lib.rand.BulkRandom(engineConfig.randseed, index)
+            elif engineConfig.randseed is None:
                 rand = random.Random()
             else:
                 rand = random.Random(engineConfig.randseed)
@@ -1533,8 +2042,10 @@ class PFAEngine(object):
                 f["emit"] = FakeEmitForExecution(engine)
             engine.f = f
             engine.config = engineConfig
+            engine.profiler = task.makeProfiler()
 
-            checkForDeadlock(engineConfig, engine)
+            if index == 0:
+                checkForDeadlock(engineConfig, engine)
             engine.initialize()
 
             out.append(engine)
@@ -1542,7 +2053,7 @@ class PFAEngine(object):
         return out
 
     @staticmethod
-    def fromJson(src, options=None, version=None, sharedState=None, multiplicity=1, style="pure", debug=False):
+    def fromJson(src, options=None, version=None, sharedState=None, multiplicity=1, style="pure", debug=False, optimize=False):
         """Create a collection of instances of this scoring engine from a JSON-formatted PFA file.
         
         :type src: JSON string or Pythonized JSON
@@ -1556,16 +2067,18 @@ class PFAEngine(object):
         :type multiplicity: positive integer
         :param multiplicity: number of instances to return (default is 1; a single-item collection)
         :type style: string
-        :param style: style of scoring engine; only one currently supported: "pure" for pure-Python
+        :param style: style of scoring engine: "pure" for pure-Python or "profile" for pure-Python with a ``titus.genpy.Profiler`` attached to each engine as ``engine.profiler``
         :type debug: bool
         :param debug: if ``True``, print the Python code generated by this PFA document before evaluating
+        :type optimize: bool
+        :param optimize: if ``True``, simplify the document with ``titus.pfaast.optimize`` (constant folding, branch pruning, inlining) before generating code
         :rtype: PFAEngine
         :return: a list of scoring engine instances
         """
-        return PFAEngine.fromAst(titus.reader.jsonToAst(src), options, version, sharedState, multiplicity, style, debug)
+        return PFAEngine.fromAst(titus.reader.jsonToAst(src), options, version, sharedState, multiplicity, style, debug, optimize)
 
     @staticmethod
-    def fromYaml(src, options=None, version=None, sharedState=None, multiplicity=1, style="pure", debug=False):
+    def fromYaml(src, options=None, version=None, sharedState=None, multiplicity=1, style="pure", debug=False, optimize=False):
         """Create a collection of instances of this scoring engine from a YAML-formatted PFA file.
         
         :type src: string
@@ -1579,16 +2092,18 @@ class PFAEngine(object):
         :type multiplicity: positive integer
         :param multiplicity: number of instances to return (default is 1; a single-item collection)
         :type style: string
-        :param style: style of scoring engine; only one currently supported: "pure" for pure-Python
+        :param style: style of scoring engine: "pure" for pure-Python or "profile" for pure-Python with a ``titus.genpy.Profiler`` attached to each engine as ``engine.profiler``
         :type debug: bool
         :param debug: if ``True``, print the Python code generated by this PFA document before evaluating
+        :type optimize: bool
+        :param optimize: if ``True``, simplify the document with ``titus.pfaast.optimize`` (constant folding, branch pruning, inlining) before generating code
         :rtype: PFAEngine
         :return: a list of scoring engine instances
         """
-        return PFAEngine.fromAst(titus.reader.yamlToAst(src), options, version, sharedState, multiplicity, style, debug)
+        return PFAEngine.fromAst(titus.reader.yamlToAst(src), options, version, sharedState, multiplicity, style, debug, optimize)
 
     @staticmethod
-    def fromPmml(src, pmmlOptions=None, pfaOptions=None, version=None, sharedState=None, multiplicity=1, style="pure", debug=False):
+    def fromPmml(src, pmmlOptions=None, pfaOptions=None, version=None, sharedState=None, multiplicity=1, style="pure", debug=False, optimize=False):
         """Translates some types of PMML documents into PFA and creates a collection of scoring engine instances.
         
         :type src: string
@@ -1604,13 +2119,15 @@ class PFAEngine(object):
         :type multiplicity: positive integer
         :param multiplicity: number of instances to return (default is 1; a single-item collection)
         :type style: string
-        :param style: style of scoring engine; only one currently supported: "pure" for pure-Python
+        :param style: style of scoring engine: "pure" for pure-Python or "profile" for pure-Python with a ``titus.genpy.Profiler`` attached to each engine as ``engine.profiler``
         :type debug: bool
         :param debug: if ``True``, print the Python code generated by this PFA document before evaluating
+        :type optimize: bool
+        :param optimize: if ``True``, simplify the document with ``titus.pfaast.optimize`` (constant folding, branch pruning, inlining) before generating code
         :rtype: PFAEngine
         :return: a list of scoring engine instances
         """
-        return PFAEngine.fromAst(pmmlToAst(src, pmmlOptions), pfaOptions, version, sharedState, multiplicity, style, debug)
+        return PFAEngine.fromAst(pmmlToAst(src, pmmlOptions), pfaOptions, version, sharedState, multiplicity, style, debug, optimize)
 
     def snapshot(self):
         """take a snapshot of the entire scoring engine (all cells and pools) and represent it as an abstract syntax tree that can be used to make new scoring engines.
@@ -1618,8 +2135,8 @@ class PFAEngine(object):
         Note that you can call ``toJson`` on the ``EngineConfig`` to get a string that can be written to a PFA file.
         """
 
-        newCells = dict((k, AstCell(self.config.cells[k].avroPlaceholder, json.dumps(v.value), v.shared, v.rollback, v.source)) for k, v in self.cells.items())
-        newPools = dict((k, AstPool(self.config.pools[k].avroPlaceholder, dict((kk, json.dumps(vv)) for kk, vv in v.value.items()), v.shared, v.rollback, v.source)) for k, v in self.pools.items())
+        newCells = dict((k, AstCell(self.config.cells[k].avroPlaceholder, json.dumps(v.value, default=titus.util.arrayJsonDefault), v.shared, v.rollback, v.source)) for k, v in self.cells.items())
+        newPools = dict((k, AstPool(self.config.pools[k].avroPlaceholder, dict((kk, json.dumps(vv, default=titus.util.arrayJsonDefault)) for kk, vv in v.value.items()), v.shared, v.rollback, v.source)) for k, v in self.pools.items())
 
         return EngineConfig(
             self.config.name,
@@ -1640,9 +2157,24 @@ class PFAEngine(object):
             self.config.metadata,
             self.config.options)
 
+    def callGraphClosure(self):
+        """Transitive closure of the ``callGraph``, computed on first use and shared by all instances of this engine class.
+
+        :rtype: titus.genpy.CallGraphClosure
+        :return: the reach and depth of each function
+        """
+        cls = self.__class__
+        closure = cls.__dict__.get("closure")
+        if closure is None:
+            closure = CallGraphClosure(self.callGraph)
+            cls.closure = closure
+        return closure
+
     def calledBy(self, fcnName, exclude=None):
         """Determine which functions are called by ``fcnName`` by traversing the ``callGraph`` backward.
 
+        Without ``exclude``, the answer comes from the cached ``callGraphClosure``.
+
         :type fcnName: string
         :param fcnName: name of function to look up
         :type exclude: set of string
@@ -1652,7 +2184,7 @@ class PFAEngine(object):
         """
 
         if exclude is None:
-            exclude = set()
+            return set(self.callGraphClosure().reach.get(fcnName, ()))
         if fcnName in exclude:
             return set()
         else:
@@ -1668,6 +2200,8 @@ class PFAEngine(object):
     def callDepth(self, fcnName, exclude=None, startingDepth=0):
         """Determine call depth of a function by traversing the ``callGraph``.
 
+        Without ``exclude``, the answer comes from the cached ``callGraphClosure``.
+
         :type fcnName: string
         :param fcnName: name of function to look up
         :type exclude: set of string
@@ -1679,7 +2213,7 @@ class PFAEngine(object):
         """
 
         if exclude is None:
-            exclude = set()
+            return self.callGraphClosure().depth.get(fcnName, 0) + startingDepth
         if fcnName in exclude:
             return float("inf")
         else:
@@ -1702,7 +2236,7 @@ class PFAEngine(object):
         :rtype: bool
         :return: ``True`` if the function directly calls itself, ``False`` otherwise
         """
-        return fcnName in self.calledBy(fcnName)
+        return fcnName in self.callGraphClosure().reach.get(fcnName, ())
 
     def hasRecursive(self, fcnName):
         """Determine if the call depth of a funciton is infinite.
@@ -1722,8 +2256,71 @@ class PFAEngine(object):
         :rtype: bool
         :return: ``True`` if the function can eventually call ``(cell-to)`` or ``(pool-to)`` on any cell or pool.
         """
-        reach = self.calledBy(fcnName)
-        return CellTo.desc in reach or PoolTo.desc in reach or PoolDel.desc in reach
+        return not self.sideEffectCalls.isdisjoint(self.callGraphClosure().reach.get(fcnName, ()))
+
+    sideEffectCalls = frozenset([CellTo.desc, PoolTo.desc, PoolDel.desc])
+
+    distributionCacheSize = 256
+
+    impureCalls = set([CellGet.desc, CellTo.desc, PoolGet.desc, PoolTo.desc, PoolDel.desc, Log.desc, "emit"])
+
+    def isPure(self, fcnName):
+        """Determine if a function's result depends only on its arguments.
+
+        :type fcnName: string
+        :param fcnName: name of function to look up
+        :rtype: bool
+        :return: ``True`` if the function can never read or write a cell or pool, log, emit, or draw from a ``rand.*`` function, ``False`` otherwise
+        """
+        return not any(x in self.impureCalls or x.startswith("rand.") for x in self.callGraphClosure().reach.get(fcnName, ()))
+
+    def memoize(self, maxSize=1024, action=True, functions=True):
+        """Cache the results of pure computations in this engine instance (opt-in).
+
+        The ``action`` of a map-type engine is cached (keyed by its normalized input) if it is pure (see ``isPure``) and does not refer to ``actionsStarted`` or ``actionsFinished``. User functions are cached (keyed by their arguments) if they are pure. Each cache is a ``Memo`` in the ``memos`` dict, which is keyed by ``"(action)"`` or the ``"u.*"`` function name; its counters can be inspected with ``statistics()``.
+
+        Cached results are shared among calls, so they must not be modified in place.
+
+        :type maxSize: positive integer
+        :param maxSize: maximum number of results to keep in each cache
+        :type action: bool
+        :param action: if ``True``, try to cache ``action`` results
+        :type functions: bool
+        :param functions: if ``True``, try to cache user function results
+        :rtype: list of string
+        :return: names of the computations that are now cached
+        """
+        if not hasattr(self, "memos"):
+            self.memos = {}
+
+        if functions:
+            for fcnName in sorted(self.callGraph):
+                if fcnName.startswith("u.") and fcnName not in self.memos and self.isPure(fcnName):
+                    self.memos[fcnName] = Memo(maxSize)
+                    self.f[fcnName] = memoizedFcn(self.f[fcnName], self.memos[fcnName])
+
+        if action and "(action)" not in self.memos and self.config.method == Method.MAP and self.isPure("(action)"):
+            class CountersRef(object):
+                def isDefinedAt(self, ast):
+                    return isinstance(ast, Ref) and ast.name in ("actionsStarted", "actionsFinished")
+                def __call__(self, ref):
+                    return ref
+            if not any(len(x.collect(CountersRef())) > 0 for x in self.config.action):
+                memo = self.memos["(action)"] = Memo(maxSize)
+                original = self.action
+                inputType = self.inputType
+                def action(input, check=True):
+                    if check:
+                        input = titus.datatype.checkData(input, inputType)
+                    misses = memo.misses
+                    result = memo(memoKey(input), lambda: original(input, check=False))
+                    if memo.misses == misses:
+                        self.actionsStarted += 1
+                        self.actionsFinished += 1
+                    return result
+                self.action = action
+
+        return sorted(self.memos)
 
     def avroInputIterator(self, inputStream, interpreter="avro"):
         """Create a generator over Avro-serialized input data.
@@ -1802,7 +2399,7 @@ class FastAvroCorrector(object):
             for tpe in avroType.types:
                 if (isinstance(tpe, (titus.datatype.AvroString, titus.datatype.AvroEnum)) and isinstance(x, str)) or \
                    (isinstance(tpe, (titus.datatype.AvroBytes, titus.datatype.AvroFixed)) and isinstance(x, unicode)) or \
-                   (isinstance(tpe, titus.datatype.AvroArray) and isinstance(x, (list, tuple))) or \
+                   (isinstance(tpe, titus.datatype.AvroArray) and isinstance(x, titus.util.arrayTypes)) or \
                    (isinstance(tpe, titus.datatype.AvroMap) and isinstance(x, dict)):
                     return self.correctFastAvro(x, tpe)
 
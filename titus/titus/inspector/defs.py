@@ -28,7 +28,14 @@ import subprocess
 import glob
 import math
 
+import json
+
 import titus.inspector.parser as parser
+import titus.options
+import titus.pfaast
+import titus.signature
+import titus.version
+from titus.inspector.jsonindex import JsonIndex, IndexNode
 from titus.reader import jsonToAst
 from titus.genpy import PFAEngine
 from titus.errors import AvroException, SchemaParseException, PFAException
@@ -257,7 +264,7 @@ def extcomplete(node, items):
     else:
         return []
 
-def extaction(args0, node, items):
+def extaction(args0, node, items, lookup=lambda node, key: node[key]):
     """Action for pfainspector extensions (depend on specific commands).
 
     :type args0: titus.inspector.parser.Extract
@@ -266,6 +273,8 @@ def extaction(args0, node, items):
     :param node: JSON node from which to extract subobjects
     :type items: (integer, titus.inspector.parser.FilePath)
     :param items: extraction path (everything between square brakets, possibly still open)
+    :type lookup: callable
+    :param lookup: function of a node and a key or index that gets the subobject, raising KeyError, IndexError, or TypeError if it does not exist (default is Python's ``node[key]``)
     :rtype: Pythonized JSON
     :return: result of extracting subobjects
     """
@@ -273,12 +282,12 @@ def extaction(args0, node, items):
     for index, item in enumerate(items):
         if isinstance(item, (parser.Word, parser.String)):
             try:
-                node = node[item.text]
+                node = lookup(node, item.text)
             except (KeyError, TypeError):
                 raise InspectorError("{0} has no key {1}".format(args0.strto(index), str(item)))
         elif isinstance(item, parser.Integer):
             try:
-                node = node[item.num]
+                node = lookup(node, item.num)
             except (IndexError, TypeError):
                 raise InspectorError("{0} has no index {1}".format(args0.strto(index), str(item)))
         else:
@@ -371,9 +380,235 @@ class Model(object):
             except (AvroException, SchemaParseException, PFAException) as err:
                 raise InspectorError(str(err))
         return self._engine
-        
+
+    @property
+    def parser(self):
+        """The titus.datatype.ForwardDeclarationParser with all of the document's named types."""
+        return self.engine.parser
+
+    @property
+    def callGraph(self):
+        """Functions called directly by each part of the document (see titus.pfaast.EngineConfig.Context)."""
+        return self.engine.callGraph
+
+    def validate(self):
+        """Check the document for syntax and semantic errors, including the contents of its cells and pools.
+
+        :rtype: string
+        :return: message to print if valid; raises titus.inspector.defs.InspectorError if not
+        """
+        self.engine
+        return "PFA document is syntactically and semantically valid"
+
+    def extract(self, args0, items):
+        """Get a subobject of the document.
+
+        :type args0: titus.inspector.parser.Extract or titus.inspector.parser.Word
+        :param args0: abstract syntax tree representation of the object to extract
+        :type items: list of titus.inspector.parser.Ast
+        :param items: extraction path (everything between square brackets)
+        :rtype: Pythonized JSON
+        :return: result of extracting subobjects
+        """
+        return extaction(args0, self.obj, items)
+
+    def complete(self, items):
+        """Tab completion for an extraction path in this document.
+
+        :type items: list of titus.inspector.parser.Ast
+        :param items: extraction path (everything between square brackets, possibly still open)
+        :rtype: list of strings
+        :return: list of possible completions
+        """
+        return extcomplete(self.obj, items)
+
+    def size(self, args0, items):
+        """Describe the size of a subobject of the document.
+
+        :type args0: titus.inspector.parser.Extract or titus.inspector.parser.Word
+        :param args0: abstract syntax tree representation of the object to measure
+        :type items: list of titus.inspector.parser.Ast
+        :param items: extraction path (everything between square brackets)
+        :rtype: (string, integer or ``None``, integer)
+        :return: ``"object"``, ``"array"``, or ``"value"``, the number of keys or elements (``None`` for values), and the number of bytes of serialized JSON
+        """
+        node = self.extract(args0, items)
+        if isinstance(node, dict):
+            return "object", len(node), len(json.dumps(node))
+        elif isinstance(node, (list, tuple)):
+            return "array", len(node), len(json.dumps(node))
+        else:
+            return "value", None, len(json.dumps(node))
+
+    def poolSize(self, name):
+        """Number of initial elements in a pool.
+
+        :type name: string
+        :param name: name of the pool
+        :rtype: integer
+        :return: number of keys in the pool's ``init``
+        """
+        return len(self.engineConfig.pools[name].initJsonNode)
+
     def __repr__(self):
         return "Model(" + repr(self.obj) + ")"
+
+class LazyModel(Model):
+    """A JSON or PFA file that has been indexed (titus.inspector.jsonindex.JsonIndex), rather than loaded.
+
+    Extractions, tab completion, and sizes are answered from the index, loading only the subobjects that are requested. The ``engineConfig`` is built with the ``init`` of each embedded cell and pool left in the file, to be read only if an ``engine`` is requested, and ``parser``, ``callGraph``, and ``validate`` type-check the document without building an engine.
+
+    Requesting the ``obj`` member loads the whole document, after which this behaves like a titus.inspector.defs.Model (the index is no longer used, since the ``obj`` might be modified).
+    """
+
+    def __init__(self, fileName):
+        """:type fileName: string
+        :param fileName: JSON file to index
+        """
+        try:
+            self.index = JsonIndex(fileName)
+        except ValueError as err:
+            raise InspectorError(str(err))
+        self._obj = None
+        self._engineConfig = None
+        self._engine = None
+        self._context = None
+        self._deferred = {"cells": {}, "pools": {}}
+
+    @property
+    def obj(self):
+        if self._obj is None:
+            self._obj = self.index.load(self.index.root)
+        return self._obj
+
+    @obj.setter
+    def obj(self, value):
+        self._obj = value
+
+    def reset(self):
+        super(LazyModel, self).reset()
+        self._context = None
+
+    @property
+    def engineConfig(self):
+        if self._engineConfig is None:
+            try:
+                if self._obj is None:
+                    self._engineConfig = self._readIndexed()
+                else:
+                    self._engineConfig = jsonToAst(self._obj)
+            except (AvroException, SchemaParseException, PFAException) as err:
+                raise InspectorError(str(err))
+        return self._engineConfig
+
+    def _readIndexed(self):
+        index = self.index
+        root = index.root
+        if not isinstance(root, IndexNode) or not root.isDict:
+            return jsonToAst(index.load(root))
+
+        self._deferred = {"cells": {}, "pools": {}}
+        skeleton = {}
+        for key in index.keys(root):
+            value = index.lookup(root, key)
+            if key in ("cells", "pools") and isinstance(value, IndexNode) and value.isDict:
+                section = {}
+                for name in index.keys(value):
+                    item = index.lookup(value, name)
+                    if isinstance(item, IndexNode) and item.isDict and "init" in item.children and index.isContainer(item, "init"):
+                        section[name] = dict((k, index.load(index.lookup(item, k))) for k in index.keys(item) if k != "init")
+                        if section[name].get("source", "embedded") == "embedded":
+                            section[name]["init"] = {} if key == "pools" else None
+                            self._deferred[key][name] = index.lookup(item, "init")
+                        else:
+                            section[name]["init"] = index.load(index.lookup(item, "init"))
+                    else:
+                        section[name] = index.load(item)
+                skeleton[key] = section
+            else:
+                skeleton[key] = index.load(value)
+
+        config = jsonToAst(skeleton)
+        for name, node in self._deferred["cells"].items():
+            config.cells[name].init = lambda avroType, node=node: index.text(node)
+        for name, node in self._deferred["pools"].items():
+            config.pools[name].init = lambda avroType, node=node: index.text(node)
+        return config
+
+    @property
+    def context(self):
+        """The titus.pfaast.EngineConfig.Context from type-checking the ``engineConfig`` (without generating code or loading cells and pools)."""
+        if self._context is None:
+            engineConfig = self.engineConfig
+            try:
+                engineOptions = titus.options.EngineOptions(engineConfig.options, None)
+                pfaVersion = titus.signature.PFAVersion.fromString(titus.version.defaultPFAVersion)
+                self._context, result = engineConfig.walk(titus.pfaast.NoTask(), titus.pfaast.SymbolTable.blank(), titus.pfaast.FunctionTable.blank(), engineOptions, pfaVersion)
+            except (AvroException, SchemaParseException, PFAException) as err:
+                raise InspectorError(str(err))
+        return self._context
+
+    @property
+    def parser(self):
+        return self.context.parser
+
+    @property
+    def callGraph(self):
+        return self.context.callGraph
+
+    def validate(self):
+        self.context
+        return "PFA document is syntactically and semantically valid (contents of cells and pools were not checked)"
+
+    def extract(self, args0, items):
+        if self._obj is not None:
+            return super(LazyModel, self).extract(args0, items)
+        return self.index.load(extaction(args0, self.index.root, items, self.index.lookup))
+
+    def complete(self, items):
+        if self._obj is not None:
+            return super(LazyModel, self).complete(items)
+
+        node = self.index.root
+        if not isinstance(node, IndexNode):
+            return []
+
+        for item in items:
+            if isinstance(item, (parser.Word, parser.String)) and node.isDict:
+                key = item.text
+            elif isinstance(item, parser.Integer) and not node.isDict:
+                key = item.num
+            else:
+                return []
+            if not self.index.isContainer(node, key):
+                return []
+            node = node.children[key]
+
+        # only the keys and which children are containers matter for completion
+        outline = dict((k, [] if self.index.isContainer(node, k) else None) for k in self.index.keys(node))
+        if not node.isDict:
+            outline = [outline[i] for i in xrange(node.count)]
+        return extcomplete(outline, [])
+
+    def size(self, args0, items):
+        if self._obj is not None:
+            return super(LazyModel, self).size(args0, items)
+
+        node = extaction(args0, self.index.root, items, self.index.lookup)
+        if isinstance(node, IndexNode):
+            return "object" if node.isDict else "array", node.count, self.index.size(node)
+        else:
+            return "value", None, len(json.dumps(node))
+
+    def poolSize(self, name):
+        if self._obj is None:
+            self.engineConfig
+            if name in self._deferred["pools"]:
+                return self._deferred["pools"][name].count
+        return super(LazyModel, self).poolSize(name)
+
+    def __repr__(self):
+        return "LazyModel(" + repr(self.index.fileName) + ")"
     
 class Mode(object):
     """A mode of operation for the pfainspector.
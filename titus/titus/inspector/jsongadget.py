@@ -77,7 +77,7 @@ class LookCommand(Command):
 
         elif len(words) == 1 and isinstance(words[0], parser.Extract) and words[0].partial:
             if words[0].text in self.mode.pfaFiles:
-                return [x for x in extcomplete(self.mode.pfaFiles[words[0].text].obj, words[0].items) if x.startswith(active)]
+                return [x for x in self.mode.pfaFiles[words[0].text].complete(words[0].items) if x.startswith(active)]
             else:
                 return []
 
@@ -119,14 +119,12 @@ class LookCommand(Command):
             if len(args) == 1 and isinstance(args[0], parser.Word):
                 if args[0].text not in self.mode.pfaFiles:
                     raise InspectorError("no PFA document named \"{0}\" in memory (try 'load <file> as {1}')".format(args[0].text, args[0].text))
-                node = self.mode.pfaFiles[args[0].text].obj
+                node = self.mode.pfaFiles[args[0].text].extract(args[0], [])
 
             elif len(args) == 1 and isinstance(args[0], parser.Extract):
                 if args[0].text not in self.mode.pfaFiles:
                     raise InspectorError("no PFA document named \"{0}\" in memory (try 'load <file> as {1}')".format(args[0].text, args[0].text))
-                node = self.mode.pfaFiles[args[0].text].obj
-                items = args[0].items
-                node = extaction(args[0], node, items)
+                node = self.mode.pfaFiles[args[0].text].extract(args[0], args[0].items)
 
             else:
                 self.syntaxError()
@@ -185,7 +183,7 @@ class CountCommand(Command):
 
         elif len(words) == 1 and isinstance(words[0], parser.Extract) and words[0].partial:
             if words[0].text in self.mode.pfaFiles:
-                return [x for x in extcomplete(self.mode.pfaFiles[words[0].text].obj, words[0].items) if x.startswith(active)]
+                return [x for x in self.mode.pfaFiles[words[0].text].complete(words[0].items) if x.startswith(active)]
             else:
                 return []
 
@@ -207,14 +205,12 @@ class CountCommand(Command):
             if len(args) == 2 and isinstance(args[0], parser.Word):
                 if args[0].text not in self.mode.pfaFiles:
                     raise InspectorError("no PFA document named \"{0}\" in memory (try 'load <file> as {1}')".format(args[0].text, args[0].text))
-                node = self.mode.pfaFiles[args[0].text].obj
+                node = self.mode.pfaFiles[args[0].text].extract(args[0], [])
 
             elif len(args) == 2 and isinstance(args[0], parser.Extract):
                 if args[0].text not in self.mode.pfaFiles:
                     raise InspectorError("no PFA document named \"{0}\" in memory (try 'load <file> as {1}')".format(args[0].text, args[0].text))
-                node = self.mode.pfaFiles[args[0].text].obj
-                items = args[0].items
-                node = extaction(args[0], node, items)
+                node = self.mode.pfaFiles[args[0].text].extract(args[0], args[0].items)
 
             else:
                 self.syntaxError()
@@ -222,6 +218,75 @@ class CountCommand(Command):
             regex = args[-1].regex()
             print "{0} matches".format(t.count(regex, node))
 
+class SizeCommand(Command):
+    """The 'json size' command in pfainspector."""
+
+    def __init__(self, mode):
+        self.name = "size"
+        self.syntax = "size <name>"
+        self.help = "count the keys or elements of a PFA document or subexpression and the bytes of JSON it occupies\n    " + self.syntax
+        self.mode = mode
+
+    def complete(self, established, active):
+        """Handle tab-complete for this command's arguments.
+
+        :type established: string
+        :param established: part of the text that has been established
+        :type active: string
+        :param active: part of the text to be completed
+        :rtype: list of strings
+        :return: potential completions
+        """
+
+        words = getcomplete(established)
+
+        if len(words) == 0:
+            if active in self.mode.pfaFiles:
+                return [active + "["]
+            else:
+                return sorted(x for x in self.mode.pfaFiles.keys() if x.startswith(active))
+
+        elif len(words) == 1 and isinstance(words[0], parser.Extract) and words[0].partial:
+            if words[0].text in self.mode.pfaFiles:
+                return [x for x in self.mode.pfaFiles[words[0].text].complete(words[0].items) if x.startswith(active)]
+            else:
+                return []
+
+        else:
+            return []
+
+    def action(self, args):
+        """Perform the action associated with this command.
+
+        :type args: list of titus.inspector.parser.Ast
+        :param args: arguments passed to the command
+        :rtype: ``None``
+        :return: nothing; results must be printed to the screen
+        """
+
+        if len(args) == 1 and args[0] == parser.Word("help"):
+            print self.help
+        else:
+            if len(args) == 1 and isinstance(args[0], parser.Word):
+                if args[0].text not in self.mode.pfaFiles:
+                    raise InspectorError("no PFA document named \"{0}\" in memory (try 'load <file> as {1}')".format(args[0].text, args[0].text))
+                kind, length, numBytes = self.mode.pfaFiles[args[0].text].size(args[0], [])
+
+            elif len(args) == 1 and isinstance(args[0], parser.Extract):
+                if args[0].text not in self.mode.pfaFiles:
+                    raise InspectorError("no PFA document named \"{0}\" in memory (try 'load <file> as {1}')".format(args[0].text, args[0].text))
+                kind, length, numBytes = self.mode.pfaFiles[args[0].text].size(args[0], args[0].items)
+
+            else:
+                self.syntaxError()
+
+            if kind == "object":
+                print "object with {0} keys, {1} bytes of JSON".format(length, numBytes)
+            elif kind == "array":
+                print "array with {0} elements, {1} bytes of JSON".format(length, numBytes)
+            else:
+                print "value, {0} bytes of JSON".format(numBytes)
+
 class IndexCommand(Command):
     """The 'json index' command in pfainspector."""
 
@@ -252,7 +317,7 @@ class IndexCommand(Command):
 
         elif len(words) == 1 and isinstance(words[0], parser.Extract) and words[0].partial:
             if words[0].text in self.mode.pfaFiles:
-                return [x for x in extcomplete(self.mode.pfaFiles[words[0].text].obj, words[0].items) if x.startswith(active)]
+                return [x for x in self.mode.pfaFiles[words[0].text].complete(words[0].items) if x.startswith(active)]
             else:
                 return []
 
@@ -274,14 +339,12 @@ class IndexCommand(Command):
             if len(args) == 2 and isinstance(args[0], parser.Word):
                 if args[0].text not in self.mode.pfaFiles:
                     raise InspectorError("no PFA document named \"{0}\" in memory (try 'load <file> as {1}')".format(args[0].text, args[0].text))
-                node = self.mode.pfaFiles[args[0].text].obj
+                node = self.mode.pfaFiles[args[0].text].extract(args[0], [])
 
             elif len(args) == 2 and isinstance(args[0], parser.Extract):
                 if args[0].text not in self.mode.pfaFiles:
                     raise InspectorError("no PFA document named \"{0}\" in memory (try 'load <file> as {1}')".format(args[0].text, args[0].text))
-                node = self.mode.pfaFiles[args[0].text].obj
-                items = args[0].items
-                node = extaction(args[0], node, items)
+                node = self.mode.pfaFiles[args[0].text].extract(args[0], args[0].items)
 
             else:
                 self.syntaxError()
@@ -335,7 +398,7 @@ class FindCommand(Command):
 
         elif len(words) == 1 and isinstance(words[0], parser.Extract) and words[0].partial:
             if words[0].text in self.mode.pfaFiles:
-                return [x for x in extcomplete(self.mode.pfaFiles[words[0].text].obj, words[0].items) if x.startswith(active)]
+                return [x for x in self.mode.pfaFiles[words[0].text].complete(words[0].items) if x.startswith(active)]
             else:
                 return []
 
@@ -377,14 +440,12 @@ class FindCommand(Command):
             if len(args) == 2 and isinstance(args[0], parser.Word):
                 if args[0].text not in self.mode.pfaFiles:
                     raise InspectorError("no PFA document named \"{0}\" in memory (try 'load <file> as {1}')".format(args[0].text, args[0].text))
-                node = self.mode.pfaFiles[args[0].text].obj
+                node = self.mode.pfaFiles[args[0].text].extract(args[0], [])
 
             elif len(args) == 2 and isinstance(args[0], parser.Extract):
                 if args[0].text not in self.mode.pfaFiles:
                     raise InspectorError("no PFA document named \"{0}\" in memory (try 'load <file> as {1}')".format(args[0].text, args[0].text))
-                node = self.mode.pfaFiles[args[0].text].obj
-                items = args[0].items
-                node = extaction(args[0], node, items)
+                node = self.mode.pfaFiles[args[0].text].extract(args[0], args[0].items)
 
             else:
                 self.syntaxError()
@@ -462,7 +523,7 @@ class ChangeCommand(Command):
 
         elif len(words) == 1 and isinstance(words[0], parser.Extract) and words[0].partial:
             if words[0].text in self.mode.pfaFiles:
-                return [x for x in extcomplete(self.mode.pfaFiles[words[0].text].obj, words[0].items) if x.startswith(active)]
+                return [x for x in self.mode.pfaFiles[words[0].text].complete(words[0].items) if x.startswith(active)]
             else:
                 return []
 
@@ -600,6 +661,7 @@ class JsonGadget(Gadget):
         self.commandGroup = CommandGroup("json", [
             LookCommand(mode),
             CountCommand(mode),
+            SizeCommand(mode),
             IndexCommand(mode),
             FindCommand(mode),
             ChangeCommand(mode)
@@ -0,0 +1,286 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2014  Open Data ("Open Data" refers to
+# one or more of the following companies: Open Data Partners LLC,
+# Open Data Research LLC, or Open Data Capital LLC.)
+#
+# This file is part of Hadrian.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import mmap
+import re
+
+class IndexNode(object):
+    """A JSON object or array in a titus.inspector.jsonindex.JsonIndex.
+
+    ``start`` and ``end`` are the byte offsets of the opening and one past the closing bracket, ``isDict`` distinguishes objects from arrays, and ``count`` is the number of keys or elements.
+
+    ``children`` maps keys (objects) or element indexes (arrays) to the offsets of their values. Objects and arrays are represented by nested titus.inspector.jsonindex.IndexNode instances; scalar values in objects are represented by the integer byte offset where they start. Scalar elements of arrays are not indexed at all, so that long numeric arrays cost no more than one node.
+    """
+
+    __slots__ = ("start", "end", "isDict", "count", "children")
+
+    def __init__(self, start, isDict):
+        self.start = start
+        self.end = None
+        self.isDict = isDict
+        self.count = 0
+        self.children = {}
+
+    def __repr__(self):
+        return "IndexNode({0}, {1}, {2}, {3})".format(self.start, self.end, "dict" if self.isDict else "list", self.count)
+
+class JsonIndex(object):
+    """Byte-offset index of the objects and arrays in a JSON file, built in one streaming pass over a memory map of the file.
+
+    Subtrees are only parsed when they are asked for (``load``), so the size and shape of a multi-gigabyte document can be explored without holding it in memory.
+    """
+
+    _token = re.compile(r'[{}\[\]"](?:(?<=")(?:[^"\\]|\\.)*")?', re.DOTALL)
+    _string = re.compile(r'"(?:[^"\\]|\\.)*"', re.DOTALL)
+    _colon = re.compile(r"\s*:\s*")
+    _scalar = re.compile(r'[^\s,:{}\[\]"]+')
+    _whitespace = " \t\r\n"
+    _chunkSize = 16*1024*1024
+
+    def __init__(self, fileName):
+        """:type fileName: string
+        :param fileName: JSON file to index
+        """
+
+        self.fileName = fileName
+        self.file = open(fileName, "rb")
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty files cannot be memory-mapped
+            self.data = ""
+        self.root = self._build()
+
+    def close(self):
+        """Release the memory map and the file handle."""
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+    def _countCommas(self, start, end):
+        data = self.data
+        total = 0
+        while start < end:
+            stop = min(end, start + self._chunkSize)
+            total += data[start:stop].count(",")
+            start = stop
+        return total
+
+    def _build(self):
+        data = self.data
+        size = len(data)
+        whitespace = self._whitespace
+        matchColon = self._colon.match
+        countCommas = self._countCommas
+        chunkSize = self._chunkSize
+
+        root = None
+        stack = []     # frames of [node, commas (arrays), nonEmpty (arrays), pendingKey (objects)]
+        frame = None
+        pos = 0
+        for m in self._token.finditer(data):
+            at = m.start()
+            char = data[at]
+
+            if frame is not None and not frame[0].isDict and at > pos:
+                if at - pos < chunkSize:
+                    span = data[pos:at]
+                    commas = span.count(",")
+                else:
+                    span = None
+                    commas = countCommas(pos, at)
+                frame[1] += commas
+                if not frame[2] and (commas > 0 or span is None or span.strip() != ""):
+                    frame[2] = True
+
+            if char == '"':
+                pos = m.end()
+                if pos == at + 1:
+                    raise ValueError("unterminated string at byte {0} of {1}".format(at, self.fileName))
+                if frame is None:
+                    continue
+                if frame[0].isDict:
+                    before = at - 1
+                    while data[before] in whitespace:
+                        before -= 1
+                    if data[before] not in "{,":
+                        continue
+                    cm = matchColon(data, pos)
+                    if cm is None:
+                        raise ValueError("expected \":\" after key at byte {0} of {1}".format(at, self.fileName))
+                    valueStart = cm.end()
+                    key = m.group()
+                    if "\\" in key:
+                        key = json.loads(key)
+                    else:
+                        # same (unicode) key that json.loads would produce, including non-ASCII keys written as UTF-8
+                        key = key[1:-1].decode("utf-8")
+                    if valueStart < size and data[valueStart] in "{[":
+                        frame[3] = key
+                    else:
+                        frame[0].children[key] = valueStart
+                    frame[0].count += 1
+                else:
+                    frame[2] = True
+
+            elif char == "{" or char == "[":
+                node = IndexNode(at, char == "{")
+                if frame is None:
+                    if root is not None:
+                        raise ValueError("extra data at byte {0} of {1}".format(at, self.fileName))
+                    root = node
+                elif frame[0].isDict:
+                    frame[0].children[frame[3]] = node
+                    frame[3] = None
+                else:
+                    frame[0].children[frame[1]] = node
+                    frame[2] = True
+                frame = [node, 0, False, None]
+                stack.append(frame)
+                pos = at + 1
+
+            else:
+                if frame is None or frame[0].isDict != (char == "}"):
+                    raise ValueError("unmatched \"{0}\" at byte {1} of {2}".format(char, at, self.fileName))
+                node, commas, nonEmpty, pendingKey = stack.pop()
+                node.end = at + 1
+                if not node.isDict:
+                    node.count = commas + 1 if nonEmpty else 0
+                frame = stack[-1] if len(stack) > 0 else None
+                pos = at + 1
+
+        if frame is not None:
+            raise ValueError("unexpected end of {0} (unclosed \"{1}\" at byte {2})".format(self.fileName, "{" if frame[0].isDict else "[", frame[0].start))
+
+        if root is None:
+            # the whole document is a scalar
+            return json.loads(data[:])
+        return root
+
+    def text(self, node):
+        """Get the raw JSON text of an indexed object or array.
+
+        :type node: titus.inspector.jsonindex.IndexNode
+        :param node: indexed object or array
+        :rtype: string
+        :return: serialized JSON
+        """
+        return self.data[node.start:node.end]
+
+    def load(self, node):
+        """Parse an indexed object or array (and everything it contains) into Pythonized JSON.
+
+        :type node: titus.inspector.jsonindex.IndexNode or Pythonized JSON
+        :param node: indexed object or array; anything else is assumed to be already loaded and is passed through
+        :rtype: Pythonized JSON
+        :return: the parsed value
+        """
+        if isinstance(node, IndexNode):
+            return json.loads(self.text(node))
+        else:
+            return node
+
+    def scalarAt(self, offset):
+        """Parse the string, number, boolean, or null that starts at a given byte offset.
+
+        :type offset: non-negative integer
+        :param offset: byte offset of the value
+        :rtype: Pythonized JSON
+        :return: the parsed value
+        """
+        if self.data[offset] == '"':
+            m = self._string.match(self.data, offset)
+        else:
+            m = self._scalar.match(self.data, offset)
+        if m is None:
+            raise ValueError("expected a JSON value at byte {0} of {1}".format(offset, self.fileName))
+        return json.loads(m.group())
+
+    def lookup(self, node, key):
+        """Get a key of an object or an index of an array without loading anything that is not needed.
+
+        Raises the same exceptions as Python's ``node[key]`` would (KeyError, IndexError, or TypeError).
+
+        :type node: titus.inspector.jsonindex.IndexNode or Pythonized JSON
+        :param node: indexed object or array, or an already loaded value
+        :type key: string or integer
+        :param key: key or index to get
+        :rtype: titus.inspector.jsonindex.IndexNode or Pythonized JSON
+        :return: an indexed subtree if the value is an object or array, the parsed value otherwise
+        """
+        if not isinstance(node, IndexNode):
+            return node[key]
+
+        if node.isDict:
+            if not isinstance(key, basestring):
+                raise TypeError("JSON object keys must be strings")
+            child = node.children[key]
+            if isinstance(child, IndexNode):
+                return child
+            else:
+                return self.scalarAt(child)
+
+        else:
+            if not isinstance(key, (int, long)):
+                raise TypeError("JSON array indexes must be integers")
+            if key < 0:
+                key += node.count
+            if key < 0 or key >= node.count:
+                raise IndexError("JSON array index out of range")
+            child = node.children.get(key)
+            if child is not None:
+                return child
+            else:
+                return self.load(node)[key]
+
+    def keys(self, node):
+        """List the keys of an object or the indexes of an array.
+
+        :type node: titus.inspector.jsonindex.IndexNode
+        :param node: indexed object or array
+        :rtype: list of strings or a list of integers
+        :return: keys or indexes, without loading any values
+        """
+        if node.isDict:
+            return node.children.keys()
+        else:
+            return range(node.count)
+
+    def isContainer(self, node, key):
+        """Determine if a key of an object or an index of an array holds an object or array, without loading it.
+
+        :type node: titus.inspector.jsonindex.IndexNode
+        :param node: indexed object or array
+        :type key: string or integer
+        :param key: key or index (assumed to exist)
+        :rtype: bool
+        :return: ``True`` if the value is an object or array
+        """
+        return isinstance(node.children.get(key), IndexNode)
+
+    def size(self, node):
+        """Number of bytes of JSON text in an indexed object or array.
+
+        :type node: titus.inspector.jsonindex.IndexNode
+        :param node: indexed object or array
+        :rtype: integer
+        :return: size of the serialized subtree
+        """
+        return node.end - node.start
@@ -44,8 +44,8 @@ class InspectorMode(Mode):
         class LoadCommand(Command):
             def __init__(self, mode):
                 self.name = "load"
-                self.syntax = "load <file-path> as <name>"
-                self.help = "read a PFA file into the current context, possibly naming it\n    " + self.syntax
+                self.syntax = "load <file-path> as <name> [lazy=false]"
+                self.help = "read a PFA file into the current context, possibly naming it (lazy=true indexes a JSON file and loads parts of it on demand)\n    " + self.syntax
                 self.mode = mode
             def complete(self, established, active):
                 words = getcomplete(established)
@@ -53,17 +53,40 @@ class InspectorMode(Mode):
                     return pathcomplete(established, active)
                 elif len(words) == 1 and "as".startswith(active):
                     return ["as "]
+                elif len(words) == 3 and "lazy=".startswith(active):
+                    return ["lazy="]
                 else:
                     return []
             def action(self, args):
+                options = {"lazy": False}
+                while len(args) > 0 and isinstance(args[-1], parser.Option):
+                    opt = args.pop()
+                    if opt.word.text in ["lazy"]:
+                        try:
+                            options[opt.word.text] = opt.value.value()
+                        except TypeError:
+                            raise InspectorError("illegal value for {0}".format(opt.word.text))
+                    else:
+                        raise InspectorError("option {0} unrecognized".format(opt.word.text))
+
+                if not isinstance(options["lazy"], bool):
+                    raise InspectorError("lazy must be boolean")
+
                 if len(args) == 1 and args[0] == parser.Word("help"):
                     print self.help
                 elif len(args) == 3 and isinstance(args[0], parser.FilePath) and args[1] == parser.Word("as") and isinstance(args[2], parser.Word):
-                    try:
-                        data = json.load(open(args[0].text))
-                    except IOError as err:
-                        raise InspectorError(err)
-                    self.mode.pfaFiles[args[2].text] = Model(data)
+                    if options["lazy"]:
+                        try:
+                            model = LazyModel(args[0].text)
+                        except IOError as err:
+                            raise InspectorError(err)
+                    else:
+                        try:
+                            data = json.load(open(args[0].text))
+                        except IOError as err:
+                            raise InspectorError(err)
+                        model = Model(data)
+                    self.mode.pfaFiles[args[2].text] = model
                 else:
                     self.syntaxError()
 
@@ -75,8 +75,7 @@ class ValidCommand(Command):
         else:
             self.syntaxError()
 
-        model.engine
-        print "PFA document is syntactically and semantically valid"
+        print model.validate()
         
 class InputOutputCommand(Command):
     """The 'pfa input' and 'pfa output' commands in pfainspector."""
@@ -140,20 +139,19 @@ class InputOutputCommand(Command):
                 if args[0].text not in self.mode.pfaFiles:
                     raise InspectorError("no PFA document named \"{0}\" in memory (try 'load <file> as {1}')".format(args[0].text, args[0].text))
                 model = self.mode.pfaFiles[args[0].text]
-                node = model.obj
 
             else:
                 self.syntaxError()
 
             try:
-                node = node[self.name]  # "input" or "output"
-            except KeyError:
+                node = model.extract(args[0], [parser.Word(self.name)])  # "input" or "output"
+            except InspectorError:
                 raise InspectorError("PFA document \"{0}\" is missing {1} section')".format(args[0].text, self.name))
 
             if isinstance(node, basestring):
-                names = model.engine.parser.names.names.keys()
+                names = model.parser.names.names.keys()
                 if node in names:
-                    node = model.engine.parser.getAvroType(node).jsonNode(set())
+                    node = model.parser.getAvroType(node).jsonNode(set())
 
             if options["pretty"]:
                 print avscToPretty(node)
@@ -226,9 +224,9 @@ class TypesCommand(Command):
             else:
                 self.syntaxError()
 
-            names = sorted(model.engine.parser.names.names.keys())
+            names = sorted(model.parser.names.names.keys())
             for index, name in enumerate(names):
-                node = model.engine.parser.getAvroType(name).jsonNode(set())
+                node = model.parser.getAvroType(name).jsonNode(set())
                 print name + ":"
                 if options["pretty"]:
                     print avscToPretty(node, 4)
@@ -389,8 +387,8 @@ class CallsCommand(Command):
         else:
             self.syntaxError()
 
-        for name in sorted(model.engine.callGraph):
-            print name + ": " + ", ".join(sorted(model.engine.callGraph[name]))
+        for name in sorted(model.callGraph):
+            print name + ": " + ", ".join(sorted(model.callGraph[name]))
 
 class CellsPoolsCommand(Command):
     """The 'pfa cells' and 'pfa pools' commands in pfainspector."""
@@ -469,7 +467,7 @@ class CellsPoolsCommand(Command):
                 if self.name == "cells":
                     preamble = "{0}: shared={1} rollback={2} type=".format(name, json.dumps(obj.shared), json.dumps(obj.rollback))
                 elif self.name == "pools":
-                    preamble = "{0}: shared={1} rollback={2} elements={3} type=".format(name, json.dumps(obj.shared), json.dumps(obj.rollback), len(json.loads(obj.init)))
+                    preamble = "{0}: shared={1} rollback={2} elements={3} type=".format(name, json.dumps(obj.shared), json.dumps(obj.rollback), model.poolSize(name))
 
                 ptype = obj.avroType
                 if options["pretty"]:
@@ -17,6 +17,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import heapq
 import math
 import itertools
 import json
@@ -27,6 +28,7 @@ from titus.signature import Sig
 from titus.signature import Sigs
 from titus.datatype import *
 from titus.errors import *
+from titus.util import arrayTypes, mapTypes
 from titus.util import callfcn, negativeIndex, startEnd
 from titus.lib.core import INT_MIN_VALUE
 from titus.lib.core import INT_MAX_VALUE
@@ -138,7 +140,7 @@ class Contains(LibFcn):
                 Sig([{"haystack": P.Array(P.Wildcard("A"))}, {"needle": P.Fcn([P.Wildcard("A")], P.Boolean())}], P.Boolean())])
     errcodeBase = 15070
     def __call__(self, state, scope, pos, paramTypes, haystack, needle):
-        if isinstance(needle, (list, tuple)):
+        if isinstance(needle, arrayTypes):
             for start in xrange(len(haystack) - len(needle) + 1):
                 if needle == haystack[start:(start + len(needle))]:
                     return True
@@ -167,7 +169,7 @@ class Count(LibFcn):
         if len(haystack) == 0:
             return 0
         else:
-            if isinstance(needle, (list, tuple)):
+            if isinstance(needle, arrayTypes):
                 if len(needle) == 0:
                     return 0
                 else:
@@ -193,7 +195,7 @@ class Index(LibFcn):
                 Sig([{"haystack": P.Array(P.Wildcard("A"))}, {"needle": P.Fcn([P.Wildcard("A")], P.Boolean())}], P.Int())])
     errcodeBase = 15090
     def __call__(self, state, scope, pos, paramTypes, haystack, needle):
-        if isinstance(needle, (list, tuple)):
+        if isinstance(needle, arrayTypes):
             for start in xrange(len(haystack) - len(needle) + 1):
                 if needle == haystack[start:(start + len(needle))]:
                     return start
@@ -217,7 +219,7 @@ class RIndex(LibFcn):
                 Sig([{"haystack": P.Array(P.Wildcard("A"))}, {"needle": P.Fcn([P.Wildcard("A")], P.Boolean())}], P.Int())])
     errcodeBase = 15100
     def __call__(self, state, scope, pos, paramTypes, haystack, needle):
-        if isinstance(needle, (list, tuple)):
+        if isinstance(needle, arrayTypes):
             for start in xrange(len(haystack) - len(needle), -1, -1):
                 if needle == haystack[start:(start + len(needle))]:
                     return start
@@ -240,7 +242,7 @@ class StartsWith(LibFcn):
                 Sig([{"haystack": P.Array(P.Wildcard("A"))}, {"needle": P.Wildcard("A")}], P.Boolean())])
     errcodeBase = 15110
     def __call__(self, state, scope, pos, paramTypes, haystack, needle):
-        if isinstance(needle, (list, tuple)):
+        if isinstance(needle, arrayTypes):
             return needle == haystack[:len(needle)]
         else:
             if len(haystack) == 0:
@@ -255,7 +257,7 @@ class EndsWith(LibFcn):
                 Sig([{"haystack": P.Array(P.Wildcard("A"))}, {"needle": P.Wildcard("A")}], P.Boolean())])
     errcodeBase = 15120
     def __call__(self, state, scope, pos, paramTypes, haystack, needle):
-        if isinstance(needle, (list, tuple)):
+        if isinstance(needle, arrayTypes):
             if len(needle) == 0:
                 return True
             else:
@@ -370,7 +372,7 @@ class Sort(LibFcn):
     sig = Sig([{"a": P.Array(P.Wildcard("A"))}], P.Array(P.Wildcard("A")))
     errcodeBase = 15200
     def __call__(self, state, scope, pos, paramTypes, a):
-        return sorted(a, lambda x, y: compare(jsonNodeToAvroType(paramTypes[0]).items, x, y))
+        return sorted(a, key=sortKeyFromJson(paramTypes[0], "items"))
 provide(Sort())
 
 class SortLT(LibFcn):
@@ -475,7 +477,7 @@ class Max(LibFcn):
         if len(a) == 0:
             raise PFARuntimeException("empty array", self.errcodeBase + 0, self.name, pos)
         else:
-            return highestN(a, 1, lambda x, y: compare(jsonNodeToAvroType(paramTypes[0]).items, x, y) < 0)[0]
+            return max(a, key=sortKeyFromJson(paramTypes[0], "items"))
 provide(Max())
 
 class Min(LibFcn):
@@ -486,7 +488,7 @@ class Min(LibFcn):
         if len(a) == 0:
             raise PFARuntimeException("empty array", self.errcodeBase + 0, self.name, pos)
         else:
-            return lowestN(a, 1, lambda x, y: compare(jsonNodeToAvroType(paramTypes[0]).items, x, y) < 0)[0]
+            return min(a, key=sortKeyFromJson(paramTypes[0], "items"))
 provide(Min())
 
 class MaxLT(LibFcn):
@@ -521,7 +523,7 @@ class MaxN(LibFcn):
         elif n < 0:
             raise PFARuntimeException("n < 0", self.errcodeBase + 1, self.name, pos)
         else:
-            return highestN(a, n, lambda x, y: compare(jsonNodeToAvroType(paramTypes[0]).items, x, y) < 0)
+            return heapq.nlargest(n, a, key=sortKeyFromJson(paramTypes[0], "items"))
 provide(MaxN())
 
 class MinN(LibFcn):
@@ -534,7 +536,7 @@ class MinN(LibFcn):
         elif n < 0:
             raise PFARuntimeException("n < 0", self.errcodeBase + 1, self.name, pos)
         else:
-            return lowestN(a, n, lambda x, y: compare(jsonNodeToAvroType(paramTypes[0]).items, x, y) < 0)
+            return heapq.nsmallest(n, a, key=sortKeyFromJson(paramTypes[0], "items"))
 provide(MinN())
 
 class MaxNLT(LibFcn):
@@ -571,7 +573,8 @@ class Argmax(LibFcn):
         if len(a) == 0:
             raise PFARuntimeException("empty array", self.errcodeBase + 0, self.name, pos)
         else:
-            return argHighestN(a, 1, lambda x, y: compare(jsonNodeToAvroType(paramTypes[0]).items, x, y) < 0)[0]
+            keys = map(sortKeyFromJson(paramTypes[0], "items"), a)
+            return max(xrange(len(a)), key=keys.__getitem__)
 provide(Argmax())
 
 class Argmin(LibFcn):
@@ -582,7 +585,8 @@ class Argmin(LibFcn):
         if len(a) == 0:
             raise PFARuntimeException("empty array", self.errcodeBase + 0, self.name, pos)
         else:
-            return argLowestN(a, 1, lambda x, y: compare(jsonNodeToAvroType(paramTypes[0]).items, x, y) < 0)[0]
+            keys = map(sortKeyFromJson(paramTypes[0], "items"), a)
+            return min(xrange(len(a)), key=keys.__getitem__)
 provide(Argmin())
 
 class ArgmaxLT(LibFcn):
@@ -617,7 +621,8 @@ class ArgmaxN(LibFcn):
         elif n < 0:
             raise PFARuntimeException("n < 0", self.errcodeBase + 1, self.name, pos)
         else:
-            return argHighestN(a, n, lambda x, y: compare(jsonNodeToAvroType(paramTypes[0]).items, x, y) < 0)
+            keys = map(sortKeyFromJson(paramTypes[0], "items"), a)
+            return heapq.nlargest(n, xrange(len(a)), key=keys.__getitem__)
 provide(ArgmaxN())
 
 class ArgminN(LibFcn):
@@ -630,7 +635,8 @@ class ArgminN(LibFcn):
         elif n < 0:
             raise PFARuntimeException("n < 0", self.errcodeBase + 1, self.name, pos)
         else:
-            return argLowestN(a, n, lambda x, y: compare(jsonNodeToAvroType(paramTypes[0]).items, x, y) < 0)
+            keys = map(sortKeyFromJson(paramTypes[0], "items"), a)
+            return heapq.nsmallest(n, xrange(len(a)), key=keys.__getitem__)
 provide(ArgminN())
 
 class ArgmaxNLT(LibFcn):
@@ -753,7 +759,7 @@ class Median(LibFcn):
     def __call__(self, state, scope, pos, paramTypes, a):
         if len(a) == 0:
             raise PFARuntimeException("empty array", self.errcodeBase + 0, self.name, pos)
-        sa = sorted(a, lambda x, y: compare(jsonNodeToAvroType(paramTypes[0]).items, x, y))
+        sa = sorted(a, key=sortKeyFromJson(paramTypes[0], "items"))
         half = len(sa) / 2
         dataType = paramTypes[-1]
 
@@ -799,10 +805,10 @@ class NTile(LibFcn):
         if math.isnan(p):
             raise PFARuntimeException("p not a number", self.errcodeBase + 1, self.name, pos)
         if p <= 0.0:
-            return lowestN(a, 1, lambda x, y: compare(jsonNodeToAvroType(paramTypes[0]).items, x, y) < 0)[0]
+            return min(a, key=sortKeyFromJson(paramTypes[0], "items"))
         if p >= 1.0:
-            return highestN(a, 1, lambda x, y: compare(jsonNodeToAvroType(paramTypes[0]).items, x, y) < 0)[0]
-        sa = sorted(a, lambda x, y: compare(jsonNodeToAvroType(paramTypes[0]).items, x, y))
+            return max(a, key=sortKeyFromJson(paramTypes[0], "items"))
+        sa = sorted(a, key=sortKeyFromJson(paramTypes[0], "items"))
         k = (len(a) - 1.0)*p
         f = math.floor(k)
         dataType = paramTypes[-1]
@@ -822,14 +828,25 @@ provide(NTile())
 
 #################################################################### set or set-like functions
 
+def hashable(x):
+    if isinstance(x, mapTypes):
+        return (dict, frozenset((k, hashable(v)) for k, v in x.items()))
+    elif isinstance(x, arrayTypes):
+        return (list, tuple(hashable(v) for v in x))
+    else:
+        return x
+
 class Distinct(LibFcn):
     name = prefix + "distinct"
     sig = Sig([{"a": P.Array(P.Wildcard("A"))}], P.Array(P.Wildcard("A")))
     errcodeBase = 15490
     def __call__(self, state, scope, pos, paramTypes, a):
         out = []
+        seen = set()
         for ai in a:
-            if ai not in out:
+            key = hashable(ai)
+            if key not in seen:
+                seen.add(key)
                 out.append(ai)
         return out
 provide(Distinct())
@@ -56,6 +56,96 @@ def checkForOverflow(paramType, out, code1, code2, fcnName, pos):
             return out
     else:
         return out
+
+def checkInt(out, code, fcnName, pos):
+    """Overflow guard for inlined int arithmetic (see ``inlineArithmetic``)."""
+    if INT_MIN_VALUE <= out <= INT_MAX_VALUE:
+        return out
+    else:
+        raise PFARuntimeException("int overflow", code, fcnName, pos)
+
+def checkLong(out, code, fcnName, pos):
+    """Overflow guard for inlined long arithmetic (see ``inlineArithmetic``)."""
+    if LONG_MIN_VALUE <= out <= LONG_MAX_VALUE:
+        return out
+    else:
+        raise PFARuntimeException("long overflow", code, fcnName, pos)
+
+def compareDouble(x, y):
+    """Compare two doubles the way ``titus.datatype.compare`` does: NaN is equal to itself and greater than any number."""
+    if x < y:
+        return -1
+    elif x > y:
+        return 1
+    elif x == y:
+        return 0
+    elif x != x:
+        if y != y:
+            return 0
+        else:
+            return 1
+    else:
+        return -1
+
+def inlineArithmetic(fcn, operator, paramTypes, args, pos):
+    """Generate a native Python expression for an arithmetic function, rather than a call through ``self.f``.
+
+    Floating-point operations are emitted as bare operators; int and long operations are wrapped in ``checkInt``/``checkLong``, which raise the same overflow errors as ``checkForOverflow``.
+
+    :type fcn: titus.fcn.LibFcn
+    :param fcn: the arithmetic function (for its name and error codes)
+    :type operator: string
+    :param operator: Python expression template, such as ``"({0} + {1})"``
+    :type paramTypes: list of Pythonized JSON
+    :param paramTypes: parameter types followed by the return type
+    :type args: list of strings
+    :param args: Python code for the arguments
+    :type pos: string or ``None``
+    :param pos: position from locator marks for error reporting
+    :rtype: string
+    :return: Python code
+    """
+    if paramTypes[0] == "double" or paramTypes[0] == "float":
+        return operator.format(*args)
+    elif paramTypes[0] == "int":
+        return "checkInt({0}, {1}, {2}, {3})".format(operator.format(*args), fcn.errcodeBase + 0, repr(fcn.name), repr(pos))
+    elif paramTypes[0] == "long":
+        return "checkLong({0}, {1}, {2}, {3})".format(operator.format(*args), fcn.errcodeBase + 1, repr(fcn.name), repr(pos))
+    else:
+        return LibFcn.genpy(fcn, paramTypes, args, pos)
+
+def inlineComparison(fcn, operator, paramTypes, args, pos):
+    """Generate a native Python expression for a comparison function, rather than a call through ``self.f``.
+
+    Only primitive types whose Python ordering agrees with ``titus.datatype.compare`` are inlined; doubles go through ``compareDouble`` for the NaN rules and other types through the library function.
+
+    :type fcn: titus.fcn.LibFcn
+    :param fcn: the comparison function
+    :type operator: string
+    :param operator: Python comparison operator, such as ``"<"``, or ``None`` for ``cmp`` itself
+    :type paramTypes: list of Pythonized JSON
+    :param paramTypes: parameter types followed by the return type
+    :type args: list of strings
+    :param args: Python code for the arguments
+    :type pos: string or ``None``
+    :param pos: position from locator marks for error reporting
+    :rtype: string
+    :return: Python code
+    """
+    if paramTypes[0] in ("int", "long", "boolean", "string", "bytes"):
+        if operator is None:
+            return "cmp({0}, {1})".format(*args)
+        else:
+            return "({0} {2} {1})".format(args[0], args[1], operator)
+    elif paramTypes[0] in ("double", "float"):
+        # floats go through Python's cmp in titus.datatype.compare, doubles have PFA's NaN rules
+        comparison = "compareDouble" if paramTypes[0] == "double" else "cmp"
+        if operator is None:
+            return "{0}({1}, {2})".format(comparison, *args)
+        else:
+            return "({0}({1}, {2}) {3} 0)".format(comparison, args[0], args[1], operator)
+    else:
+        return LibFcn.genpy(fcn, paramTypes, args, pos)
     
 #################################################################### basic arithmetic
 
@@ -63,6 +153,8 @@ class Plus(LibFcn):
     name = "+"
     sig = Sig([{"x": P.Wildcard("A", anyNumber)}, {"y" : P.Wildcard("A")}], P.Wildcard("A"))
     errcodeBase = 18000
+    def genpy(self, paramTypes, args, pos):
+        return inlineArithmetic(self, "({0} + {1})", paramTypes, args, pos)
     def __call__(self, state, scope, pos, paramTypes, x, y):
         return checkForOverflow(paramTypes[0], x + y, self.errcodeBase + 0, self.errcodeBase + 1, self.name, pos)
 provide(Plus())
@@ -71,6 +163,8 @@ class Minus(LibFcn):
     name = "-"
     sig = Sig([{"x": P.Wildcard("A", anyNumber)}, {"y": P.Wildcard("A")}], P.Wildcard("A"))
     errcodeBase = 18010
+    def genpy(self, paramTypes, args, pos):
+        return inlineArithmetic(self, "({0} - {1})", paramTypes, args, pos)
     def __call__(self, state, scope, pos, paramTypes, x, y):
         return checkForOverflow(paramTypes[0], x - y, self.errcodeBase + 0, self.errcodeBase + 1, self.name, pos)
 provide(Minus())
@@ -79,6 +173,8 @@ class Times(LibFcn):
     name = "*"
     sig = Sig([{"x": P.Wildcard("A", anyNumber)}, {"y": P.Wildcard("A")}], P.Wildcard("A"))
     errcodeBase = 18020
+    def genpy(self, paramTypes, args, pos):
+        return inlineArithmetic(self, "({0} * {1})", paramTypes, args, pos)
     def __call__(self, state, scope, pos, paramTypes, x, y):
         return checkForOverflow(paramTypes[0], x * y, self.errcodeBase + 0, self.errcodeBase + 1, self.name, pos)
 provide(Times())
@@ -87,6 +183,8 @@ class Divide(LibFcn):
     name = "/"
     sig = Sig([{"x": P.Double()}, {"y": P.Double()}], P.Double())
     errcodeBase = 18030
+    def genpy(self, paramTypes, args, pos):
+        return "div({0}, {1})".format(*args)
     def __call__(self, state, scope, pos, paramTypes, x, y):
         return div(x, y)
 provide(Divide())
@@ -106,6 +204,8 @@ class Negative(LibFcn):
     name = "u-"
     sig = Sig([{"x": P.Wildcard("A", anyNumber)}], P.Wildcard("A"))
     errcodeBase = 18050
+    def genpy(self, paramTypes, args, pos):
+        return inlineArithmetic(self, "(-{0})", paramTypes, args, pos)
     def __call__(self, state, scope, pos, paramTypes, x):
         return checkForOverflow(paramTypes[0], -x, self.errcodeBase + 0, self.errcodeBase + 1, self.name, pos)
 provide(Negative())
@@ -220,56 +320,77 @@ class Comparison(LibFcn):
     name = "cmp"
     sig = Sig([{"x": P.Wildcard("A")}, {"y": P.Wildcard("A")}], P.Int())
     errcodeBase = 18090
+    def genpy(self, paramTypes, args, pos):
+        return inlineComparison(self, None, paramTypes, args, pos)
     def __call__(self, state, scope, pos, paramTypes, x, y):
-        return compare(jsonNodeToAvroType(paramTypes[0]), x, y)
+        key = sortKeyFromJson(paramTypes[0])
+        return cmp(key(x), key(y))
 provide(Comparison())
 
 class Equal(LibFcn):
     name = "=="
     sig = Sig([{"x": P.Wildcard("A")}, {"y": P.Wildcard("A")}], P.Boolean())
     errcodeBase = 18100
+    def genpy(self, paramTypes, args, pos):
+        return inlineComparison(self, "==", paramTypes, args, pos)
     def __call__(self, state, scope, pos, paramTypes, x, y):
-        return compare(jsonNodeToAvroType(paramTypes[0]), x, y) == 0
+        key = sortKeyFromJson(paramTypes[0])
+        return key(x) == key(y)
 provide(Equal())
 
 class GreaterOrEqual(LibFcn):
     name = ">="
     sig = Sig([{"x": P.Wildcard("A")}, {"y": P.Wildcard("A")}], P.Boolean())
     errcodeBase = 18110
+    def genpy(self, paramTypes, args, pos):
+        return inlineComparison(self, ">=", paramTypes, args, pos)
     def __call__(self, state, scope, pos, paramTypes, x, y):
-        return compare(jsonNodeToAvroType(paramTypes[0]), x, y) >= 0
+        key = sortKeyFromJson(paramTypes[0])
+        return key(x) >= key(y)
 provide(GreaterOrEqual())
 
 class GreaterThan(LibFcn):
     name = ">"
     sig = Sig([{"x": P.Wildcard("A")}, {"y": P.Wildcard("A")}], P.Boolean())
     errcodeBase = 18120
+    def genpy(self, paramTypes, args, pos):
+        return inlineComparison(self, ">", paramTypes, args, pos)
     def __call__(self, state, scope, pos, paramTypes, x, y):
-        return compare(jsonNodeToAvroType(paramTypes[0]), x, y) > 0
+        key = sortKeyFromJson(paramTypes[0])
+        return key(x) > key(y)
 provide(GreaterThan())
 
 class NotEqual(LibFcn):
     name = "!="
     sig = Sig([{"x": P.Wildcard("A")}, {"y": P.Wildcard("A")}], P.Boolean())
     errcodeBase = 18130
+    def genpy(self, paramTypes, args, pos):
+        return inlineComparison(self, "!=", paramTypes, args, pos)
     def __call__(self, state, scope, pos, paramTypes, x, y):
-        return compare(jsonNodeToAvroType(paramTypes[0]), x, y) != 0
+        key = sortKeyFromJson(paramTypes[0])
+        return key(x) != key(y)
 provide(NotEqual())
 
 class LessThan(LibFcn):
     name = "<"
     sig = Sig([{"x": P.Wildcard("A")}, {"y": P.Wildcard("A")}], P.Boolean())
     errcodeBase = 18140
+    def genpy(self, paramTypes, args, pos):
+        return inlineComparison(self, "<", paramTypes, args, pos)
     def __call__(self, state, scope, pos, paramTypes, x, y):
-        return compare(jsonNodeToAvroType(paramTypes[0]), x, y) < 0
+        key = sortKeyFromJson(paramTypes[0])
+        return key(x) < key(y)
 provide(LessThan())
 
 class LessOrEqual(LibFcn):
     name = "<="
     sig = Sig([{"x": P.Wildcard("A")}, {"y": P.Wildcard("A")}], P.Boolean())
     errcodeBase = 18150
+    def genpy(self, paramTypes, args, pos):
+        return inlineComparison(self, "<=", paramTypes, args, pos)
     def __call__(self, state, scope, pos, paramTypes, x, y):
-        return compare(jsonNodeToAvroType(paramTypes[0]), x, y) <= 0
+        key = sortKeyFromJson(paramTypes[0])
+        return key(x) <= key(y)
 provide(LessOrEqual())
 
 #################################################################### max and min
@@ -279,7 +400,8 @@ class Max(LibFcn):
     sig = Sig([{"x": P.Wildcard("A")}, {"y": P.Wildcard("A")}], P.Wildcard("A"))
     errcodeBase = 18160
     def __call__(self, state, scope, pos, paramTypes, x, y):
-        if compare(jsonNodeToAvroType(paramTypes[0]), x, y) >= 0:
+        key = sortKeyFromJson(paramTypes[0])
+        if key(x) >= key(y):
             return x
         else:
             return y
@@ -290,7 +412,8 @@ class Min(LibFcn):
     sig = Sig([{"x": P.Wildcard("A")}, {"y": P.Wildcard("A")}], P.Wildcard("A"))
     errcodeBase = 18170
     def __call__(self, state, scope, pos, paramTypes, x, y):
-        if compare(jsonNodeToAvroType(paramTypes[0]), x, y) < 0:
+        key = sortKeyFromJson(paramTypes[0])
+        if key(x) < key(y):
             return x
         else:
             return y
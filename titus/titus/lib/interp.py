@@ -17,6 +17,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import bisect
 import math
 
 from titus.fcn import Fcn
@@ -121,8 +122,53 @@ class Linear(LibFcn):
     sig = Sigs([Sig([{"x": P.Double()}, {"table": P.Array(P.WildRecord("R", {"x": P.Double(), "to": P.Double()}))}], P.Double()),
                 Sig([{"x": P.Double()}, {"table": P.Array(P.WildRecord("R", {"x": P.Double(), "to": P.Array(P.Double())}))}], P.Array(P.Double()))])
     errcodeBase = 22020
+    _seenOnce = object()
+
+    @staticmethod
+    def tableIndex(table, cache):
+        """Return the sorted distinct x values of ``table`` and the first item with each x value, or ``None`` if the table should be scanned instead.
+
+        The index is cached by the identity of the table and only built the second time the same table is seen, so that tables constructed anew on every call (which would not be reused) cost a linear scan rather than a sort.
+        """
+        index = cache.get(table)
+        if index is None:
+            cache.put(table, Linear._seenOnce)
+            return None
+        elif index is Linear._seenOnce:
+            firstItems = {}
+            for item in table:
+                x = item["x"]
+                if math.isnan(x):
+                    cache.put(table, False)
+                    return None
+                if x not in firstItems:
+                    firstItems[x] = item
+            keys = sorted(firstItems)
+            index = (keys, [firstItems[x] for x in keys])
+            cache.put(table, index)
+            return index
+        elif index is False:
+            return None
+        else:
+            return index
+
+    @staticmethod
+    def closest(datum, table, code, fcnName, pos, cache=None):
+        index = None if cache is None or math.isnan(datum) or math.isinf(datum) else Linear.tableIndex(table, cache)
+        if index is None:
+            return Linear.closestScan(datum, table, code, fcnName, pos)
+        keys, items = index
+        i = bisect.bisect_right(keys, datum)
+        if 0 < i < len(keys):
+            return items[i - 1], items[i], True
+        elif len(keys) < 2:
+            raise PFARuntimeException("table must have at least two distinct x values", code, fcnName, pos)
+        elif i == 0:
+            return items[0], items[1], False
+        else:
+            return items[-1], items[-2], False
     @staticmethod
-    def closest(datum, table, code, fcnName, pos):
+    def closestScan(datum, table, code, fcnName, pos):
         below = None
         above = None
         belowd = None
@@ -173,7 +219,8 @@ class Linear(LibFcn):
             raise PFARuntimeException("inconsistent dimensionality", code, fcnName, pos)
         return [(1.0 - unitless)*oney[i] + unitless*twoy[i] for i in xrange(len(oney))]
     def __call__(self, state, scope, pos, paramTypes, datum, table):
-        one, two, between = Linear.closest(datum, table, self.errcodeBase + 0, self.name, pos)
+        cache = None if state is None else state.identityCache((self.name, pos))
+        one, two, between = Linear.closest(datum, table, self.errcodeBase + 0, self.name, pos, cache)
         if isinstance(paramTypes[-1], dict) and paramTypes[-1].get("type") == "array":
             return Linear.interpolateMulti(datum, one, two, self.errcodeBase + 1, self.name, pos)
         else:
@@ -186,7 +233,8 @@ class LinearFlat(LibFcn):
                 Sig([{"x": P.Double()}, {"table": P.Array(P.WildRecord("R", {"x": P.Double(), "to": P.Array(P.Double())}))}], P.Array(P.Double()))])
     errcodeBase = 22030
     def __call__(self, state, scope, pos, paramTypes, datum, table):
-        one, two, between = Linear.closest(datum, table, self.errcodeBase + 0, self.name, pos)
+        cache = None if state is None else state.identityCache((self.name, pos))
+        one, two, between = Linear.closest(datum, table, self.errcodeBase + 0, self.name, pos, cache)
         if not between:
             return one["to"]
         elif isinstance(paramTypes[-1], dict) and paramTypes[-1].get("type") == "array":
@@ -201,7 +249,8 @@ class LinearMissing(LibFcn):
                 Sig([{"x": P.Double()}, {"table": P.Array(P.WildRecord("R", {"x": P.Double(), "to": P.Array(P.Double())}))}], P.Union([P.Null(), P.Array(P.Double())]))])
     errcodeBase = 22040
     def __call__(self, state, scope, pos, paramTypes, datum, table):
-        one, two, between = Linear.closest(datum, table, self.errcodeBase + 0, self.name, pos)
+        cache = None if state is None else state.identityCache((self.name, pos))
+        one, two, between = Linear.closest(datum, table, self.errcodeBase + 0, self.name, pos, cache)
         if not between and one["x"] != datum:
             return None
         elif isinstance([x for x in paramTypes[-1] if x != "null"][0], dict) and [x for x in paramTypes[-1] if x != "null"][0].get("type") == "array":
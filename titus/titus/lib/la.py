@@ -25,7 +25,7 @@ from titus.signature import Sig
 from titus.signature import Sigs
 from titus.datatype import *
 from titus.errors import *
-from titus.util import callfcn, div
+from titus.util import callfcn, div, arrayTypes, mapTypes, ArrayView
 import titus.P as P
 
 provides = {}
@@ -47,10 +47,28 @@ def colKeys(x):
     else:
         return reduce(lambda a, b: a.union(b), [set(xi.keys()) for xi in x.values()])
 
+def isArrayMatrix(x):
+    if isinstance(x, ArrayView):
+        return x.array.ndim == 2
+    return isinstance(x, arrayTypes) and all(isinstance(xi, arrayTypes) for xi in x)
+
+def nonFinite(x):
+    if isinstance(x, ArrayView):
+        return not np().isfinite(x.array).all()
+    elif len(x) > 0 and isinstance(x[0], arrayTypes):
+        return any(any(math.isnan(z) or math.isinf(z) for z in row) for row in x)
+    else:
+        return any(math.isnan(z) or math.isinf(z) for z in x)
+
 def arraysToMatrix(x):
+    if isinstance(x, ArrayView):
+        # no copy if the view is already stored as doubles
+        return np().asmatrix(x.array, dtype=np().double)
     return np().matrix(x, dtype=np().double)
 
 def arrayToRowVector(x):
+    if isinstance(x, ArrayView):
+        return np().asmatrix(x.array, dtype=np().double).T
     return np().matrix(x, dtype=np().double).T
 
 def rowVectorToArray(x):
@@ -72,6 +90,8 @@ def matrixToMaps(x, rows, cols):
     return dict((row, dict(zip(cols, xi))) for row, xi in zip(rows, x.tolist()))
 
 def raggedArray(x):
+    if isinstance(x, ArrayView):
+        return False
     collens = map(len, x)
     return max(collens) != min(collens)
 
@@ -84,10 +104,10 @@ class MapApply(LibFcn):
                 Sig([{"x": P.Map(P.Map(P.Double()))}, {"fcn": P.Fcn([P.Double()], P.Double())}], P.Map(P.Map(P.Double())))])
     errcodeBase = 24000
     def __call__(self, state, scope, pos, paramTypes, x, fcn):
-        if isinstance(x, (list, tuple)) and all(isinstance(xi, (list, tuple)) for xi in x):
+        if isArrayMatrix(x):
             return [[callfcn(state, scope, fcn, [xj]) for xj in xi] for xi in x]
 
-        elif isinstance(x, dict) and all(isinstance(x[i], dict) for i in x.keys()):
+        elif isinstance(x, mapTypes) and all(isinstance(x[i], mapTypes) for i in x.keys()):
             return dict((i, dict((j, callfcn(state, scope, fcn, [xj])) for j, xj in xi.items())) for i, xi in x.items())
 
 provide(MapApply())
@@ -100,11 +120,11 @@ class Scale(LibFcn):
                 Sig([{"x": P.Map(P.Map(P.Double()))}, {"alpha": P.Double()}], P.Map(P.Map(P.Double())))])
     errcodeBase = 24010
     def __call__(self, state, scope, pos, paramTypes, x, alpha):
-        if isinstance(x, (list, tuple)) and all(isinstance(xi, (list, tuple)) for xi in x):
+        if isArrayMatrix(x):
             return [[xj * alpha for xj in xi] for xi in x]
-        elif isinstance(x, (list, tuple)):
+        elif isinstance(x, arrayTypes):
             return [xi * alpha for xi in x]
-        elif isinstance(x, dict) and all(isinstance(x[i], dict) for i in x):
+        elif isinstance(x, mapTypes) and all(isinstance(x[i], mapTypes) for i in x):
             return dict((i, dict((j, xj * alpha) for j, xj in xi.items())) for i, xi in x.items())
         else:
             return dict((i, xi * alpha) for i, xi in x.items())
@@ -117,14 +137,14 @@ class ZipMap(LibFcn):
                 Sig([{"x": P.Map(P.Map(P.Double()))}, {"y": P.Map(P.Map(P.Double()))}, {"fcn": P.Fcn([P.Double(), P.Double()], P.Double())}], P.Map(P.Map(P.Double())))])
     errcodeBase = 24020
     def __call__(self, state, scope, pos, paramTypes, x, y, fcn):
-        if isinstance(x, (list, tuple)) and all(isinstance(xi, (list, tuple)) for xi in x) and \
-           isinstance(y, (list, tuple)) and all(isinstance(yi, (list, tuple)) for yi in y):
+        if isArrayMatrix(x) and \
+           isArrayMatrix(y):
             if len(x) != len(y) or any(len(xi) != len(yi) for xi, yi in zip(x, y)):
                 raise PFARuntimeException("misaligned matrices", self.errcodeBase + 0, self.name, pos)
             return [[callfcn(state, scope, fcn, [xj, yj]) for xj, yj in zip(xi, yi)] for xi, yi in zip(x, y)]
 
-        elif isinstance(x, dict) and all(isinstance(x[i], dict) for i in x.keys()) and \
-             isinstance(y, dict) and all(isinstance(y[i], dict) for i in y.keys()):
+        elif isinstance(x, mapTypes) and all(isinstance(x[i], mapTypes) for i in x.keys()) and \
+             isinstance(y, mapTypes) and all(isinstance(y[i], mapTypes) for i in y.keys()):
             rows = rowKeys(x).union(rowKeys(y))
             cols = colKeys(x).union(colKeys(y))
             return dict((i, dict((j, callfcn(state, scope, fcn, [x.get(i, {}).get(j, 0.0), y.get(i, {}).get(j, 0.0)])) for j in cols)) for i in rows)
@@ -139,19 +159,19 @@ class Add(LibFcn):
                 Sig([{"x": P.Map(P.Map(P.Double()))}, {"y": P.Map(P.Map(P.Double()))}], P.Map(P.Map(P.Double())))])
     errcodeBase = 24030
     def __call__(self, state, scope, pos, paramTypes, x, y):
-        if isinstance(x, (list, tuple)) and all(isinstance(xi, (list, tuple)) for xi in x) and \
-           isinstance(y, (list, tuple)) and all(isinstance(yi, (list, tuple)) for yi in y):
+        if isArrayMatrix(x) and \
+           isArrayMatrix(y):
             if len(x) != len(y) or any(len(xi) != len(yi) for xi, yi in zip(x, y)):
                 raise PFARuntimeException("misaligned matrices", self.errcodeBase + 0, self.name, pos)
             return [[xj + yj for xj, yj in zip(xi, yi)] for xi, yi in zip(x, y)]
 
-        elif isinstance(x, (list, tuple)) and isinstance(y, (list, tuple)):
+        elif isinstance(x, arrayTypes) and isinstance(y, arrayTypes):
             if len(x) != len(y):
                 raise PFARuntimeException("misaligned matrices", self.errcodeBase + 0, self.name, pos)
             return [xi + yi for xi, yi in zip(x, y)]
 
-        elif isinstance(x, dict) and all(isinstance(x[i], dict) for i in x.keys()) and \
-             isinstance(y, dict) and all(isinstance(y[i], dict) for i in y.keys()):
+        elif isinstance(x, mapTypes) and all(isinstance(x[i], mapTypes) for i in x.keys()) and \
+             isinstance(y, mapTypes) and all(isinstance(y[i], mapTypes) for i in y.keys()):
             rows = rowKeys(x).union(rowKeys(y))
             cols = colKeys(x).union(colKeys(y))
             return dict((i, dict((j, x.get(i, {}).get(j, 0.0) + y.get(i, {}).get(j, 0.0)) for j in cols)) for i in rows)
@@ -170,19 +190,19 @@ class Sub(LibFcn):
                 Sig([{"x": P.Map(P.Map(P.Double()))}, {"y": P.Map(P.Map(P.Double()))}], P.Map(P.Map(P.Double())))])
     errcodeBase = 24040
     def __call__(self, state, scope, pos, paramTypes, x, y):
-        if isinstance(x, (list, tuple)) and all(isinstance(xi, (list, tuple)) for xi in x) and \
-           isinstance(y, (list, tuple)) and all(isinstance(yi, (list, tuple)) for yi in y):
+        if isArrayMatrix(x) and \
+           isArrayMatrix(y):
             if len(x) != len(y) or any(len(xi) != len(yi) for xi, yi in zip(x, y)):
                 raise PFARuntimeException("misaligned matrices", self.errcodeBase + 0, self.name, pos)
             return [[xj - yj for xj, yj in zip(xi, yi)] for xi, yi in zip(x, y)]
 
-        elif isinstance(x, (list, tuple)) and isinstance(y, (list, tuple)):
+        elif isinstance(x, arrayTypes) and isinstance(y, arrayTypes):
             if len(x) != len(y):
                 raise PFARuntimeException("misaligned matrices", self.errcodeBase + 0, self.name, pos)
             return [xi - yi for xi, yi in zip(x, y)]
 
-        elif isinstance(x, dict) and all(isinstance(x[i], dict) for i in x.keys()) and \
-             isinstance(y, dict) and all(isinstance(y[i], dict) for i in y.keys()):
+        elif isinstance(x, mapTypes) and all(isinstance(x[i], mapTypes) for i in x.keys()) and \
+             isinstance(y, mapTypes) and all(isinstance(y[i], mapTypes) for i in y.keys()):
             rows = rowKeys(x).union(rowKeys(y))
             cols = colKeys(x).union(colKeys(y))
             return dict((i, dict((j, x.get(i, {}).get(j, 0.0) - y.get(i, {}).get(j, 0.0)) for j in cols)) for i in rows)
@@ -204,8 +224,7 @@ class Dot(LibFcn):
         if paramTypes[1]["type"] == "array":
             if isinstance(paramTypes[1]["items"], dict) and paramTypes[1]["items"]["type"] == "array":
                 # array matrix-matrix case
-                bad = any(any(math.isnan(z) or math.isinf(z) for z in row) for row in x) or \
-                      any(any(math.isnan(z) or math.isinf(z) for z in row) for row in y)
+                bad = nonFinite(x) or nonFinite(y)
                 xmat = arraysToMatrix(x)
                 ymat = arraysToMatrix(y)
                 if xmat.shape[0] == 0 or xmat.shape[1] == 0 or ymat.shape[0] == 0 or ymat.shape[1] == 0:
@@ -218,8 +237,7 @@ class Dot(LibFcn):
 
             else:
                 # array matrix-vector case
-                bad = any(any(math.isnan(z) or math.isinf(z) for z in row) for row in x) or \
-                      any(math.isnan(z) or math.isinf(z) for z in y)
+                bad = nonFinite(x) or nonFinite(y)
                 xmat = arraysToMatrix(x)
                 ymat = arrayToRowVector(y)
                 if xmat.shape[0] == 0 or xmat.shape[1] == 0 or ymat.shape[0] == 0 or ymat.shape[1] == 0:
@@ -266,7 +284,7 @@ class Transpose(LibFcn):
                 Sig([{"x": P.Map(P.Map(P.Double()))}], P.Map(P.Map(P.Double())))])
     errcodeBase = 24060
     def __call__(self, state, scope, pos, paramTypes, x):
-        if isinstance(x, (list, tuple)) and all(isinstance(xi, (list, tuple)) for xi in x):
+        if isArrayMatrix(x):
             rows = len(x)
             if rows < 1:
                 raise PFARuntimeException("too few rows/cols", self.errcodeBase + 0, self.name, pos)
@@ -277,7 +295,7 @@ class Transpose(LibFcn):
                 raise PFARuntimeException("ragged columns", self.errcodeBase + 1, self.name, pos)
             return [[x[r][c] for r in xrange(rows)] for c in xrange(cols)]
 
-        elif isinstance(x, dict) and all(isinstance(x[i], dict) for i in x.keys()):
+        elif isinstance(x, mapTypes) and all(isinstance(x[i], mapTypes) for i in x.keys()):
             rows = rowKeys(x)
             cols = colKeys(x)
             if len(rows) < 1 or len(cols) < 1:
@@ -294,7 +312,7 @@ class Inverse(LibFcn):
                 Sig([{"x": P.Map(P.Map(P.Double()))}], P.Map(P.Map(P.Double())))])
     errcodeBase = 24070
     def __call__(self, state, scope, pos, paramTypes, x):
-        if isinstance(x, (list, tuple)) and all(isinstance(xi, (list, tuple)) for xi in x):
+        if isArrayMatrix(x):
             rows = len(x)
             if rows < 1:
                 raise PFARuntimeException("too few rows/cols", self.errcodeBase + 0, self.name, pos)
@@ -305,7 +323,7 @@ class Inverse(LibFcn):
                 raise PFARuntimeException("ragged columns", self.errcodeBase + 1, self.name, pos)
             return matrixToArrays(arraysToMatrix(x).I)
 
-        elif isinstance(x, dict) and all(isinstance(x[i], dict) for i in x.keys()):
+        elif isinstance(x, mapTypes) and all(isinstance(x[i], mapTypes) for i in x.keys()):
             rows = list(rowKeys(x))
             cols = list(colKeys(x))
             if len(rows) < 1 or len(cols) < 1:
@@ -321,7 +339,7 @@ class Trace(LibFcn):
                 Sig([{"x": P.Map(P.Map(P.Double()))}], P.Double())])
     errcodeBase = 24080
     def __call__(self, state, scope, pos, paramTypes, x):
-        if isinstance(x, (list, tuple)) and all(isinstance(xi, (list, tuple)) for xi in x):
+        if isArrayMatrix(x):
             rows = len(x)
             if rows == 0:
                 return 0.0
@@ -331,7 +349,7 @@ class Trace(LibFcn):
                     raise PFARuntimeException("ragged columns", self.errcodeBase + 0, self.name, pos)
                 return sum(x[i][i] for i in xrange(min(rows, cols)))
 
-        elif isinstance(x, dict) and all(isinstance(x[i], dict) for i in x.keys()):
+        elif isinstance(x, mapTypes) and all(isinstance(x[i], mapTypes) for i in x.keys()):
             keys = rowKeys(x).intersection(colKeys(x))
             return sum(x[i][i] for i in keys)
 
@@ -343,7 +361,7 @@ class Det(LibFcn):
                 Sig([{"x": P.Map(P.Map(P.Double()))}], P.Double())])
     errcodeBase = 24090
     def __call__(self, state, scope, pos, paramTypes, x):
-        if isinstance(x, (list, tuple)) and all(isinstance(xi, (list, tuple)) for xi in x):
+        if isArrayMatrix(x):
             rows = len(x)
             if rows < 1:
                 raise PFARuntimeException("too few rows/cols", self.errcodeBase + 0, self.name, pos)
@@ -354,12 +372,12 @@ class Det(LibFcn):
                 raise PFARuntimeException("ragged columns", self.errcodeBase + 1, self.name, pos)
             if rows != cols:
                 raise PFARuntimeException("non-square matrix", self.errcodeBase + 2, self.name, pos)
-            if any(any(math.isnan(z) or math.isinf(z) for z in row) for row in x):
+            if nonFinite(x):
                 return float("nan")
             else:
                 return float(np().linalg.det(arraysToMatrix(x)))
 
-        elif isinstance(x, dict) and all(isinstance(x[i], dict) for i in x.keys()):
+        elif isinstance(x, mapTypes) and all(isinstance(x[i], mapTypes) for i in x.keys()):
             keys = list(rowKeys(x).union(colKeys(x)))
             if len(keys) < 1 or all(len(row) == 0 for row in x.values()):
                 raise PFARuntimeException("too few rows/cols", self.errcodeBase + 0, self.name, pos)
@@ -386,7 +404,7 @@ class Symmetric(LibFcn):
         else:
             return False
     def __call__(self, state, scope, pos, paramTypes, x, tol):
-        if isinstance(x, (list, tuple)) and all(isinstance(xi, (list, tuple)) for xi in x):
+        if isArrayMatrix(x):
             rows = len(x)
             if rows < 1:
                 raise PFARuntimeException("too few rows/cols", self.errcodeBase + 0, self.name, pos)
@@ -399,7 +417,7 @@ class Symmetric(LibFcn):
                 raise PFARuntimeException("non-square matrix", self.errcodeBase + 2, self.name, pos)
             return all(all(self.same(x[i][j], x[j][i], tol) for j in xrange(cols)) for i in xrange(rows))
 
-        elif isinstance(x, dict) and all(isinstance(x[i], dict) for i in x.keys()):
+        elif isinstance(x, mapTypes) and all(isinstance(x[i], mapTypes) for i in x.keys()):
             keys = list(rowKeys(x).union(colKeys(x)))
             if len(keys) < 1 or all(len(row) == 0 for row in x.values()):
                 raise PFARuntimeException("too few rows/cols", self.errcodeBase + 0, self.name, pos)
@@ -430,7 +448,7 @@ class EigenBasis(LibFcn):
         return out
 
     def __call__(self, state, scope, pos, paramTypes, x):
-        if isinstance(x, (list, tuple)) and all(isinstance(xi, (list, tuple)) for xi in x):
+        if isArrayMatrix(x):
             rows = len(x)
             if rows < 1:
                 raise PFARuntimeException("too few rows/cols", self.errcodeBase + 0, self.name, pos)
@@ -441,11 +459,11 @@ class EigenBasis(LibFcn):
                 raise PFARuntimeException("ragged columns", self.errcodeBase + 1, self.name, pos)
             if rows != cols:
                 raise PFARuntimeException("non-square matrix", self.errcodeBase + 2, self.name, pos)
-            if any(any(math.isnan(z) or math.isinf(z) for z in row) for row in x):
+            if nonFinite(x):
                 raise PFARuntimeException("non-finite matrix", self.errcodeBase + 3, self.name, pos)
             return matrixToArrays(self.calculate(arraysToMatrix(x), rows))
 
-        elif isinstance(x, dict) and all(isinstance(x[i], dict) for i in x.keys()):
+        elif isinstance(x, mapTypes) and all(isinstance(x[i], mapTypes) for i in x.keys()):
             keys = list(rowKeys(x).union(colKeys(x)))
             if len(keys) < 1 or all(len(z) == 0 for z in x.values()):
                 raise PFARuntimeException("too few rows/cols", self.errcodeBase + 0, self.name, pos)
@@ -464,7 +482,7 @@ class Truncate(LibFcn):
         if keep < 0:
             keep = 0
 
-        if isinstance(x, (list, tuple)) and all(isinstance(xi, (list, tuple)) for xi in x):
+        if isArrayMatrix(x):
             rows = len(x)
             if rows < 1:
                 raise PFARuntimeException("too few rows/cols", self.errcodeBase + 0, self.name, pos)
@@ -475,7 +493,7 @@ class Truncate(LibFcn):
                 raise PFARuntimeException("ragged columns", self.errcodeBase + 1, self.name, pos)
             return x[:keep]
 
-        elif isinstance(x, dict) and all(isinstance(x[i], dict) for i in x.keys()):
+        elif isinstance(x, mapTypes) and all(isinstance(x[i], mapTypes) for i in x.keys()):
             rows = rowKeys(x)
             cols = colKeys(x)
             if len(rows) < 1 or len(cols) < 1:
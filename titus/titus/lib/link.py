@@ -25,7 +25,7 @@ from titus.signature import Sig
 from titus.signature import Sigs
 from titus.datatype import *
 from titus.errors import *
-from titus.util import callfcn, div
+from titus.util import callfcn, div, arrayTypes, mapTypes
 import titus.P as P
 from titus.lib.array import argLowestN
 from titus.lib.prob.dist import Chi2Distribution
@@ -68,12 +68,12 @@ class SoftMax(LibFcn):
 provide(SoftMax())
 
 def unwrapForNorm(x, func):
-    if isinstance(x, dict):
+    if isinstance(x, mapTypes):
         xx = x.copy()
         for key, val in zip(x.keys(), x.values()):
             xx[key] = float(func(val))
         return xx
-    elif isinstance(x, (tuple, list)):
+    elif isinstance(x, arrayTypes):
         xx = x[:]
         for i, val in enumerate(x):
             xx[i] = float(func(val))
@@ -18,6 +18,7 @@
 # limitations under the License.
 
 import base64
+import heapq
 import io
 import json
 
@@ -236,7 +237,8 @@ class Argmax(LibFcn):
         if len(m) == 0:
             raise PFARuntimeException("empty map", self.errcodeBase + 0, self.name, pos)
         else:
-            return argHighestN(m, 1, lambda x, y: compare(jsonNodeToAvroType(paramTypes[0]).values, x, y) < 0)[0]
+            key = sortKeyFromJson(paramTypes[0], "values")
+            return max(sorted(m), key=lambda k: key(m[k]))
 provide(Argmax())
 
 class Argmin(LibFcn):
@@ -247,7 +249,8 @@ class Argmin(LibFcn):
         if len(m) == 0:
             raise PFARuntimeException("empty map", self.errcodeBase + 0, self.name, pos)
         else:
-            return argLowestN(m, 1, lambda x, y: compare(jsonNodeToAvroType(paramTypes[0]).values, x, y) < 0)[0]
+            key = sortKeyFromJson(paramTypes[0], "values")
+            return min(sorted(m), key=lambda k: key(m[k]))
 provide(Argmin())
 
 class ArgmaxLT(LibFcn):
@@ -282,7 +285,8 @@ class ArgmaxN(LibFcn):
         elif n < 0:
             raise PFARuntimeException("n < 0", self.errcodeBase + 1, self.name, pos)
         else:
-            return argHighestN(m, n, lambda x, y: compare(jsonNodeToAvroType(paramTypes[0]).values, x, y) < 0)
+            key = sortKeyFromJson(paramTypes[0], "values")
+            return heapq.nlargest(n, sorted(m), key=lambda k: key(m[k]))
 provide(ArgmaxN())
 
 class ArgminN(LibFcn):
@@ -295,7 +299,8 @@ class ArgminN(LibFcn):
         elif n < 0:
             raise PFARuntimeException("n < 0", self.errcodeBase + 1, self.name, pos)
         else:
-            return argLowestN(m, n, lambda x, y: compare(jsonNodeToAvroType(paramTypes[0]).values, x, y) < 0)
+            key = sortKeyFromJson(paramTypes[0], "values")
+            return heapq.nsmallest(n, sorted(m), key=lambda k: key(m[k]))
 provide(ArgminN())
 
 class ArgmaxNLT(LibFcn):
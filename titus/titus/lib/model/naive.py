@@ -23,7 +23,7 @@ from titus.signature import Sig
 from titus.signature import Sigs
 from titus.datatype import *
 from titus.errors import *
-from titus.util import callfcn, div
+from titus.util import callfcn, div, arrayTypes
 import titus.P as P
 import math
 tiny = 2.2250738585072014e-308
@@ -42,7 +42,7 @@ class Gaussian(LibFcn):
     errcodeBase = 10000
     def __call__(self, state, scope, pos, paramTypes, datum, classModel):
         ll = 0.0
-        if isinstance(datum, list) or isinstance(datum, tuple):
+        if isinstance(datum, arrayTypes):
             if len(datum) != len(classModel):
                 raise PFARuntimeException("datum and classModel misaligned", self.errcodeBase + 0, self.name, pos)
             for i, x in enumerate(datum):
@@ -25,7 +25,7 @@ from titus.signature import Sig
 from titus.signature import Sigs
 from titus.datatype import *
 from titus.errors import *
-from titus.util import callfcn, div
+from titus.util import callfcn, div, ArrayView
 import titus.P as P
 from titus.lib.array import argLowestN
 
@@ -35,6 +35,24 @@ def provide(fcn):
 
 prefix = "model.neighbor."
 
+def np():
+    import numpy
+    return numpy
+
+blockSize = 1048576
+
+def squaredDistances(datum, codebook):
+    """Squared Euclidean distances from ``datum`` to every row of a two-dimensional titus.util.ArrayView, computed by NumPy a block of rows at a time (so that a memory-mapped codebook is never copied as a whole)."""
+    numpy = np()
+    array = codebook.array
+    d = numpy.asarray(datum, dtype=numpy.double)
+    out = numpy.empty(array.shape[0], dtype=numpy.double)
+    step = max(1, blockSize // max(1, array.shape[1]))
+    for start in xrange(0, array.shape[0], step):
+        diff = array[start:start + step] - d
+        out[start:start + step] = numpy.einsum("ij,ij->i", diff, diff)
+    return out.tolist()
+
 #################################################################### 
 
 class Mean(LibFcn):
@@ -51,6 +69,9 @@ class Mean(LibFcn):
         if len(points) == 0:
             raise PFARuntimeException("not enough points", self.errcodeBase + 0, self.name, pos)
 
+        if weight is None and isinstance(points, ArrayView) and points.array.ndim == 2:
+            return np().mean(points.array, axis=0, dtype=np().double).tolist()
+
         dimensions = len(points[0])
         numer = [0.0] * dimensions
         denom = [0.0] * dimensions
@@ -89,12 +110,16 @@ class NearestK(LibFcn):
         else:
             if len(codebook) == 0:
                 return []
+            elif isinstance(codebook, ArrayView) and codebook.array.ndim == 2:
+                if codebook.array.shape[1] != len(datum):
+                    raise PFARuntimeException("inconsistent dimensionality", self.errcodeBase + 1, self.name, pos)
+                distances = squaredDistances(datum, codebook)
             else:
                 dimensions = len(datum)
                 for x in codebook:
                     if len(x) != dimensions:
                         raise PFARuntimeException("inconsistent dimensionality", self.errcodeBase + 1, self.name, pos)
-            distances = [sum((di - xi)**2 for di, xi in zip(datum, x)) for x in codebook]
+                distances = [sum((di - xi)**2 for di, xi in zip(datum, x)) for x in codebook]
 
         indexes = argLowestN(distances, k, lambda a, b: a < b)
         return [codebook[i] for i in indexes]
@@ -111,6 +136,8 @@ class BallR(LibFcn):
         if len(args) == 1:
             metric, = args
             distances = [callfcn(state, scope, metric, [datum, x]) for x in codebook]
+        elif isinstance(codebook, ArrayView) and codebook.array.ndim == 2 and codebook.array.shape[1] == len(datum):
+            distances = map(math.sqrt, squaredDistances(datum, codebook))
         else:
             distances = [math.sqrt(sum((di - xi)**2 for di, xi in zip(datum, x))) for x in codebook]
         return [x for x, d in zip(codebook, distances) if d < r]
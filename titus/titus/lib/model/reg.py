@@ -31,7 +31,7 @@ from titus.signature import Lifespan
 from titus.signature import PFAVersion
 from titus.datatype import *
 from titus.errors import *
-from titus.util import callfcn, div, flatten
+from titus.util import callfcn, div, flatten, arrayTypes, mapTypes
 import titus.P as P
 from titus.lib.array import argLowestN
 from titus.lib.prob.dist import Chi2Distribution
@@ -55,8 +55,8 @@ class Linear(LibFcn):
         coeffType = [x["type"] for x in paramTypes[1]["fields"] if x["name"] == "coeff"][0]
 
         if coeffType == {'items': 'double', 'type': 'array'}: #sig1
-            coeff = model["coeff"] + [model["const"]]
-            datum = np().array(datum + [1.0])
+            coeff = np().append(np().asarray(model["coeff"], dtype=np().double), model["const"])
+            datum = np().append(np().asarray(datum, dtype=np().double), 1.0)
             if len(datum) != len(coeff):
                 raise PFARuntimeException("misaligned coeff", self.errcodeBase + 0, self.name, pos)
             return float(np().dot(coeff, datum))
@@ -71,9 +71,9 @@ class Linear(LibFcn):
             elif len(model["const"]) == 0:
                 return []
             else:
-                coeff = np().array(model["coeff"])
-                const = np().array(model["const"])
-                datum = np().array(datum + [1.0])
+                coeff = np().asarray(model["coeff"], dtype=np().double)
+                const = np().asarray(model["const"], dtype=np().double)
+                datum = np().append(np().asarray(datum, dtype=np().double), 1.0)
                 coeff = np().vstack((coeff.T, const))
                 return map(float, np().dot(coeff.T, datum))
 
@@ -201,7 +201,7 @@ class GaussianProcess(LibFcn):
             if any(len(t["to"]) != n_outputs for t in table):
                 raise PFARuntimeException("table outputs must all have the same number of dimensions", self.errcodeBase + 4, self.name, pos)
 
-            if isinstance(x, (list, tuple)):
+            if isinstance(x, arrayTypes):
                 if any(math.isnan(xi) or math.isinf(xi) for xi in x):
                     raise PFARuntimeException("x is not finite", self.errcodeBase + 5, self.name, pos)
             else:
@@ -212,7 +212,7 @@ class GaussianProcess(LibFcn):
                 raise PFARuntimeException("table value is not finite", self.errcodeBase + 6, self.name, pos)
 
         else:
-            if isinstance(x, (list, tuple)):
+            if isinstance(x, arrayTypes):
                 if any(math.isnan(xi) or math.isinf(xi) for xi in x):
                     raise PFARuntimeException("x is not finite", self.errcodeBase + 5, self.name, pos)
             else:
@@ -233,7 +233,7 @@ class GaussianProcess(LibFcn):
         if n_samples < 1:
             raise PFARuntimeException("table must have at least 1 entry", self.errcodeBase + 0, self.name, pos)
                 
-        if isinstance(x, (list, tuple)):
+        if isinstance(x, arrayTypes):
             n_features = len(x)
             if n_features < 1:
                 raise PFARuntimeException("x must have at least 1 feature", self.errcodeBase + 1, self.name, pos)
@@ -383,7 +383,7 @@ class Residual(LibFcn):
                 Sig([{"observation": P.Map(P.Double())}, {"prediction": P.Map(P.Double())}], P.Map(P.Double()), Lifespan(None, PFAVersion(0, 7, 2), PFAVersion(0, 9, 0), "use test.residual instead"))])
     errcodeBase = 31020
     def __call__(self, state, scope, pos, paramTypes, observation, prediction):
-        if isinstance(observation, dict):
+        if isinstance(observation, mapTypes):
             if len(observation) != len(prediction):
                 raise PFARuntimeException("misaligned prediction", self.errcodeBase + 0, self.name, pos)
             result = {}
@@ -394,7 +394,7 @@ class Residual(LibFcn):
                     raise PFARuntimeException("misaligned prediction", self.errcodeBase + 0, self.name, pos)
             return result
 
-        elif isinstance(observation, (tuple, list)):
+        elif isinstance(observation, arrayTypes):
             try:
                 result = [float(o - p) for o, p in zip(observation, prediction)]
             except:
@@ -413,7 +413,7 @@ class Pull(LibFcn):
                 Sig([{"observation": P.Map(P.Double())}, {"prediction": P.Map(P.Double())}, {"uncertainty": P.Map(P.Double())}], P.Map(P.Double()), Lifespan(None, PFAVersion(0, 7, 2), PFAVersion(0, 9, 0), "use test.pull instead"))])
     errcodeBase = 31030
     def __call__(self, state, scope, pos, paramTypes, observation, prediction, uncertainty):
-        if isinstance(observation, dict):
+        if isinstance(observation, mapTypes):
             if len(observation) != len(prediction):
                 raise PFARuntimeException("misaligned prediction", self.errcodeBase + 0, self.name, pos)
             if len(observation) != len(uncertainty):
@@ -434,7 +434,7 @@ class Pull(LibFcn):
                     result[k] = float("nan")
             return result
 
-        elif isinstance(observation, (tuple, list)):
+        elif isinstance(observation, arrayTypes):
             if len(observation) != len(prediction):
                 raise PFARuntimeException("misaligned prediction", self.errcodeBase + 0, self.name, pos)
             if len(observation) != len(uncertainty):
@@ -452,7 +452,7 @@ class Mahalanobis(LibFcn):
                 Sig([{"observation": P.Map(P.Double())}, {"prediction": P.Map(P.Double())}, {"covariance": P.Map(P.Map(P.Double()))}], P.Double(), Lifespan(None, PFAVersion(0, 7, 2), PFAVersion(0, 9, 0), "use test.mahalanobis instead"))])
     errcodeBase = 31040
     def __call__(self, state, scope, pos, paramTypes, observation, prediction, covariance):
-        if isinstance(observation, (tuple, list)):
+        if isinstance(observation, arrayTypes):
             if (len(observation) < 1):
                 raise PFARuntimeException("too few rows/cols", self.errcodeBase + 0, self.name, pos)
             if (len(observation) != len(prediction)):
@@ -492,7 +492,7 @@ class UpdateChi2(LibFcn):
     def __call__(self, state, scope, pos, paramTypes, pull, state_):
         if isinstance(pull, float):
             return update(pull*pull, state_)
-        elif isinstance(pull, (tuple, list)):
+        elif isinstance(pull, arrayTypes):
             return update(sum([y**2 for y in pull]), state_)
         else:
             return update(sum([y**2 for y in pull.values()]), state_)
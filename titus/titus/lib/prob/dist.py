@@ -17,6 +17,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import bisect
 import math
 
 from titus.fcn import Fcn
@@ -200,7 +201,7 @@ class Chi2PDF(LibFcn):
         elif x <= 0.0:
             return 0.0
         else:
-            return Chi2Distribution(df, self.errcodeBase + 0, self.name, pos).PDF(x)
+            return distribution(state, Chi2Distribution, df, self.errcodeBase + 0, self.name, pos).PDF(x)
 provide(Chi2PDF())
 
 class Chi2CDF(LibFcn):
@@ -218,7 +219,7 @@ class Chi2CDF(LibFcn):
             else:
                 return 0.0
         else:
-            return Chi2Distribution(df, self.errcodeBase + 0, self.name, pos).CDF(x)
+            return distribution(state, Chi2Distribution, df, self.errcodeBase + 0, self.name, pos).CDF(x)
 provide(Chi2CDF())
 
 class Chi2QF(LibFcn):
@@ -237,7 +238,7 @@ class Chi2QF(LibFcn):
         elif p == 0.0:
             return 0.0
         else:
-            return Chi2Distribution(df, self.errcodeBase + 0, self.name, pos).QF(p)
+            return distribution(state, Chi2Distribution, df, self.errcodeBase + 0, self.name, pos).QF(p)
 provide(Chi2QF())
 
 ################ Poisson #######################################
@@ -256,7 +257,7 @@ class PoissonPDF(LibFcn):
         elif x < 0:
             return 0.0
         else:
-            return PoissonDistribution(lamda, self.errcodeBase + 0, self.name, pos).PDF(x)
+            return distribution(state, PoissonDistribution, lamda, self.errcodeBase + 0, self.name, pos).PDF(x)
 provide(PoissonPDF())
 
 class PoissonCDF(LibFcn):
@@ -274,7 +275,7 @@ class PoissonCDF(LibFcn):
             else:
                 return 0.0
         else:
-            return PoissonDistribution(lamda, self.errcodeBase + 0, self.name, pos).CDF(x)
+            return distribution(state, PoissonDistribution, lamda, self.errcodeBase + 0, self.name, pos).CDF(x)
 provide(PoissonCDF())
 
 class PoissonQF(LibFcn):
@@ -293,7 +294,7 @@ class PoissonQF(LibFcn):
         elif p == 0:
             return 0.0
         else:
-            return PoissonDistribution(lamda, self.errcodeBase + 0, self.name, pos).QF(p)
+            return distribution(state, PoissonDistribution, lamda, self.errcodeBase + 0, self.name, pos).QF(p)
 provide(PoissonQF())
 
 ################ Gamma
@@ -321,7 +322,7 @@ class GammaPDF(LibFcn):
             else:
                 return 0.0
         else:
-            return GammaDistribution(shape, scale, self.errcodeBase + 0, self.name, pos).PDF(x)
+            return distribution(state, GammaDistribution, shape, scale, self.errcodeBase + 0, self.name, pos).PDF(x)
 provide(GammaPDF())
 
 class GammaCDF(LibFcn):
@@ -341,7 +342,7 @@ class GammaCDF(LibFcn):
         elif x < 0:
             return 0.0
         else:
-            return GammaDistribution(shape, scale, self.errcodeBase + 0, self.name, pos).CDF(x)
+            return distribution(state, GammaDistribution, shape, scale, self.errcodeBase + 0, self.name, pos).CDF(x)
 provide(GammaCDF())
 
 class GammaQF(LibFcn):
@@ -358,7 +359,7 @@ class GammaQF(LibFcn):
         elif p == 0.0:
             return 0.0
         else:
-            return GammaDistribution(shape, scale, self.errcodeBase + 0, self.name, pos).QF(p)
+            return distribution(state, GammaDistribution, shape, scale, self.errcodeBase + 0, self.name, pos).QF(p)
 provide(GammaQF())
 
 ################ Beta
@@ -374,7 +375,7 @@ class BetaPDF(LibFcn):
         elif x <= 0 or x >= 1:
             return 0.0
         else:
-            return BetaDistribution(shape1, shape2, self.errcodeBase + 0, self.name, pos).PDF(x)
+            return distribution(state, BetaDistribution, shape1, shape2, self.errcodeBase + 0, self.name, pos).PDF(x)
 provide(BetaPDF())
 
 class BetaCDF(LibFcn):
@@ -391,7 +392,7 @@ class BetaCDF(LibFcn):
         elif x >= 1:
             return 1.0
         else:
-            return BetaDistribution(shape1, shape2, self.errcodeBase + 0, self.name, pos).CDF(x)
+            return distribution(state, BetaDistribution, shape1, shape2, self.errcodeBase + 0, self.name, pos).CDF(x)
 provide(BetaCDF())
 
 class BetaQF(LibFcn):
@@ -408,7 +409,7 @@ class BetaQF(LibFcn):
         elif p == 0:
             return 0.0
         else:
-            return BetaDistribution(shape1, shape2, self.errcodeBase + 0, self.name, pos).QF(p)
+            return distribution(state, BetaDistribution, shape1, shape2, self.errcodeBase + 0, self.name, pos).QF(p)
 provide(BetaQF())
 
 ################ Cauchy
@@ -468,7 +469,7 @@ class FPDF(LibFcn):
         elif x <= 0:
             return 0.0
         else:
-            return FDistribution(d1, d2, self.errcodeBase + 0, self.name, pos).PDF(x)
+            return distribution(state, FDistribution, d1, d2, self.errcodeBase + 0, self.name, pos).PDF(x)
 provide(FPDF())
 
 class FCDF(LibFcn):
@@ -481,7 +482,7 @@ class FCDF(LibFcn):
         elif math.isinf(x) or math.isnan(x):
             raise PFARuntimeException("invalid input", self.errcodeBase + 1, self.name, pos)
         else:
-            return FDistribution(d1, d2, self.errcodeBase + 0, self.name, pos).CDF(x)
+            return distribution(state, FDistribution, d1, d2, self.errcodeBase + 0, self.name, pos).CDF(x)
 provide(FCDF())
 
 class FQF(LibFcn):
@@ -496,7 +497,7 @@ class FQF(LibFcn):
         elif p == 1:
             return float("inf")
         else:
-            return FDistribution(d1, d2, self.errcodeBase + 0, self.name, pos).QF(p)
+            return distribution(state, FDistribution, d1, d2, self.errcodeBase + 0, self.name, pos).QF(p)
 provide(FQF())
 
 ################ Lognormal
@@ -510,7 +511,7 @@ class LognormalPDF(LibFcn):
         elif math.isinf(x) or math.isnan(x):
             raise PFARuntimeException("invalid input", self.errcodeBase + 1, self.name, pos)
         else:
-            return LognormalDistribution(meanlog, sdlog, self.errcodeBase + 0, self.name, pos).PDF(x)
+            return distribution(state, LognormalDistribution, meanlog, sdlog, self.errcodeBase + 0, self.name, pos).PDF(x)
 provide(LognormalPDF())
 
 class LognormalCDF(LibFcn):
@@ -523,7 +524,7 @@ class LognormalCDF(LibFcn):
         elif math.isinf(x) or math.isnan(x):
             raise PFARuntimeException("invalid input", self.errcodeBase + 1, self.name, pos)
         else:
-            return LognormalDistribution(meanlog, sdlog, self.errcodeBase + 0, self.name, pos).CDF(x)
+            return distribution(state, LognormalDistribution, meanlog, sdlog, self.errcodeBase + 0, self.name, pos).CDF(x)
 provide(LognormalCDF())
 
 class LognormalQF(LibFcn):
@@ -538,7 +539,7 @@ class LognormalQF(LibFcn):
         elif p == 1:
             return float("inf")
         else:
-            return LognormalDistribution(meanlog, sdlog, self.errcodeBase + 0, self.name, pos).QF(p)
+            return distribution(state, LognormalDistribution, meanlog, sdlog, self.errcodeBase + 0, self.name, pos).QF(p)
 provide(LognormalQF())
 
 ################ T
@@ -552,7 +553,7 @@ class TPDF(LibFcn):
         elif math.isinf(x) or math.isnan(x):
             raise PFARuntimeException("invalid input", self.errcodeBase + 1, self.name, pos)
         else:
-            return TDistribution(df, self.errcodeBase + 0, self.name, pos).PDF(x)
+            return distribution(state, TDistribution, df, self.errcodeBase + 0, self.name, pos).PDF(x)
 provide(TPDF())
 
 class TCDF(LibFcn):
@@ -565,7 +566,7 @@ class TCDF(LibFcn):
         elif math.isinf(x) or math.isnan(x):
             raise PFARuntimeException("invalid input", self.errcodeBase + 1, self.name, pos)
         else:
-            return TDistribution(df, self.errcodeBase + 0, self.name, pos).CDF(x)
+            return distribution(state, TDistribution, df, self.errcodeBase + 0, self.name, pos).CDF(x)
 provide(TCDF())
 
 class TQF(LibFcn):
@@ -582,7 +583,7 @@ class TQF(LibFcn):
         elif p == 0:
             return float("-inf")
         else:
-            return TDistribution(df, self.errcodeBase + 0, self.name, pos).QF(p)
+            return distribution(state, TDistribution, df, self.errcodeBase + 0, self.name, pos).QF(p)
 provide(TQF())
 
 ################ Binomial
@@ -600,7 +601,7 @@ class BinomialPDF(LibFcn):
         elif x >= size:
             return 0.0
         else:
-            return BinomialDistribution(size, prob, self.errcodeBase + 0, self.name, pos).PDF(x)
+            return distribution(state, BinomialDistribution, size, prob, self.errcodeBase + 0, self.name, pos).PDF(x)
 provide(BinomialPDF())
 
 class BinomialCDF(LibFcn):
@@ -624,7 +625,7 @@ class BinomialCDF(LibFcn):
         elif prob == 0:
             return 1.0
         else:
-            return BinomialDistribution(size, prob, self.errcodeBase + 0, self.name, pos).CDF(x)
+            return distribution(state, BinomialDistribution, size, prob, self.errcodeBase + 0, self.name, pos).CDF(x)
 provide(BinomialCDF())
 
 class BinomialQF(LibFcn):
@@ -641,7 +642,7 @@ class BinomialQF(LibFcn):
         elif p == 0:
             return 0.0
         else:
-            return BinomialDistribution(size, prob, self.errcodeBase + 0, self.name, pos).QF(p)
+            return distribution(state, BinomialDistribution, size, prob, self.errcodeBase + 0, self.name, pos).QF(p)
 provide(BinomialQF())
 
 ################ Uniform
@@ -737,7 +738,7 @@ class HypergeometricPDF(LibFcn):
         elif x > m:
             return 0.0
         else:
-            return HypergeometricDistribution(m, n, k, self.errcodeBase + 0, self.name, pos).PDF(x)
+            return distribution(state, HypergeometricDistribution, m, n, k, self.errcodeBase + 0, self.name, pos).PDF(x)
 provide(HypergeometricPDF())
 
 class HypergeometricCDF(LibFcn):
@@ -752,7 +753,7 @@ class HypergeometricCDF(LibFcn):
         elif x > m:
             return 0.0
         else:
-            return HypergeometricDistribution(m, n, k, self.errcodeBase + 0, self.name, pos).CDF(x)
+            return distribution(state, HypergeometricDistribution, m, n, k, self.errcodeBase + 0, self.name, pos).CDF(x)
 provide(HypergeometricCDF())
 
 class HypergeometricQF(LibFcn):
@@ -765,7 +766,7 @@ class HypergeometricQF(LibFcn):
         elif not (0.0 <= p <= 1.0):
             raise PFARuntimeException("invalid input", self.errcodeBase + 1, self.name, pos)
         else:
-            return HypergeometricDistribution(m, n, k, self.errcodeBase + 0, self.name, pos).QF(p)
+            return distribution(state, HypergeometricDistribution, m, n, k, self.errcodeBase + 0, self.name, pos).QF(p)
 provide(HypergeometricQF())
 
 ################ Weibull
@@ -827,7 +828,7 @@ class NegativeBinomialPDF(LibFcn):
         elif size == 0:
             return 0.0
         else:
-            return NegativeBinomialDistribution(size, prob, self.errcodeBase + 0, self.name, pos).PDF(x)
+            return distribution(state, NegativeBinomialDistribution, size, prob, self.errcodeBase + 0, self.name, pos).PDF(x)
 provide(NegativeBinomialPDF())
 
 class NegativeBinomialCDF(LibFcn):
@@ -846,7 +847,7 @@ class NegativeBinomialCDF(LibFcn):
         elif x < 0:
             return 0.0
         else:
-            return NegativeBinomialDistribution(size, prob, self.errcodeBase + 0, self.name, pos).CDF(x)
+            return distribution(state, NegativeBinomialDistribution, size, prob, self.errcodeBase + 0, self.name, pos).CDF(x)
 provide(NegativeBinomialCDF())
 
 class NegativeBinomialQF(LibFcn):
@@ -865,13 +866,101 @@ class NegativeBinomialQF(LibFcn):
         elif p == 1:
             return float("inf")
         else:
-            return NegativeBinomialDistribution(size, prob, self.errcodeBase + 0, self.name, pos).QF(p)
+            return distribution(state, NegativeBinomialDistribution, size, prob, self.errcodeBase + 0, self.name, pos).QF(p)
 provide(NegativeBinomialQF())
 
 #########################################################################################
 ##### The actual distribution functions #################################################
 #########################################################################################
 
+def distribution(state, cls, *args):
+    """Get a distribution object from the running engine's cache (``state.distributions``), constructing it on a miss.
+
+    Parameters are nearly always constant model values, so caching the object by its class and constructor arguments lets each call site reuse the cumulative tables, brackets, and quantiles that the object accumulates. Without an engine (e.g. when the optimizer evaluates a call on literals), the object is simply constructed.
+
+    :type state: titus.genpy.ExecutionState or ``None``
+    :param state: execution state of the running engine
+    :type cls: class
+    :param cls: distribution class, such as ``PoissonDistribution``
+    :type args: tuple
+    :param args: constructor arguments (parameters, function name, error code, and source position)
+    :rtype: object
+    :return: instance of ``cls``
+    """
+    if state is None or getattr(state, "distributions", None) is None:
+        return cls(*args)
+    else:
+        return state.distributions((cls, tuple(type(x) for x in args)) + args, lambda: cls(*args))
+
+class CumulativeTable(object):
+    """Cumulative probabilities of a discrete distribution at 0, 1, 2, ..., extended only as far as the queries need and searched by bisection."""
+
+    def __init__(self, step):
+        """:type step: callable of ``k`` and the previous cumulative value (``0.0`` for ``k == 0``)
+        :param step: returns the cumulative value at ``k``; the values must be non-decreasing
+        """
+        self.step = step
+        self.values = []
+
+    def _extend(self):
+        values = self.values
+        if len(values) == 0:
+            values.append(self.step(0, 0.0))
+        else:
+            values.append(self.step(len(values), values[-1]))
+
+    def at(self, k):
+        """Cumulative value at non-negative integer ``k``."""
+        while len(self.values) <= k:
+            self._extend()
+        return self.values[k]
+
+    def firstAbove(self, p):
+        """Smallest ``k`` whose cumulative value is greater than ``p`` (the result of stepping through the CDF ``while cdf <= p``)."""
+        while len(self.values) == 0 or self.values[-1] <= p:
+            self._extend()
+        return bisect.bisect_right(self.values, p)
+
+    def firstAtLeast(self, p):
+        """Smallest ``k`` whose cumulative value is at least ``p`` (the result of stepping through the CDF ``while cdf < p``)."""
+        while len(self.values) == 0 or self.values[-1] < p:
+            self._extend()
+        return bisect.bisect_left(self.values, p)
+
+class IterativeDistribution(object):
+    """Base class for distributions whose QF is an iterative search: remembers computed quantiles and the CDF along the bracketing steps."""
+
+    maxQuantiles = 64
+
+    def quantile(self, p, search):
+        """Return ``search(p)``, remembering the result for the next call with the same ``p``."""
+        if p != p:
+            return search(p)
+        quantiles = self.__dict__.setdefault("quantiles", {})
+        out = quantiles.get(p)
+        if out is None:
+            out = search(p)
+            if len(quantiles) >= self.maxQuantiles:
+                quantiles.clear()
+            quantiles[p] = out
+        return out
+
+    def bracket(self, start, p, below):
+        """Double ``start`` until the CDF is at least ``p`` (or at most ``p`` if ``below``) and return that point.
+
+        The CDF at each doubling is remembered, so later searches find their bracket without evaluating the CDF again.
+        """
+        steps = self.__dict__.setdefault("brackets", {}).setdefault(start, [])
+        x = start
+        i = 0
+        while True:
+            if i == len(steps):
+                steps.append(self.CDF(x))
+            if (below and steps[i] <= p) or (not below and steps[i] >= p):
+                return x
+            x *= 2.0
+            i += 1
+
 ################### Gaussian
 class GaussianDistribution(object):
     def __init__(self, mu, sigma, name, errcodeBase, pos):
@@ -984,6 +1073,7 @@ class Chi2Distribution(object):
         self.DOF     = DOF
         if (self.DOF < 0):
             raise PFARuntimeException("invalid parameterization", self.errcodeBase + 0, self.name, self.pos)
+        self.gamma = GammaDistribution(self.DOF/2.0, 2.0, self.name, self.errcodeBase, self.pos)
 
     def PDF(self,x):
         if (self.DOF == 0) and (x != 0.0):
@@ -995,7 +1085,7 @@ class Chi2Distribution(object):
         elif (x < 0.0):
             return 0.0
         else:
-            return GammaDistribution(self.DOF/2.0, 2.0, self.name, self.errcodeBase, self.pos).PDF(x)
+            return self.gamma.PDF(x)
 
     def CDF(self,x):
         if math.isnan(x):
@@ -1007,7 +1097,7 @@ class Chi2Distribution(object):
         elif (x <= 0.0):
             return 0.0
         else:
-            return GammaDistribution(self.DOF/2.0, 2.0, self.name, self.errcodeBase, self.pos).CDF(x)
+            return self.gamma.CDF(x)
 
     def QF(self,p):
         if (p > 1.0) or (p < 0.0):
@@ -1019,7 +1109,7 @@ class Chi2Distribution(object):
         elif (p == 0.0):
             return 0.0
         else:
-            return GammaDistribution(self.DOF/2.0, 2.0, self.name, self.errcodeBase, self.pos).QF(p)
+            return self.gamma.QF(p)
 
 ################### Poisson
 class PoissonDistribution(object):
@@ -1068,15 +1158,12 @@ class PoissonDistribution(object):
             return 0.0
         else:
             # step through CDFs until we find the right one
-            x = 0
-            p0 = 0.0
-            while (p0 <= p):
-                p0 = self.CDF(x)
-                x += 1
-            return x - 1
+            if not hasattr(self, "table"):
+                self.table = CumulativeTable(lambda x, p0: max(p0, self.CDF(x)))
+            return self.table.firstAbove(p)
 
 ################### Gamma
-class GammaDistribution(object):
+class GammaDistribution(IterativeDistribution):
     def __init__(self, shape, scale, name, errcodeBase, pos):
         self.name = name
         self.errcodeBase = errcodeBase
@@ -1130,24 +1217,27 @@ class GammaDistribution(object):
         elif (p == 0.0):
             return 0.0
         else:
-            y = self.alpha*self.beta
-            y_old = y
-            for i in range(0,100):
-                h = (self.CDF(y_old) - p)/self.PDF(y_old)
-                if y_old - h <= 0.0:
-                    y_new = y_old / 2.0
-                else:
-                    y_new = y_old - h
-                if abs(y_new) <= self.epsilon:
-                    y_new = y_old/10.0
-                    h = y_old - y_new
-                if abs(h) < math.sqrt(self.epsilon):
-                    break
-                y_old = y_new
-            return y_new
+            return self.quantile(p, self.newtonQF)
+
+    def newtonQF(self, p):
+        y = self.alpha*self.beta
+        y_old = y
+        for i in range(0,100):
+            h = (self.CDF(y_old) - p)/self.PDF(y_old)
+            if y_old - h <= 0.0:
+                y_new = y_old / 2.0
+            else:
+                y_new = y_old - h
+            if abs(y_new) <= self.epsilon:
+                y_new = y_old/10.0
+                h = y_old - y_new
+            if abs(h) < math.sqrt(self.epsilon):
+                break
+            y_old = y_new
+        return y_new
 
 ################### Beta
-class BetaDistribution(object):
+class BetaDistribution(IterativeDistribution):
     def __init__(self, alpha, beta, name, errcodeBase, pos):
         self.name = name
         self.errcodeBase = errcodeBase
@@ -1198,7 +1288,7 @@ class BetaDistribution(object):
         elif (p == 0.0):
             return 0.0
         else:
-            return inverseIncompleteBetaFunction(p,self.alpha,self.beta)
+            return self.quantile(p, lambda p: inverseIncompleteBetaFunction(p,self.alpha,self.beta))
 
 ################### Cauchy
 class CauchyDistribution(object):
@@ -1231,7 +1321,7 @@ class CauchyDistribution(object):
 
 ################### F
 # from: http://www.stat.tamu.edu/~jnewton/604/chap3.pdf
-class FDistribution(object):
+class FDistribution(IterativeDistribution):
     def __init__(self, upperDOF, lowerDOF, name, errcodeBase, pos):
         self.name = name
         self.errcodeBase = errcodeBase
@@ -1276,22 +1366,23 @@ class FDistribution(object):
         elif (p == 0.0):
             return 0.0
         else:
-            low = 0.0
-            high = 1.0
-            while self.CDF(high) < p:
-                high *= 2.0
-            diff = None
-            while diff is None or abs(diff) > self.epsilon:
-                mid = (low + high) / 2.0
-                diff = self.CDF(mid) - p
-                if diff > 0:
-                    high = mid
-                else:
-                    low = mid
-            return mid
+            return self.quantile(p, self.bisectionQF)
+
+    def bisectionQF(self, p):
+        low = 0.0
+        high = self.bracket(1.0, p, False)
+        diff = None
+        while diff is None or abs(diff) > self.epsilon:
+            mid = (low + high) / 2.0
+            diff = self.CDF(mid) - p
+            if diff > 0:
+                high = mid
+            else:
+                low = mid
+        return mid
 
 ################### Lognormal
-class LognormalDistribution(object):
+class LognormalDistribution(IterativeDistribution):
     def __init__(self, meanlog, sdlog, name, errcodeBase, pos):
         self.name = name
         self.errcodeBase = errcodeBase
@@ -1302,6 +1393,7 @@ class LognormalDistribution(object):
         self.maxIter = 100
         if self.sigma <= 0.0:
             raise PFARuntimeException("invalid parameterization", self.errcodeBase + 0, self.name, self.pos)
+        self.standard = GaussianDistribution(0.0, 1.0, self.name, self.errcodeBase, self.pos)
 
     def PDF(self, x):
         if x <= 0.0:
@@ -1315,7 +1407,7 @@ class LognormalDistribution(object):
         if x <= 0.0:
             return 0.0
         else:
-            return GaussianDistribution(0.0, 1.0, self.name, self.errcodeBase, self.pos).CDF((math.log(x) - self.mu)/self.sigma)
+            return self.standard.CDF((math.log(x) - self.mu)/self.sigma)
 
     def QF(self, p):
         if math.isnan(p):
@@ -1327,19 +1419,20 @@ class LognormalDistribution(object):
         elif (p == 1.0):
             return float("inf")
         else:
-            low = 0.0
-            high = 1.0
-            while self.CDF(high) < p:
-                high *= 2.0
-            diff = None
-            while diff is None or abs(diff) > self.epsilon:
-                mid = (low + high) / 2.0
-                diff = self.CDF(mid) - p
-                if diff > 0:
-                    high = mid
-                else:
-                    low = mid
-            return mid
+            return self.quantile(p, self.bisectionQF)
+
+    def bisectionQF(self, p):
+        low = 0.0
+        high = self.bracket(1.0, p, False)
+        diff = None
+        while diff is None or abs(diff) > self.epsilon:
+            mid = (low + high) / 2.0
+            diff = self.CDF(mid) - p
+            if diff > 0:
+                high = mid
+            else:
+                low = mid
+        return mid
 
             # # Using Newton-Raphson algorithm
             # if p <= .001:
@@ -1358,7 +1451,7 @@ class LognormalDistribution(object):
             # return p2
 
 ################### Student's T
-class TDistribution(object):
+class TDistribution(IterativeDistribution):
     def __init__(self, DOF, name, errcodeBase, pos):
         self.name = name
         self.errcodeBase = errcodeBase
@@ -1395,21 +1488,20 @@ class TDistribution(object):
         elif (p == 0.0):
             return float("-inf")
         else:
-            low = -1.0
-            high = 1.0
-            while self.CDF(low) > p:
-                low *= 2.0
-            while self.CDF(high) < p:
-                high *= 2.0
-            diff = None
-            while diff is None or abs(diff) > self.epsilon:
-                mid = (low + high) / 2.0
-                diff = self.CDF(mid) - p
-                if diff > 0:
-                    high = mid
-                else:
-                    low = mid
-            return mid
+            return self.quantile(p, self.bisectionQF)
+
+    def bisectionQF(self, p):
+        low = self.bracket(-1.0, p, True)
+        high = self.bracket(1.0, p, False)
+        diff = None
+        while diff is None or abs(diff) > self.epsilon:
+            mid = (low + high) / 2.0
+            diff = self.CDF(mid) - p
+            if diff > 0:
+                high = mid
+            else:
+                low = mid
+        return mid
 
             # # Using Newton-Raphson algorithm
             # if p <= .001:
@@ -1475,12 +1567,9 @@ class BinomialDistribution(object):
             return 0.0
         elif (p > 0.0) and (p < 1.0):
             # step through CDFs until we find the right one
-            x = 0
-            p0 = 0.0
-            while (p0 < p):
-                p0 = p0 + self.PDF(x)
-                x += 1
-            return x - 1
+            if not hasattr(self, "table"):
+                self.table = CumulativeTable(lambda x, p0: p0 + self.PDF(x))
+            return self.table.firstAtLeast(p)
         else:
             return 0.0
 
@@ -1614,12 +1703,9 @@ class HypergeometricDistribution(object):
             return self.n_drawn
         else:
             # step through CDFs until we find the right one
-            x = 0
-            p0 = 0.0
-            while (p0 <= p):
-                p0 = p0 + self.PDF(x)
-                x += 1
-            return x - 1
+            if not hasattr(self, "table"):
+                self.table = CumulativeTable(lambda x, p0: p0 + self.PDF(x))
+            return self.table.firstAbove(p)
 
 ################### Weibull
 class WeibullDistribution(object):
@@ -1680,6 +1766,8 @@ class NegativeBinomialDistribution(object):
         self.prob = p
         if (p > 1.0) or (p <= 0.0) or (self.n < 0.0):
             raise PFARuntimeException("invalid parameterization", self.errcodeBase + 0, self.name, self.pos)
+        # cumulative sums of the PDF at 0.0, 1.0, 2.0, ..., shared by the CDF and the QF
+        self.table = CumulativeTable(lambda x, s: s + self.PDF(float(x)))
 
     def PDF(self, x):
         if (math.isnan(x)):
@@ -1708,10 +1796,11 @@ class NegativeBinomialDistribution(object):
             return float("nan")
         elif (self.n == 0.0) and (x == 0.0):
             return 1.0
-        val = 0.0
-        for i in range(0, int(math.floor(x + 1.0))):
-            val = val + self.PDF(float(i))
-        return val
+        count = int(math.floor(x + 1.0))
+        if count <= 0:
+            return 0.0
+        else:
+            return self.table.at(count - 1)
 
     def QF(self, p):
         # CDF SEEMS MORE ACCURATE NOW, REVISIT
@@ -1751,9 +1840,4 @@ class NegativeBinomialDistribution(object):
             if w > 100000:
                 return w
             else:  # do the step-through-CDF method
-                x = 0.0
-                s = 0.0
-                while (s <= p):
-                    s = s + self.PDF(x)
-                    x += 1
-                return x - 1
+                return float(self.table.firstAbove(p))
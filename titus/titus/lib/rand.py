@@ -36,6 +36,116 @@ def provide(fcn):
 
 prefix = "rand."
 
+########################################################### bulk random number generator backend
+
+class BulkRandom(object):
+    """Engine random number generator backed by a NumPy ``RandomState``, selected with the ``rng: numpy`` engine option.
+
+    It provides the subset of ``random.Random`` that library functions use, drawing uniform and Gaussian deviates in buffered blocks, and bulk methods (``integers``, ``histogramIndex``, ``sampleIndexes``) for the array, string, and histogram functions. Each instance of an engine gets its own stream, seeded by ``randseed`` and the instance number, so results are deterministic for a given ``randseed``.
+    """
+
+    bufferSize = 1024
+
+    def __init__(self, randseed, instance):
+        """:type randseed: integer or ``None``
+        :param randseed: engine's random seed; ``None`` seeds from the operating system
+        :type instance: non-negative integer
+        :param instance: instance number of the engine
+        """
+        import numpy
+        self.numpy = numpy
+        if randseed is None:
+            self.state = numpy.random.RandomState()
+        else:
+            self.state = numpy.random.RandomState([randseed & 0xffffffff, (randseed >> 32) & 0xffffffff, instance])
+        self.doubles = []
+        self.doublesIndex = 0
+        self.normals = []
+        self.normalsIndex = 0
+
+    def random(self):
+        """Uniform deviate in [0, 1)."""
+        if self.doublesIndex == len(self.doubles):
+            self.doubles = self.state.random_sample(self.bufferSize).tolist()
+            self.doublesIndex = 0
+        out = self.doubles[self.doublesIndex]
+        self.doublesIndex += 1
+        return out
+
+    def getrandbits(self, k):
+        """Non-negative integer with ``k`` random bits."""
+        out = 0
+        for word in self.state.randint(0, 2**16, size=(k + 15) // 16).tolist():
+            out = (out << 16) | word
+        return out >> (-k % 16)
+
+    def randint(self, a, b):
+        """Integer in [a, b], including both end points."""
+        n = b - a + 1
+        if n <= 2**53:
+            return a + int(self.random() * n)
+        else:
+            k = n.bit_length()
+            r = self.getrandbits(k)
+            while r >= n:
+                r = self.getrandbits(k)
+            return a + r
+
+    def uniform(self, a, b):
+        """Uniform deviate between ``a`` and ``b``."""
+        return a + (b - a) * self.random()
+
+    def gauss(self, mu, sigma):
+        """Gaussian deviate with mean ``mu`` and standard deviation ``sigma``."""
+        if self.normalsIndex == len(self.normals):
+            self.normals = self.state.standard_normal(self.bufferSize).tolist()
+            self.normalsIndex = 0
+        out = self.normals[self.normalsIndex]
+        self.normalsIndex += 1
+        return mu + sigma * out
+
+    def integers(self, low, high, size):
+        """List of ``size`` integers in [low, high), excluding the upper end point."""
+        if -2**63 <= low and high <= 2**63 - 1:
+            return self.state.randint(low, high, size=size, dtype=self.numpy.int64).tolist()
+        else:
+            return [self.randint(low, high - 1) for x in xrange(size)]
+
+    def sampleIndexes(self, n, size):
+        """List of ``size`` distinct indexes into a population of ``n`` items, in random order."""
+        return self.state.choice(n, size, replace=False).tolist()
+
+    def sample(self, population, size):
+        """List of ``size`` distinct items from ``population``, in random order."""
+        return [population[i] for i in self.sampleIndexes(len(population), size)]
+
+    def shuffle(self, x):
+        """Shuffle list ``x`` in place."""
+        x[:] = [x[i] for i in self.state.permutation(len(x)).tolist()]
+
+    def histogramIndex(self, distribution):
+        """Index selected with probability proportional to its weight in ``distribution``.
+
+        :type distribution: list of numbers
+        :param distribution: weights, which must be finite and non-negative with a positive sum
+        :rtype: (integer, ``None``) or (``None``, string)
+        :return: selected index, or ``None`` and the reason that the weights are invalid ("finite", "non-negative", or "non-empty")
+        """
+        weights = self.numpy.array(distribution, dtype=self.numpy.float64)
+        with self.numpy.errstate(invalid="ignore"):
+            bad = ~self.numpy.isfinite(weights) | (weights < 0.0)
+        if bad.any():
+            return None, "finite" if not self.numpy.isfinite(weights[bad.argmax()]) else "non-negative"
+        cumulativeSum = self.numpy.cumsum(weights)
+        if len(cumulativeSum) == 0 or cumulativeSum[-1] == 0.0:
+            return None, "non-empty"
+        total = float(cumulativeSum[-1])
+        index = int(cumulativeSum.searchsorted(self.uniform(0.0, total), side="right"))
+        if index == len(cumulativeSum):
+            # rounding put the position at the very end: take the last item with non-zero weight
+            index = int(cumulativeSum.searchsorted(total, side="left"))
+        return index, None
+
 ########################################################### raw numbers of various types
 
 class RandomInt(LibFcn):
@@ -101,6 +211,8 @@ class RandomChoices(LibFcn):
     def __call__(self, state, scope, pos, paramTypes, size, population):
         if len(population) == 0:
             raise PFARuntimeException("population must not be empty", self.errcodeBase + 0, self.name, pos)
+        if isinstance(state.rand, BulkRandom):
+            return [population[i] for i in state.rand.integers(0, len(population), size)]
         return [population[state.rand.randint(0, len(population) - 1)] for x in xrange(size)]
 provide(RandomChoices())
 
@@ -138,13 +250,26 @@ class RandomHistogram(LibFcn):
         for i, y in enumerate(cumulativeSum):
             if position < y:
                 return i - 1
+    def selectIndexBulk(self, rand, distribution, pos):
+        index, problem = rand.histogramIndex(distribution)
+        if problem == "finite":
+            raise PFARuntimeException("distribution must be finite", self.errcodeBase + 1, self.name, pos)
+        elif problem == "non-negative":
+            raise PFARuntimeException("distribution must be non-negative", self.errcodeBase + 2, self.name, pos)
+        elif problem == "non-empty":
+            raise PFARuntimeException("distribution must be non-empty", self.errcodeBase + 0, self.name, pos)
+        return index
     def __call__(self, state, scope, pos, paramTypes, distribution):
+        if isinstance(state.rand, BulkRandom):
+            selectIndex = self.selectIndexBulk
+        else:
+            selectIndex = self.selectIndex
         if isinstance(paramTypes[-1], dict) and paramTypes[-1].get("type") == "record":
             probs = [x["prob"] for x in distribution]
-            index = self.selectIndex(state.rand, probs, pos)
+            index = selectIndex(state.rand, probs, pos)
             return distribution[index]
         else:
-            return self.selectIndex(state.rand, distribution, pos)
+            return selectIndex(state.rand, distribution, pos)
 provide(RandomHistogram())
 
 ########################################################### strings and byte arrays
@@ -157,16 +282,23 @@ class RandomString(LibFcn):
     errcodeBase = 34080
     def __call__(self, state, scope, pos, paramTypes, size, *args):
         if size <= 0: raise PFARuntimeException("size must be positive", self.errcodeBase + 0, self.name, pos)
+        bulk = isinstance(state.rand, BulkRandom)
         if len(args) == 0:
+            if bulk:
+                return u"".join(map(unichr, state.rand.integers(1, 0xD801, size)))
             return "".join(unichr(state.rand.randint(1, 0xD800)) for x in xrange(size))
         elif len(args) == 1:
             if len(args[0]) == 0:
                 raise PFARuntimeException("population must be non-empty", self.errcodeBase + 3, self.name, pos)
+            if bulk:
+                return "".join(args[0][i] for i in state.rand.integers(0, len(args[0]), size))
             return "".join(args[0][state.rand.randint(0, len(args[0]) - 1)] for x in xrange(size))
         else:
             low, high = args
             if high <= low: raise PFARuntimeException("high must be greater than low", self.errcodeBase + 1, self.name, pos)
             if low < 1 or low > 0xD800 or high < 1 or high > 0xD800: raise PFARuntimeException("invalid char", self.errcodeBase + 2, self.name, pos)
+            if bulk:
+                return u"".join(map(unichr, state.rand.integers(low, high, size)))
             return u"".join(unichr(state.rand.randint(low, high - 1)) for x in xrange(size))
 provide(RandomString())
 
@@ -178,16 +310,23 @@ class RandomBytes(LibFcn):
     errcodeBase = 34090
     def __call__(self, state, scope, pos, paramTypes, size, *args):
         if size <= 0: raise PFARuntimeException("size must be positive", self.errcodeBase + 0, self.name, pos)
+        bulk = isinstance(state.rand, BulkRandom)
         if len(args) == 0:
+            if bulk:
+                return "".join(map(chr, state.rand.integers(0, 256, size)))
             return "".join(chr(state.rand.randint(0, 255)) for x in xrange(size))
         elif len(args) == 1:
             if len(args[0]) == 0:
                 raise PFARuntimeException("population must be non-empty", self.errcodeBase + 3, self.name, pos)
+            if bulk:
+                return "".join(args[0][i] for i in state.rand.integers(0, len(args[0]), size))
             return "".join(args[0][state.rand.randint(0, len(args[0]) - 1)] for x in xrange(size))
         else:
             low, high = args
             if high <= low: raise PFARuntimeException("high must be greater than low", self.errcodeBase + 1, self.name, pos)
             if low < 0 or low > 255 or high < 0 or high > 256: raise PFARuntimeException("invalid byte", self.errcodeBase + 2, self.name, pos)
+            if bulk:
+                return "".join(map(chr, state.rand.integers(low, high, size)))
             return "".join(chr(state.rand.randint(low, high - 1)) for x in xrange(size))
 provide(RandomBytes())
 
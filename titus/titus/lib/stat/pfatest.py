@@ -29,7 +29,7 @@ from titus.signature import Sig
 from titus.signature import Sigs
 from titus.datatype import *
 from titus.errors import *
-from titus.util import div
+from titus.util import div, arrayTypes, mapTypes
 from titus.lib.core import INT_MIN_VALUE, INT_MAX_VALUE, LONG_MIN_VALUE, LONG_MAX_VALUE
 import titus.P as P
 from titus.lib.prob.dist import Chi2Distribution
@@ -90,12 +90,12 @@ class Residual(LibFcn):
                 Sig([{"observation": P.Map(P.Double())}, {"prediction": P.Map(P.Double())}], P.Map(P.Double()))])
     errcodeBase = 38010
     def __call__(self, state, scope, pos, paramTypes, observation, prediction):
-        if isinstance(observation, dict):
+        if isinstance(observation, mapTypes):
             if set(observation.keys()) != set(prediction.keys()):
                 raise PFARuntimeException("misaligned prediction", self.errcodeBase + 0, self.name, pos)
             return dict((k, observation[k] - prediction[k]) for k in observation)
 
-        elif isinstance(observation, (tuple, list)):
+        elif isinstance(observation, arrayTypes):
             if len(observation) != len(prediction):
                 raise PFARuntimeException("misaligned prediction", self.errcodeBase + 0, self.name, pos)
             return [float(o - p) for o, p in zip(observation, prediction)]
@@ -112,14 +112,14 @@ class Pull(LibFcn):
                 Sig([{"observation": P.Map(P.Double())}, {"prediction": P.Map(P.Double())}, {"uncertainty": P.Map(P.Double())}], P.Map(P.Double()))])
     errcodeBase = 38020
     def __call__(self, state, scope, pos, paramTypes, observation, prediction, uncertainty):
-        if isinstance(observation, dict):
+        if isinstance(observation, mapTypes):
             if set(observation.keys()) != set(prediction.keys()):
                 raise PFARuntimeException("misaligned prediction", self.errcodeBase + 0, self.name, pos)
             if set(observation.keys()) != set(uncertainty.keys()):
                 raise PFARuntimeException("misaligned uncertainty", self.errcodeBase + 1, self.name, pos)
             return dict((k, div(observation[k] - prediction[k], uncertainty[k])) for k in observation)
 
-        elif isinstance(observation, (tuple, list)):
+        elif isinstance(observation, arrayTypes):
             if len(observation) != len(prediction):
                 raise PFARuntimeException("misaligned prediction", self.errcodeBase + 0, self.name, pos)
             if len(observation) != len(uncertainty):
@@ -139,7 +139,7 @@ class Mahalanobis(LibFcn):
                      {"covariance": P.Map(P.Map(P.Double()))}], P.Double())])
     errcodeBase = 38030
     def __call__(self, state, scope, pos, paramTypes, observation, prediction, covariance):
-        if isinstance(observation, (tuple, list)):
+        if isinstance(observation, arrayTypes):
             if len(observation) < 1:
                 raise PFARuntimeException("too few rows/cols", self.errcodeBase + 0, self.name, pos)
             if len(observation) != len(prediction):
@@ -183,7 +183,7 @@ class UpdateChi2(LibFcn):
     def __call__(self, state, scope, pos, paramTypes, pull, state_):
         if isinstance(pull, float):
             return dict(state_, chi2=(state_["chi2"] + pull*pull), dof=(state_["dof"] + 1))
-        elif isinstance(pull, (tuple, list)):
+        elif isinstance(pull, arrayTypes):
             return dict(state_, chi2=(state_["chi2"] + sum([y**2 for y in pull])), dof=(state_["dof"] + 1))
         else:
             return dict(state_, chi2=(state_["chi2"] + sum([y**2 for y in pull.values()])), dof=(state_["dof"] + 1))
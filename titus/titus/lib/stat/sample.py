@@ -17,6 +17,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import bisect
 import math
 
 from titus.fcn import Fcn
@@ -25,7 +26,7 @@ from titus.signature import Sig
 from titus.signature import Sigs
 from titus.datatype import *
 from titus.errors import *
-from titus.util import div, callfcn
+from titus.util import div, callfcn, SlidingWindow, VersionedMap
 from titus.lib.core import INT_MIN_VALUE
 from titus.lib.core import INT_MAX_VALUE
 import titus.P as P
@@ -195,15 +196,22 @@ class UpdateWindow(UpdateMeanVariance):
                     out["variance"] = 0.0
                 else:
                     raise PFARuntimeException("cannot initialize unrecognized fields", self.errcodeBase + 1, self.name, pos)
-            return [out]
-        
-        elif len(theState) >= windowSize:
-            record = theState[-1]
+            return SlidingWindow([out])
 
+        # the window is a view of a shared buffer, so sliding it is O(1) (amortized) rather than O(windowSize)
+        if not isinstance(theState, SlidingWindow):
+            theState = SlidingWindow(theState)
+
+        record = theState[-1]
+
+        if len(theState) >= windowSize:
             splitAt = len(theState) - windowSize + 1
-            remove, keep = theState[:splitAt], theState[splitAt:]
-            oldx = [xi["x"] for xi in remove]
-            oldw = [-xi["w"] for xi in remove]
+            oldx = []
+            oldw = []
+            for i in xrange(splitAt):
+                xi = theState[i]
+                oldx.append(xi["x"])
+                oldw.append(-xi["w"])
 
             originalCount = record["count"]
             count = originalCount + w
@@ -211,7 +219,7 @@ class UpdateWindow(UpdateMeanVariance):
             count2 = count + sum(oldw)
 
             if level == 0:
-                return keep + [dict(record, x=x, w=w, count=count2)]
+                return theState.slide(dict(record, x=x, w=w, count=count2), windowSize)
             else:
                 mean = record["mean"]
                 delta = x - mean
@@ -230,23 +238,21 @@ class UpdateWindow(UpdateMeanVariance):
                     varianceCorrection += (accumulatedCount - ow) * delta2 * shift2
 
                 if level == 1:
-                    return keep + [dict(record, x=x, w=w, count=count2, mean=mean)]
+                    return theState.slide(dict(record, x=x, w=w, count=count2, mean=mean), windowSize)
                 else:
                     varianceTimesCount = record["variance"] * originalCount
                     varianceTimesCount += originalCount * delta * shift
 
                     varianceTimesCount += varianceCorrection
 
-                    return keep + [dict(record, x=x, w=w, count=count2, mean=mean, variance=div(varianceTimesCount, count2))]
+                    return theState.slide(dict(record, x=x, w=w, count=count2, mean=mean, variance=div(varianceTimesCount, count2)), windowSize)
 
         else:
-            record = theState[-1]
-
             originalCount = record["count"]
             count = originalCount + w
 
             if level == 0:
-                return theState + [dict(record, x=x, w=w, count=count)]
+                return theState.slide(dict(record, x=x, w=w, count=count), windowSize)
             else:
                 mean = record["mean"]
                 delta = x - mean
@@ -254,12 +260,12 @@ class UpdateWindow(UpdateMeanVariance):
                 mean += shift
 
                 if level == 1:
-                    return theState + [dict(record, x=x, w=w, count=count, mean=mean)]
+                    return theState.slide(dict(record, x=x, w=w, count=count, mean=mean), windowSize)
                 else:
                     varianceTimesCount = record["variance"] * originalCount
                     varianceTimesCount += originalCount * delta * shift
 
-                    return theState + [dict(record, x=x, w=w, count=count, mean=mean, variance=div(varianceTimesCount, count))]
+                    return theState.slide(dict(record, x=x, w=w, count=count, mean=mean, variance=div(varianceTimesCount, count)), windowSize)
 
 provide(UpdateWindow())
 
@@ -469,6 +475,27 @@ class FillHistogram(LibFcn):
 
         return "self.f[{0}]({1}, {2}, {3}, {4}, {5}, {6})".format(repr(self.name), ", ".join(["state", "scope", repr(pos), repr(paramTypes)] + args), method, hasUnderflow, hasOverflow, hasNanflow, hasInfflow)
 
+    def _rangeIndex(self, ranges, cache):
+        """Validate and index the "ranges" of a variable-width histogram, caching the result by the identity of the ranges array (which is usually constant) if ``cache`` is not ``None``.
+
+        Returns ``None`` if the ranges are invalid; otherwise a tuple of the sorted low edges, the original index of each sorted range, and whether the ranges are disjoint (so that bisection finds the only one that can contain a value).
+        """
+        out = False if cache is None else cache.get(ranges, False)
+        if out is not False:
+            return out
+
+        if any(len(x) != 2 or x[0] >= x[1] or math.isnan(x[0]) or math.isinf(x[0]) or math.isnan(x[1]) or math.isinf(x[1]) for x in ranges):
+            out = None
+        else:
+            order = sorted(xrange(len(ranges)), key=lambda i: ranges[i][0])
+            lows = [ranges[i][0] for i in order]
+            disjoint = all(ranges[order[i]][1] <= lows[i + 1] for i in xrange(len(order) - 1))
+            out = (lows, order, disjoint)
+
+        if cache is not None:
+            cache.put(ranges, out)
+        return out
+
     def updateHistogram(self, w, histogram, newValues, hasUnderflow, hasOverflow, hasNanflow, hasInfflow, underflow, overflow, nanflow, infflow):
         updator = {"values": newValues}
         if (hasUnderflow):
@@ -565,8 +592,10 @@ class FillHistogram(LibFcn):
             if len(values) != len(ranges):
                 raise PFARuntimeException("wrong histogram size", self.errcodeBase + 0, self.name, pos)
 
-            if any(len(x) != 2 or x[0] >= x[1] or math.isnan(x[0]) or math.isinf(x[0]) or math.isnan(x[1]) or math.isinf(x[1]) for x in ranges):
+            rangeIndex = self._rangeIndex(ranges, None if state is None else state.identityCache((self.name, pos)))
+            if rangeIndex is None:
                 raise PFARuntimeException("bad histogram ranges", self.errcodeBase + 3, self.name, pos)
+            lows, order, disjoint = rangeIndex
 
             isInfinite = math.isinf(x)
             isNan = math.isnan(x)
@@ -575,17 +604,26 @@ class FillHistogram(LibFcn):
             hitOne = False
 
             if not isInfinite and not isNan:
-                for index, rang in enumerate(ranges):
-                    low = rang[0]
-                    high = rang[1]
+                if disjoint:
+                    # at most one range can contain x: the last one that starts at or below it
+                    i = bisect.bisect_right(lows, x) - 1
+                    if i >= 0:
+                        index = order[i]
+                        if x < ranges[index][1]:
+                            newValues[index] = newValues[index] + w
+                            hitOne = True
+                else:
+                    for index, rang in enumerate(ranges):
+                        low = rang[0]
+                        high = rang[1]
 
-                    if low == high and x == low:
-                        newValues[index] = newValues[index] + w
-                        hitOne = True
+                        if low == high and x == low:
+                            newValues[index] = newValues[index] + w
+                            hitOne = True
 
-                    elif x >= low and x < high:
-                        newValues[index] = newValues[index] + w
-                        hitOne = True
+                        elif x >= low and x < high:
+                            newValues[index] = newValues[index] + w
+                            hitOne = True
 
             if hasInfflow and isInfinite:
                 underflow, overflow, nanflow, infflow = False, False, False, True
@@ -716,9 +754,11 @@ class FillCounter(LibFcn):
     sig = Sig([{"x": P.String()}, {"w": P.Double()}, {"counter": P.WildRecord("A", {"values": P.Map(P.Double())})}], P.Wildcard("A"))
     errcodeBase = 14100
     def __call__(self, state, scope, pos, paramTypes, x, w, counter):
+        # the first update copies the map into a titus.util.VersionedMap; later updates of its latest version change one key in place
         oldmap = counter["values"]
-        newmap = dict(oldmap, **{x: oldmap.get(x, 0.0) + w})
-        return dict(counter, values=newmap)
+        if not isinstance(oldmap, VersionedMap):
+            oldmap = VersionedMap(oldmap)
+        return dict(counter, values=oldmap.updated(x, oldmap.get(x, 0.0) + w))
 
 provide(FillCounter())
 
@@ -729,17 +769,42 @@ class TopN(LibFcn):
     def __call__(self, state, scope, pos, paramTypes, x, top, n, lessThan):
         if n <= 0:
             return []
-        else:
+
+        # bisection needs top in descending order, which is only known for lists that this call site returned: anything else
+        # (an initial value, a list built elsewhere) gets the linear scan, and the result is checked once to see if it is sorted
+        cache = None if state is None else state.identityCache((self.name, pos))
+        isSorted = None if cache is None else cache.get(top)
+        if not isSorted:
             index = 0
             for best in top:
                 if callfcn(state, scope, lessThan, [best, x]):
                     break
                 index += 1
-            if index == len(top):
-                out = top + [x]
+            out = (top[:index] + [x] + top[index:])[:n]
+            if cache is not None:
+                cache.put(out, isSorted is None and not any(callfcn(state, scope, lessThan, [out[i], out[i + 1]]) for i in xrange(len(out) - 1)))
+            return out
+
+        elif len(top) >= n and not callfcn(state, scope, lessThan, [top[n - 1], x]):
+            # x does not make the cut (the common case once the list is full)
+            if len(top) == n:
+                return top
             else:
-                above, below = top[:index], top[index:]
-                out = above + [x] + below
-            return out[:n]
+                out = top[:n]
+
+        else:
+            # top is kept in descending order, so "lessThan(best, x)" is false, then true:
+            # bisect for the first best that is less than x
+            low, high = 0, min(len(top), n)
+            while low < high:
+                mid = (low + high) // 2
+                if callfcn(state, scope, lessThan, [top[mid], x]):
+                    high = mid
+                else:
+                    low = mid + 1
+            out = top[:low] + [x] + top[low:n - 1]
+
+        cache.put(out, True)
+        return out
 
 provide(TopN())
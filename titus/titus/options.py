@@ -45,4 +45,9 @@ class EngineOptions(object):
         self.timeout_action = longOpt("timeout", self.timeout)
         self.timeout_end = longOpt("timeout", self.timeout)
 
+        # random number generator backend for rand.* functions: "python" (random.Random) or "numpy" (titus.lib.rand.BulkRandom)
+        self.rng = combinedOptions.get("rng", "python")
+        if self.rng not in ("python", "numpy"):
+            raise PFAInitializationException("rng must be \"python\" or \"numpy\"")
+
         # ...
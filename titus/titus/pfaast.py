@@ -19,6 +19,7 @@
 
 import base64
 import json
+import math
 import re
 from collections import OrderedDict
 
@@ -352,8 +353,8 @@ class EmitFcn(Fcn):
         self.sig = Sig([{"output": P.fromType(outputType)}], P.Null())
 
     def genpy(self, paramTypes, args, pos=None):
-        """Generate an executable Python string for this function; usually ``self.f["emit"].engine.emit(argument)``."""
-        return "self.f[\"emit\"].engine.emit(" + args[0] + ")"
+        """Generate an executable Python string for this function; usually ``self.f["emit"].emit(argument)``."""
+        return "self.f[\"emit\"].emit(" + args[0] + ")"
 
 class FunctionTable(object):
     """Represents a table of all accessible PFA function names, such as library functions, user-defined functions, and possibly emit."""
@@ -505,6 +506,361 @@ def isValid(engineConfig, version):
     else:
         return True
 
+def literalValue(expr):
+    """Extract the type and value of a literal expression.
+
+    :type expr: titus.pfaast.Argument
+    :param expr: expression to examine
+    :rtype: (titus.datatype.AvroType, Python value) or ``None``
+    :return: the literal's type and value, or ``None`` if ``expr`` is not a literal
+    """
+    if isinstance(expr, LiteralNull):
+        return AvroNull(), None
+    elif isinstance(expr, LiteralBoolean):
+        return AvroBoolean(), expr.value
+    elif isinstance(expr, LiteralInt):
+        return AvroInt(), expr.value
+    elif isinstance(expr, LiteralLong):
+        return AvroLong(), expr.value
+    elif isinstance(expr, LiteralFloat):
+        return AvroFloat(), float(expr.value)
+    elif isinstance(expr, LiteralDouble):
+        return AvroDouble(), float(expr.value)
+    elif isinstance(expr, LiteralString):
+        return AvroString(), expr.value
+    elif isinstance(expr, LiteralBase64):
+        return AvroBytes(), expr.value
+    elif isinstance(expr, Literal):
+        return expr.avroType, jsonDecoder(expr.avroType, json.loads(expr.value))
+    else:
+        return None
+
+def makeLiteral(avroType, value, pos=None):
+    """Express a value as a literal expression, if it can be represented exactly.
+
+    :type avroType: titus.datatype.AvroType
+    :param avroType: type of the value
+    :type value: Python value
+    :param value: value to express
+    :type pos: string or ``None``
+    :param pos: source file location from the locator mark
+    :rtype: titus.pfaast.LiteralValue or ``None``
+    :return: literal expression or ``None`` if the value is not finite, is a union, or would not survive a round-trip through JSON
+    """
+    try:
+        if isinstance(avroType, AvroNull) and value is None:
+            return LiteralNull(pos)
+        elif isinstance(avroType, AvroBoolean) and isinstance(value, bool):
+            return LiteralBoolean(value, pos)
+        elif isinstance(avroType, AvroInt):
+            return LiteralInt(value, pos)
+        elif isinstance(avroType, AvroLong):
+            return LiteralLong(value, pos)
+        elif isinstance(avroType, (AvroFloat, AvroDouble)):
+            if math.isinf(value) or math.isnan(value):
+                return None
+            elif isinstance(avroType, AvroFloat):
+                return LiteralFloat(value, pos)
+            else:
+                return LiteralDouble(value, pos)
+        elif isinstance(avroType, AvroString):
+            return LiteralString(value, pos)
+        elif isinstance(avroType, AvroBytes):
+            return LiteralBase64(value, pos)
+        elif isinstance(avroType, (AvroArray, AvroMap, AvroRecord, AvroEnum, AvroFixed)):
+            text = json.dumps(jsonEncoder(avroType, value), allow_nan=False)
+            if jsonDecoder(avroType, json.loads(text)) == value:
+                return Literal(avroType, text, pos)
+    except (PFASyntaxException, TypeError, ValueError, AttributeError):
+        pass
+    return None
+
+class Optimizer(object):
+    """Partial function for ``Ast.replace`` that simplifies expressions without changing their results; see ``titus.pfaast.optimize``."""
+
+    def __init__(self, fcns, version, maxInlineSize):
+        """:type fcns: dict of titus.pfaast.FcnDef
+        :param fcns: user-defined functions (without the "u." prefix)
+        :type version: titus.signature.PFAVersion
+        :param version: PFA version in which to interpret library function signatures
+        :type maxInlineSize: non-negative integer
+        :param maxInlineSize: largest number of AST nodes in a user function body that will be inlined
+        """
+        self.fcns = fcns
+        self.version = version
+        self.maxInlineSize = maxInlineSize
+        self.functionTable = FunctionTable.blank()
+        self.fcnDefs = {}
+        self.numInlined = 0
+
+        class FcnNames(object):
+            def isDefinedAt(self, ast):
+                return isinstance(ast, (Call, FcnRef, FcnRefFill, CallUserFcn))
+            def __call__(self, ast):
+                if isinstance(ast, CallUserFcn):
+                    return ["u." + x for x in fcns]
+                else:
+                    return [ast.name]
+
+        graph = dict(("u." + name, set(titus.util.flatten(titus.util.flatten(x.collect(FcnNames()) for x in fcnDef.body)))) for name, fcnDef in fcns.items())
+        self.recursive = set()
+        for name in graph:
+            seen = set()
+            frontier = set(graph[name])
+            while len(frontier) > 0:
+                seen.update(frontier)
+                frontier = set(titus.util.flatten(graph.get(x, ()) for x in frontier)).difference(seen)
+            if name in seen:
+                self.recursive.add(name)
+
+        # callees before callers, so that optimizing a caller finds its callees' optimized definitions without recursing through the call chain
+        self.bottomUp = []
+        visited = set()
+        for root in sorted(graph):
+            if root in visited:
+                continue
+            visited.add(root)
+            stack = [(root, iter(sorted(graph[root])))]
+            while len(stack) > 0:
+                name, callees = stack[-1]
+                for callee in callees:
+                    if callee in graph and callee not in visited:
+                        visited.add(callee)
+                        stack.append((callee, iter(sorted(graph[callee]))))
+                        break
+                else:
+                    stack.pop()
+                    self.bottomUp.append(name)
+
+    def fcnDef(self, name):
+        """Optimized definition of user function ``name`` (with the "u." prefix)."""
+        if name not in self.fcnDefs:
+            fcnDef = self.fcns[name[2:]]
+            self.fcnDefs[name] = FcnDef(fcnDef.paramsPlaceholder, fcnDef.retPlaceholder, self.exprs(fcnDef.body), fcnDef.pos)
+        return self.fcnDefs[name]
+
+    def exprs(self, exprs):
+        """Optimize a list of expressions, dropping literals (including former ``doc`` nodes) whose values are not used."""
+        out = [x.replace(self) for x in exprs]
+        return [x for i, x in enumerate(out) if i == len(out) - 1 or not isinstance(x, LiteralValue)]
+
+    def canInline(self, name, args):
+        """Determine if a call to user function ``name`` with ``args`` can be replaced by the function's body."""
+        if name in self.recursive or name[2:] not in self.fcns or not all(isinstance(x, Expression) for x in args):
+            return False
+        fcnDef = self.fcnDef(name)
+        if any(isinstance(t, AvroUnion) for t in fcnDef.paramsDict.values()) or isinstance(fcnDef.ret, AvroUnion) or len(fcnDef.body) != 1:
+            return False
+
+        class AnyNode(object):
+            def isDefinedAt(self, ast):
+                return True
+            def __call__(self, ast):
+                return ast
+        nodes = fcnDef.body[0].collect(AnyNode())
+        inlinable = (Call, Ref, LiteralValue, NewObject, NewArray, AttrGet, CellGet, PoolGet, If, Cond, Do, Let, Upcast, FcnRef, FcnRefFill, Error)
+        return len(nodes) <= self.maxInlineSize and all(isinstance(x, inlinable) for x in nodes)
+
+    def inline(self, call):
+        """Replace a call to a user function with its body, binding arguments to uniquely named variables (which preserves evaluation order) and up-casting to the declared types."""
+        fcnDef = self.fcnDef(call.name)
+        self.numInlined += 1
+        prefix = "inline{0}_{1}_".format(self.numInlined, call.name[2:])
+
+        class LetNames(object):
+            def isDefinedAt(self, ast):
+                return isinstance(ast, Let)
+            def __call__(self, ast):
+                return ast.values.keys()
+        names = dict((x, prefix + x) for x in fcnDef.paramNames + titus.util.flatten(fcnDef.body[0].collect(LetNames())))
+
+        class Rename(object):
+            def isDefinedAt(self, ast):
+                return isinstance(ast, (Ref, Let))
+            def __call__(self, ast):
+                if isinstance(ast, Ref):
+                    return Ref(names.get(ast.name, ast.name), ast.pos)
+                else:
+                    return Let(OrderedDict((names[k], v.replace(self)) for k, v in ast.values.items()), ast.pos)
+
+        lets = [Let({names[n]: Upcast(arg, t, arg.pos)}, call.pos) for (n, t), arg in zip([x.items()[0] for x in fcnDef.paramsPlaceholder], call.args)]
+        body = Upcast(fcnDef.body[0].replace(Rename()), fcnDef.retPlaceholder, call.pos)
+        if len(lets) == 0:
+            return body
+        else:
+            return Do(lets + [body], call.pos)
+
+    def fold(self, call):
+        """Evaluate a library function on literal arguments, returning a literal or ``None`` if it can't (or shouldn't) be evaluated in advance."""
+        fcn = self.functionTable.functions.get(call.name)
+        if fcn is None or call.name.startswith("rand."):
+            return None
+        values = [literalValue(x) for x in call.args]
+        if any(x is None for x in values):
+            return None
+        sigres = fcn.sig.accepts([t for t, v in values], self.version)
+        if sigres is None:
+            return None
+        sig, paramTypes, retType = sigres
+        try:
+            # generated code passes types as Python literals evaluated from their reprs, and some functions compare them by identity with interned strings
+            result = fcn(None, None, call.pos, eval(repr(paramTypes + [retType]), {"__builtins__": {}}), *[v for t, v in values])
+        except Exception:
+            return None
+        return makeLiteral(retType, result, call.pos)
+
+    def canPrune(self, retType):
+        """Determine if an ``if`` or ``cond`` with an ``else`` clause and type ``retType`` can be reduced to one of its branches.
+
+        Up-casting to a union would tag the value at runtime, which the original does not do, so those are left alone (as are nodes whose type is unknown).
+        """
+        return retType is not None and not isinstance(retType, AvroUnion)
+
+    def upcast(self, expr, retType):
+        """Up-cast a pruned ``if`` or ``cond`` to the type it had before pruning, so that enclosing expressions (and their function signatures) see the same type."""
+        if isinstance(expr, Do) and isinstance(expr.body[-1], Error):
+            return expr
+        return Upcast(expr, retType, expr.pos)
+
+    def isDefinedAt(self, ast):
+        return isinstance(ast, (Call, If, Cond, Do, FcnDef, Doc))
+
+    def __call__(self, ast):
+        if isinstance(ast, Doc):
+            return LiteralNull(ast.pos)
+
+        elif isinstance(ast, FcnDef):
+            return FcnDef(ast.paramsPlaceholder, ast.retPlaceholder, self.exprs(ast.body), ast.pos)
+
+        elif isinstance(ast, Do):
+            return Do(self.exprs(ast.body), ast.pos)
+
+        elif isinstance(ast, Call):
+            call = Call(ast.name, [x.replace(self) for x in ast.args], ast.pos)
+            if call.name.startswith("u.") and self.canInline(call.name, call.args):
+                return self.inline(call)
+            folded = self.fold(call)
+            if folded is not None:
+                return folded
+            return call
+
+        elif isinstance(ast, If):
+            predicate = ast.predicate.replace(self)
+            thenClause = self.exprs(ast.thenClause)
+            elseClause = None if ast.elseClause is None else self.exprs(ast.elseClause)
+            if isinstance(predicate, LiteralBoolean):
+                if predicate.value and elseClause is None:
+                    return Do(thenClause + [LiteralNull(ast.pos)], ast.pos)
+                elif elseClause is None:
+                    return LiteralNull(ast.pos)
+                elif self.canPrune(getattr(ast, "retType", None)):
+                    return self.upcast(Do(thenClause if predicate.value else elseClause, ast.pos), ast.retType)
+            return If(predicate, thenClause, elseClause, ast.pos)
+
+        elif isinstance(ast, Cond):
+            elseClause = None if ast.elseClause is None else self.exprs(ast.elseClause)
+            retType = getattr(ast, "retType", None)
+            if elseClause is not None and not self.canPrune(retType):
+                # without a unified type that can be up-cast to, dropping a branch could narrow it
+                return Cond([If(x.predicate.replace(self), self.exprs(x.thenClause), None, x.pos) for x in ast.ifthens], elseClause, ast.pos)
+            ifthens = []
+            pruned = False
+            for ifthen in ast.ifthens:
+                predicate = ifthen.predicate.replace(self)
+                if isinstance(predicate, LiteralBoolean) and not predicate.value:
+                    pruned = True
+                    continue
+                thenClause = self.exprs(ifthen.thenClause)
+                if isinstance(predicate, LiteralBoolean):
+                    if elseClause is not None:
+                        elseClause = thenClause
+                        pruned = True
+                    elif len(ifthens) == 0:
+                        return Do(thenClause + [LiteralNull(ast.pos)], ast.pos)
+                    else:
+                        ifthens.append(If(predicate, thenClause, None, ifthen.pos))
+                    break
+                ifthens.append(If(predicate, thenClause, None, ifthen.pos))
+            if len(ifthens) > 0:
+                out = Cond(ifthens, elseClause, ast.pos)
+            elif elseClause is not None:
+                out = Do(elseClause, ast.pos)
+            else:
+                return LiteralNull(ast.pos)
+            if pruned and elseClause is not None:
+                return self.upcast(out, retType)
+            return out
+
+def optimize(engineConfig, version, maxInlineSize=16, engineOptions=None):
+    """Simplify a type-checked PFA abstract syntax tree before generating code from it.
+
+    Library function calls on literal arguments (except ``rand.*``) are evaluated with the library's own implementation and replaced by literals, unless they raise an exception or return a value that can't be expressed exactly as a literal. ``if`` and ``cond`` branches with literal predicates are pruned, small non-recursive user functions are inlined, and ``doc`` nodes and other unused literals are dropped.
+
+    An ``if`` or ``cond`` with an ``else`` clause has the broadest type of all of its branches, so the document is type-checked first and the branch that is kept is up-cast to that type (unless it is a union, since up-casting to a union tags the value at runtime; those are not pruned). The result should still be type-checked again before use (``PFAEngine.fromAst`` falls back to the original if it fails).
+
+    :type engineConfig: titus.pfaast.EngineConfig
+    :param engineConfig: abstract syntax tree for a complete PFA document
+    :type version: titus.signature.PFAVersion
+    :param version: PFA version in which to interpret the document
+    :type maxInlineSize: non-negative integer
+    :param maxInlineSize: largest number of AST nodes in a single-expression user function that will be inlined
+    :type engineOptions: titus.options.EngineOptions or ``None``
+    :param engineOptions: implementation options for the type-check; if ``None``, use the document's own options
+    :rtype: titus.pfaast.EngineConfig
+    :return: a simplified copy of the abstract syntax tree
+    """
+    class TypedIf(If):
+        def walk(self, task, symbolTable, functionTable, engineOptions, version):
+            context, result = super(TypedIf, self).walk(task, symbolTable, functionTable, engineOptions, version)
+            self.retType = context.retType
+            return context, result
+
+    class TypedCond(Cond):
+        def walk(self, task, symbolTable, functionTable, engineOptions, version):
+            context, result = super(TypedCond, self).walk(task, symbolTable, functionTable, engineOptions, version)
+            self.retType = context.retType
+            return context, result
+
+    class MarkBranches(object):
+        def __init__(self):
+            self.marked = False
+        def isDefinedAt(self, ast):
+            return isinstance(ast, (If, Cond)) and ast.elseClause is not None
+        def __call__(self, ast):
+            self.marked = True
+            if isinstance(ast, If):
+                return TypedIf(ast.predicate.replace(self), [x.replace(self) for x in ast.thenClause], [x.replace(self) for x in ast.elseClause], ast.pos)
+            else:
+                return TypedCond([x.replace(self) for x in ast.ifthens], [x.replace(self) for x in ast.elseClause], ast.pos)
+
+    markBranches = MarkBranches()
+    engineConfig = engineConfig.replace(markBranches)
+    if markBranches.marked:
+        if engineOptions is None:
+            engineOptions = titus.options.EngineOptions(engineConfig.options, None)
+        engineConfig.walk(NoTask(), SymbolTable.blank(), FunctionTable.blank(), engineOptions, version)
+
+    optimizer = Optimizer(engineConfig.fcns, version, maxInlineSize)
+    fcns = dict((name[2:], optimizer.fcnDef(name)) for name in optimizer.bottomUp)
+    return EngineConfig(engineConfig.name,
+                        engineConfig.method,
+                        engineConfig.inputPlaceholder,
+                        engineConfig.outputPlaceholder,
+                        optimizer.exprs(engineConfig.begin),
+                        optimizer.exprs(engineConfig.action),
+                        optimizer.exprs(engineConfig.end),
+                        fcns,
+                        engineConfig.zero,
+                        None if engineConfig.merge is None else optimizer.exprs(engineConfig.merge),
+                        engineConfig.cells,
+                        engineConfig.pools,
+                        engineConfig.randseed,
+                        engineConfig.doc,
+                        engineConfig.version,
+                        engineConfig.metadata,
+                        engineConfig.options,
+                        engineConfig.pos)
+
 ############################################################ AST nodes
 
 class Ast(object):
@@ -1099,11 +1455,29 @@ class EngineConfig(Ast):
                      options,
                      parser): pass
 
+        @property
+        def callGraph(self):
+            """Functions called directly by ``(begin)``, ``(action)``, ``(end)``, ``(merge)`` (if present), and each user-defined function, as a dict from caller name to a set of callee names."""
+            begin, beginSymbols, beginCalls = self.begin
+            action, actionSymbols, actionCalls = self.action
+            end, endSymbols, endCalls = self.end
+
+            out = {"(begin)": beginCalls, "(action)": actionCalls, "(end)": endCalls}
+            if self.merge is not None:
+                mergeTasks, mergeSymbols, mergeCalls = self.merge
+                out["(merge)"] = mergeCalls
+            for fname, fctx in self.fcns:
+                out[fname] = fctx.calls
+            return out
+
 class CellPoolSource(object):
     """Source methods for cells and pools."""
     EMBEDDED = "embedded"
     JSON = "json"
     AVRO = "avro"
+    NPY = "npy"
+    MMAP = "mmap"
+    binary = (AVRO, NPY, MMAP)
 
 @titus.util.case
 class Cell(Ast):
@@ -1113,7 +1487,7 @@ class Cell(Ast):
         """:type avroPlaceholder: titus.datatype.AvroPlaceholder
         :param avroPlaceholder: cell type as a placeholder (so it can exist before type resolution)
         :type init: string or callable
-        :param init: serialized JSON string containing initial data or a function that produces it (from an external file, usually)
+        :param init: serialized JSON string containing initial data or a function of the cell type that produces it (from an external file, usually); for the binary sources (``avro``, ``npy``, and ``mmap``), the function returns the data itself, not serialized JSON
         :type shared: bool
         :param shared: if ``True``, this cell shares data with all others in the same titus.genpy.SharedState
         :type rollback: bool
@@ -1178,10 +1552,20 @@ class Cell(Ast):
 
     @property
     def initJsonNode(self):
-        if callable(self.init):
+        if callable(self.init) and self.source in CellPoolSource.binary:
+            return jsonEncoder(self.avroType, self.init(self.avroType))
+        elif callable(self.init):
             return json.loads(self.init(self.avroType))
         else:
             return json.loads(self.init)
+
+    @property
+    def initValue(self):
+        """Initial data in the form used by a running engine (binary sources are not converted to and from JSON)."""
+        if callable(self.init) and self.source in CellPoolSource.binary:
+            return self.init(self.avroType)
+        else:
+            return jsonDecoder(self.avroType, self.initJsonNode)
         
     def jsonNode(self, lineNumbers, memo):
         """Convert this abstract syntax tree to Pythonized JSON.
@@ -1214,7 +1598,7 @@ class Pool(Ast):
         """:type avroPlaceholder: titus.datatype.AvroPlaceholder
         :param avroPlaceholder: pool type as a placeholder (so it can exist before type resolution)
         :type init: string or callable
-        :param init: serialized JSON string containing initial data or a function that produces it (from an external file, usually)
+        :param init: serialized JSON string containing initial data or a function of the pool's map type that produces it (from an external file, usually); for the ``avro`` source, the function returns the data itself, not serialized JSON
         :type shared: bool
         :param shared: if ``True``, this pool shares data with all others in the same titus.genpy.SharedState
         :type rollback: bool
@@ -1230,8 +1614,8 @@ class Pool(Ast):
         if not isinstance(avroPlaceholder, (AvroPlaceholder, AvroType)):
             raise PFASyntaxException("\"avroPlaceholder\" must be an AvroPlaceholder or AvroType", pos)
 
-        if not isinstance(init, dict) or not all(isinstance(x, basestring) or x is None for x in init.values()):
-            raise PFASyntaxException("\"init\" must be a string or callable", pos)
+        if not callable(init) and (not isinstance(init, dict) or not all(isinstance(x, basestring) or x is None for x in init.values())):
+            raise PFASyntaxException("\"init\" must be a dictionary of strings or callable", pos)
 
         if not isinstance(shared, bool):
             raise PFASyntaxException("\"shared\" must be boolean", pos)
@@ -1278,11 +1662,21 @@ class Pool(Ast):
 
     @property
     def initJsonNode(self):
-        if callable(self.init):
+        if callable(self.init) and self.source in CellPoolSource.binary:
+            return jsonEncoder(AvroMap(self.avroType), self.init(AvroMap(self.avroType)))
+        elif callable(self.init):
             return json.loads(self.init(AvroMap(self.avroType)))
         else:
             return OrderedDict((k, json.loads(v)) for k, v in self.init.items())
 
+    @property
+    def initValue(self):
+        """Initial data in the form used by a running engine (binary sources are not converted to and from JSON)."""
+        if callable(self.init) and self.source in CellPoolSource.binary:
+            return self.init(AvroMap(self.avroType))
+        else:
+            return jsonDecoder(AvroMap(self.avroType), self.initJsonNode)
+
     def jsonNode(self, lineNumbers, memo):
         """Convert this abstract syntax tree to Pythonized JSON.
 
@@ -1875,7 +2269,7 @@ class CallUserFcn(Expression):
         except IncompatibleTypes as err:
             raise PFASemanticException(str(err), self.pos)
 
-        context = self.Context(retType, calls, nameResult, nameToNum, nameToFcn, [x[1] for x in argResults], [x[0] for x in argResults], nameToParamTypes, nameToRetTypes)
+        context = self.Context(retType, calls, nameResult, nameToNum, nameToFcn, [x[1] for x in argResults], [x[0] for x in argResults], nameToParamTypes, nameToRetTypes, self.pos)
         return context, task(context, engineOptions)
 
     def jsonNode(self, lineNumbers, memo):
@@ -1895,7 +2289,7 @@ class CallUserFcn(Expression):
 
     @titus.util.case
     class Context(ExpressionContext):
-        def __init__(self, retType, calls, name, nameToNum, nameToFcn, args, argContext, nameToParamTypes, nameToRetTypes): pass
+        def __init__(self, retType, calls, name, nameToNum, nameToFcn, args, argContext, nameToParamTypes, nameToRetTypes, pos): pass
 
 @titus.util.case
 class Call(Expression):
@@ -3979,7 +4373,7 @@ class PoolDel(Expression):
 
         calls = delContext.calls.union(set([self.desc]))
 
-        context = PoolDel.Context(AvroNull(), calls, self.pool, delResult, shared)
+        context = PoolDel.Context(AvroNull(), calls, self.pool, delResult, shared, self.pos)
         return context, task(context, engineOptions)
 
     def jsonNode(self, lineNumbers, memo):
@@ -4001,7 +4395,7 @@ class PoolDel(Expression):
 
     @titus.util.case
     class Context(ExpressionContext):
-        def __init__(self, retType, calls, pool, dell, shared): pass
+        def __init__(self, retType, calls, pool, dell, shared, pos): pass
 
 @titus.util.case
 class If(Expression):
@@ -4121,7 +4515,7 @@ class If(Expression):
         else:
             retType, elseTaskResults, elseSymbols = AvroNull(), None, None
 
-        context = self.Context(retType, calls.union(set([self.desc])), thenScope.inThisScope, predResult, [x[1] for x in thenResults], elseSymbols, elseTaskResults)
+        context = self.Context(retType, calls.union(set([self.desc])), thenScope.inThisScope, predResult, [x[1] for x in thenResults], elseSymbols, elseTaskResults, self.pos)
         return context, task(context, engineOptions)
 
     def jsonNode(self, lineNumbers, memo):
@@ -4145,7 +4539,7 @@ class If(Expression):
 
     @titus.util.case
     class Context(ExpressionContext):
-        def __init__(self, retType, calls, thenSymbols, predicate, thenClause, elseSymbols, elseClause): pass
+        def __init__(self, retType, calls, thenSymbols, predicate, thenClause, elseSymbols, elseClause, pos): pass
 
 @titus.util.case
 class Cond(Expression):
@@ -4269,7 +4663,7 @@ class Cond(Expression):
                 except IncompatibleTypes as err:
                     raise PFASemanticException(str(err), self.pos)
 
-        context = self.Context(retType, calls.union(set([self.desc])), (self.elseClause is not None), walkBlocks)
+        context = self.Context(retType, calls.union(set([self.desc])), (self.elseClause is not None), walkBlocks, self.pos)
         return context, task(context, engineOptions)
 
     def jsonNode(self, lineNumbers, memo):
@@ -4296,7 +4690,7 @@ class Cond(Expression):
 
     @titus.util.case
     class Context(ExpressionContext):
-        def __init__(self, retType, calls, complete, walkBlocks): pass
+        def __init__(self, retType, calls, complete, walkBlocks, pos): pass
 
 @titus.util.case
 class While(Expression):
@@ -4382,7 +4776,7 @@ class While(Expression):
         for exprCtx, exprRes in loopResults:
             calls = calls.union(exprCtx.calls)
 
-        context = self.Context(AvroNull(), calls.union(set([self.desc])), loopScope.inThisScope, predResult, [x[1] for x in loopResults])
+        context = self.Context(AvroNull(), calls.union(set([self.desc])), loopScope.inThisScope, predResult, [x[1] for x in loopResults], self.pos)
         return context, task(context, engineOptions)
 
     def jsonNode(self, lineNumbers, memo):
@@ -4404,7 +4798,7 @@ class While(Expression):
 
     @titus.util.case
     class Context(ExpressionContext):
-        def __init__(self, retType, calls, symbols, predicate, loopBody): pass
+        def __init__(self, retType, calls, symbols, predicate, loopBody, pos): pass
 
 @titus.util.case
 class DoUntil(Expression):
@@ -4490,7 +4884,7 @@ class DoUntil(Expression):
             raise PFASemanticException("\"until\" predicate should be boolean, but is " + ts(predContext.retType), self.pos)
         calls = calls.union(predContext.calls)
 
-        context = self.Context(AvroNull(), calls.union(set([self.desc])), loopScope.inThisScope, [x[1] for x in loopResults], predResult)
+        context = self.Context(AvroNull(), calls.union(set([self.desc])), loopScope.inThisScope, [x[1] for x in loopResults], predResult, self.pos)
         return context, task(context, engineOptions)
 
     def jsonNode(self, lineNumbers, memo):
@@ -4512,7 +4906,7 @@ class DoUntil(Expression):
 
     @titus.util.case
     class Context(ExpressionContext):
-        def __init__(self, retType, calls, symbols, loopBody, predicate): pass
+        def __init__(self, retType, calls, symbols, loopBody, predicate, pos): pass
 
 @titus.util.case
 class For(Expression):
@@ -4659,7 +5053,7 @@ class For(Expression):
         for exprCtx, exprRes in bodyResults:
             calls = calls.union(exprCtx.calls)
 
-        context = self.Context(AvroNull(), calls.union(set([self.desc])), dict(list(bodyScope.inThisScope.items()) + list(loopScope.inThisScope.items())), initNameTypeExpr, predicateResult, [x[1] for x in bodyResults], stepNameTypeExpr)
+        context = self.Context(AvroNull(), calls.union(set([self.desc])), dict(list(bodyScope.inThisScope.items()) + list(loopScope.inThisScope.items())), initNameTypeExpr, predicateResult, [x[1] for x in bodyResults], stepNameTypeExpr, self.pos)
         return context, task(context, engineOptions)
 
     def jsonNode(self, lineNumbers, memo):
@@ -4683,7 +5077,7 @@ class For(Expression):
 
     @titus.util.case
     class Context(ExpressionContext):
-        def __init__(self, retType, calls, symbols, initNameTypeExpr, predicate, loopBody, stepNameTypeExpr): pass
+        def __init__(self, retType, calls, symbols, initNameTypeExpr, predicate, loopBody, stepNameTypeExpr, pos): pass
 
 @titus.util.case
 class Foreach(Expression):
@@ -4795,7 +5189,7 @@ class Foreach(Expression):
         for exprCtx, exprRes in bodyResults:
             calls = calls.union(exprCtx.calls)
 
-        context = self.Context(AvroNull(), calls.union(set([self.desc])), dict(list(bodyScope.inThisScope.items()) + list(loopScope.inThisScope.items())), objContext.retType, objResult, elementType, self.name, [x[1] for x in bodyResults])
+        context = self.Context(AvroNull(), calls.union(set([self.desc])), dict(list(bodyScope.inThisScope.items()) + list(loopScope.inThisScope.items())), objContext.retType, objResult, elementType, self.name, [x[1] for x in bodyResults], self.pos)
         return context, task(context, engineOptions)
 
     def jsonNode(self, lineNumbers, memo):
@@ -4819,7 +5213,7 @@ class Foreach(Expression):
 
     @titus.util.case
     class Context(ExpressionContext):
-        def __init__(self, retType, calls, symbols, objType, objExpr, itemType, name, loopBody): pass
+        def __init__(self, retType, calls, symbols, objType, objExpr, itemType, name, loopBody, pos): pass
 
 @titus.util.case
 class Forkeyval(Expression):
@@ -4936,7 +5330,7 @@ class Forkeyval(Expression):
         for exprCtx, exprRes in bodyResults:
             calls = calls.union(exprCtx.calls)
 
-        context = self.Context(AvroNull(), calls.union([self.desc]), dict(list(bodyScope.inThisScope.items()) + list(loopScope.inThisScope.items())), objContext.retType, objResult, elementType, self.forkey, self.forval, [x[1] for x in bodyResults])
+        context = self.Context(AvroNull(), calls.union([self.desc]), dict(list(bodyScope.inThisScope.items()) + list(loopScope.inThisScope.items())), objContext.retType, objResult, elementType, self.forkey, self.forval, [x[1] for x in bodyResults], self.pos)
         return context, task(context, engineOptions)
 
     def jsonNode(self, lineNumbers, memo):
@@ -4960,7 +5354,7 @@ class Forkeyval(Expression):
 
     @titus.util.case
     class Context(ExpressionContext):
-        def __init__(self, retType, calls, symbols, objType, objExpr, valueType, forkey, forval, loopBody): pass
+        def __init__(self, retType, calls, symbols, objType, objExpr, valueType, forkey, forval, loopBody, pos): pass
 
 @titus.util.case
 class CastCase(Ast):
@@ -5507,52 +5901,48 @@ class BinaryFormatter(object):
     formatPrefixed = re.compile("""\s*(length\s*)?prefixed\s*""")
     
     class Declare(object):
-        """Trait for binary format declaration."""
-        pass
+        """Trait for binary format declaration.
+
+        Subclasses provide ``formatLength``: the ``struct`` format code (or "raw", "tonull", "prefixed") and the width in bytes (``None`` if variable).
+        """
+        def __str__(self):
+            f, l = self.formatLength
+            return "(" + repr(self.value) + ", \"" + f + "\", " + str(l) + ")"
 
     @titus.util.case
     class DeclarePad(Declare):
         """Binary format declaration for a padded byte."""
         def __init__(self, value): pass
         avroType = AvroNull()
-        def __str__(self):
-            return "(" + repr(self.value) + ", \"x\", 1)"
+        formatLength = ("x", 1)
 
     @titus.util.case
     class DeclareBoolean(Declare):
         """Binary format declaration for a boolean byte."""
         def __init__(self, value): pass
         avroType = AvroBoolean()
-        def __str__(self):
-            return "(" + repr(self.value) + ", \"?\", 1)"
+        formatLength = ("?", 1)
 
     @titus.util.case
     class DeclareByte(Declare):
         """Binary format declaration for an integer byte."""
         def __init__(self, value, unsigned): pass
         avroType = AvroInt()
-        def __str__(self):
+        @property
+        def formatLength(self):
             if self.unsigned:
-                return "(" + repr(self.value) + ", \"B\", 1)"
+                return ("B", 1)
             else:
-                return "(" + repr(self.value) + ", \"b\", 1)"
+                return ("b", 1)
 
     @titus.util.case
     class DeclareShort(Declare):
         """Binary format declaration for a short (16-bit) integer."""
         def __init__(self, value, littleEndian, unsigned): pass
         avroType = AvroInt()
-        def __str__(self):
-            if self.unsigned:
-                if self.littleEndian:
-                    return "(" + repr(self.value) + ", \"<H\", 2)"
-                else:
-                    return "(" + repr(self.value) + ", \">H\", 2)"
-            else:
-                if self.littleEndian:
-                    return "(" + repr(self.value) + ", \"<h\", 2)"
-                else:
-                    return "(" + repr(self.value) + ", \">h\", 2)"
+        @property
+        def formatLength(self):
+            return ("<" if self.littleEndian else ">") + ("H" if self.unsigned else "h"), 2
 
     @titus.util.case
     class DeclareInt(Declare):
@@ -5564,17 +5954,9 @@ class BinaryFormatter(object):
                 return AvroLong()
             else:
                 return AvroInt()
-        def __str__(self):
-            if self.unsigned:
-                if self.littleEndian:
-                    return "(" + repr(self.value) + ", \"<I\", 4)"
-                else:
-                    return "(" + repr(self.value) + ", \">I\", 4)"
-            else:
-                if self.littleEndian:
-                    return "(" + repr(self.value) + ", \"<i\", 4)"
-                else:
-                    return "(" + repr(self.value) + ", \">i\", 4)"
+        @property
+        def formatLength(self):
+            return ("<" if self.littleEndian else ">") + ("I" if self.unsigned else "i"), 4
 
     @titus.util.case
     class DeclareLong(Declare):
@@ -5586,71 +5968,57 @@ class BinaryFormatter(object):
                 return AvroDouble()
             else:
                 return AvroLong()
-        def __str__(self):
-            if self.unsigned:
-                if self.littleEndian:
-                    return "(" + repr(self.value) + ", \"<Q\", 8)"
-                else:
-                    return "(" + repr(self.value) + ", \">Q\", 8)"
-            else:
-                if self.littleEndian:
-                    return "(" + repr(self.value) + ", \"<q\", 8)"
-                else:
-                    return "(" + repr(self.value) + ", \">q\", 8)"
+        @property
+        def formatLength(self):
+            return ("<" if self.littleEndian else ">") + ("Q" if self.unsigned else "q"), 8
 
     @titus.util.case
     class DeclareFloat(Declare):
         """Binary format declaration for a single-precision (32-bit) floating point number."""
         def __init__(self, value, littleEndian): pass
         avroType = AvroFloat()
-        def __str__(self):
-            if self.littleEndian:
-                return "(" + repr(self.value) + ", \"<f\", 4)"
-            else:
-                return "(" + repr(self.value) + ", \">f\", 4)"
+        @property
+        def formatLength(self):
+            return ("<" if self.littleEndian else ">") + "f", 4
 
     @titus.util.case
     class DeclareDouble(Declare):
         """Binary format declaration for a double-precision (64-bit) floating point number."""
         def __init__(self, value, littleEndian): pass
         avroType = AvroDouble()
-        def __str__(self):
-            if self.littleEndian:
-                return "(" + repr(self.value) + ", \"<d\", 8)"
-            else:
-                return "(" + repr(self.value) + ", \">d\", 8)"
+        @property
+        def formatLength(self):
+            return ("<" if self.littleEndian else ">") + "d", 8
 
     @titus.util.case
     class DeclareRaw(Declare):
         """Binary format declaration for arbitrary-width raw data."""
         def __init__(self, value): pass
         avroType = AvroBytes()
-        def __str__(self):
-            return "(" + repr(self.value) + ", \"raw\", None)"
+        formatLength = ("raw", None)
 
     @titus.util.case
     class DeclareRawSize(Declare):
         """Binary format declaration for fixed-width raw data."""
         def __init__(self, value, size): pass
         avroType = AvroBytes()
-        def __str__(self):
-            return "(" + repr(self.value) + ", \"raw\", " + str(self.size) + ")"
+        @property
+        def formatLength(self):
+            return ("raw", self.size)
 
     @titus.util.case
     class DeclareToNull(Declare):
         """Binary format declaration for null-terminated raw data."""
         def __init__(self, value): pass
         avroType = AvroBytes()
-        def __str__(self):
-            return "(" + repr(self.value) + ", \"tonull\", None)"
+        formatLength = ("tonull", None)
 
     @titus.util.case
     class DeclarePrefixed(Declare):
         """Binary format declaration for length-prefixed raw data."""
         def __init__(self, value): pass
         avroType = AvroBytes()
-        def __str__(self):
-            return "(" + repr(self.value) + ", \"prefixed\", None)"
+        formatLength = ("prefixed", None)
 
     @staticmethod
     def formatToDeclare(value, f, pos, output):
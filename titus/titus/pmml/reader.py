@@ -30,14 +30,19 @@ import titus.pmml.version_4_1
 import titus.pmml.version_4_2
 
 class PmmlContentHandler(xml.sax.handler.ContentHandler):
-    """Streaming XML reader for loading PMML: methods handle SAX events (see xml.sax.handler.ContentHandler)."""
+    """Streaming XML reader for loading PMML: methods handle SAX events (see xml.sax.handler.ContentHandler).
 
-    def __init__(self):
+    If ``compactSegments`` is ``True``, each ``<Segment>`` of an ensemble is converted to a packed tree as soon as it has been read, so that only one segment's PMML elements are in memory at a time.
+    """
+
+    def __init__(self, compactSegments=False):
         self.stack = []
         self.version = None
         self.namespace = None
         self.tagToClass = None
         self.result = None
+        self.compactSegments = compactSegments
+        self.dataDictionary = None
 
     def startElement(self, name, attrib):
         if self.version is None:
@@ -98,17 +103,36 @@ class PmmlContentHandler(xml.sax.handler.ContentHandler):
     def endElement(self, name):
         self.result = self.stack.pop()
 
+        if self.compactSegments and isinstance(self.result, titus.pmml.version_independent.Segment):
+            dataDictionary = self.segmentDataDictionary()
+            if dataDictionary is not None:
+                self.result.compact(dataDictionary)
+
+    def segmentDataDictionary(self):
+        """Types of the fields in the ``<DataDictionary>``, which precedes all models in a PMML document (``None`` if unavailable)."""
+
+        if self.dataDictionary is None and len(self.stack) > 0:
+            pmml = self.stack[0]
+            if len(getattr(pmml, "DataDictionary", [])) > 0:
+                try:
+                    self.dataDictionary = dict((x.name, {"type": x.pmmlTypeToAvro()}) for x in pmml.DataDictionary[0].DataField)
+                except NotImplementedError:
+                    pass
+        return self.dataDictionary
+
     def endElementNS(self, name, qname):
         if name[0] is not None and name[0].startswith(self.namespace):
             self.endElement(name[1])
         
-def loadPMML(pmmlInput, processNamespaces=False):
+def loadPMML(pmmlInput, processNamespaces=False, compactSegments=False):
     """Load a PMML document.
 
     :type pmmlInput: open XML file, gzip-compressed byte string, XML string, or file name string
     :param pmmlInput: input source for the PMML
     :type processNamespaces: bool
     :param processNamespaces: if ``True``, allow for namespaces other than just "http://www.dmg.org/PMML-*"
+    :type compactSegments: bool
+    :param compactSegments: if ``True``, replace the trees in ensemble ``<Segments>`` with packed trees while reading (the ``<TreeModel>`` elements are not kept)
     :rtype: titus.pmml.version_independent.PmmlBinding
     :return: loaded PMML
     """
@@ -124,7 +148,7 @@ def loadPMML(pmmlInput, processNamespaces=False):
         else:
             pmmlInput = open(pmmlInput)
 
-    contentHandler = PmmlContentHandler()
+    contentHandler = PmmlContentHandler(compactSegments)
     parser = xml.sax.make_parser()
     parser.setContentHandler(contentHandler)
     if processNamespaces:
@@ -153,7 +177,7 @@ def pmmlToAst(pmmlInput, options=None):
     context = titus.pmml.version_independent.Context()
     context.avroTypeBuilder = AvroTypeBuilder()
     
-    obj = loadPMML(pmmlInput, options.get("reader.processNamespaces", False))
+    obj = loadPMML(pmmlInput, options.get("reader.processNamespaces", False), options.get("reader.compactSegments", True))
     result = obj.toPFA(options, context)
 
     context.avroTypeBuilder.resolveTypes()
@@ -18,6 +18,7 @@
 # limitations under the License.
 
 import json
+from collections import OrderedDict
 
 import titus.pfaast as ast
 from titus.datatype import AvroArray
@@ -922,7 +923,17 @@ class MiningField(PmmlBinding):
 class MiningModel(PmmlBinding, ModelElement):
     """Represents a <MiningModel> tag and provides methods to convert to PFA."""
     def toPFA(self, options, context):
-        raise NotImplementedError
+        if len(self.Segmentation) != 1:
+            raise NotImplementedError
+
+        if self.functionName == "regression":
+            context.outputType = "double"
+        elif self.functionName == "classification":
+            context.outputType = "string"
+        else:
+            raise NotImplementedError
+
+        return self.Segmentation[0].toPFA(options, context.copy(functionName=self.functionName))
 
 class MiningSchema(PmmlBinding):
     """Represents a <MiningSchema> tag and provides methods to convert to PFA."""
@@ -1021,6 +1032,45 @@ class Node(PmmlBinding):
     def predicate(self):
         return (self.SimplePredicate + self.CompoundPredicate + self.SimpleSetPredicate + self.AlwaysTrue + self.AlwaysFalse)[0]
 
+    simpleOperators = {("equal", "notEqual"): "==",
+                       ("notEqual", "equal"): "!=",
+                       ("lessThan", "greaterOrEqual"): "<",
+                       ("lessOrEqual", "greaterThan"): "<=",
+                       ("greaterThan", "lessOrEqual"): ">",
+                       ("greaterOrEqual", "lessThan"): ">="}
+
+    def simpleSplit(self, dataDictionary):
+        """Interpret the ``<SimplePredicates>`` of this node's two children as one binary split.
+
+        :type dataDictionary: dict from field name to ``{"type": PFA type name}``
+        :param dataDictionary: types of the input fields
+        :rtype: (string, string, Pythonized JSON)
+        :return: (field name, PFA comparison operator, value tagged with its type), where the first child passes the comparison and the second fails it
+        """
+
+        left, right = self.Node
+        fieldName = left.predicate().field
+        if right.predicate().field != fieldName:
+            raise NotImplementedError
+
+        valueType = dataDictionary[fieldName]["type"]
+
+        lop = left.predicate().operator
+        rop = right.predicate().operator
+        lval = left.predicate().value
+        rval = right.predicate().value
+
+        if valueType in ("int", "long", "float", "double"):
+            lval, rval = {"double": float(lval)}, {"double": float(rval)}
+        else:
+            lval, rval = {"string": lval}, {"string": rval}
+
+        operator = self.simpleOperators.get((lop, rop))
+        if operator is None or lval != rval:
+            raise NotImplementedError
+
+        return fieldName, operator, lval
+
     def simpleWalk(self, context, functionName, splitCharacteristic, predicateTypes):
         if len(self.Node) == 0:
             if functionName == "regression":
@@ -1032,66 +1082,13 @@ class Node(PmmlBinding):
                 left, right = self.Node
 
                 if predicateTypes == set(["SimplePredicate"]):
-                    fieldName = left.predicate().field
-                    if right.predicate().field != fieldName:
-                        raise NotImplementedError
-
-                    valueType = context.dataDictionary[fieldName]["type"]
-
-                    lop = left.predicate().operator
-                    rop = right.predicate().operator
-                    lval = left.predicate().value
-                    rval = right.predicate().value
-
-                    if valueType in ("int", "long", "float", "double"):
-                        lval, rval = {"double": float(lval)}, {"double": float(rval)}
-                    else:
-                        lval, rval = {"string": lval}, {"string": rval}
-
-                    if (lop, rop) == ("equal", "notEqual") and lval == rval:
-                        return {"TreeNode": {
-                            "field": fieldName,
-                            "operator": "==",
-                            "value": lval,
-                            "pass": left.simpleWalk(context, functionName, splitCharacteristic, predicateTypes),
-                            "fail": right.simpleWalk(context, functionName, splitCharacteristic, predicateTypes)}}
-                    elif (lop, rop) == ("notEqual", "equal") and lval == rval:
-                        return {"TreeNode": {
-                            "field": fieldName,
-                            "operator": "!=",
-                            "value": lval,
-                            "pass": left.simpleWalk(context, functionName, splitCharacteristic, predicateTypes),
-                            "fail": right.simpleWalk(context, functionName, splitCharacteristic, predicateTypes)}}
-                    elif (lop, rop) == ("lessThan", "greaterOrEqual") and lval == rval:
-                        return {"TreeNode": {
-                            "field": fieldName,
-                            "operator": "<",
-                            "value": lval,
-                            "pass": left.simpleWalk(context, functionName, splitCharacteristic, predicateTypes),
-                            "fail": right.simpleWalk(context, functionName, splitCharacteristic, predicateTypes)}}
-                    elif (lop, rop) == ("lessOrEqual", "greaterThan") and lval == rval:
-                        return {"TreeNode": {
-                            "field": fieldName,
-                            "operator": "<=",
-                            "value": lval,
-                            "pass": left.simpleWalk(context, functionName, splitCharacteristic, predicateTypes),
-                            "fail": right.simpleWalk(context, functionName, splitCharacteristic, predicateTypes)}}
-                    elif (lop, rop) == ("greaterThan", "lessOrEqual") and lval == rval:
-                        return {"TreeNode": {
-                            "field": fieldName,
-                            "operator": ">",
-                            "value": lval,
-                            "pass": left.simpleWalk(context, functionName, splitCharacteristic, predicateTypes),
-                            "fail": right.simpleWalk(context, functionName, splitCharacteristic, predicateTypes)}}
-                    elif (lop, rop) == ("greaterOrEqual", "lessThan") and lval == rval:
-                        return {"TreeNode": {
-                            "field": fieldName,
-                            "operator": ">=",
-                            "value": lval,
-                            "pass": left.simpleWalk(context, functionName, splitCharacteristic, predicateTypes),
-                            "fail": right.simpleWalk(context, functionName, splitCharacteristic, predicateTypes)}}
-                    else:
-                        raise NotImplementedError
+                    fieldName, operator, value = self.simpleSplit(context.dataDictionary)
+                    return {"TreeNode": {
+                        "field": fieldName,
+                        "operator": operator,
+                        "value": value,
+                        "pass": left.simpleWalk(context, functionName, splitCharacteristic, predicateTypes),
+                        "fail": right.simpleWalk(context, functionName, splitCharacteristic, predicateTypes)}}
 
                 else:
                     raise NotImplementedError
@@ -1099,6 +1096,29 @@ class Node(PmmlBinding):
             else:
                 raise NotImplementedError
 
+    def packNodes(self, dataDictionary, out):
+        """Append this node and its descendants to a flat list, with children referenced by index rather than nested.
+
+        :type dataDictionary: dict from field name to ``{"type": PFA type name}``
+        :param dataDictionary: types of the input fields
+        :type out: list
+        :param out: nodes packed so far; modified in-place
+        :rtype: integer
+        :return: index of this node in ``out``; leaves have ``pass`` and ``fail`` equal to ``-1`` and the raw PMML ``score``
+        """
+
+        index = len(out)
+        if len(self.Node) == 0:
+            out.append({"field": None, "operator": "", "value": None, "pass": -1, "fail": -1, "score": self.score})
+        else:
+            left, right = self.Node
+            fieldName, operator, value = self.simpleSplit(dataDictionary)
+            packed = {"field": fieldName, "operator": operator, "value": value, "pass": -1, "fail": -1, "score": None}
+            out.append(packed)
+            packed["pass"] = left.packNodes(dataDictionary, out)
+            packed["fail"] = right.packNodes(dataDictionary, out)
+        return index
+
     def toPFA(self, options, context):
         raise NotImplementedError
 
@@ -1272,13 +1292,182 @@ class Regression(PmmlBinding):
 
 class RegressionModel(PmmlBinding, ModelElement):
     """Represents a <RegressionModel> tag and provides methods to convert to PFA."""
+    def featureExpression(self, key, context):
+        """PFA expression for one (non-categorical) column of the regression input vector.
+
+        :type key: tuple
+        :param key: ``("numeric", field name, exponent)`` or ``("term", field names)``, as returned by ``RegressionTable.toPFA``
+        :type context: titus.pmml.version_independent.Context
+        :param context: PMML-to-PFA conversion context
+        :rtype: titus.pfaast.Expression
+        :return: expression that computes the column
+        """
+
+        if key[0] == "numeric":
+            kind, name, exponent = key
+            if exponent == 1:
+                return context.fieldRef(name)
+            else:
+                return ast.Call("**", [context.fieldRef(name), ast.LiteralInt(exponent)])
+        else:
+            kind, names = key
+            out = context.fieldRef(names[0])
+            for name in names[1:]:
+                out = ast.Call("*", [out, context.fieldRef(name)])
+            return out
+
     def toPFA(self, options, context):
-        raise NotImplementedError
+        # every table becomes one row of a coefficient matrix over the same columns (numerical features first, then one column per category)
+        tables = [table.toPFA(options, context) for table in self.RegressionTable]
+        if len(tables) == 0:
+            raise NotImplementedError
+
+        featureKeys = []
+        oneHotKeys = []
+        for intercept, coefficients in tables:
+            for key in coefficients:
+                if key[0] == "categorical":
+                    if key not in oneHotKeys:
+                        oneHotKeys.append(key)
+                elif key not in featureKeys:
+                    featureKeys.append(key)
+        columns = featureKeys + oneHotKeys
+
+        oneHot = {}
+        for index, (kind, name, value) in enumerate(oneHotKeys):
+            oneHot.setdefault(name, {})[value] = len(featureKeys) + index
+        for name in oneHot:
+            if context.dataDictionary[name]["type"] not in ("string", "int", "long"):
+                raise NotImplementedError
+
+        coeff = [[coefficients.get(key, 0.0) for key in columns] for intercept, coefficients in tables]
+        const = [intercept for intercept, coefficients in tables]
+
+        if self.functionName == "regression":
+            if len(tables) != 1:
+                raise NotImplementedError
+            coeff, = coeff
+            const, = const
+            coeffType = {"type": "array", "items": "double"}
+            constType = "double"
+            context.outputType = "double"
+        elif self.functionName == "classification":
+            categories = [table.targetCategory for table in self.RegressionTable]
+            coeffType = {"type": "array", "items": {"type": "array", "items": "double"}}
+            constType = {"type": "array", "items": "double"}
+            context.outputType = "string"
+        else:
+            raise NotImplementedError
+
+        modelType = {"type": "record", "name": "Regression", "fields": [
+            {"name": "coeff", "type": coeffType},
+            {"name": "const", "type": constType},
+            {"name": "oneHot", "type": {"type": "map", "values": {"type": "map", "values": "int"}}}
+            ]}
+        modelData = {"coeff": coeff, "const": const, "oneHot": oneHot}
+
+        if context.storageType == "cell":
+            context.cells[context.storageName] = ast.Cell(context.avroTypeBuilder.makePlaceholder(json.dumps(modelType)), json.dumps(modelData), False, False, ast.CellPoolSource.EMBEDDED)
+            getModel = lambda *path: ast.CellGet(context.storageName, list(path))
+        elif context.storageType == "pool":
+            poolName, itemName, refName = context.storageName
+            if poolName not in context.pools:
+                context.pools[poolName] = ast.Pool(context.avroTypeBuilder.makePlaceholder(json.dumps(modelType)), {}, False, ast.CellPoolSource.EMBEDDED)
+            context.pools[poolName].init[itemName] = json.dumps(modelData)
+            getModel = lambda *path: ast.PoolGet(poolName, [ast.LiteralString(itemName)] + list(path))
+        else:
+            raise NotImplementedError
+
+        # the input vector: numerical features, then zeros for the one-hot columns, with the matching category (if any) set to one
+        datumName = "regressionDatum"
+        action = [ast.Let({datumName: ast.NewArray([self.featureExpression(key, context) for key in featureKeys] + [ast.LiteralDouble(0.0) for key in oneHotKeys],
+                                                   context.avroTypeBuilder.makePlaceholder('{"type": "array", "items": "double"}'))})]
+        for name in sorted(oneHot):
+            if context.dataDictionary[name]["type"] == "string":
+                category = context.fieldRef(name)
+            else:
+                category = ast.Call("s.int", [context.fieldRef(name)])
+            action.append(ast.If(ast.Call("map.containsKey", [getModel(ast.LiteralString("oneHot"), ast.LiteralString(name)), category]),
+                                 [ast.SetVar({datumName: ast.Call("a.replace", [ast.Ref(datumName), getModel(ast.LiteralString("oneHot"), ast.LiteralString(name), category), ast.LiteralDouble(1.0)])})],
+                                 None))
+
+        linear = ast.Call("model.reg.linear", [ast.Ref(datumName), getModel()])
+        normalizationMethod = self.normalizationMethod
+        if normalizationMethod is None:
+            normalizationMethod = "none"
+
+        if self.functionName == "regression":
+            if normalizationMethod == "none":
+                action.append(linear)
+            elif normalizationMethod in ("softmax", "logit"):
+                action.append(ast.Call("m.link.logit", [linear]))
+            elif normalizationMethod == "exp":
+                action.append(ast.Call("m.exp", [linear]))
+            elif normalizationMethod in ("probit", "cloglog", "loglog", "cauchit"):
+                action.append(ast.Call("m.link." + normalizationMethod, [linear]))
+            else:
+                raise NotImplementedError
+
+        else:
+            categoryArray = ast.Literal(context.avroTypeBuilder.makePlaceholder('{"type": "array", "items": "string"}'), json.dumps(categories))
+            if normalizationMethod == "none":
+                scores = linear
+            elif normalizationMethod == "softmax":
+                scores = ast.Call("m.link.softmax", [linear])
+            elif normalizationMethod in ("logit", "probit", "cloglog", "loglog", "cauchit"):
+                scores = ast.Call("m.link." + normalizationMethod, [linear])
+            elif normalizationMethod == "simplemax":
+                action.append(ast.Let({"regressionScores": linear}))
+                scores = ast.Call("la.scale", [ast.Ref("regressionScores"), ast.Call("/", [ast.LiteralDouble(1.0), ast.Call("a.sum", [ast.Ref("regressionScores")])])])
+            else:
+                raise NotImplementedError
+
+            if len(categories) == 2 and normalizationMethod in ("none", "logit", "probit", "cloglog", "loglog", "cauchit"):
+                # binary case: the second category's probability is one minus the first's (the second table is not used)
+                index = ast.If(ast.Call(">=", [ast.AttrGet(scores, [ast.LiteralInt(0)]), ast.LiteralDouble(0.5)]), [ast.LiteralInt(0)], [ast.LiteralInt(1)])
+            else:
+                index = ast.Call("a.argmax", [scores])
+            action.append(ast.AttrGet(categoryArray, [index]))
+
+        return action
 
 class RegressionTable(PmmlBinding):
     """Represents a <RegressionTable> tag and provides methods to convert to PFA."""
     def toPFA(self, options, context):
-        raise NotImplementedError
+        """Collect the coefficients of this table.
+
+        :type options: dict of string
+        :param options: PMML-to-PFA conversion options
+        :type context: titus.pmml.version_independent.Context
+        :param context: PMML-to-PFA conversion context
+        :rtype: (number, OrderedDict from tuple to number)
+        :return: (intercept, coefficients), where each coefficient is keyed by ``("numeric", field name, exponent)``, ``("categorical", field name, value as a string)``, or ``("term", field names)``
+        """
+
+        coefficients = OrderedDict()
+        for predictor in self.NumericPredictor:
+            if predictor.exponent is None:
+                exponent = 1
+            else:
+                exponent = int(predictor.exponent)
+            key = ("numeric", predictor.name, exponent)
+            coefficients[key] = coefficients.get(key, 0.0) + float(predictor.coefficient)
+
+        for predictor in self.CategoricalPredictor:
+            value = predictor.value
+            if context.dataDictionary[predictor.name]["type"] in ("int", "long"):
+                value = str(int(value))
+            key = ("categorical", predictor.name, value)
+            coefficients[key] = coefficients.get(key, 0.0) + float(predictor.coefficient)
+
+        for term in self.PredictorTerm:
+            names = tuple(x.field for x in term.FieldRef)
+            if len(names) == 0 or any(context.dataDictionary.get(name, {}).get("type") == "string" for name in names):
+                raise NotImplementedError
+            key = ("term", names)
+            coefficients[key] = coefficients.get(key, 0.0) + float(term.coefficient)
+
+        return float(self.intercept), coefficients
 
 class ResultField(PmmlBinding):
     """Represents a <ResultField> tag and provides methods to convert to PFA."""
@@ -1322,13 +1511,164 @@ class Seasonality_ExpoSmooth(PmmlBinding):
 
 class Segment(PmmlBinding):
     """Represents a <Segment> tag and provides methods to convert to PFA."""
+    def packedTree(self, dataDictionary):
+        """Convert this segment's ``<TreeModel>`` into a flat list of nodes (see ``Node.packNodes``).
+
+        :type dataDictionary: dict from field name to ``{"type": PFA type name}``
+        :param dataDictionary: types of the input fields
+        :rtype: dict
+        :return: ``functionName``, ``weight``, and ``nodes`` of the tree
+        """
+
+        packed = getattr(self, "packed", None)
+        if packed is not None:
+            return packed
+
+        if not isinstance((self.SimplePredicate + self.CompoundPredicate + self.SimpleSetPredicate + self.AlwaysTrue + self.AlwaysFalse)[0], AlwaysTrue):
+            raise NotImplementedError
+        if len(self.TreeModel) != 1 or any(isinstance(x, ModelElement) and not isinstance(x, TreeModel) for x in self.children):
+            raise NotImplementedError
+
+        if self.weight is None:
+            weight = 1.0
+        else:
+            weight = float(self.weight)
+
+        treeModel = self.TreeModel[0]
+        return {"functionName": treeModel.functionName, "weight": weight, "nodes": treeModel.packedNodes(dataDictionary)}
+
+    def compact(self, dataDictionary):
+        """Replace this segment's ``<TreeModel>`` with its packed form, if possible, so that the PMML elements can be garbage collected while streaming.
+
+        :type dataDictionary: dict from field name to ``{"type": PFA type name}``
+        :param dataDictionary: types of the input fields
+        :rtype: ``None``
+        :return: nothing; modifies this segment in-place
+        """
+
+        try:
+            self.packed = self.packedTree(dataDictionary)
+        except (NotImplementedError, KeyError, ValueError, IndexError):
+            return
+        self.children = [x for x in self.children if not isinstance(x, TreeModel)]
+        self.TreeModel = []
+
     def toPFA(self, options, context):
         raise NotImplementedError
 
 class Segmentation(PmmlBinding):
     """Represents a <Segmentation> tag and provides methods to convert to PFA."""
     def toPFA(self, options, context):
-        raise NotImplementedError
+        trees = [segment.packedTree(context.dataDictionary) for segment in self.Segment]
+        if len(trees) == 0 or any(tree["functionName"] != context.functionName for tree in trees):
+            raise NotImplementedError
+
+        # every per-tree result is multiplied by a weight computed here, so that one a.sum or a.fold aggregates them
+        if context.functionName == "regression":
+            scoreType = "double"
+            if self.multipleModelMethod == "sum":
+                weights = [1.0 for tree in trees]
+            elif self.multipleModelMethod == "average":
+                weights = [1.0 / len(trees) for tree in trees]
+            elif self.multipleModelMethod == "weightedAverage":
+                totalWeight = sum(tree["weight"] for tree in trees)
+                weights = [tree["weight"] / totalWeight for tree in trees]
+            else:
+                raise NotImplementedError
+
+        elif context.functionName == "classification":
+            # leaves refer to categories by index; votes are tallied in an array
+            scoreType = "int"
+            if self.multipleModelMethod == "majorityVote":
+                weights = [1.0 for tree in trees]
+            elif self.multipleModelMethod == "weightedMajorityVote":
+                weights = [tree["weight"] for tree in trees]
+            else:
+                raise NotImplementedError
+            categories = []
+            for tree in trees:
+                for node in tree["nodes"]:
+                    if node["pass"] < 0 and node["score"] not in categories:
+                        categories.append(node["score"])
+
+        else:
+            raise NotImplementedError
+
+        symbols = [x.name for x in context.inputType.fields]
+        # split values are tagged as "double" for any numeric field and "string" otherwise (see Node.simpleSplit)
+        valueTypes = sorted(set("double" if x["type"] in ("int", "long", "float", "double") else "string" for x in context.dataDictionary.values()))
+
+        modelData = []
+        for tree, weight in zip(trees, weights):
+            nodes = []
+            for node in tree["nodes"]:
+                if node["pass"] < 0:
+                    field = symbols[0]
+                    if scoreType == "double":
+                        score = float(node["score"])
+                    else:
+                        score = categories.index(node["score"])
+                else:
+                    field = node["field"]
+                    if scoreType == "double":
+                        score = 0.0
+                    else:
+                        score = -1
+                nodes.append({"field": field, "operator": node["operator"], "value": node["value"], "pass": node["pass"], "fail": node["fail"], "score": score})
+            modelData.append({"weight": weight, "nodes": nodes})
+
+        modelType = {"type": "array", "items": {"type": "record", "name": "Tree", "fields": [
+            {"name": "weight", "type": "double"},
+            {"name": "nodes", "type": {"type": "array", "items": {"type": "record", "name": "TreeNode", "fields": [
+                {"name": "field", "type": {"type": "enum", "name": "TreeFields", "symbols": symbols}},
+                {"name": "operator", "type": "string"},
+                {"name": "value", "type": ["null"] + valueTypes},
+                {"name": "pass", "type": "int"},
+                {"name": "fail", "type": "int"},
+                {"name": "score", "type": scoreType}
+                ]}}}
+            ]}}
+
+        if context.storageType == "cell":
+            context.cells[context.storageName] = ast.Cell(context.avroTypeBuilder.makePlaceholder(json.dumps(modelType)), json.dumps(modelData), False, False, ast.CellPoolSource.EMBEDDED)
+            getModel = ast.CellGet(context.storageName, [])
+        elif context.storageType == "pool":
+            poolName, itemName, refName = context.storageName
+            if poolName not in context.pools:
+                context.pools[poolName] = ast.Pool(context.avroTypeBuilder.makePlaceholder(json.dumps(modelType)), {}, False, ast.CellPoolSource.EMBEDDED)
+            context.pools[poolName].init[itemName] = json.dumps(modelData)
+            getModel = ast.PoolGet(poolName, [ast.LiteralString(itemName)])
+        else:
+            raise NotImplementedError
+
+        # walk one tree by node index: follow pass or fail until reaching a leaf (pass < 0)
+        def nodeAttr(*path):
+            return ast.AttrGet(ast.Ref("tree"), [ast.LiteralString("nodes"), ast.Ref("node")] + [ast.LiteralString(x) for x in path])
+
+        walk = [ast.Let({"node": ast.LiteralInt(0)}),
+                ast.While(ast.Call(">=", [nodeAttr("pass"), ast.LiteralInt(0)]),
+                          [ast.SetVar({"node": ast.If(ast.Call("model.tree.simpleTest", [ast.Ref("input"), nodeAttr()]), [nodeAttr("pass")], [nodeAttr("fail")])})])]
+        treeWeight = ast.AttrGet(ast.Ref("tree"), [ast.LiteralString("weight")])
+
+        if scoreType == "double":
+            return [ast.Call("a.sum", [ast.Call("a.map", [
+                getModel,
+                ast.FcnDef([{"tree": context.avroTypeBuilder.makePlaceholder('"Tree"')}],
+                           context.avroTypeBuilder.makePlaceholder('"double"'),
+                           walk + [ast.Call("*", [treeWeight, nodeAttr("score")])])
+                ])])]
+
+        else:
+            tallyType = context.avroTypeBuilder.makePlaceholder('{"type": "array", "items": "double"}')
+            vote = walk + [ast.Let({"vote": nodeAttr("score")}),
+                           ast.Call("a.replace", [ast.Ref("tally"), ast.Ref("vote"), ast.Call("+", [ast.AttrGet(ast.Ref("tally"), [ast.Ref("vote")]), treeWeight])])]
+            return [ast.AttrGet(ast.Literal(context.avroTypeBuilder.makePlaceholder('{"type": "array", "items": "string"}'), json.dumps(categories)), [
+                ast.Call("a.argmax", [ast.Call("a.fold", [
+                    getModel,
+                    ast.Literal(tallyType, json.dumps([0.0] * len(categories))),
+                    ast.FcnDef([{"tally": tallyType}, {"tree": context.avroTypeBuilder.makePlaceholder('"Tree"')}], tallyType, vote)
+                    ])])
+                ])]
 
 class SelectResult(PmmlBinding):
     """Represents a <SelectResult> tag and provides methods to convert to PFA."""
@@ -1556,6 +1896,32 @@ class TransformationDictionary(PmmlBinding):
 
 class TreeModel(PmmlBinding, ModelElement):
     """Represents a <TreeModel> tag and provides methods to convert to PFA."""
+    def packedNodes(self, dataDictionary):
+        """Convert a binary tree of ``<SimplePredicates>`` into a flat list of nodes (see ``Node.packNodes``).
+
+        :type dataDictionary: dict from field name to ``{"type": PFA type name}``
+        :param dataDictionary: types of the input fields
+        :rtype: list of dict
+        :return: nodes with the root first
+        """
+
+        topNode = self.Node[0]
+        otherNodes = topNode.nodes()
+
+        splitCharacteristic = self.splitCharacteristic
+        if self.splitCharacteristic is None:
+            if all(len(node.Node) == 0 or len(node.Node) == 2 for node in otherNodes):
+                splitCharacteristic = "binarySplit"
+
+        if splitCharacteristic != "binarySplit" or not isinstance(topNode.predicate(), AlwaysTrue):
+            raise NotImplementedError
+        if set(x.predicate().__class__.__name__ for x in otherNodes) != set(["SimplePredicate"]):
+            raise NotImplementedError
+
+        out = []
+        topNode.packNodes(dataDictionary, out)
+        return out
+
     def toPFA(self, options, context):
         topNode = self.Node[0]
         otherNodes = topNode.nodes()
@@ -19,6 +19,7 @@
 
 import ast as pythonast
 import base64
+import copy
 import json as jsonlib
 import re
 from collections import OrderedDict
@@ -1183,20 +1184,118 @@ class MiniAssignment(MiniAst):
         else:
             super(MiniAssignment, self).defType(state)
 
+def interpretDocument(sectionDict):
+    """Interpret the sections of a parsed PrettyPFA document as a PFA abstract syntax tree; used internally.
+
+    Interpretation has no lasting effect on the Mini-AST, so the same sections can be interpreted again with different values bound to their titus.prettypfa.ResolvedSubs.
+
+    :type sectionDict: dict from section names to titus.prettypfa.Section
+    :param sectionDict: output of the PrettyPFA grammar
+    :rtype: titus.pfaast.EngineConfig
+    :return: PFA abstract syntax tree
+    """
+
+    keys = set(sectionDict.keys())
+
+    _name = None
+    _method = Method.MAP
+    _input = None
+    _output = None
+    _begin = []
+    _action = []
+    _end = []
+    _fcns = {}
+    _zero = None
+    _merge = None
+    _cells = {}
+    _pools = {}
+    _randseed = None
+    _doc = None
+    _version = None
+    _metadata = {}
+    _options = {}
+
+    if "name" in keys:
+        _name = sectionDict["name"].content.name
+    else:
+        _name = titus.util.uniqueEngineName()
+
+    if "method" in keys:
+        _method = sectionDict["method"].method()
+
+    state = InterpretationState()
+
+    if "types" in keys:
+        sectionDict["types"].types(state)
+
+    if "input" in keys:
+        _input = sectionDict["input"].input(state)
+    if "output" in keys:
+        _output = sectionDict["output"].output(state)
+    if "cells" in keys:
+        _cells = sectionDict["cells"].cells(state)
+    if "pools" in keys:
+        _pools = sectionDict["pools"].pools(state)
+
+    if "fcns" in keys:
+        for x in sectionDict["fcns"].content:
+            if isinstance(x, MiniNamedFcnDef):
+                state.functionNames.add("u." + x.name)
+    state.cellNames = set(_cells.keys())
+    state.poolNames = set(_pools.keys())
+
+    if "begin" in keys:
+        _begin = sectionDict["begin"].begin(state)
+    if "action" in keys:
+        _action = sectionDict["action"].action(state)
+    if "end" in keys:
+        _end = sectionDict["end"].end(state)
+    if "fcns" in keys:
+        _fcns = sectionDict["fcns"].fcns(state)
+
+    if "zero" in keys:
+        _zero = sectionDict["zero"].zero()
+    if "merge" in keys:
+        _merge = sectionDict["merge"].merge(state)
+    if "randseed" in keys:
+        _randseed = sectionDict["randseed"].randseed()
+    if "doc" in keys:
+        _doc = sectionDict["doc"].doc()
+    if "version" in keys:
+        _version = sectionDict["version"].version()
+    if "metadata" in keys:
+        _metadata = sectionDict["metadata"].metadata()
+    if "options" in keys:
+        _options = sectionDict["options"].options()
+
+    required = set(["action", "input", "output"])
+    if keys.intersection(required) != required:
+        raise PFASyntaxException("missing top-level fields: {0}".format(", ".join(required.difference(keys))), "PrettyPFA document")
+    else:
+        out = EngineConfig(_name, _method, _input, _output, _begin, _action, _end, _fcns, _zero, _merge, _cells, _pools, _randseed, _doc, _version, _metadata, _options, "PrettyPFA document")
+        state.avroTypeBuilder.resolveTypes()
+        return out
+
 class Parser(object):
     """Parser for the "ply" package, specialized for PrettyPFA (whole document or expression).
 
     Includes both the tokenizer and the parser.
     """
 
-    def __init__(self, wholeDocument):
+    replacement = re.compile(r"<<([A-Za-z_][A-Za-z_0-9]*)>>")
+
+    def __init__(self, wholeDocument, cacheSize=64):
         """Creates the ``Parser``, but it is only ready to use after calling ``initialize``.
 
         :type wholeDocument: bool
         :param wholeDocument: if ``True``, this parser expects a whole PFA document and ``parse`` returns a titus.pfaast.EngineConfig; otherwise, this parser expects a PFA expression and ``parse`` returns a titus.pfaast.Expression
+        :type cacheSize: non-negative integer
+        :param cacheSize: number of parsed texts (Mini-ASTs) to keep, so that a template used with many different substitutions is only tokenized and parsed once; ``0`` disables the cache
         """
         self.initialized = False
         self.wholeDocument = wholeDocument
+        self.cacheSize = cacheSize
+        self.cache = OrderedDict()
 
     def initialize(self, lex, yacc):
         """Initialize the ``Parser`` by passing it the appropriate ply modules.
@@ -1290,6 +1389,7 @@ class Parser(object):
             name = t.value[2:-2]
             if name in self.subs:
                 t.value = ResolvedSubs(name, self.subs[name], t.lexer.lineno)
+                self.resolved.append(t.value)
             else:
                 t.value = Subs(name, t.lexer.lineno)
             return t
@@ -1454,88 +1554,8 @@ class Parser(object):
         if self.wholeDocument:
             def p_document(p):
                 r'''document : sections'''
+                p[0] = p[1]
 
-                sectionDict = p[1]
-                keys = set(sectionDict.keys())
-
-                _name = None
-                _method = Method.MAP
-                _input = None
-                _output = None
-                _begin = []
-                _action = []
-                _end = []
-                _fcns = {}
-                _zero = None
-                _merge = None
-                _cells = {}
-                _pools = {}
-                _randseed = None
-                _doc = None
-                _version = None
-                _metadata = {}
-                _options = {}
-
-                if "name" in keys:
-                    _name = sectionDict["name"].content.name
-                else:
-                    _name = titus.util.uniqueEngineName()
-
-                if "method" in keys:
-                    _method = sectionDict["method"].method()
-
-                state = InterpretationState()
-
-                if "types" in keys:
-                    sectionDict["types"].types(state)
-
-                if "input" in keys:
-                    _input = sectionDict["input"].input(state)
-                if "output" in keys:
-                    _output = sectionDict["output"].output(state)
-                if "cells" in keys:
-                    _cells = sectionDict["cells"].cells(state)
-                if "pools" in keys:
-                    _pools = sectionDict["pools"].pools(state)
-
-                if "fcns" in keys:
-                    for x in sectionDict["fcns"].content:
-                        if isinstance(x, MiniNamedFcnDef):
-                            state.functionNames.add("u." + x.name)
-                state.cellNames = set(_cells.keys())
-                state.poolNames = set(_pools.keys())
-
-                if "begin" in keys:
-                    _begin = sectionDict["begin"].begin(state)
-                if "action" in keys:
-                    _action = sectionDict["action"].action(state)
-                if "end" in keys:
-                    _end = sectionDict["end"].end(state)
-                if "fcns" in keys:
-                    _fcns = sectionDict["fcns"].fcns(state)
-
-                if "zero" in keys:
-                    _zero = sectionDict["zero"].zero()
-                if "merge" in keys:
-                    _merge = sectionDict["merge"].merge(state)
-                if "randseed" in keys:
-                    _randseed = sectionDict["randseed"].randseed()
-                if "doc" in keys:
-                    _doc = sectionDict["doc"].doc()
-                if "version" in keys:
-                    _version = sectionDict["version"].version()
-                if "metadata" in keys:
-                    _metadata = sectionDict["metadata"].metadata()
-                if "options" in keys:
-                    _options = sectionDict["options"].options()
-
-                required = set(["action", "input", "output"])
-                if keys.intersection(required) != required:
-                    raise PFASyntaxException("missing top-level fields: {0}".format(", ".join(required.difference(keys))), "PrettyPFA document")
-                else:
-                    p[0] = EngineConfig(_name, _method, _input, _output, _begin, _action, _end, _fcns, _zero, _merge, _cells, _pools, _randseed, _doc, _version, _metadata, _options, "PrettyPFA document")
-                    state.avroTypeBuilder.resolveTypes()
-                    
             def p_section(p):
                 r'''section : SECTION_HEADER_START anything
                             | SECTION_HEADER anything'''
@@ -2118,25 +2138,65 @@ class Parser(object):
         :return: parsed text as an abstract syntax tree
         """
 
-        self.lexer.lineno = 1
-        self.text = text
-        self.subs = subs
-        out = self.yacc.parse(text, lexer=self.lexer)
-        if self.wholeDocument:
-            return out
+        # the grammar only depends on which substitutions are resolved, not on their values
+        key = (text, frozenset(name for name in self.replacement.findall(text) if name in subs))
+        entry = self.cache.pop(key, None)
+        if entry is None:
+            self.lexer.lineno = 1
+            self.text = text
+            self.subs = subs
+            self.resolved = []
+            entry = (self.yacc.parse(text, lexer=self.lexer), self.resolved)
+            if self.cacheSize > 0:
+                while len(self.cache) >= self.cacheSize:
+                    self.cache.popitem(last=False)
+                self.cache[key] = entry
         else:
-            state = InterpretationState()
-            if isinstance(out, (list, tuple)):
-                out2 = [x.asExpr(state) for x in out]
+            self.cache[key] = entry
+
+        out, resolved = entry
+        for token in resolved:
+            token.value = subs[token.name]
+        try:
+            if self.wholeDocument:
+                return interpretDocument(out)
             else:
-                out2 = out.asExpr(state)
-            state.avroTypeBuilder.resolveTypes()
-            return out2
+                state = InterpretationState()
+                if isinstance(out, (list, tuple)):
+                    out2 = [x.asExpr(state) for x in out]
+                else:
+                    out2 = out.asExpr(state)
+                state.avroTypeBuilder.resolveTypes()
+                return out2
+        finally:
+            # don't keep the substituted values alive in the cache
+            for token in resolved:
+                token.value = None
 
 ###
 
 parser = Parser(True)
 
+checkedCacheSize = 256
+checkedCache = OrderedDict()
+
+def _checkedKey(engineConfig, version):
+    """Serialize everything that can affect the semantic check of a PFA document except its cell and pool data, which are checked separately (titus.pfaast.Cell.walk does not look at them).
+
+    Names generated for anonymous types (``Record_N``, ``Enum_N``, ``Fixed_N``) are renumbered in order of appearance, since they differ every time the same template is interpreted.
+    """
+    skeleton = copy.copy(engineConfig)
+    skeleton.name = ""
+    skeleton.cells = dict((k, Cell(v.avroPlaceholder, "null", v.shared, v.rollback, v.source)) for k, v in engineConfig.cells.items())
+    skeleton.pools = dict((k, Pool(v.avroPlaceholder, {}, v.shared, v.rollback, v.source)) for k, v in engineConfig.pools.items())
+    text = jsonlib.dumps(skeleton.jsonNode(False, set()), sort_keys=True)
+    generated = {}
+    def renumber(m):
+        if m.group(0) not in generated:
+            generated[m.group(0)] = "\"{0}#{1}\"".format(m.group(1), len(generated))
+        return generated[m.group(0)]
+    return version, re.sub(r'"(Record|Enum|Fixed)_[0-9]+"', renumber, text)
+
 def subs(originalAst, **subs2):
     """Apply substitutions to all titus.pfaast.Subs nodes in a PFA abstract syntax tree using its ``replace`` method.
 
@@ -2164,7 +2224,7 @@ def ast(text, check=True, version=None, subs={}, **subs2):
     :type text: string
     :param text: PrettyPFA to parse
     :type check: bool
-    :param check: if ``True``, check the result for PFA semantic errors (default ``True``); **Note:** if the PrettyPFA contains any unresolved substitutions (in ``<<French quotes>>``), it will **not** be checked
+    :param check: if ``True``, check the result for PFA semantic errors (default ``True``); **Note:** if the PrettyPFA contains any unresolved substitutions (in ``<<French quotes>>``), it will **not** be checked; documents that differ only in cell and pool data are only fully checked once (see ``titus.prettypfa.checkedCache``)
     :type version: string or ``None``
     :param version: version of the PFA language to use while interpreting (``None`` defaults to titus.version.defaultPFAVersion)
     :type subs: dict from substitution names to substitutions
@@ -2192,7 +2252,19 @@ def ast(text, check=True, version=None, subs={}, **subs2):
     anysubs.isDefinedAt = lambda x: isinstance(x, Subs)
 
     if check and len(out.collect(anysubs)) == 0:
-        PFAEngine.fromAst(out, version=version)
+        # a template whose substitutions only change cell and pool data is only type-checked once
+        key = _checkedKey(out, version)
+        if key in checkedCache:
+            checkedCache[key] = checkedCache.pop(key)
+            for cellOrPool in out.cells.values() + out.pools.values():
+                # decoding the data raises the same errors as PFAEngine.fromAst would
+                cellOrPool.initValue
+        else:
+            PFAEngine.fromAst(out, version=version)
+            if checkedCacheSize > 0:
+                while len(checkedCache) >= checkedCacheSize:
+                    checkedCache.popitem(last=False)
+                checkedCache[key] = True
     return out
 
 def jsonNode(text, lineNumbers=True, check=True, version=None, subs={}, **subs2):
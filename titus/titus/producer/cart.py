@@ -18,6 +18,7 @@
 # limitations under the License.
 
 import itertools
+import multiprocessing
 import numbers
 import math
 import json
@@ -58,6 +59,10 @@ class Dataset(object):
         def __repr__(self):
             return "<Dataset.Field of type {0} at 0x{1:08x}>".format("float" if self.tpe == numbers.Real else "str", id(self))
 
+        def __reduce__(self):
+            # nested classes can't be pickled by name in Python 2; needed to send fields to a process pool
+            return (_restoreField, (self.tpe, self.__dict__))
+
         def add(self, v):
             self.data.append(v)
 
@@ -159,22 +164,113 @@ class Dataset(object):
 
         return cls([x.toNumpy() for x in fields], names)
 
+    @classmethod
+    def fromNumpy(cls, columns, names=None, mmapMode="r"):
+        """Constructor for Dataset that takes one Numpy array (or ``.npy`` file) per column.
+
+        Numerical columns are used as-is if they are already arrays of ``float``, so a memory-mapped column stays on disk; string columns are converted to integer categories in memory.
+
+        :type columns: list of 1-d Numpy arrays or ``.npy`` file names
+        :param columns: input dataset, one entry per field
+        :type names: list of strings or ``None``
+        :param names: names of the fields; if not provided, names like ``var0``, ``var1``, etc. will be generated.
+        :type mmapMode: string or ``None``
+        :param mmapMode: ``mmap_mode`` used to load columns given as file names (``None`` to read them into memory)
+        :rtype: titus.producer.cart.Dataset
+        :return: a dataset
+        """
+
+        if names is None:
+            formatter = "var{0:0%dd}" % len(str(len(columns)))
+            names = [formatter.format(i) for i in xrange(len(columns))]
+        elif len(names) != len(columns):
+            raise ValueError("number of columns in dataset is not the same as the number of names")
+
+        fields = []
+        for columnNumber, column in enumerate(columns):
+            if isinstance(column, basestring):
+                column = numpy.load(column, mmap_mode=mmapMode)
+            if len(column.shape) != 1:
+                raise ValueError("column {0} is not one-dimensional".format(columnNumber))
+            if len(fields) > 0 and len(column) != len(fields[0].data):
+                raise ValueError("number of rows in column {0} is not the same as the first: {1}".format(columnNumber, len(column)))
+
+            if column.dtype.kind in ("f", "i", "u", "b"):
+                field = cls.Field(numbers.Real)
+                if column.dtype == numpy.dtype(float):
+                    field.data = column
+                else:
+                    field.data = column.astype(numpy.dtype(float))
+            elif column.dtype.kind in ("S", "U", "O"):
+                field = cls.Field(basestring)
+                unique, converted = numpy.unique(column, return_inverse=True)
+                field.intToStr = dict(enumerate(unique.tolist()))
+                field.strToInt = dict((x, i) for i, x in field.intToStr.items())
+                field.data = converted.astype(numpy.dtype(int))
+            else:
+                raise ValueError("column {0} must contain real numbers or strings, not {1}".format(columnNumber, column.dtype))
+            fields.append(field)
+
+        return cls(fields, names)
+
     def __len__(self):
         return len(self.fields[0].data)
 
     def __repr__(self):
         return "<Dataset with {0} fields at 0x{1:08x}>".format(len(self.fields), id(self))
 
+def _restoreField(tpe, state):
+    out = Dataset.Field(tpe)
+    out.__dict__.update(state)
+    return out
+
+def _fieldGainTerms(args):
+    # runs in a worker process: evaluate the best split of a chunk of fields
+    predictand, fields, maxSubsetSize = args
+    node = TreeNode(Dataset(fields, [None] * len(fields)), predictand, maxSubsetSize)
+    return [node.fieldGainTerm(field) for field in fields]
+
+class TrainingIndex(object):
+    """Shared state for building a tree by row indexes rather than by copying the dataset at each node.
+
+    Each numerical field is sorted once (or binned into quantiles once), and tree nodes refer to rows of the original dataset, which may be memory-mapped.
+    """
+
+    def __init__(self, dataset, bins=None):
+        """:type dataset: titus.producer.cart.Dataset
+        :param dataset: dataset of regressors only
+        :type bins: positive integer or ``None``
+        :param bins: if provided, numerical fields are binned into this many quantiles and splits are only considered at bin edges
+        """
+
+        self.dataset = dataset
+        self.bins = bins
+
+        self.sortedRows = {}
+        self.binEdges = {}
+        self.binCodes = {}
+        for fieldIndex, field in enumerate(dataset.fields):
+            if field.tpe == numbers.Real:
+                if bins is None:
+                    self.sortedRows[fieldIndex] = numpy.argsort(field.data, kind="mergesort")
+                else:
+                    edges = numpy.unique(numpy.percentile(field.data, numpy.linspace(0.0, 100.0, bins + 1)[1:]))
+                    self.binEdges[fieldIndex] = edges
+                    codes = numpy.searchsorted(edges, field.data, side="left")
+                    self.binCodes[fieldIndex] = codes.astype(numpy.min_scalar_type(len(edges)))
+
 class TreeNode(object):
     """Represents a tree node and applies the CART algorithm to build decision and regression trees.
 
     The constructors are ``__init__`` and ``fromWholeDataset``.
 
     Tree-building is initiated by calling ``splitUntil(condition)``, where ``condition(node, depth)`` is a user-supplied function that takes a node (titus.producer.cart.TreeNode) and depth (integer) and returns bool (``True``: continue splitting; ``False``: stop splitting).
+
+    For large datasets, ``fromWholeDataset(..., indexed=True)`` builds the tree through a ``titus.producer.cart.TrainingIndex``: numerical fields are sorted once, nodes hold row indexes into the original (possibly memory-mapped) dataset instead of copies of it, and with ``bins`` numerical splits are found from quantile histograms.
     """
 
     @classmethod
-    def fromWholeDataset(cls, wholeDataset, predictandName, maxSubsetSize=None):
+    def fromWholeDataset(cls, wholeDataset, predictandName, maxSubsetSize=None, pool=None, indexed=False, bins=None):
         """Constructor for a tree from a dataset that includes the predictand (that which we try to purify in the leaves) as one of its fields.
 
         :type wholeDataset: titus.producer.cart.Dataset
@@ -183,6 +279,12 @@ class TreeNode(object):
         :param predictandName: name of the predictand, to be taken out of the dataset
         :type maxSubsetSize: positive integer or ``None``
         :param maxSubsetSize: maximum size of subset splits of categorical regressors (approximation for optimization in ``categoricalEntropyGainTerm`` and ``categoricalNVarianceGainTerm``)
+        :type pool: ``multiprocessing.Pool`` or ``None``
+        :param pool: if provided, ``splitOnce`` evaluates the fields in parallel in this process pool
+        :type indexed: bool
+        :param indexed: if ``True``, build the tree through a ``titus.producer.cart.TrainingIndex`` (sort once, partition row indexes); fields are then evaluated in this process, ignoring ``pool``, since workers would need their own copies of the rows
+        :type bins: positive integer or ``None``
+        :param bins: if provided, find numerical splits from quantile histograms with this many bins (implies ``indexed``)
         :rtype: titus.producer.cart.TreeNode
         :return: an unsplit tree
         """
@@ -192,9 +294,15 @@ class TreeNode(object):
                           wholeDataset.names[:predictandIndex] + wholeDataset.names[(predictandIndex + 1):])
         predictand = wholeDataset.fields[predictandIndex]
         maxSubsetSize = maxSubsetSize
-        return cls(dataset, predictand, maxSubsetSize)
+        if indexed or bins is not None:
+            index = TrainingIndex(dataset, bins)
+            rows = numpy.arange(len(predictand.data))
+            sortedPositions = dict(index.sortedRows)
+            return cls(dataset, predictand.select(rows), maxSubsetSize, pool, index, rows, sortedPositions)
+        else:
+            return cls(dataset, predictand, maxSubsetSize, pool)
 
-    def __init__(self, dataset, predictand, maxSubsetSize=None):
+    def __init__(self, dataset, predictand, maxSubsetSize=None, pool=None, index=None, rows=None, sortedPositions=None):
         """Constructor for a tree from a dataset of regressors (that which we split) and a predictand (that which we try to purify in the leaves).
 
         :type dataset: titus.producer.cart.Dataset
@@ -203,11 +311,23 @@ class TreeNode(object):
         :param predictand: predictands in a separate array with the same number of rows as the ``dataset``
         :type maxSubsetSize: positive integer or ``None``
         :param maxSubsetSize: maximum size of subset splits of categorical regressors (approximation for optimization in ``categoricalEntropyGainTerm`` and ``categoricalNVarianceGainTerm``)
+        :type pool: ``multiprocessing.Pool`` or ``None``
+        :param pool: if provided, ``splitOnce`` evaluates the fields in parallel in this process pool
+        :type index: titus.producer.cart.TrainingIndex or ``None``
+        :param index: if provided, ``dataset`` is the whole dataset and this node only refers to some of its rows
+        :type rows: 1-d Numpy array of integers or ``None``
+        :param rows: with ``index``, increasing indexes of the rows of ``dataset`` in this node (``predictand`` has one entry per row in this list)
+        :type sortedPositions: dict from field index to 1-d Numpy array of integers, or ``None``
+        :param sortedPositions: with ``index``, positions in ``rows`` that put each unbinned numerical field in increasing order
         """
 
         self.dataset = dataset
         self.predictand = predictand
         self.maxSubsetSize = maxSubsetSize
+        self.pool = pool
+        self.index = index
+        self.rows = rows
+        self.sortedPositions = sortedPositions
 
         self.datasetSize = len(self.predictand.data)
 
@@ -299,13 +419,8 @@ class TreeNode(object):
             self.fieldIndex = None
             self.field = None
             # for each field...
-            for fieldIndex, field in enumerate(self.dataset.fields):
-                if field.tpe == numbers.Real:
-                    gainTerm, split = self.numericalNVarianceGainTerm(field)
-                elif field.tpe == basestring:
-                    gainTerm, split = self.categoricalNVarianceGainTerm(field, self.maxSubsetSize)
-                else:
-                    raise RuntimeError
+            for fieldIndex, (gainTerm, split) in enumerate(self.fieldGainTerms()):
+                field = self.dataset.fields[fieldIndex]
 
                 # the gainTerm functions don't include this constant (n-times-variance of the unsplit node)
                 gainTerm += self.nTimesVariance
@@ -330,14 +445,8 @@ class TreeNode(object):
             self.fieldIndex = None
             self.field = None
             # for each field...
-            for fieldIndex, field in enumerate(self.dataset.fields):
-                # go to a function that finds the best choice for that field
-                if field.tpe == numbers.Real:
-                    gainTerm, split = self.numericalEntropyGainTerm(field)
-                elif field.tpe == basestring:
-                    gainTerm, split = self.categoricalEntropyGainTerm(field, self.maxSubsetSize)
-                else:
-                    raise RuntimeError
+            for fieldIndex, (gainTerm, split) in enumerate(self.fieldGainTerms()):
+                field = self.dataset.fields[fieldIndex]
 
                 # the gainTerm functions don't include this constant (entropy of the unsplit node)
                 gainTerm += self.entropy
@@ -352,6 +461,10 @@ class TreeNode(object):
         else:
             raise RuntimeError
 
+        if self.index is not None:
+            self.splitIndexed()
+            return
+
         # construct a new dataset by splitting the best field, best split
         if self.field.tpe == numbers.Real:
             passSelection = self.field.data <= self.split
@@ -372,8 +485,192 @@ class TreeNode(object):
             failPredictand = self.predictand.select(failSelection)
 
             # create two new tree nodes, one with the data that pass the cut, the other with the data that fail
-            self.passBranch = TreeNode(passDataset, passPredictand, self.maxSubsetSize)
-            self.failBranch = TreeNode(failDataset, failPredictand, self.maxSubsetSize)
+            self.passBranch = TreeNode(passDataset, passPredictand, self.maxSubsetSize, self.pool)
+            self.failBranch = TreeNode(failDataset, failPredictand, self.maxSubsetSize, self.pool)
+
+    def splitIndexed(self):
+        """Add two new ``TreeNodes`` below this one by partitioning its row indexes, rather than copying the dataset (used when the tree has a ``TrainingIndex``)."""
+
+        data = self.field.data[self.rows]
+        if self.field.tpe == numbers.Real:
+            passSelection = data <= self.split
+        elif self.field.tpe == basestring:
+            passSelection = numpy.in1d(data, self.split)
+        failSelection = numpy.logical_not(passSelection)
+        del data
+
+        numPass = numpy.count_nonzero(passSelection)
+        if numPass > 0 and numPass < len(self.rows):
+            # positions in this node's rows --> positions in each child's rows
+            passPosition = numpy.cumsum(passSelection) - 1
+            failPosition = numpy.cumsum(failSelection) - 1
+
+            passSortedPositions = {}
+            failSortedPositions = {}
+            for fieldIndex, positions in self.sortedPositions.items():
+                passSortedPositions[fieldIndex] = passPosition[positions[passSelection[positions]]]
+                failSortedPositions[fieldIndex] = failPosition[positions[failSelection[positions]]]
+
+            self.passBranch = TreeNode(self.dataset, self.predictand.select(passSelection), self.maxSubsetSize, self.pool, self.index, self.rows[passSelection], passSortedPositions)
+            self.failBranch = TreeNode(self.dataset, self.predictand.select(failSelection), self.maxSubsetSize, self.pool, self.index, self.rows[failSelection], failSortedPositions)
+
+        # the children have everything they need; release this node's share of the index
+        self.rows = None
+        self.sortedPositions = None
+
+    def indexedFieldGainTerm(self, fieldIndex):
+        """Find the best split of one field of the whole dataset, restricted to this node's rows (used when the tree has a ``TrainingIndex``).
+
+        :type fieldIndex: non-negative integer
+        :param fieldIndex: index of the field in the dataset
+        :rtype: (number, number or tuple of integers)
+        :return: (best gain term, best cut value or best combination of regressor categories)
+        """
+
+        field = self.dataset.fields[fieldIndex]
+        if fieldIndex in self.index.binCodes:
+            return self.binnedGainTerm(self.index.binCodes[fieldIndex][self.rows], self.index.binEdges[fieldIndex])
+
+        elif field.tpe == numbers.Real:
+            positions = self.sortedPositions[fieldIndex]
+            values = field.data[self.rows[positions]]
+            if self.predictand.tpe == numbers.Real:
+                return self.sortedNVarianceGainTerm(values, self.predictand.data[positions])
+            else:
+                return self.sortedEntropyGainTerm(values, self.predictand.data[positions])
+
+        else:
+            return self.fieldGainTerm(field.select(self.rows))
+
+    def binnedGainTerm(self, codes, edges):
+        """Split a numerical predictor that has been binned into quantiles, considering only cuts at the bin edges.
+
+        The work is proportional to the number of rows (to fill the histograms) plus the number of bins (to scan them), with no sorting.
+
+        :type codes: 1-d Numpy array of integers
+        :param codes: bin number of each row in this node: values in bin ``i`` are greater than ``edges[i - 1]`` and at most ``edges[i]``
+        :type edges: 1-d Numpy array of numbers
+        :param edges: upper edge of each bin, in increasing order
+        :rtype: (number, number)
+        :return: (best gain term, best cut value)
+        """
+
+        numBins = len(edges)
+        sum1 = numpy.bincount(codes, minlength=numBins).astype(numpy.dtype(float))
+
+        # the cut after bin i passes bins 0 through i; only cuts that leave data on both sides are allowed
+        sum1sel = numpy.cumsum(sum1)[:-1]
+        sum1antisel = self.datasetSize - sum1sel
+        allowed = numpy.logical_and(sum1sel > 0, sum1antisel > 0)
+        if numBins < 2 or not numpy.any(allowed):
+            return -numpy.inf, edges[-1]
+
+        if self.predictand.tpe == numbers.Real:
+            sumx = numpy.bincount(codes, weights=self.predictand.data, minlength=numBins)
+            sumxx = numpy.bincount(codes, weights=numpy.power(self.predictand.data, 2), minlength=numBins)
+            sumxsel = numpy.cumsum(sumx)[:-1]
+            sumxxsel = numpy.cumsum(sumxx)[:-1]
+            sumxantisel = sumxsel[-1] + sumx[-1] - sumxsel
+            sumxxantisel = sumxxsel[-1] + sumxx[-1] - sumxxsel
+
+            nTimesVarianceInSelection = sumxxsel - sumxsel**2/sum1sel
+            nTimesVarianceInAntiselection = sumxxantisel - sumxantisel**2/sum1antisel
+            gains = -nTimesVarianceInSelection - nTimesVarianceInAntiselection
+
+        else:
+            numCategories = len(self.predictand.intToStr)
+            counts = numpy.bincount(codes.astype(numpy.dtype(int)) * numCategories + self.predictand.data, minlength=numBins * numCategories).reshape(numBins, numCategories)
+            countsel = numpy.cumsum(counts, axis=0)[:-1]
+            countantisel = countsel[-1] + counts[-1] - countsel
+
+            selectionEntropy = numpy.zeros(numBins - 1, dtype=numpy.dtype(float))
+            antiSelectionEntropy = numpy.zeros(numBins - 1, dtype=numpy.dtype(float))
+            for category in xrange(numCategories):
+                for num, denom, entropy in ((countsel[:,category], sum1sel, selectionEntropy), (countantisel[:,category], sum1antisel, antiSelectionEntropy)):
+                    frac = num / denom
+                    term = frac * numpy.log2(frac)
+                    term[numpy.logical_not(frac > 0.0)] = 0.0
+                    entropy -= term
+
+            gains = -(sum1sel/self.datasetSize)*selectionEntropy - (sum1antisel/self.datasetSize)*antiSelectionEntropy
+
+        gains = numpy.where(allowed, gains, -numpy.inf)
+        maxGainIndex = numpy.argmax(gains)
+        return gains[maxGainIndex], edges[maxGainIndex]
+
+    def fieldGainTerm(self, field):
+        """Find the best split of one field, using the gain metric appropriate for the predictand and the field.
+
+        :type field: titus.producer.cart.Dataset.Field
+        :param field: the field to split
+        :rtype: (number, number or tuple of integers)
+        :return: (best gain term, best cut value or best combination of regressor categories)
+        """
+
+        if self.predictand.tpe == numbers.Real:
+            if field.tpe == numbers.Real:
+                return self.numericalNVarianceGainTerm(field)
+            elif field.tpe == basestring:
+                return self.categoricalNVarianceGainTerm(field, self.maxSubsetSize)
+        elif self.predictand.tpe == basestring:
+            if field.tpe == numbers.Real:
+                return self.numericalEntropyGainTerm(field)
+            elif field.tpe == basestring:
+                return self.categoricalEntropyGainTerm(field, self.maxSubsetSize)
+        raise RuntimeError
+
+    def fieldGainTerms(self):
+        """Find the best split of each field, in parallel if this node has a process pool.
+
+        :rtype: list of (number, number or tuple of integers)
+        :return: ``fieldGainTerm`` of each field in the dataset, in order
+        """
+
+        fields = self.dataset.fields
+        if self.index is not None:
+            return [self.indexedFieldGainTerm(fieldIndex) for fieldIndex in xrange(len(fields))]
+
+        if self.pool is None or len(fields) < 2:
+            return [self.fieldGainTerm(field) for field in fields]
+
+        # send the predictand once per chunk of fields, rather than once per field
+        numChunks = min(len(fields), 4 * multiprocessing.cpu_count())
+        chunkSize = int(math.ceil(len(fields) / float(numChunks)))
+        chunks = [fields[i:i + chunkSize] for i in xrange(0, len(fields), chunkSize)]
+        results = self.pool.map(_fieldGainTerms, [(self.predictand, chunk, self.maxSubsetSize) for chunk in chunks])
+        return [x for chunk in results for x in chunk]
+
+    @staticmethod
+    def bestOrderedSplit(orderedCategories, gains):
+        """Choose among splits of categories that have been sorted by their mean response.
+
+        Splitting a sorted list of categories into a prefix and a suffix is guaranteed to include the optimal subset split for regression (n-times-variance) and for binary classification (entropy) [Breiman et al., *Classification and Regression Trees* (1984), section 9.4], so only k - 1 candidates need to be considered, rather than all subsets of up to k/2 categories.
+
+        Ties are broken as in the exhaustive search: the selection is the side with fewer categories, and among equal gains, the smallest selection and then the lowest category numbers win.
+
+        :type orderedCategories: list of integers
+        :param orderedCategories: regressor categories in order of increasing mean response
+        :type gains: 1-d Numpy array
+        :param gains: gain term for splitting after each of the first k - 1 categories
+        :rtype: (number, tuple of integers)
+        :return: (best gain term, best combination of regressor categories)
+        """
+
+        bestGainTerm = None
+        bestCombination = None
+        for i, gainTerm in enumerate(gains):
+            prefix = orderedCategories[:i + 1]
+            suffix = orderedCategories[i + 1:]
+            if len(prefix) < len(suffix) or (len(prefix) == len(suffix) and sorted(prefix) < sorted(suffix)):
+                combination = tuple(sorted(prefix))
+            else:
+                combination = tuple(sorted(suffix))
+
+            if bestGainTerm is None or gainTerm > bestGainTerm or (gainTerm == bestGainTerm and (len(combination), combination) < (len(bestCombination), bestCombination)):
+                bestGainTerm = gainTerm
+                bestCombination = combination
+
+        return bestGainTerm, bestCombination
 
     def numericalEntropyGainTerm(self, field):
         """Split a numerical predictor in such a way that maximizes entropic gain above and below the threshold of the split."""
@@ -382,9 +679,19 @@ class TreeNode(object):
         sortedIndexes = numpy.argsort(field.data, kind="heapsort")
 
         # work with the predictor (values) and predictand (categories) for ascending values of the predictor
-        values = field.data[sortedIndexes]
-        categories = self.predictand.data[sortedIndexes]
-        
+        return self.sortedEntropyGainTerm(field.data[sortedIndexes], self.predictand.data[sortedIndexes])
+
+    def sortedEntropyGainTerm(self, values, categories):
+        """Same as ``numericalEntropyGainTerm``, but for predictor values that have already been sorted.
+
+        :type values: 1-d Numpy array of numbers
+        :param values: predictor values in ascending order
+        :type categories: 1-d Numpy array of integers
+        :param categories: predictand categories in the same order as ``values``
+        :rtype: (number, number)
+        :return: (best gain term, best cut value)
+        """
+
         # for normalizing
         numInSelection = numpy.arange(1, self.datasetSize + 1, dtype=numpy.dtype(float))
         numNotInSelection = numpy.arange(self.datasetSize, 0, -1, dtype=numpy.dtype(float))
@@ -479,6 +786,28 @@ class TreeNode(object):
         else:
             maxSubsetSize = min(maxSubsetSize, maxInformativeSubset)
 
+        # with at most two predictand categories, the exact answer is a cut through the predictor categories
+        # sorted by the fraction of one predictand category: O(k log k) instead of exponential
+        if maxSubsetSize == maxInformativeSubset and len(remainingPredictorCategories) > 1 and len(remainingPredictandCategories) <= 2:
+            marginal = 1.0 * numMarginal[remainingPredictorCategories]
+            first = 1.0 * numInCategory[remainingPredictandCategories[0]][remainingPredictorCategories]
+            order = numpy.argsort(first / marginal, kind="mergesort")
+
+            numInSelection = numpy.cumsum(marginal[order])[:-1]
+            firstInSelection = numpy.cumsum(first[order])[:-1]
+            numInAntiselection = self.datasetSize - numInSelection
+            firstInAntiselection = numpy.sum(first) - firstInSelection
+
+            def binaryEntropy(frac):
+                out = numpy.zeros(len(frac), dtype=numpy.dtype(float))
+                for p in (frac, 1.0 - frac):
+                    nonzero = p > 0.0
+                    out[nonzero] -= p[nonzero] * numpy.log2(p[nonzero])
+                return out
+
+            gains = -(numInSelection/self.datasetSize)*binaryEntropy(firstInSelection / numInSelection) - (numInAntiselection/self.datasetSize)*binaryEntropy(firstInAntiselection / numInAntiselection)
+            return self.bestOrderedSplit([remainingPredictorCategories[i] for i in order], gains)
+
         bestGainTerm = None
         bestCombination = None
         for howMany in xrange(1, maxSubsetSize + 1):
@@ -529,8 +858,18 @@ class TreeNode(object):
         sortedIndexes = numpy.argsort(field.data, kind="heapsort")
 
         # work with the predictor (values) and predictand (predictands) for ascending values of the predictor
-        values = field.data[sortedIndexes]
-        predictands = self.predictand.data[sortedIndexes]
+        return self.sortedNVarianceGainTerm(field.data[sortedIndexes], self.predictand.data[sortedIndexes])
+
+    def sortedNVarianceGainTerm(self, values, predictands):
+        """Same as ``numericalNVarianceGainTerm``, but for predictor values that have already been sorted.
+
+        :type values: 1-d Numpy array of numbers
+        :param values: predictor values in ascending order
+        :type predictands: 1-d Numpy array of numbers
+        :param predictands: predictand values in the same order as ``values``
+        :rtype: (number, number)
+        :return: (best gain term, best cut value)
+        """
 
         # compute less-than-or-equal-to sums for each index using Numpy
         sum1sel = numpy.arange(1, len(values) + 1, dtype=numpy.dtype(float))
@@ -605,6 +944,23 @@ class TreeNode(object):
         else:
             maxSubsetSize = min(maxSubsetSize, maxInformativeSubset)
 
+        # the exact answer is a cut through the predictor categories sorted by mean predictand: O(k log k) instead of exponential
+        if maxSubsetSize == maxInformativeSubset and len(fieldUniques) > 1:
+            order = numpy.argsort(sumx / sum1, kind="mergesort")
+
+            sum1sel = numpy.cumsum(sum1[order])[:-1]
+            sumxsel = numpy.cumsum(sumx[order])[:-1]
+            sumxxsel = numpy.cumsum(sumxx[order])[:-1]
+            nTimesVarianceInSelection = sumxxsel - sumxsel**2/sum1sel
+
+            sum1antisel = sum1total - sum1sel
+            sumxantisel = sumxtotal - sumxsel
+            sumxxantisel = sumxxtotal - sumxxsel
+            nTimesVarianceInAntiselection = sumxxantisel - sumxantisel**2/sum1antisel
+
+            gains = -nTimesVarianceInSelection - nTimesVarianceInAntiselection
+            return self.bestOrderedSplit([int(fieldUniques[i]) for i in order], gains)
+
         bestGainTerm = None
         bestCombination = None
         for howMany in xrange(1, maxSubsetSize + 1):
@@ -632,7 +988,8 @@ class TreeNode(object):
                     bestGainTerm = gainTerm
                     bestCombination = categorySet
 
-        return bestGainTerm, bestCombination
+        # categorySet indexes fieldUniques; convert to the categories themselves
+        return bestGainTerm, tuple(int(fieldUniques[i]) for i in bestCombination)
 
     def walkNodes(self, topDown=True, depth=0):
         """Return a generator that walks over all nodes in the tree, yielding a 2-tuple of node and depth.
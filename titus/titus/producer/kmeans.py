@@ -34,23 +34,33 @@ import titus.prettypfa
 
 def _NotImplementedError():
     raise NotImplementedError
+def _reduceByInitArgs(self):
+    # the calculate lambdas can't be pickled, so rebuild from constructor arguments (to send metrics to a process pool)
+    if self.initArgs is None:
+        return object.__reduce__(self)
+    return (self.__class__, tuple(getattr(self, x) for x in self.initArgs))
 class Similarity(object):
     """Trait for similarity functions in Numpy and PFA (compare two scalars, return a non-negative number)."""
+    initArgs = None
     def __init__(self):
         self.calculate = lambda dataset, cluster: _NotImplementedError()
     def pfa(self):
         raise NotImplementedError
+    __reduce__ = _reduceByInitArgs
 class Metric(object):
     """Trait for metric functions in Numpy and PFA (compare two vectors, return a non-negative number)."""
+    initArgs = None
     def __init__(self):
         self.calculate = lambda dataset, cluster: _NotImplementedError()
     def pfa(self):
         raise NotImplementedError
+    __reduce__ = _reduceByInitArgs
 
 ### similarity
 
 class AbsDiff(Similarity):
     """Absolute difference similarity function for Numpy and PFA."""
+    initArgs = ()
     def __init__(self):
         self.calculate = lambda dataset, cluster: numpy.absolute(dataset - cluster)
     def pfa(self):
@@ -58,6 +68,7 @@ class AbsDiff(Similarity):
 
 class GaussianSimilarity(Similarity):
     """Gaussian similarity function for Numpy and PFA."""
+    initArgs = ("sigma",)
     def __init__(self, sigma):
         self.calculate = lambda dataset, cluster: numpy.exp(-numpy.log(2) * numpy.square(dataset - cluster) / sigma**2)
         self.sigma = sigma
@@ -72,6 +83,7 @@ class GaussianSimilarity(Similarity):
 
 class Euclidean(Metric):
     """Euclidean metric for Numpy and PFA."""
+    initArgs = ("similarity",)
     def __init__(self, similarity):
         self.calculate = lambda dataset, cluster: numpy.sqrt(numpy.sum(numpy.square(similarity.calculate(dataset, cluster)), axis=1))
         self.similarity = similarity
@@ -80,6 +92,7 @@ class Euclidean(Metric):
 
 class SquaredEuclidean(Metric):
     """Squared euclidean metric for Numpy and PFA."""
+    initArgs = ("similarity",)
     def __init__(self, similarity):
         self.calculate = lambda dataset, cluster: numpy.sum(numpy.square(similarity.calculate(dataset, cluster)), axis=1)
         self.similarity = similarity
@@ -90,6 +103,7 @@ class SquaredEuclidean(Metric):
 
 class Chebyshev(Metric):
     """Chebyshev (maximum) metric for Numpy and PFA."""
+    initArgs = ("similarity",)
     def __init__(self, similarity):
         self.calculate = lambda dataset, cluster: numpy.max(similarity.calculate(dataset, cluster), axis=1)
         self.similarity = similarity
@@ -100,6 +114,7 @@ class Chebyshev(Metric):
 
 class Taxicab(Metric):
     """Taxicab (sum) metric for Numpy and PFA."""
+    initArgs = ("similarity",)
     def __init__(self, similarity):
         self.calculate = lambda dataset, cluster: numpy.sum(similarity.calculate(dataset, cluster), axis=1)
         self.similarity = similarity
@@ -110,6 +125,7 @@ class Taxicab(Metric):
 
 class Minkowski(Metric):
     """Minkowski metric for Numpy and PFA."""
+    initArgs = ("similarity", "p")
     def __init__(self, similarity, p):
         self.calculate = lambda dataset, cluster: numpy.pow(numpy.sum(numpy.pow(similarity.calculate(dataset, cluster), p), axis=1), 1.0/p)
         self.similarity = similarity
@@ -260,21 +276,71 @@ def moving():
     """
     return whileall(clusterJumped(), allChange(1e-15))
 
+### the distance computation works on one chunk of the dataset at a
+### time, either in this process or in a process pool
+
+def _clusterChunk((dataset, weights, start, stop, clusters, metric, summarize)):
+    """Find the closest cluster to each point in ``dataset[start:stop]`` and optionally sum the residuals by cluster.
+
+    :type dataset: 2-d Numpy array or string
+    :param dataset: the dataset or the name of a ``.npy`` file containing it (opened memory-mapped)
+    :type weights: 1-d Numpy array or ``None``
+    :param weights: weights for the rows of this chunk only
+    :type start: non-negative integer
+    :param start: first row of the chunk
+    :type stop: non-negative integer
+    :param stop: one past the last row of the chunk
+    :type clusters: list of 1-d Numpy arrays
+    :param clusters: cluster centers
+    :type metric: titus.produce.kmeans.Metric
+    :param metric: metric for Numpy and PFA
+    :type summarize: bool
+    :param summarize: if ``True``, also compute the number of points and the sum of weighted residuals for each cluster
+    :rtype: tuple
+    :return: (index of closest cluster, distance to it) for each point, followed by (counts, sums) if ``summarize``
+    """
+
+    if isinstance(dataset, basestring):
+        dataset = numpy.load(dataset, mmap_mode="r")
+    chunk = numpy.asarray(dataset[start:stop])
+
+    # distanceToCenter.shape[0] is the number of records in the chunk, distanceToCenter.shape[1] is the number of clusters
+    distanceToCenter = numpy.empty((chunk.shape[0], len(clusters)), dtype=numpy.dtype(float))
+    for clusterIndex, cluster in enumerate(clusters):
+        distanceToCenter[:, clusterIndex] = metric.calculate(chunk, cluster)
+
+    indexOfClosestCluster = numpy.argmin(distanceToCenter, axis=1)
+    distanceToClosestCluster = distanceToCenter[numpy.arange(chunk.shape[0]), indexOfClosestCluster]
+    if not summarize:
+        return indexOfClosestCluster, distanceToClosestCluster
+
+    counts = numpy.bincount(indexOfClosestCluster, minlength=len(clusters))
+    residuals = chunk - numpy.array(clusters)[indexOfClosestCluster]
+    if weights is not None:
+        residuals *= weights[:, numpy.newaxis]
+    sums = numpy.empty((len(clusters), chunk.shape[1]), dtype=numpy.dtype(float))
+    for dimension in xrange(chunk.shape[1]):
+        sums[:, dimension] = numpy.bincount(indexOfClosestCluster, weights=residuals[:, dimension], minlength=len(clusters))
+
+    return indexOfClosestCluster, distanceToClosestCluster, counts, sums
+
 ### the KMeans class
 
 class KMeans(object):
     """Represents a k-means optimization by storing a dataset and performing all operations *in-place*.
 
     Usually, you would construct the object, possibly stepup, then optimize and export to pfaDocument.
+
+    Distances are computed ``chunkSize`` records at a time, so the scratch space does not grow with the dataset, and the dataset may be a memory-mapped ``.npy`` file.  For very large datasets, seed with ``seeding="kmeans++"`` and train with ``optimizeMiniBatch``.
     """
 
-    def __init__(self, numberOfClusters, dataset, weights=None, metric=Euclidean(AbsDiff()), minPointsInCluster=None, maxPointsForClustering=None):
+    def __init__(self, numberOfClusters, dataset, weights=None, metric=Euclidean(AbsDiff()), minPointsInCluster=None, maxPointsForClustering=None, seeding="random", chunkSize=100000, pool=None):
         """Construct a KMeans object, initializing cluster centers to unique, random points from the dataset.
 
         :type numberOfClusters: positive integer
         :param numberOfClusters: number of clusters (the "k" in k-means)
-        :type dataset: 2-d Numpy array
-        :param dataset: dataset to cluster; ``dataset.shape[0]`` is the number of records (rows), ``dataset.shape[1]`` is the number of dimensions for each point (columns)
+        :type dataset: 2-d Numpy array or string
+        :param dataset: dataset to cluster; ``dataset.shape[0]`` is the number of records (rows), ``dataset.shape[1]`` is the number of dimensions for each point (columns); if a string, the name of a ``.npy`` file to open memory-mapped (unique records are not precomputed for memory-mapped datasets)
         :type weights: 1-d Numpy array or ``None``
         :param weights: how much to weight each point in the ``dataset``: must have shape equal to ``(dataset.shape[0],)``; ``0`` means ignore the dataset, ``1`` means normal weight; ``None`` generates all ones
         :type metric: titus.produce.kmeans.Metric
@@ -283,8 +349,20 @@ class KMeans(object):
         :param minPointsInCluster: minimum number of points before jumping (replacing cluster with a random point during optimization)
         :type maxPointsForClustering: positive integer or ``None``
         :param maxPointsForClustering: maximum number of points in an optimization (if ``dataset.shape[0]`` exceeds this amount, a random subset is chosen)
+        :type seeding: string
+        :param seeding: "random" to start from unique, random points or "kmeans++" to start from points chosen by ``seedPlusPlus``
+        :type chunkSize: positive integer
+        :param chunkSize: number of records for which to compute distances at a time
+        :type pool: ``multiprocessing.Pool`` or ``None``
+        :param pool: if provided, compute the distances for chunks in parallel in this process pool (the metric must be picklable; a dataset given as a file name is opened by each worker rather than sent to it)
         """
 
+        if isinstance(dataset, basestring):
+            self.fileName = dataset
+            dataset = numpy.load(dataset, mmap_mode="r")
+        else:
+            self.fileName = None
+
         if len(dataset.shape) != 2:
             raise TypeError("dataset must be two-dimensional: dataset.shape[0] is the number of records (rows), dataset.shape[1] is the number of dimensions (columns)")
 
@@ -293,25 +371,36 @@ class KMeans(object):
             raise TypeError("weights must have as many records as the dataset and must be one dimensional")
         self.weights = weights
         self.metric = metric
+        self.chunkSize = chunkSize
+        self.pool = pool
 
-        try:
-            flattenedView = numpy.ascontiguousarray(self.dataset).view(numpy.dtype((numpy.void, self.dataset.dtype.itemsize * self.dataset.shape[1])))
-            _, indexes = numpy.unique(flattenedView, return_index=True)
-            self.uniques = self.dataset[indexes]
-        except TypeError:
+        if isinstance(dataset, numpy.memmap):
+            # finding the unique records would read the whole file into memory
             self.uniques = self.dataset
+        else:
+            try:
+                flattenedView = numpy.ascontiguousarray(self.dataset).view(numpy.dtype((numpy.void, self.dataset.dtype.itemsize * self.dataset.shape[1])))
+                _, indexes = numpy.unique(flattenedView, return_index=True)
+                self.uniques = self.dataset[indexes]
+            except TypeError:
+                self.uniques = self.dataset
 
         if self.uniques.shape[0] <= numberOfClusters:
             raise TypeError("the number of unique records in the dataset ({0} in this case) must be strictly greater than numberOfClusters ({1})".format(self.uniques.shape[0], numberOfClusters))
         self.numberOfClusters = numberOfClusters
 
-        self.clusters = []
-        for index in xrange(numberOfClusters):
-            self.clusters.append(self.newCluster())
-
         self.minPointsInCluster = minPointsInCluster
         self.maxPointsForClustering = maxPointsForClustering
 
+        self.clusters = []
+        if seeding == "random":
+            for index in xrange(numberOfClusters):
+                self.clusters.append(self.newCluster())
+        elif seeding == "kmeans++":
+            self.seedPlusPlus()
+        else:
+            raise ValueError("seeding must be \"random\" or \"kmeans++\"")
+
     def randomPoint(self):
         """Pick a random point from the dataset.
 
@@ -353,31 +442,114 @@ class KMeans(object):
 
         return dataset, weights
 
+    def seedPlusPlus(self, dataset=None, weights=None):
+        """Replace the cluster centers with points chosen by k-means++ (each new center is drawn with probability proportional to the weighted, squared distance to the nearest center already chosen).
+
+        This takes one pass over the dataset per cluster, computing distances in chunks.
+
+        :type dataset: 2-d Numpy array or ``None``
+        :param dataset: an input dataset or the built-in dataset (or a random subset of ``maxPointsForClustering``) if ``None`` is passed
+        :type weights: 1-d Numpy array or ``None``
+        :param weights: input weights or the built-in weights if ``dataset`` is ``None``
+        :rtype: ``None``
+        :return: nothing; modifies cluster set in-place
+        """
+
+        if dataset is None:
+            if self.maxPointsForClustering is None:
+                dataset, weights = self.dataset, self.weights
+            else:
+                dataset, weights = self.randomSubset(self.maxPointsForClustering)
+
+        self.clusters = []
+        distanceToClosestCluster = numpy.empty(dataset.shape[0], dtype=numpy.dtype(float))
+        distanceToClosestCluster.fill(numpy.inf)
+
+        for index in xrange(self.numberOfClusters):
+            if index == 0:
+                probability = numpy.ones(dataset.shape[0], dtype=numpy.dtype(float))
+            else:
+                probability = numpy.square(distanceToClosestCluster)
+            if weights is not None:
+                probability *= weights
+
+            cumulative = numpy.cumsum(probability, out=probability)
+            total = cumulative[-1]
+            if total > 0.0 and numpy.isfinite(total):
+                chosen = min(numpy.searchsorted(cumulative, random.random() * total, side="right"), dataset.shape[0] - 1)
+                newCluster = numpy.array(dataset[chosen], dtype=numpy.dtype(float))
+            else:
+                newCluster = None
+            del cumulative, probability
+
+            if newCluster is None or any(numpy.array_equal(x, newCluster) for x in self.clusters):
+                # all remaining points coincide with centers (or have zero weight)
+                newCluster = self.newCluster()
+            self.clusters.append(newCluster)
+
+            for start, stop, (indexOfClosestCluster, distance) in self.chunkResults(dataset, None, False, [newCluster]):
+                numpy.minimum(distanceToClosestCluster[start:stop], distance, distanceToClosestCluster[start:stop])
+
+    def chunkResults(self, dataset, weights, summarize, clusters=None):
+        """Compute the closest cluster (and optionally the residual sums) for each chunk of ``chunkSize`` records, in the process pool if there is one.
+
+        :type dataset: 2-d Numpy array
+        :param dataset: an input dataset
+        :type weights: 1-d Numpy array or ``None``
+        :param weights: input weights
+        :type summarize: bool
+        :param summarize: if ``True``, also compute the number of points and the sum of weighted residuals for each cluster
+        :type clusters: list of 1-d Numpy arrays or ``None``
+        :param clusters: cluster centers to compare with or ``self.clusters`` if ``None``
+        :rtype: iterator over (start, stop, results)
+        :return: the row range of each chunk (in order) and the results of ``titus.producer.kmeans._clusterChunk`` for it
+        """
+
+        if clusters is None:
+            clusters = self.clusters
+
+        ranges = [(start, min(start + self.chunkSize, dataset.shape[0])) for start in xrange(0, dataset.shape[0], self.chunkSize)]
+
+        def jobs():
+            for start, stop in ranges:
+                if weights is None:
+                    chunkWeights = None
+                else:
+                    chunkWeights = weights[start:stop]
+
+                if self.pool is None:
+                    yield (dataset, chunkWeights, start, stop, clusters, self.metric, summarize)
+                elif self.fileName is not None and dataset is self.dataset:
+                    yield (self.fileName, chunkWeights, start, stop, clusters, self.metric, summarize)
+                else:
+                    yield (numpy.asarray(dataset[start:stop]), chunkWeights, 0, stop - start, clusters, self.metric, summarize)
+
+        if self.pool is None:
+            results = (_clusterChunk(job) for job in jobs())
+        else:
+            results = self.pool.imap(_clusterChunk, jobs())
+
+        return ((start, stop, result) for (start, stop), result in zip(ranges, results))
+
     def closestCluster(self, dataset=None, weights=None):
         """Identify the closest cluster to each element in the dataset.
 
         :type dataset: 2-d Numpy array or ``None``
         :param dataset: an input dataset or the built-in dataset if ``None`` is passed
         :type weights: 1-d Numpy array or ``None``
-        :param weights: input weights or the built-in weights if ``None`` is passed
+        :param weights: ignored (accepted for backward compatibility); the closest cluster to a point is the same for any weight
         :rtype: 1-d Numpy array of integers
         :return: the *indexes* of the closest cluster for each datum
         """
 
         if dataset is None:
             dataset = self.dataset
-        if weights is None:
-            weights = self.weights
-
-        # distanceToCenter is the result of applying the metric to each point in the dataset, for each cluster
-        # distanceToCenter.shape[0] is the number of records, distanceToCenter.shape[1] is the number of clusters
 
-        distanceToCenter = numpy.empty((dataset.shape[0], self.numberOfClusters), dtype=numpy.dtype(float))
-        for clusterIndex, cluster in enumerate(self.clusters):
-            distanceToCenter[:, clusterIndex] = self.metric.calculate(dataset, cluster)
-
-        # indexOfClosestCluster is the cluster classification for each point in the dataset
-        return numpy.argmin(distanceToCenter, axis=1)
+        # indexOfClosestCluster is the cluster classification for each point in the dataset, computed one chunk at a time
+        indexOfClosestCluster = numpy.empty(dataset.shape[0], dtype=numpy.dtype(int))
+        for start, stop, (chunkIndexes, chunkDistances) in self.chunkResults(dataset, None, False):
+            indexOfClosestCluster[start:stop] = chunkIndexes
+        return indexOfClosestCluster
 
     def iterate(self, dataset, weights, iterationNumber, condition):
         """Perform one iteration step (in-place; modifies ``self.clusters``).
@@ -394,20 +566,17 @@ class KMeans(object):
         :return: the result of the stopping condition
         """
 
-        indexOfClosestCluster = self.closestCluster(dataset, weights)
+        # accumulate the number of points and the sum of (weighted) residuals in each cluster, one chunk at a time
+        counts = numpy.zeros(self.numberOfClusters, dtype=numpy.dtype(int))
+        sums = numpy.zeros((self.numberOfClusters, dataset.shape[1]), dtype=numpy.dtype(float))
+        for start, stop, (chunkIndexes, chunkDistances, chunkCounts, chunkSums) in self.chunkResults(dataset, weights, True):
+            counts += chunkCounts
+            sums += chunkSums
 
         values = []
         corrections = []
         for clusterIndex, cluster in enumerate(self.clusters):
-            # select by cluster classification
-            selection = (indexOfClosestCluster == clusterIndex)
-            residuals = (dataset - cluster)[selection]
-
-            # weights scale the residuals
-            if weights is not None:
-                residuals *= weights[selection]
-
-            if self.minPointsInCluster is not None and numpy.sum(selection) < self.minPointsInCluster:
+            if self.minPointsInCluster is not None and counts[clusterIndex] < self.minPointsInCluster:
                 # too few points in this cluster; jump to a new random point
                 self.clusters[clusterIndex] = self.newCluster()
                 values.append(None)
@@ -416,7 +585,7 @@ class KMeans(object):
             else:
                 # compute the mean of the displacements of points associated with this cluster
                 # (note that the similarity metric used here is the trivial one, possibly different from the classification metric)
-                correction = residuals.mean(axis=0)
+                correction = sums[clusterIndex] / counts[clusterIndex]
                 numpy.add(cluster, correction, cluster)
 
                 if not numpy.isfinite(cluster).all():
@@ -488,6 +657,66 @@ class KMeans(object):
         while self.iterate(dataset, weights, iterationNumber, condition):
             iterationNumber += 1
 
+    def optimizeMiniBatch(self, condition, batchSize=1000):
+        """Run mini-batch k-means on the dataset, changing the clusters *in-place*.
+
+        Each iteration draws a random batch of ``batchSize`` records and moves each cluster toward its new points with a learning rate of one over the total weight the cluster has received so far (Sculley, "Web-scale k-means clustering," 2010).  The time per iteration depends only on ``batchSize``, so it is suitable for datasets too large for ``optimize``; since the clusters never stop moving entirely, use a condition like ``maxIterations``.
+
+        :type condition: callable that takes iterationNumber, corrections, values, datasetSize as arguments
+        :param condition: the stopping condition (``datasetSize`` is the size of the batch)
+        :type batchSize: positive integer
+        :param batchSize: number of records in each iteration
+        :rtype: ``None``
+        :return: nothing; modifies cluster set in-place
+        """
+
+        numRecords = self.dataset.shape[0]
+        batchSize = min(batchSize, numRecords)
+        clusterWeights = numpy.zeros(self.numberOfClusters, dtype=numpy.dtype(float))
+
+        iterationNumber = 0
+        while True:
+            # sorted indexes read a memory-mapped dataset in order
+            indexes = sorted(random.sample(xrange(numRecords), batchSize))
+            dataset = numpy.asarray(self.dataset[indexes])
+            if self.weights is None:
+                weights = None
+            else:
+                weights = self.weights[indexes]
+
+            batchWeights = numpy.zeros(self.numberOfClusters, dtype=numpy.dtype(float))
+            sums = numpy.zeros((self.numberOfClusters, dataset.shape[1]), dtype=numpy.dtype(float))
+            for start, stop, (chunkIndexes, chunkDistances, chunkCounts, chunkSums) in self.chunkResults(dataset, weights, True):
+                if weights is None:
+                    batchWeights += chunkCounts
+                else:
+                    batchWeights += numpy.bincount(chunkIndexes, weights=weights[start:stop], minlength=self.numberOfClusters)
+                sums += chunkSums
+
+            values = []
+            corrections = []
+            for clusterIndex, cluster in enumerate(self.clusters):
+                if batchWeights[clusterIndex] > 0.0:
+                    # equivalent to a per-point learning rate of 1/(weight so far) applied to each point in the batch
+                    clusterWeights[clusterIndex] += batchWeights[clusterIndex]
+                    correction = sums[clusterIndex] / clusterWeights[clusterIndex]
+                    numpy.add(cluster, correction, cluster)
+                else:
+                    correction = numpy.zeros(dataset.shape[1], dtype=numpy.dtype(float))
+
+                if not numpy.isfinite(cluster).all():
+                    self.clusters[clusterIndex] = self.newCluster()
+                    clusterWeights[clusterIndex] = 0.0
+                    values.append(None)
+                    corrections.append(None)
+                else:
+                    values.append(cluster)
+                    corrections.append(correction)
+
+            if not condition(iterationNumber, corrections, values, dataset.shape[0]):
+                break
+            iterationNumber += 1
+
     def centers(self, sort=True):
         """Get the cluster centers as a sorted Python list (canonical form).
 
@@ -546,7 +775,7 @@ class KMeans(object):
         out = [{"center": x} for x in self.centers(sort=False)]
 
         if populations:
-            indexOfClosestCluster = self.closestCluster(self.dataset, self.weights)
+            indexOfClosestCluster = self.closestCluster(self.dataset)
             for clusterIndex in xrange(len(self.clusters)):
                 out[clusterIndex]["population"] = int(numpy.sum(indexOfClosestCluster == clusterIndex))
 
@@ -28,6 +28,8 @@ from avro.io import DatumReader
 
 import titus.util
 from titus.util import pos
+from titus.util import ts
+from titus.util import ArrayView
 
 from titus.pfaast import validSymbolName
 from titus.pfaast import validFunctionName
@@ -90,7 +92,93 @@ from titus.pfaast import Error
 from titus.pfaast import Try
 from titus.pfaast import Log
 from titus.errors import PFASyntaxException
+from titus.errors import PFAInitializationException
 from titus.datatype import AvroTypeBuilder
+from titus.datatype import AvroArray
+from titus.datatype import AvroBoolean
+from titus.datatype import AvroDouble
+from titus.datatype import AvroFloat
+from titus.datatype import AvroInt
+from titus.datatype import AvroLong
+from titus.datatype import jsonDecoder
+from titus.datatype import jsonEncoder
+
+def npyLayout(avroType):
+    """Describe how a value of a given type is stored in a NumPy ``.npy`` file (for cells with ``source: npy`` or ``source: mmap``).
+
+    :type avroType: titus.datatype.AvroType
+    :param avroType: cell type
+    :rtype: (integer, string) or ``None``
+    :return: the number of dimensions and the NumPy dtype name, or ``None`` if the type is not a (possibly nested) array of numbers or booleans
+    """
+    ndim = 0
+    while isinstance(avroType, AvroArray):
+        ndim += 1
+        avroType = avroType.items
+    dtype = {AvroDouble: "float64", AvroFloat: "float32", AvroLong: "int64", AvroInt: "int32", AvroBoolean: "bool"}.get(avroType.__class__)
+    if ndim == 0 or dtype is None:
+        return None
+    else:
+        return ndim, dtype
+
+def avroExternalDatum(avroType, value):
+    """Convert the JSON form of a cell or pool's initial value into the datum for an Avro side file (``source: avro``).
+
+    Avro's ``DatumWriter`` expects unions without the ``{tag: value}`` wrappers of Avro's JSON encoding, which is what is read back as the cell or pool's ``initValue``.
+
+    :type avroType: titus.datatype.AvroType
+    :param avroType: cell type, or a map of the pool type
+    :type value: Pythonized JSON
+    :param value: initial value in Avro's JSON encoding
+    :rtype: Python object
+    :return: datum ready for ``DataFileWriter.append``
+    """
+    return jsonEncoder(avroType, jsonDecoder(avroType, value), tagged=False)
+
+def _openExternal(url):
+    if re.match("^[a-zA-Z][a-zA-Z0-9\+\-\.]*://", url) is not None:
+        # binary readers need to seek
+        return io.BytesIO(urllib.urlopen(url).read())
+    else:
+        return open(url, "rb")
+
+def _readAvroExternal(url, avroType):
+    reader = DataFileReader(_openExternal(url), DatumReader(readers_schema=avroType.schema))
+    try:
+        for datum in reader:
+            return datum
+    finally:
+        reader.close()
+    raise PFAInitializationException("Avro file {0} contains no data".format(url))
+
+def _checkNpyLayout(url, array, avroType, source):
+    layout = npyLayout(avroType)
+    if layout is None:
+        raise PFAInitializationException("source: {0} can only initialize arrays of numbers or booleans, not {1}".format(source, ts(avroType)))
+    ndim, dtype = layout
+    kinds = {"float64": "fiu", "float32": "fiu", "int64": "iu", "int32": "iu", "bool": "b"}[dtype]
+    if array.ndim != ndim or array.dtype.kind not in kinds:
+        raise PFAInitializationException("npy file {0} has shape {1} and dtype {2}, which cannot initialize {3}".format(url, array.shape, array.dtype, ts(avroType)))
+    return dtype
+
+def _readNpyExternal(url, avroType):
+    import numpy
+    array = numpy.load(_openExternal(url), allow_pickle=False)
+    dtype = _checkNpyLayout(url, array, avroType, "npy")
+    if array.dtype.kind != numpy.dtype(dtype).kind:
+        array = array.astype(dtype)
+    return array.tolist()
+
+def _mmapNpyExternal(url, avroType):
+    import numpy
+    if re.match("^[a-zA-Z][a-zA-Z0-9\+\-\.]*://", url) is not None:
+        raise PFAInitializationException("source: mmap requires a local file, not {0}".format(url))
+    array = numpy.load(url, mmap_mode="r", allow_pickle=False)
+    dtype = _checkNpyLayout(url, array, avroType, "mmap")
+    if array.dtype.kind != numpy.dtype(dtype).kind:
+        # integers in a file for a floating-point cell (or vice-versa) cannot be viewed without conversion
+        raise PFAInitializationException("npy file {0} has dtype {1}, which cannot be memory-mapped as {2}".format(url, array.dtype, ts(avroType)))
+    return ArrayView(array)
 
 def jsonToAst(jsonInput):
     """Reads PFA from serialized JSON into an abstract syntax tree.
@@ -899,8 +987,7 @@ def _readCell(data, dot, avroTypeBuilder):
                 if not isinstance(url, basestring):
                     raise PFASyntaxException("source: avro requires init to be a string", pos(dot, at))
                 def getit(avroType):
-                    reader = DataFileReader(urllib.urlopen(url), DatumReader())
-                    return reader.read()
+                    return _readAvroExternal(url, avroType)
                 _init = getit
 
             elif _source == "json":
@@ -913,6 +1000,22 @@ def _readCell(data, dot, avroTypeBuilder):
                     else:
                         return open(url).read()
                 _init = getit
+
+            elif _source == "npy":
+                url = json.loads(_init)
+                if not isinstance(url, basestring):
+                    raise PFASyntaxException("source: npy requires init to be a string", pos(dot, at))
+                def getit(avroType):
+                    return _readNpyExternal(url, avroType)
+                _init = getit
+
+            elif _source == "mmap":
+                url = json.loads(_init)
+                if not isinstance(url, basestring):
+                    raise PFASyntaxException("source: mmap requires init to be a string", pos(dot, at))
+                def getit(avroType):
+                    return _mmapNpyExternal(url, avroType)
+                _init = getit
                 
             elif _source == "embedded":
                 pass
@@ -949,7 +1052,6 @@ def _readPool(data, dot, avroTypeBuilder):
         keys = set(x for x in data.keys() if x != "@")
         for key in keys:
             if key == "type": _avroType = _readAvroPlaceholder(data[key], dot + " -> " + key, avroTypeBuilder)
-            elif key == "init": _init = _readJsonToStringMap(data[key], dot + " -> " + key)
             elif key == "shared": _shared = _readBoolean(data[key], dot + " -> " + key)
             elif key == "rollback": _rollback = _readBoolean(data[key], dot + " -> " + key)
             elif key == "source": _source = _readString(data[key], dot + " -> " + key)
@@ -957,17 +1059,21 @@ def _readPool(data, dot, avroTypeBuilder):
         if ("type" not in keys) or (not keys.issubset(set(["type", "init", "shared", "rollback", "source"]))):
             raise PFASyntaxException("wrong set of fields for a pool: " + ", ".join(keys), pos(dot, at))
         else:
+            # external sources name a file in "init", embedded pools have a map of initial values
+            url = None
+            if "init" in keys and _source == "embedded":
+                _init = _readJsonToStringMap(data["init"], dot + " -> init")
+            elif "init" in keys:
+                url = _stripAtSigns(data["init"])
+
             if _source == "avro":
-                url = json.loads(_init)
                 if not isinstance(url, basestring):
                     raise PFASyntaxException("source: avro requires init to be a string", pos(dot, at))
                 def getit(avroType):
-                    reader = DataFileReader(urllib.urlopen(url), DatumReader())
-                    return reader.read()
+                    return _readAvroExternal(url, avroType)
                 _init = getit
 
             elif _source == "json":
-                url = json.loads(_init)
                 if not isinstance(url, basestring):
                     raise PFASyntaxException("source: json requires init to be a string", pos(dot, at))
                 def getit(avroType):
@@ -976,6 +1082,9 @@ def _readPool(data, dot, avroTypeBuilder):
                     else:
                         return open(url).read()
                 _init = getit
+
+            elif _source in ("npy", "mmap"):
+                raise PFASyntaxException("source: {0} is only available for cells".format(_source), pos(dot, at))
                 
             elif _source == "embedded":
                 pass
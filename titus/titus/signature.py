@@ -288,9 +288,63 @@ class LabelData(object):
     def __repr__(self):
         return "<titus.signature.LabelData {0} at {1}>".format(self.members, "0x%x" % id(self))
 
+def resolutionKey(args, version):
+    """Hashable key for a signature resolution: the structural keys of the argument types and the version triple.
+
+    :type args: list of titus.datatype.Type
+    :param args: argument types
+    :type version: titus.signature.PFAVersion
+    :param version: PFA version number
+    :rtype: tuple or ``NoneType``
+    :return: key, or ``None`` if some argument type has no structural key (and the resolution should not be cached)
+    """
+    try:
+        return (version.major, version.minor, version.release) + tuple(x.structuralKey for x in args)
+    except AttributeError:
+        return None
+
 class Signature(object):
-    """Abstract trait for function signatures. Known subclasses: titus.signature.Sig and titus.signature.Sigs."""
+    """Abstract trait for function signatures. Known subclasses: titus.signature.Sig and titus.signature.Sigs.
+
+    Resolutions are cached on each signature object, keyed by ``titus.signature.resolutionKey``, because large documents call the same functions with the same argument types many times.
+    """
+
+    resolutionCacheSize = 1000
+
     def accepts(self, args, version):
+        """Determine if this signature accepts the given arguments for a given PFA version number, using the cached resolution if the same argument types have been seen before.
+
+        :type args: list of titus.datatype.AvroType
+        :param args: arguments to match against the signature pattern(s)
+        :type version: titus.signature.PFAVersion
+        :param version: PFA version number in which to interpret the pattern(s)
+        :rtype: (titus.signature.Sig, list of titus.datatype.AvroType, AvroType)
+        :return: (matching signature, resolved argument types, resolved return type) if the arguments are accepted; ``None`` otherwise
+        """
+        key = resolutionKey(args, version)
+        if key is None:
+            return self.resolve(args, version)
+
+        cache = self.__dict__.get("resolutionCache")
+        if cache is None:
+            cache = self.resolutionCache = {}
+
+        if key in cache:
+            out = cache[key]
+        else:
+            out = self.resolve(args, version)
+            if len(cache) >= self.resolutionCacheSize:
+                cache.clear()
+            cache[key] = out
+
+        if out is None:
+            return None
+        else:
+            sig, assignedParams, assignedRet = out
+            return (sig, list(assignedParams), assignedRet)
+
+    def resolve(self, args, version):
+        """Perform the signature matching of ``accepts`` without the cache."""
         raise NotImplementedError
 
 class Sigs(Signature):
@@ -302,7 +356,7 @@ class Sigs(Signature):
         """
         self.cases = cases
 
-    def accepts(self, args, version):
+    def resolve(self, args, version):
         """Determine if this list of signatures accepts the given arguments for a given PFA version number.
 
         :type args: list of titus.datatype.AvroType
@@ -313,7 +367,7 @@ class Sigs(Signature):
         :return: (matching signature, resolved argument types, resolved return type) if one of the signatures accepts the arguments; ``None`` otherwise
         """
         for case in self.cases:
-            result = case.accepts(args, version)
+            result = case.resolve(args, version)
             if result is not None:
                 return result
         return None
@@ -340,7 +394,7 @@ class Sig(Signature):
         alreadyLabeled = set()
         return "(" + ", ".join(p.keys()[0] + ": " + toText(p.values()[0], alreadyLabeled) for p in self.params) + " -> " + toText(self.ret, alreadyLabeled) + ")"
 
-    def accepts(self, args, version):
+    def resolve(self, args, version):
         """Determine if this signature accepts the given arguments for a given PFA version number.
 
         :type args: list of titus.datatype.AvroType
@@ -19,6 +19,8 @@
 
 import inspect
 import sys
+import threading
+from collections import OrderedDict
 
 TYPE_ERRORS_IN_PRETTYPFA = True
 def ts(avroType):
@@ -231,6 +233,429 @@ def startEnd(length, start, end):
 
     return normStart, normEnd
 
+class SlidingWindow(object):
+    """Read-only array value backed by a shared, append-only buffer, so that windowed accumulators can slide in O(1) amortized time.
+
+    A SlidingWindow is a view of ``buffer[start:stop]``. Sliding a window that ends at the end of its buffer appends to the buffer in place; older views are unaffected because they only see their own range. Sliding any other view (for instance, an old copy retained by a rollback cell or a ``let`` variable) copies the live range into a new buffer, as does compaction when the dead prefix grows larger than the live range.
+
+    To PFA code, a SlidingWindow behaves like an immutable list: it supports ``len``, indexing, slicing (which returns a ``list``), iteration, ``+``, and equality with lists and tuples.
+    """
+
+    __slots__ = ("_buffer", "_start", "_stop")
+
+    _lock = threading.Lock()
+
+    def __init__(self, items=(), start=None, stop=None):
+        """:type items: list
+        :param items: initial contents; copied unless ``start`` and ``stop`` are given, in which case ``items`` is used as the backing buffer
+        :type start: non-negative integer or ``None``
+        :param start: first index of the view in the backing buffer
+        :type stop: non-negative integer or ``None``
+        :param stop: one past the last index of the view in the backing buffer
+        """
+        if start is None or stop is None:
+            self._buffer = list(items)
+            self._start = 0
+            self._stop = len(self._buffer)
+        else:
+            self._buffer = items
+            self._start = start
+            self._stop = stop
+
+    def slide(self, item, windowSize):
+        """Return a new window containing the last ``windowSize`` items of this window with ``item`` appended.
+
+        :type item: anything
+        :param item: new item to put at the end of the window
+        :type windowSize: positive integer
+        :param windowSize: maximum length of the new window
+        :rtype: titus.util.SlidingWindow
+        :return: new window; this window is not modified
+        """
+        start = max(self._start, self._stop + 1 - windowSize)
+        buf = self._buffer
+        with self._lock:
+            if self._stop == len(buf) and start <= self._stop + 1 - start:
+                buf.append(item)
+                return SlidingWindow(buf, start, self._stop + 1)
+        newbuf = buf[start:self._stop]
+        newbuf.append(item)
+        return SlidingWindow(newbuf, 0, len(newbuf))
+
+    def __len__(self):
+        return self._stop - self._start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._buffer[self._start:self._stop][index]
+        length = self._stop - self._start
+        if index < 0:
+            index += length
+        if index < 0 or index >= length:
+            raise IndexError("window index out of range")
+        return self._buffer[self._start + index]
+
+    def __iter__(self):
+        buf = self._buffer
+        for i in xrange(self._start, self._stop):
+            yield buf[i]
+
+    def __reversed__(self):
+        buf = self._buffer
+        for i in xrange(self._stop - 1, self._start - 1, -1):
+            yield buf[i]
+
+    def __contains__(self, item):
+        return any(x == item for x in self)
+
+    def index(self, item):
+        for i, x in enumerate(self):
+            if x == item:
+                return i
+        raise ValueError("{0} is not in window".format(repr(item)))
+
+    def count(self, item):
+        return sum(1 for x in self if x == item)
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+    def __radd__(self, other):
+        return list(other) + list(self)
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, SlidingWindow)):
+            return len(self) == len(other) and all(x == y for x, y in zip(self, other))
+        else:
+            return NotImplemented
+
+    def __ne__(self, other):
+        out = self.__eq__(other)
+        if out is NotImplemented:
+            return out
+        return not out
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(list(self))
+
+class ArrayView(object):
+    """Read-only array value backed by a NumPy array (usually memory-mapped from a ``.npy`` file), so that large numeric cells are never expanded into Python lists of Python numbers.
+
+    To PFA code, an ArrayView behaves like an immutable list: it supports ``len``, indexing, slicing (which returns a ``list``), iteration, ``+``, and equality with lists and tuples. Items of a one-dimensional view are Python numbers; items of a multidimensional view are ArrayViews of its rows, which share memory with their parent.
+
+    NumPy-aware library functions get the underlying array without copying through the ``array`` attribute or ``numpy.asarray`` (the ``__array__`` protocol). Copies (``copy.copy``, ``copy.deepcopy``) return the same view, since it cannot be modified.
+    """
+
+    __slots__ = ("array",)
+
+    _iterChunk = 4096
+
+    def __init__(self, array):
+        """:type array: numpy.ndarray
+        :param array: backing array with at least one dimension; it should not be writable
+        """
+        self.array = array
+
+    def __len__(self):
+        return self.array.shape[0]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.array[index].tolist()
+        item = self.array[index]
+        if self.array.ndim > 1:
+            return ArrayView(item)
+        else:
+            return item.item()
+
+    def __iter__(self):
+        array = self.array
+        if array.ndim > 1:
+            for row in array:
+                yield ArrayView(row)
+        else:
+            # convert a chunk at a time so that iterating over a huge vector does not materialize all of it
+            for start in xrange(0, array.shape[0], self._iterChunk):
+                for x in array[start:start + self._iterChunk].tolist():
+                    yield x
+
+    def __reversed__(self):
+        for i in xrange(len(self) - 1, -1, -1):
+            yield self[i]
+
+    def __contains__(self, item):
+        return any(x == item for x in self)
+
+    def index(self, item):
+        for i, x in enumerate(self):
+            if x == item:
+                return i
+        raise ValueError("{0} is not in array".format(repr(item)))
+
+    def count(self, item):
+        return sum(1 for x in self if x == item)
+
+    def tolist(self):
+        """Copy the whole array into (nested) Python lists."""
+        return self.array.tolist()
+
+    def __array__(self, dtype=None):
+        import numpy
+        return numpy.asarray(self.array, dtype=dtype)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+    def __radd__(self, other):
+        return list(other) + list(self)
+
+    def __eq__(self, other):
+        if isinstance(other, ArrayView):
+            import numpy
+            return self.array.shape == other.array.shape and bool(numpy.all(self.array == other.array))
+        elif isinstance(other, (list, tuple, SlidingWindow)):
+            return len(self) == len(other) and all(x == y for x, y in zip(self, other))
+        else:
+            return NotImplemented
+
+    def __ne__(self, other):
+        out = self.__eq__(other)
+        if out is NotImplemented:
+            return out
+        return not out
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "ArrayView(shape={0}, dtype={1})".format(self.array.shape, self.array.dtype)
+
+arrayTypes = (list, tuple, SlidingWindow, ArrayView)
+"""Python types that represent PFA arrays at runtime."""
+
+class VersionedMap(object):
+    """Read-only map value backed by a dict shared among its versions, so that accumulators can change one key in O(1) time.
+
+    Only one version holds the dict; every other version is a one-key difference from a neighbor. ``updated`` changes the dict in place for the new version and turns the old one into a difference. Reading any other version (for instance, an old copy retained by a rollback cell or a ``let`` variable) first moves the dict back to it by undoing the differences along the way, so every version keeps its own contents and a linear sequence of updates never copies.
+
+    To PFA code, a VersionedMap behaves like an immutable dict: it supports ``len``, lookup, ``in``, ``get``, iteration, ``keys``, ``values``, ``items`` (and their ``iter`` forms), ``copy`` (which returns a ``dict``), and equality with dicts.
+    """
+
+    __slots__ = ("_data",)
+
+    _lock = threading.Lock()
+    _missing = object()
+
+    def __init__(self, items=()):
+        """:type items: dict or list of key-value pairs
+        :param items: initial contents (copied)
+        """
+        self._data = dict(items)
+
+    def _reroot(self):
+        """Move the shared dict to this version and return it; the caller must hold the lock."""
+        if isinstance(self._data, dict):
+            return self._data
+        chain = []
+        version = self
+        while not isinstance(version._data, dict):
+            chain.append(version)
+            version = version._data[2]
+        data = version._data
+        for version in reversed(chain):
+            # version = neighbor with key set to value (or removed); the neighbor becomes the inverse difference
+            key, value, neighbor = version._data
+            old = data.get(key, self._missing)
+            if value is self._missing:
+                del data[key]
+            else:
+                data[key] = value
+            neighbor._data = (key, old, version)
+            version._data = data
+        return data
+
+    def updated(self, key, value):
+        """Return a new version with ``key`` set to ``value``.
+
+        :type key: string
+        :param key: key to set
+        :type value: anything
+        :param value: new value for that key
+        :rtype: titus.util.VersionedMap
+        :return: new map; this map is not modified
+        """
+        with self._lock:
+            data = self._reroot()
+            old = data.get(key, self._missing)
+            data[key] = value
+            out = VersionedMap.__new__(VersionedMap)
+            out._data = data
+            self._data = (key, old, out)
+            return out
+
+    def __len__(self):
+        with self._lock:
+            return len(self._reroot())
+
+    def __getitem__(self, key):
+        with self._lock:
+            return self._reroot()[key]
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self._reroot().get(key, default)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._reroot()
+
+    has_key = __contains__
+
+    def keys(self):
+        with self._lock:
+            return self._reroot().keys()
+
+    def values(self):
+        with self._lock:
+            return self._reroot().values()
+
+    def items(self):
+        with self._lock:
+            return self._reroot().items()
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def iterkeys(self):
+        return iter(self.keys())
+
+    def itervalues(self):
+        return iter(self.values())
+
+    def iteritems(self):
+        return iter(self.items())
+
+    def copy(self):
+        """Copy this version into a ``dict``."""
+        with self._lock:
+            return dict(self._reroot())
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __eq__(self, other):
+        if isinstance(other, VersionedMap):
+            return self.copy() == other.copy()
+        elif isinstance(other, dict):
+            return self.copy() == other
+        else:
+            return NotImplemented
+
+    def __ne__(self, other):
+        out = self.__eq__(other)
+        if out is NotImplemented:
+            return out
+        return not out
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self.copy())
+
+mapTypes = (dict, VersionedMap)
+"""Python types that represent PFA maps at runtime (records are always ``dict``)."""
+
+class IdentityCache(object):
+    """Least-recently-used cache of structures derived from PFA values (such as sorted indexes of lookup tables), keyed by the identity of the value.
+
+    PFA values are never modified in place, so a derived structure stays valid for as long as the same object is passed in; replacing a cell or pool value naturally invalidates it. Lists and dicts cannot be weakly referenced, so each entry holds a reference to its key object instead, which keeps the object's ``id`` from being reused while the entry exists.
+
+    Engines keep one cache per call site (see ``titus.genpy.ExecutionState.identityCache``), so that the values seen at one site do not evict those seen at another.
+    """
+
+    def __init__(self, maxSize=64):
+        """:type maxSize: positive integer
+        :param maxSize: number of entries to keep before evicting the least recently used
+        """
+        self.maxSize = maxSize
+        self.entries = OrderedDict()
+
+    def get(self, obj, default=None):
+        """Return the structure cached for ``obj`` or ``default`` if there is none."""
+        key = id(obj)
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return default
+        self.entries[key] = entry
+        if entry[0] is obj:
+            return entry[1]
+        else:
+            return default
+
+    def put(self, obj, value):
+        """Cache ``value`` as the structure derived from ``obj``, evicting the least recently used entry if the cache is full."""
+        key = id(obj)
+        if self.entries.pop(key, None) is None and len(self.entries) >= self.maxSize:
+            self.entries.popitem(last=False)
+        self.entries[key] = (obj, value)
+
+def arrayJsonDefault(obj):
+    """Helper for ``json.dumps(..., default=arrayJsonDefault)`` that serializes array views (titus.util.SlidingWindow and titus.util.ArrayView) as JSON arrays and titus.util.VersionedMap as JSON objects."""
+    if isinstance(obj, SlidingWindow):
+        return list(obj)
+    elif isinstance(obj, ArrayView):
+        return obj.tolist()
+    elif isinstance(obj, VersionedMap):
+        return obj.copy()
+    raise TypeError(repr(obj) + " is not JSON serializable")
+
+def materialize(obj):
+    """Replace array views (titus.util.SlidingWindow and titus.util.ArrayView) anywhere in a PFA value by lists and titus.util.VersionedMap by dicts, for consumers that only accept built-in types, such as Avro's ``DatumWriter``.
+
+    Lists and dicts are copied only if they contain a view, so values without views are returned as-is and are never modified in place.
+
+    :type obj: PFA value
+    :param obj: value that may contain array views
+    :rtype: PFA value
+    :return: equivalent value without array views
+    """
+    if isinstance(obj, ArrayView):
+        return obj.tolist()
+    elif isinstance(obj, SlidingWindow):
+        return [materialize(x) for x in obj]
+    elif isinstance(obj, VersionedMap):
+        return dict((k, materialize(x)) for k, x in obj.items())
+    elif isinstance(obj, list):
+        out = None
+        for i, x in enumerate(obj):
+            y = materialize(x)
+            if y is not x:
+                if out is None:
+                    out = list(obj)
+                out[i] = y
+        return obj if out is None else out
+    elif isinstance(obj, dict):
+        out = None
+        for k, x in obj.items():
+            y = materialize(x)
+            if y is not x:
+                if out is None:
+                    out = obj.copy()
+                out[k] = y
+        return obj if out is None else out
+    else:
+        return obj
+
 def case(clazz):
     """Decoration to make a "case class" in Python.
 